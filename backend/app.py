@@ -7,8 +7,19 @@ Flask + SQLAlchemy + PostgreSQL
 """
 
 import os
+import sys
+from pathlib import Path
+
+# Sibling modules (startup_profile, ...) live next to this file; make them
+# importable whether we're loaded as `app` (scripts) or `backend.app` (wsgi)
+_BACKEND_DIR = str(Path(__file__).resolve().parent)
+if _BACKEND_DIR not in sys.path:
+    sys.path.insert(0, _BACKEND_DIR)
+
+import startup_profile
 import jwt
-import json
+import logging
+import math
 import random
 import string
 import smtplib
@@ -17,171 +28,118 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from functools import wraps
-from pathlib import Path
-from flask import Flask, jsonify, request, send_from_directory, redirect
+import weakref
+import click
+from flask import Flask, Blueprint, current_app, g, jsonify, request, send_from_directory, redirect
 from flask_cors import CORS, cross_origin
-from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
-from dotenv import load_dotenv
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
-
-# Check for psycopg2 availability for PostgreSQL
-try:
-    import psycopg2
-    HAS_PSYCOPG2 = True
-    print("[IMPORT] ✅ psycopg2 available for PostgreSQL", flush=True)
-except ImportError:
-    HAS_PSYCOPG2 = False
-    print("[IMPORT] ⚠️  psycopg2 NOT available - PostgreSQL disabled", flush=True)
+from config import BASE_DIR, Config, has_psycopg2
+from extensions import db
+from passwords import HasherBusy, get_hasher
+from throttle import client_ip, get_login_throttle
+from phones import normalize_phone
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only, selectinload, validates
+import google_keys
+import otp_sweeper
+import outbox
+from outbox import PermanentDeliveryError
+from smtp_pool import get_smtp_pool
+import bill_split
+from catalog import get_catalog
+from group_codes import CodeSpaceExhausted, get_code_allocator
+from group_events import TooManyStreams, get_group_events
+from group_lookup import get_group_lookup
+from join_batcher import get_join_batcher
+from memberships import (add_member, add_members, group_members, is_member, member_counts, remove_group_members,
+                         remove_user_memberships, user_group_ids)
+from menus import group_menu, group_menu_etag, load_menu, store_menu
+from verify_gateway import ProviderUnavailable, get_gateway, is_client_error
+from principal import current_principal, decode_token, invalidate_principal, load_principal
+from logging_config import configure_logging, get_logger, restart_after_fork as restart_logging_after_fork
+# NOTE: Twilio, google-auth and psycopg2 are imported lazily on first use
+# (see get_twilio_client, verify_google_id_token, config.has_psycopg2) so cold
+# starts and worker respawns don't pay for integrations a request may never touch
+
+startup_profile.checkpoint('imports')
 
 # Cache-busting marker for Render deployments (forces clean rebuild)
 _RENDER_CACHE_BUST = "2026-05-08-22:59-v2-prioritize-render-db"
 
-# Load env - BUT ONLY IF NOT ON RENDER
-# On Render, environment variables are provided by render.yaml
-is_render = bool(os.getenv('RENDER'))
-if not is_render:
-    load_dotenv()
-    print("[APP] .env loaded (local development)", flush=True)
-else:
-    print("[APP] Skipping .env on Render - using only environment variables", flush=True)
-    # DEBUG: Show what Render gave us
-    print("[APP] ========== RENDER ENVIRONMENT DEBUG ==========", flush=True)
-    for key in sorted(os.environ.keys()):
-        if len(os.environ[key]) < 500:
-            if any(x in key.upper() for x in ['RENDER', 'DB', 'DATABASE', 'POSTGRES', 'HOST', 'USER', 'PASS', 'PORT']):
-                print(f"[APP] {key}={os.environ[key]}", flush=True)
-    print("[APP] =============================================", flush=True)
-
-# Get parent directory (main project root)
-# On Render, working directory is /app, so this will resolve to /app
-BASE_DIR = Path(__file__).parent.parent
-
-# Fallback: if BASE_DIR/index.html doesn't exist, check common Render paths
-if not (BASE_DIR / 'index.html').exists():
-    # Try /app (Render default)
-    alt_dir = Path('/app')
-    if (alt_dir / 'index.html').exists():
-        BASE_DIR = alt_dir
-        print(f"[APP] Using alternative BASE_DIR: {BASE_DIR}", flush=True)
-
-print(f"[APP] BASE_DIR: {BASE_DIR}")
-print(f"[APP] BASE_DIR exists: {BASE_DIR.exists()}")
-print(f"[APP] index.html exists: {(BASE_DIR / 'index.html').exists()}")
-print(f"[APP] Files in BASE_DIR: {sorted([f.name for f in BASE_DIR.glob('*') if f.is_file()])[:10]}", flush=True)
-
-# Initialize Flask - DON'T use static_folder for now, serve manually
-# Using explicit path serving instead of Flask's static system
-print(f"[INIT] Creating Flask app", flush=True)
-app = Flask(__name__)
-print(f"[INIT] Flask app created successfully", flush=True)
+# All routes and hooks are registered on this blueprint; create_app() attaches
+# it to an application built from a config object (see config.py)
+bp = Blueprint('main', __name__)
+
+# Request-path logging goes through a background queue (see logging_config.py).
+# Per-logger levels via LOG_LEVELS, e.g. "hesap.http=WARNING,hesap.otp=DEBUG"
+http_log = get_logger('http')
+auth_log = get_logger('auth')
+otp_log = get_logger('otp')
+email_log = get_logger('email')
+users_log = get_logger('users')
+groups_log = get_logger('groups')
+orders_log = get_logger('orders')
+admin_log = get_logger('admin')
+sync_log = get_logger('sync')
 
 # ==================== HTTPS REDIRECT MIDDLEWARE ====================
-@app.before_request
+@bp.before_app_request
 def enforce_https():
     """Force HTTP → HTTPS redirect in production"""
     # DEBUG: Log the request details
-    print(f"[HTTPS] Host: {request.host}, Scheme: {request.scheme}, URL: {request.url[:50]}", flush=True)
+    http_log.debug('Host: %s, Scheme: %s, URL: %s', request.host, request.scheme, request.url[:50])
     
     # Only redirect on production domain
     if request.host in ['hesappaylas.com', 'www.hesappaylas.com']:
         # Check scheme (works better with proxies than checking request.url)
         if request.scheme == 'http':
-            print(f"[HTTPS] REDIRECTING http→https", flush=True)
+            http_log.info('REDIRECTING http→https')
             # Reconstruct URL with HTTPS
             url = f"https://{request.host}{request.full_path}"
             if request.query_string:
                 url += f"?{request.query_string.decode()}"
             return redirect(url, code=301)
         else:
-            print(f"[HTTPS] Already HTTPS, no redirect needed", flush=True)
-
-# ==================== PHONE NORMALIZATION UTILITY ====================
-def normalize_phone(phone):
-    """
-    Normalize phone number to international format: +905323133277
-    Standards: Always use +90 prefix for Turkish numbers
-    """
-    if not phone:
-        return None
-    
-    phone = str(phone).strip()
-    
-    # Remove any spaces, hyphens, parentheses
-    phone = phone.replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
-    
-    # If already has + prefix, just ensure it's correct
-    if phone.startswith('+'):
-        return phone
-    
-    # Remove leading 0 if present (for Turkish numbers entered as 05323133277)
-    if phone.startswith('0'):
-        phone = phone[1:]
-    
-    # Add country code if not present
-    if not phone.startswith('90'):
-        phone = '90' + phone
-    
-    # Add + prefix
-    return '+' + phone
+            http_log.debug('Already HTTPS, no redirect needed')
 
 # ==================== EMAIL UTILITY ====================
-def _send_email_async(email, reset_code, user_name):
-    """Actually send the email (runs in background thread)"""
-    try:
-        # Log to file since daemon threads don't show in stdout
-        log_file = '/tmp/hesap_paylas_email.log'
-        
-        with open(log_file, 'a') as f:
-            f.write(f"\n[{datetime.now()}] Starting email send to {email}\n")
-        
-        smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-        smtp_port = int(os.getenv('SMTP_PORT', '587'))
-        sender_email = os.getenv('SENDER_EMAIL')
-        sender_password = os.getenv('SENDER_PASSWORD')
-        
-        print(f"[EMAIL] Starting email send...")
-        print(f"[EMAIL] SMTP Server: {smtp_server}:{smtp_port}")
-        print(f"[EMAIL] Sender Email: {sender_email}")
-        print(f"[EMAIL] Recipient Email: {email}")
-        
-        if not all([sender_email, sender_password]):
-            print(f"[EMAIL] ⚠️  Email not configured - SENDER_EMAIL={sender_email}, SENDER_PASSWORD={'***' if sender_password else 'NOT SET'}")
-            return False
-        
-        message = MIMEMultipart('alternative')
-        message['Subject'] = 'Hesap Paylaş - PIN Sıfırlama Kodu / Password Reset Code'
-        message['From'] = 'Hesap Paylaş <noreply@hesappaylas.local>'
-        message['To'] = email
-        message['Reply-To'] = sender_email
-        message['X-Priority'] = '3'
-        message['X-Mailer'] = 'Hesap Paylas System'
-        message['Precedence'] = 'bulk'
-        
-        html = f"""\
-        <html>
-            <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                <div style="padding: 20px; background: #f9f9f9; border: 1px solid #ddd;">
-                    <h2>Hesap Paylaş - PIN Sıfırlama Kodu</h2>
-                    <p>Merhaba {user_name},</p>
-                    <p>PIN kodunuzu sıfırlamak için aşağıdaki 6 haneli kodu kullanabilirsiniz:</p>
-                    
-                    <div style="padding: 20px; background: #f0f0f0; border: 1px solid #ccc; text-align: center; margin: 20px 0;">
-                        <p style="font-size: 32px; font-weight: bold; letter-spacing: 4px; margin: 0; font-family: monospace;">
-                            {reset_code}
-                        </p>
-                    </div>
-                    
-                    <p>Bu kod 5 dakika geçerlidir. Kodunuzu kimseyle paylaşmayın.</p>
-                    <p>Hesap Paylaş Team</p>
+def email_configured():
+    config = current_app.config
+    return bool(config['SENDER_EMAIL'] and config['SENDER_PASSWORD'])
+
+def build_reset_email(email, reset_code, user_name):
+    """The PIN reset code email (HTML + plain text)"""
+    message = MIMEMultipart('alternative')
+    message['Subject'] = 'Hesap Paylaş - PIN Sıfırlama Kodu / Password Reset Code'
+    message['From'] = 'Hesap Paylaş <noreply@hesappaylas.local>'
+    message['To'] = email
+    message['Reply-To'] = current_app.config['SENDER_EMAIL']
+    message['X-Priority'] = '3'
+    message['X-Mailer'] = 'Hesap Paylas System'
+    message['Precedence'] = 'bulk'
+    
+    html = f"""\
+    <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <div style="padding: 20px; background: #f9f9f9; border: 1px solid #ddd;">
+                <h2>Hesap Paylaş - PIN Sıfırlama Kodu</h2>
+                <p>Merhaba {user_name},</p>
+                <p>PIN kodunuzu sıfırlamak için aşağıdaki 6 haneli kodu kullanabilirsiniz:</p>
+                
+                <div style="padding: 20px; background: #f0f0f0; border: 1px solid #ccc; text-align: center; margin: 20px 0;">
+                    <p style="font-size: 32px; font-weight: bold; letter-spacing: 4px; margin: 0; font-family: monospace;">
+                        {reset_code}
+                    </p>
                 </div>
-            </body>
-        </html>
-        """
-        
-        # Also add plain text version for email clients that don't support HTML
-        text = f"""\
+                
+                <p>Bu kod 5 dakika geçerlidir. Kodunuzu kimseyle paylaşmayın.</p>
+                <p>Hesap Paylaş Team</p>
+            </div>
+        </body>
+    </html>
+    """
+    
+    # Also add plain text version for email clients that don't support HTML
+    text = f"""\
 Hesap Paylaş - PIN Sıfırlama Kodu
 
 Merhaba {user_name}!
@@ -197,164 +155,66 @@ GÜVENLIK UYARISI: Bu kodu kimseyle paylaşmayın!
 ---
 Hesap Paylaş Team
 © 2026 Hesap Paylaş. Tüm hakları saklıdır.
-        """
-        
-        part1 = MIMEText(text, 'plain')
-        part2 = MIMEText(html, 'html')
-        message.attach(part1)
-        message.attach(part2)
-        
-        print(f"[EMAIL] Connecting to SMTP server...")
-        server = smtplib.SMTP(smtp_server, smtp_port, timeout=10)
-        print(f"[EMAIL] Connected. Starting TLS...")
-        server.starttls()
-        print(f"[EMAIL] TLS started. Logging in...")
-        server.login(sender_email, sender_password)
-        print(f"[EMAIL] Login successful. Sending message...")
-        server.send_message(message)
-        server.quit()
-        
-        print(f"[EMAIL] ✅ Reset code sent to {email}")
-        with open(log_file, 'a') as f:
-            f.write(f"[{datetime.now()}] ✅ Email sent successfully to {email}\n")
-        return True
-        
-    except Exception as e:
-        print(f"[EMAIL] ❌ Failed to send email: {str(e)}")
-        with open('/tmp/hesap_paylas_email.log', 'a') as f:
-            f.write(f"[{datetime.now()}] ❌ Error: {str(e)}\n")
-        return False
+    """
+    
+    message.attach(MIMEText(text, 'plain'))
+    message.attach(MIMEText(html, 'html'))
+    return message
 
-def send_reset_email(email, reset_code, user_name):
-    """Send password reset code via email (non-blocking)"""
+def deliver_email(kind, payload):
+    """Outbox provider for 'email': send one PIN reset code over SMTP
+
+    Runs in the outbox dispatcher (worker.py or the inline thread), never in
+    a request. Sessions come from this process's SMTPPool, so a reset wave
+    logs in once instead of once per email. Raising makes the outbox retry
+    with backoff.
+    """
+    email = payload['email']
+    if not email_configured():
+        email_log.warning('⚠️  Email not configured - SENDER_EMAIL=%s, SENDER_PASSWORD=%s',
+                          current_app.config['SENDER_EMAIL'],
+                          '***' if current_app.config['SENDER_PASSWORD'] else 'NOT SET')
+        raise PermanentDeliveryError('email not configured')
+    
+    message = build_reset_email(email, payload['reset_code'], payload['user_name'])
     try:
-        # Send email in background thread so it doesn't block the response
-        thread = threading.Thread(
-            target=_send_email_async,
-            args=(email, reset_code, user_name),
-            daemon=True
-        )
-        thread.start()
-        return True
+        get_smtp_pool().send(message)
+    except smtplib.SMTPRecipientsRefused as e:
+        raise PermanentDeliveryError(f'recipient refused: {e}')
     except Exception as e:
-        print(f"[EMAIL] ❌ Failed to start email thread: {str(e)}")
-        return False
+        email_log.error('❌ Failed to send email to %s: %s', email, e)
+        raise
+    
+    email_log.info('✅ Reset code sent to %s', email)
+    return {'email': email}
 
-    except Exception as e:
-        print(f"[EMAIL] ❌ Failed to send email: {e}")
+def send_reset_email(email, reset_code, user_name, dedupe_key=None):
+    """Queue a password reset code email; True once it is in the outbox
+
+    The caller commits (the message is part of its transaction). Returns
+    False without queueing when SMTP isn't configured.
+    """
+    if current_app.config['OUTBOX_PROVIDER'] == 'live' and not email_configured():
+        email_log.warning('⚠️  Email not configured - not queueing reset code for %s', email)
         return False
+    outbox.enqueue('email', {'email': email, 'reset_code': reset_code, 'user_name': user_name},
+                   dedupe_key=dedupe_key)
+    return True
 
 # Print all registered routes at startup (for debugging Render)
-def print_routes():
-    """Print all registered Flask routes"""
+def print_routes(app):
+    """Print all registered Flask routes (auth routes with their methods)"""
     routes = []
     for rule in app.url_map.iter_rules():
         routes.append(f"{rule.rule} -> {rule.endpoint}")
     print(f"[ROUTES] Registered {len(routes)} routes", flush=True)
+    for rule in app.url_map.iter_rules():
+        if 'auth' in str(rule):
+            print(f"  {rule.rule:50} {sorted(rule.methods)}", flush=True)
 
 # Will be called after app is fully initialized
 # print_routes() is called later in the code
 
-# CORS configuration for GitHub Pages and local development
-CORS(app, resources={
-    r"/api/*": {
-        "origins": ["*"],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "supports_credentials": False,
-        "max_age": 3600
-    }
-})
-
-# ==================== Database Initialization ====================
-# NOTE: Removed @app.before_request hook that was causing timeout issues
-# Database is now initialized once at startup in __main__ block
-
-# Config
-# ABSOLUTE path for database - avoid path conflicts
-database_url = None
-db_type = None
-
-# DEBUG: Log all environment variables that might contain database info
-print("\n[DB] ===== DATABASE ENVIRONMENT DEBUG =====", flush=True)
-print(f"[DB] RENDER: {os.getenv('RENDER', 'NOT SET')}", flush=True)
-print(f"[DB] RENDER_DATABASE_URL: {os.getenv('RENDER_DATABASE_URL', 'NOT SET')[:80] if os.getenv('RENDER_DATABASE_URL') else 'NOT SET'}", flush=True)
-print(f"[DB] DATABASE_URL: {os.getenv('DATABASE_URL', 'NOT SET')[:80] if os.getenv('DATABASE_URL') else 'NOT SET'}", flush=True)
-print(f"[DB] Checking all env vars with 'DB' or 'DATABASE' or 'POSTGRES':", flush=True)
-for key in sorted(os.environ.keys()):
-    if any(x in key.upper() for x in ['DB', 'DATABASE', 'POSTGRES', 'SQL']):
-        value = os.getenv(key)
-        if value and len(value) > 100:
-            print(f"[DB]   {key}: {value[:100]}...", flush=True)
-        else:
-            print(f"[DB]   {key}: {value}", flush=True)
-print("[DB] ==========================================\n", flush=True)
-
-# Priority 1: Check RENDER_DATABASE_URL (Render's PostgreSQL - HIGHEST PRIORITY)
-if os.getenv('RENDER_DATABASE_URL'):
-    test_url = os.getenv('RENDER_DATABASE_URL')
-    print(f"[DB] RENDER_DATABASE_URL detected: {test_url[:50]}...", flush=True)
-    if HAS_PSYCOPG2:
-        print(f"[DB] ✅ Using RENDER_DATABASE_URL with PostgreSQL", flush=True)
-        database_url = test_url
-        if database_url.startswith('postgres://'):
-            database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        db_type = 'PostgreSQL (Render RENDER_DATABASE_URL)'
-
-# Priority 2: If no RENDER_DATABASE_URL, check if DATABASE_URL is PostgreSQL
-elif os.getenv('DATABASE_URL'):
-    test_url = os.getenv('DATABASE_URL')
-    print(f"[DB] DATABASE_URL detected: {test_url[:50]}...", flush=True)
-    
-    # If we're on Render and got PostgreSQL in DATABASE_URL, use it
-    if 'postgres' in test_url.lower() and os.getenv('RENDER'):
-        if HAS_PSYCOPG2:
-            print(f"[DB] ✅ Detected PostgreSQL in DATABASE_URL on Render", flush=True)
-            database_url = test_url
-            if database_url.startswith('postgres://'):
-                database_url = database_url.replace('postgres://', 'postgresql://', 1)
-            db_type = 'PostgreSQL (Render DATABASE_URL)'
-        else:
-            print(f"[DB] ⚠️  PostgreSQL in DATABASE_URL but psycopg2 not available", flush=True)
-    # If it's SQLite, use it
-    elif 'sqlite' in test_url.lower():
-        database_url = test_url
-        db_type = 'SQLite (Local)'
-        print(f"[DB] Detected SQLite database", flush=True)
-
-# Priority 3: Fall back to local SQLite if we're NOT on Render
-if not database_url and not os.getenv('RENDER'):
-    # Priority 3: Fall back to local SQLite
-    instance_path = os.path.join(BASE_DIR, 'backend', 'instance')
-    os.makedirs(instance_path, exist_ok=True)
-    db_path = os.path.join(instance_path, 'hesap_paylas.db')
-    database_url = f'sqlite:///{db_path}'
-    db_type = 'SQLite (Local)'
-    print(f"[DB] No DATABASE_URL set - using local SQLite", flush=True)
-
-# Log database selection
-print(f"\n{'='*60}")
-print(f"Database: {db_type}")
-print(f"Status: {'Configured' if 'sqlite' not in database_url else 'Ready'}")
-print(f"{'='*60}\n")
-
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret')
-app.config['JWT_SECRET'] = os.getenv('JWT_SECRET', 'jwt-secret')
-app.config['JWT_EXPIRATION'] = 86400 * 7  # 7 days
-
-# Connection pooling for PostgreSQL
-if 'postgresql' in database_url:
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'pool_size': 10,
-        'pool_recycle': 3600,
-        'pool_pre_ping': True,
-        'max_overflow': 20,
-    }
-
-db = SQLAlchemy(app)
-
 # ==================== Real-time Database Sync ====================
 
 # Store Render connection for sync
@@ -370,14 +230,14 @@ def get_render_connection():
             if render_url.startswith('postgres://'):
                 render_url = render_url.replace('postgres://', 'postgresql://', 1)
             render_db = create_engine(render_url, echo=False)
-            print("✓ Render sync connection established")
+            sync_log.info('✓ Render sync connection established')
         except Exception as e:
-            print(f"⚠️  Render sync not available: {e}")
+            sync_log.warning('⚠️  Render sync not available: %s', e)
     return render_db
 
 def sync_to_render(table_name, operation, data):
     """Sync data to Render PostgreSQL in real-time"""
-    if os.getenv('FLASK_ENV') == 'development' and 'sqlite' in database_url:
+    if os.getenv('FLASK_ENV') == 'development' and 'sqlite' in current_app.config['SQLALCHEMY_DATABASE_URI']:
         # Only sync if we're using SQLite locally and Render is configured
         if os.getenv('RENDER_DATABASE_URL'):
             try:
@@ -392,7 +252,7 @@ def sync_to_render(table_name, operation, data):
                         elif operation == 'delete':
                             pass
             except Exception as e:
-                print(f"⚠️  Sync to Render failed: {e}")
+                sync_log.error('⚠️  Sync to Render failed: %s', e)
 
 # ==================== Models ====================
 
@@ -403,7 +263,8 @@ class User(db.Model):
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    phone = db.Column(db.String(20), nullable=True)
+    # Canonical +90... form (see phones.py); unique so lookups use ix_users_phone
+    phone = db.Column(db.String(20), nullable=True, unique=True, index=True)
     password_hash = db.Column(db.String(255), nullable=True)
     avatar_url = db.Column(db.String(255), nullable=True)
     bonus_points = db.Column(db.Integer, default=0)
@@ -422,11 +283,26 @@ class User(db.Model):
     # Relationships
     orders = db.relationship('Order', backref='creator', lazy=True)
     
+    @validates('phone')
+    def _normalize_phone(self, key, phone):
+        return normalize_phone(phone)
+    
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        """Hash in the bounded hashing pool; raises passwords.HasherBusy when it is saturated"""
+        self.password_hash = get_hasher().hash_bounded(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify in the bounded hashing pool; upgrade an outdated hash in place
+
+        Raises passwords.HasherBusy when the pool is saturated. After a
+        successful check the caller commits if the hash was upgraded.
+        """
+        hasher = get_hasher()
+        if not hasher.verify_bounded(password, self.password_hash):
+            return False
+        if hasher.needs_rehash(self.password_hash):
+            self.password_hash = hasher.hash_bounded(password)
+        return True
     
     def to_dict(self):
         return {
@@ -452,22 +328,22 @@ class Group(db.Model):
     # 🆕 Menu/Restaurant fields
     restaurant_id = db.Column(db.String(50), nullable=True)  # ID from QR code (e.g., "rest_001")
     restaurant_name = db.Column(db.String(100), nullable=True)  # Restaurant name
-    menu_data = db.Column(db.JSON, nullable=True)  # Full menu data from restaurants.json
+    menu_data = db.Column(db.JSON, nullable=True)  # Legacy per-group menu copy (see migrate_menu_snapshots.py)
+    menu_snapshot_id = db.Column(db.String(64), db.ForeignKey('menu_snapshots.id'), nullable=True, index=True)  # menus.py
     menu_locked = db.Column(db.Boolean, default=False)  # Menu locked after finalization
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)  # Grup kapalı/açık
+    # Bumped by every change GET /api/groups/<id> shows (its ETag); see bump_group_version
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
-    # Many-to-many relationship with users
-    members = db.relationship('User', secondary='group_members', backref='groups')
+    # Many-to-many relationship with users (group_members, see memberships.py).
+    # passive_deletes: deleting a group or user never loads these collections;
+    # the handlers remove the membership rows with one statement first
+    members = db.relationship('User', secondary=group_members, passive_deletes=True,
+                              backref=db.backref('groups', passive_deletes=True))
     orders = db.relationship('Order', backref='group', lazy=True)
 
-# Association table for group members (many-to-many)
-group_members = db.Table('group_members',
-    db.Column('group_id', db.Integer, db.ForeignKey('groups.id'), primary_key=True),
-    db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True)
-)
-
 class Order(db.Model):
     __tablename__ = 'orders'
     
@@ -478,6 +354,7 @@ class Order(db.Model):
     total_amount = db.Column(db.Float, nullable=False)
     tax = db.Column(db.Float, default=0)
     delivery = db.Column(db.Float, default=0)
+    tip = db.Column(db.Float, default=0)  # tip, tax and delivery are split by consumption ratio
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
@@ -491,21 +368,36 @@ class OrderItem(db.Model):
     name = db.Column(db.String(100), nullable=False)
     price = db.Column(db.Float, nullable=False)
     quantity = db.Column(db.Integer, default=1)
+    # personal (the order's creator pays), shared (all members) or excluded; see bill_split.py
+    split_type = db.Column(db.String(10), nullable=False, default=bill_split.PERSONAL,
+                           server_default=bill_split.PERSONAL)
+    # shared items only: {"<user id>": weight} of the members sharing it; NULL = all members equally
+    shares = db.Column(db.JSON, nullable=True)
 
 class MemberBill(db.Model):
     __tablename__ = 'member_bills'
+    __table_args__ = (
+        # One bill per member and order (save_member_bills rewrites them)
+        db.Index('uq_member_bills_order_user', 'order_id', 'user_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     items = db.Column(db.JSON, nullable=True)  # JSON array of items
 
 class OTPVerification(db.Model):
     __tablename__ = 'otp_verifications'
+    __table_args__ = (
+        # Exactly the reset-code lookups: (phone, purpose, code[, used])
+        db.Index('ix_otp_lookup', 'phone', 'purpose', 'code', 'used'),
+        # Expiry sweeper (otp_sweeper.py)
+        db.Index('ix_otp_expires_at', 'expires_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    phone = db.Column(db.String(20), nullable=False, index=True)
+    phone = db.Column(db.String(20), nullable=False)
     otp_code = db.Column(db.String(6), nullable=True)  # For Twilio verification
     code = db.Column(db.String(6), nullable=True)  # Generic code field (for PIN reset)
     purpose = db.Column(db.String(20), default='verification')  # 'verification' or 'pin_reset'
@@ -523,27 +415,129 @@ class OTPVerification(db.Model):
     def can_attempt(self):
         return self.attempts < self.max_attempts
 
+# Most codes a failed lookup will load for its debug log
+OTP_DEBUG_LIMIT = 5
+
+def log_recent_otps(logger, phone, purpose):
+    """Debug aid for a failed code lookup: the newest few codes for this phone, never all of them"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    recent = OTPVerification.query.filter_by(phone=phone, purpose=purpose) \
+        .order_by(OTPVerification.id.desc()).limit(OTP_DEBUG_LIMIT).all()
+    logger.debug('Newest %s %s codes for %s:', len(recent), purpose, phone)
+    for otp in recent:
+        logger.debug('- code=%s, used=%s, expires_at=%s', otp.code, otp.used, otp.expires_at)
+
+def outstanding_otp(phone, purpose):
+    """The newest unused, unexpired code for phone/purpose issued within OTP_RESEND_SECONDS
+
+    Repeated "resend code" taps inside that window reuse it instead of
+    creating another code and sending another SMS/email.
+    """
+    now = datetime.utcnow()
+    window = timedelta(seconds=current_app.config['OTP_RESEND_SECONDS'])
+    return OTPVerification.query.filter(
+        OTPVerification.phone == phone,
+        OTPVerification.purpose == purpose,
+        OTPVerification.used == False,
+        OTPVerification.expires_at > now,
+        OTPVerification.created_at > now - window,
+    ).order_by(OTPVerification.id.desc()).first()
+
+def resend_info(otp, coalesced):
+    """Response fields telling the client when it may ask for a new code"""
+    available_at = otp.created_at + timedelta(seconds=current_app.config['OTP_RESEND_SECONDS'])
+    return {
+        'coalesced': coalesced,
+        'resend_available_in': max(0, math.ceil((available_at - datetime.utcnow()).total_seconds())),
+        'resend_available_at': available_at.isoformat() + 'Z',
+    }
+
+startup_profile.checkpoint('models')
+
 # ==================== Twilio Configuration ====================
-try:
-    from twilio.rest import Client
-    TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
-    TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
-    TWILIO_SERVICE_SID = os.getenv('TWILIO_SERVICE_SID')
-    
-    if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_SERVICE_SID:
-        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        print("[TWILIO] Client initialized successfully", flush=True)
-    else:
-        print("[TWILIO] Missing credentials - SMS OTP disabled", flush=True)
-        twilio_client = None
-except Exception as e:
-    print(f"[TWILIO] Initialization failed: {e}", flush=True)
-    twilio_client = None
+_twilio_lock = threading.Lock()
+
+def twilio_configured():
+    config = current_app.config
+    return bool(config['TWILIO_ACCOUNT_SID'] and config['TWILIO_AUTH_TOKEN'] and config['TWILIO_SERVICE_SID'])
+
+def get_twilio_client():
+    """Return this process's Twilio client, importing/creating it on first use (None if not configured)
 
-@app.after_request
+    The client is cached on the app per process id, so workers forked from a
+    preloaded master each build their own HTTP session instead of sharing one.
+    """
+    if not twilio_configured():
+        return None
+    config = current_app.config
+    cached = current_app.extensions.get('twilio_client')
+    if cached and cached[0] == os.getpid():
+        return cached[1]
+    with _twilio_lock:
+        cached = current_app.extensions.get('twilio_client')
+        if cached and cached[0] == os.getpid():
+            return cached[1]
+        try:
+            from twilio.http.http_client import TwilioHttpClient
+            from twilio.rest import Client
+            # Bounded socket waits: a hung Twilio must not hold our threads forever
+            client = Client(config['TWILIO_ACCOUNT_SID'], config['TWILIO_AUTH_TOKEN'],
+                            http_client=TwilioHttpClient(timeout=config['TWILIO_TIMEOUT']))
+            current_app.extensions['twilio_client'] = (os.getpid(), client)
+            otp_log.info('Client initialized successfully')
+            return client
+        except Exception as e:
+            otp_log.error('Initialization failed: %s', e)
+            return None
+
+def twilio_gateway():
+    """This process's guarded Twilio Verify gateway (None if not configured)"""
+    return get_gateway(client_factory=get_twilio_client)
+
+def provider_unavailable_response(e):
+    """503 while Twilio is failing, too slow, or this worker's Twilio calls are saturated"""
+    return jsonify({'error': 'SMS service temporarily unavailable. Please retry.', 'reason': e.reason}), \
+        503, {'Retry-After': str(e.retry_after)}
+
+def deliver_sms_verification(kind, payload):
+    """Outbox provider for 'sms_verification': start a Twilio Verify SMS
+
+    ProviderUnavailable (timeout, open circuit) is an ordinary failure here:
+    the dispatcher retries the message with backoff.
+    """
+    gateway = twilio_gateway()
+    if not gateway:
+        raise PermanentDeliveryError('SMS service not configured')
+    try:
+        verification = gateway.start_verification(payload['phone'])
+    except Exception as e:
+        # 4xx (invalid number, blocked, ...) won't succeed on retry; 429 and 5xx may
+        if is_client_error(e):
+            raise PermanentDeliveryError(f'Twilio {e.status}: {getattr(e, "msg", e)}')
+        raise
+    otp_log.info('✅ Verification sent: %s (%s)', verification['sid'], verification['status'])
+    return verification
+
+@bp.before_app_first_request
+def start_background_jobs():
+    """OUTBOX_DISPATCH=inline: this worker runs the outbox and OTP sweeper itself (no worker.py)"""
+    outbox.start_inline_dispatcher()
+    otp_sweeper.start_inline_sweeper()
+
+# ==================== Google Sign-In ====================
+def verify_google_id_token(token):
+    """Verify a Google ID token and return its claims
+
+    Google's certificates come from this process's cache (google_keys.py),
+    so a sign-in doesn't wait on a certificate download.
+    """
+    return google_keys.verify_google_id_token(token, current_app.config['GOOGLE_CLIENT_ID'])
+
+@bp.after_app_request
 def sync_to_render_after_request(response):
     """After each request, sync local changes to Render if using SQLite locally"""
-    if os.getenv('FLASK_ENV') == 'development' and 'sqlite' in database_url:
+    if os.getenv('FLASK_ENV') == 'development' and 'sqlite' in current_app.config['SQLALCHEMY_DATABASE_URI']:
         if os.getenv('RENDER_DATABASE_URL') and request.method in ['POST', 'PUT', 'DELETE']:
             try:
                 # Queue async sync to Render (non-blocking)
@@ -592,19 +586,19 @@ def sync_to_render_after_request(response):
                         sqlite_conn.close()
                         render_conn.close()
                     except Exception as sync_err:
-                        print(f"⚠️  Background sync error: {sync_err}")
+                        sync_log.warning('⚠️  Background sync error: %s', sync_err)
                 
                 # Run sync in background thread (non-blocking)
                 sync_thread = threading.Thread(target=background_sync, daemon=True)
                 sync_thread.start()
             except Exception as e:
-                print(f"⚠️  Sync setup failed: {e}")
+                sync_log.error('⚠️  Sync setup failed: %s', e)
     
     return response
 
 # ==================== Auth Routes ====================
 
-@app.route('/api/auth/signup', methods=['POST', 'OPTIONS'])
+@bp.route('/api/auth/signup', methods=['POST', 'OPTIONS'])
 @cross_origin(origins="*", methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"], allow_headers=["Content-Type", "Authorization"])
 def signup():
     """User signup"""
@@ -636,39 +630,53 @@ def signup():
         # This was causing users to be added to ALL groups on signup
         
         token = generate_token(user.id)
-        print(f"[SIGNUP] User created: {data['email']}")
+        auth_log.info('User created: %s', data['email'])
         return jsonify({
             'message': 'User created successfully',
             'user': user.to_dict(),
             'token': token
         }), 201
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Signup failed: {str(e)}")
+        auth_log.error('Signup failed: %s', str(e))
         return jsonify({'error': 'Signup failed. Please try again.'}), 500
 
-@app.route('/api/auth/login', methods=['POST', 'OPTIONS'])
+@bp.route('/api/auth/login', methods=['POST', 'OPTIONS'])
 def login():
     """User login"""
     if request.method == 'OPTIONS':
         return '', 200
     
+    throttled = login_throttled()
+    if throttled:
+        return throttled
+    
     data = request.get_json()
-    print(f"[LOGIN] Request - Email: {data.get('email') if data else 'No data'}")
+    auth_log.debug('Request - Email: %s', data.get('email') if data else 'No data')
     
     if not data or not all(k in data for k in ['email', 'password']):
-        print("[LOGIN] Missing email or password")
+        auth_log.info('Missing email or password')
         return jsonify({'error': 'Missing email or password'}), 400
     
+    throttled = login_throttled(email=str(data['email']))
+    if throttled:
+        return throttled
+    
     user = User.query.filter_by(email=data['email']).first()
     if not user:
-        print(f"[LOGIN] User not found: {data['email']}")
+        auth_log.debug('User not found: %s', data['email'])
         return jsonify({'error': 'user_not_found'}), 404
     if not user.check_password(data['password']):
-        print(f"[LOGIN] Password mismatch for user: {data['email']}")
+        auth_log.info('Password mismatch for user: %s', data['email'])
         return jsonify({'error': 'wrong_password'}), 401
+    if db.session.is_modified(user):
+        db.session.commit()  # hash upgraded to the current PASSWORD_HASH_METHOD
+    login_succeeded(email=str(data['email']))
     
-    print(f"[LOGIN] Successful login for: {data['email']}")
+    auth_log.info('Successful login for: %s', data['email'])
     token = generate_token(user.id)
     return jsonify({
         'message': 'Login successful',
@@ -676,7 +684,7 @@ def login():
         'token': token
     }), 200
 
-@app.route('/api/auth/debug-env', methods=['GET'])
+@bp.route('/api/auth/debug-env', methods=['GET'])
 def debug_env():
     """Debug endpoint - show ALL environment variables"""
     # Get all env vars
@@ -692,13 +700,13 @@ def debug_env():
         'RENDER': os.getenv('RENDER', 'NOT SET'),
         'RENDER_DATABASE_URL': os.getenv('RENDER_DATABASE_URL', 'NOT SET')[:80],
         'DATABASE_URL': os.getenv('DATABASE_URL', 'NOT SET')[:80],
-        'HAS_PSYCOPG2': str(HAS_PSYCOPG2),
-        'app_sqlalchemy_uri': str(app.config.get('SQLALCHEMY_DATABASE_URI', 'NOT SET'))[:80],
-        'detected_database_type': db_type,
+        'HAS_PSYCOPG2': str(has_psycopg2()),
+        'app_sqlalchemy_uri': str(current_app.config.get('SQLALCHEMY_DATABASE_URI', 'NOT SET'))[:80],
+        'detected_database_type': current_app.config['DB_TYPE'],
         'sample_env_vars': dict(env_list)
     }), 200
 
-@app.route('/api/auth/debug-users', methods=['GET'])
+@bp.route('/api/auth/debug-users', methods=['GET'])
 def debug_users():
     """Debug endpoint - list all users (remove in production)"""
     users = User.query.all()
@@ -707,7 +715,7 @@ def debug_users():
         'users': [{'id': u.id, 'email': u.email, 'name': f"{u.first_name} {u.last_name}"} for u in users]
     }), 200
 
-@app.route('/api/auth/google', methods=['POST'])
+@bp.route('/api/auth/google', methods=['POST'])
 def google_signup():
     """Google OAuth signup/login"""
     data = request.get_json()
@@ -717,11 +725,7 @@ def google_signup():
     
     try:
         # Verify Google token
-        idinfo = id_token.verify_oauth2_token(
-            data['token'],
-            google_requests.Request(),
-            '625132087724-43j0qmqgh8kds471d73oposqthr8tt1h.apps.googleusercontent.com'
-        )
+        idinfo = verify_google_id_token(data['token'])
         
         # Extract user info from Google token
         google_id = idinfo['sub']
@@ -753,10 +757,13 @@ def google_signup():
             'token': token
         }), 200
     
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         return jsonify({'error': f'Invalid token: {str(e)}'}), 401
 
-@app.route('/api/auth/request-password-reset', methods=['POST'])
+@bp.route('/api/auth/request-password-reset', methods=['POST'])
 def request_password_reset():
     """Request password reset - send reset code to email"""
     try:
@@ -777,7 +784,7 @@ def request_password_reset():
             'purpose': 'password_reset',
             'exp': datetime.utcnow() + timedelta(hours=1)  # 1 hour expiration
         }
-        reset_token = jwt.encode(reset_payload, app.config['JWT_SECRET'], algorithm='HS256')
+        reset_token = jwt.encode(reset_payload, current_app.config['JWT_SECRET'], algorithm='HS256')
         
         # Store reset token in database
         user.reset_token = reset_token
@@ -786,7 +793,7 @@ def request_password_reset():
         
         # In a real app, send email here with reset link/code
         # For now, return the token in response (frontend will store it)
-        print(f"[PASSWORD] Reset token generated for {data['email']}")
+        auth_log.info('Reset token generated for %s', data['email'])
         return jsonify({
             'message': 'Password reset token generated',
             'resetToken': reset_token,
@@ -794,10 +801,10 @@ def request_password_reset():
         }), 200
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Password reset request failed: {str(e)}")
+        auth_log.error('Password reset request failed: %s', str(e))
         return jsonify({'error': 'Password reset request failed. Please try again.'}), 500
 
-@app.route('/api/auth/reset-password', methods=['POST'])
+@bp.route('/api/auth/reset-password', methods=['POST'])
 def reset_password():
     """Reset password using reset token"""
     try:
@@ -808,7 +815,7 @@ def reset_password():
         
         try:
             # Verify reset token
-            payload = jwt.decode(data['resetToken'], app.config['JWT_SECRET'], algorithms=['HS256'])
+            payload = jwt.decode(data['resetToken'], current_app.config['JWT_SECRET'], algorithms=['HS256'])
             
             if payload.get('purpose') != 'password_reset':
                 return jsonify({'error': 'Invalid reset token'}), 401
@@ -827,88 +834,88 @@ def reset_password():
             user.reset_token_expires = None
             db.session.commit()
             
-            print(f"[PASSWORD] Password reset successful")
+            auth_log.info('Password reset successful')
             return jsonify({'message': 'Password reset successful'}), 200
             
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Reset token has expired'}), 401
         except jwt.InvalidTokenError:
             return jsonify({'error': 'Invalid reset token'}), 401
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Password reset failed: {str(e)}")
+        auth_log.error('Password reset failed: %s', str(e))
         return jsonify({'error': 'Password reset failed. Please try again.'}), 500
 
 # ==================== Phone OTP Authentication ====================
 
-@app.route('/api/auth/request-otp', methods=['POST'])
+@bp.route('/api/auth/request-otp', methods=['POST'])
 def request_otp():
     """Request OTP via SMS to phone number"""
     try:
         data = request.get_json()
-        print(f"[OTP] Request received: {data}")
+        otp_log.debug('Request received: %s', data)
         
         if not data or 'phone' not in data:
             return jsonify({'error': 'Phone number is required'}), 400
         
         phone = data['phone'].strip()
-        print(f"[OTP] Raw phone: {phone}")
+        otp_log.debug('Raw phone: %s', phone)
         
-        # Validate phone format (basic)
-        if not phone.startswith('+'):
-            phone = '+90' + phone.lstrip('0')
+        # Canonical form, as stored in users.phone
+        phone = normalize_phone(phone)
         
-        print(f"[OTP] Formatted phone: {phone}")
+        otp_log.debug('Formatted phone: %s', phone)
         
-        if not twilio_client:
-            print("[OTP] ERROR: Twilio client not initialized")
+        if not phone:
+            return jsonify({'error': 'Phone number is required'}), 400
+        
+        if current_app.config['OUTBOX_PROVIDER'] == 'live' and not twilio_configured():
+            otp_log.error('Twilio client not configured')
             return jsonify({'error': 'SMS service not configured'}), 503
         
-        try:
-            print(f"[OTP] Attempting to send SMS via Twilio Verify Service: {TWILIO_SERVICE_SID}")
-            
-            # Use Twilio Verify API (free service)
-            verification = twilio_client.verify \
-                .v2 \
-                .services(TWILIO_SERVICE_SID) \
-                .verifications \
-                .create(to=phone, channel='sms')
-            
-            print(f"[OTP] ✅ Verification sent successfully!")
-            print(f"[OTP] Verification SID: {verification.sid}")
-            print(f"[OTP] Status: {verification.status}")
-            print(f"[OTP] Phone: {verification.to}")
-            
-            return jsonify({
-                'message': 'OTP sent to your phone',
-                'verification_sid': verification.sid,
-                'phone_masked': phone[-4:],
-                'status': verification.status
-            }), 200
+        # Don't promise an SMS while this worker has seen Twilio failing
+        gateway = current_app.extensions.get('twilio_gateway')
+        if gateway is not None and gateway.breaker.is_open():
+            return provider_unavailable_response(ProviderUnavailable('circuit open', gateway.breaker.retry_after()))
+        
+        # A repeat tap within OTP_RESEND_SECONDS reuses the pending Twilio
+        # verification: no new row, no new SMS
+        otp = outstanding_otp(phone, 'verification')
+        coalesced = otp is not None
+        if coalesced:
+            otp_log.info('Verification SMS already pending for %s, not resending', phone[-4:])
+        else:
+            # Twilio Verify codes stay valid for 10 minutes
+            otp = OTPVerification(phone=phone, purpose='verification',
+                                  expires_at=datetime.utcnow() + timedelta(minutes=10))
+            db.session.add(otp)
+            db.session.flush()
+            # The SMS is sent by the outbox dispatcher, not in this request
+            outbox.enqueue('sms_verification', {'phone': phone}, dedupe_key=f'sms_verification:{otp.id}')
+            db.session.commit()
+            otp_log.info('Verification SMS queued for %s', phone[-4:])
         
-        except Exception as e:
-            print(f"[OTP] ❌ Twilio error: {str(e)}")
-            print(f"[OTP] Error type: {type(e).__name__}")
-            import traceback
-            print(f"[OTP] Full traceback:\n{traceback.format_exc()}")
-            
-            return jsonify({
-                'error': f'Failed to send OTP: {str(e)}',
-                'error_type': type(e).__name__
-            }), 500
+        return jsonify({
+            'message': 'OTP already sent to your phone' if coalesced else 'OTP sent to your phone',
+            'verification_sid': None,  # assigned by Twilio when the worker sends it
+            'phone_masked': phone[-4:],
+            'status': 'queued',
+            **resend_info(otp, coalesced)
+        }), 200
     
     except Exception as e:
-        print(f"[ERROR] Request OTP failed: {str(e)}")
-        import traceback
-        print(f"[ERROR] Full traceback:\n{traceback.format_exc()}")
+        otp_log.exception('Request OTP failed: %s', str(e))
         return jsonify({'error': 'Request OTP failed. Please try again.'}), 500
 
-@app.route('/api/auth/verify-otp', methods=['POST'])
+@bp.route('/api/auth/verify-otp', methods=['POST'])
 def verify_otp():
     """Verify OTP code and authenticate user"""
     try:
         data = request.get_json()
-        print(f"[VERIFY-OTP] Request received: {data}")
+        otp_log.debug('Request received: %s', data)
         
         if not data or not all(k in data for k in ['phone', 'code']):
             return jsonify({'error': 'Phone and OTP code are required'}), 400
@@ -916,40 +923,44 @@ def verify_otp():
         phone = data['phone'].strip()
         code = data['code'].strip()
         
-        print(f"[VERIFY-OTP] Phone: {phone}, Code: {code}")
+        otp_log.debug('Phone: %s, Code: %s', phone, code)
         
-        # Validate phone format
-        if not phone.startswith('+'):
-            phone = '+90' + phone.lstrip('0')
+        # Canonical form, as stored in users.phone
+        phone = normalize_phone(phone)
         
-        print(f"[VERIFY-OTP] Formatted phone: {phone}")
+        otp_log.debug('Formatted phone: %s', phone)
         
-        if not twilio_client:
-            print(f"[VERIFY-OTP] ERROR: Twilio client not initialized")
+        if not phone:
+            return jsonify({'error': 'Invalid phone number'}), 400
+        
+        gateway = twilio_gateway()
+        if not gateway:
+            otp_log.error('Twilio client not initialized')
             return jsonify({'error': 'SMS service temporarily unavailable'}), 503
         
         try:
-            print(f"[VERIFY-OTP] Verifying code against Service: {TWILIO_SERVICE_SID}")
+            otp_log.debug('Verifying code against Service: %s', current_app.config['TWILIO_SERVICE_SID'])
             
-            # Verify code with Twilio Verify Service
-            verification_check = twilio_client.verify \
-                .v2 \
-                .services(TWILIO_SERVICE_SID) \
-                .verification_checks \
-                .create(to=phone, code=code)
+            # Verify code with Twilio Verify Service (timeout, bulkhead, circuit breaker)
+            verification_check = gateway.check_verification(phone, code)
             
-            print(f"[VERIFY-OTP] ✅ Verification check completed")
-            print(f"[VERIFY-OTP] Status: {verification_check.status}")
-            print(f"[VERIFY-OTP] Phone: {verification_check.to}")
+            otp_log.debug('✅ Verification check completed')
+            otp_log.debug('Status: %s', verification_check['status'])
+            otp_log.debug('Phone: %s', verification_check['to'])
             
-            if verification_check.status == 'approved':
-                print(f"[VERIFY-OTP] ✅ Verification APPROVED for {phone}")
+            if verification_check['status'] == 'approved':
+                otp_log.info('✅ Verification APPROVED for %s', phone)
+                
+                # Twilio consumed the code; the next request-otp sends a new one
+                OTPVerification.query.filter_by(phone=phone, purpose='verification', used=False) \
+                    .update({'used': True}, synchronize_session=False)
+                db.session.commit()
                 
                 # Check if user exists with this phone
                 user = User.query.filter_by(phone=phone).first()
                 
                 if not user:
-                    print(f"[VERIFY-OTP] New user with phone {phone}, creating account")
+                    otp_log.info('New user with phone %s, creating account', phone)
                     # Create new user with phone
                     user = User(
                         first_name='User',
@@ -962,14 +973,14 @@ def verify_otp():
                     db.session.add(user)
                     db.session.commit()
                     is_new_user = True
-                    print(f"[VERIFY-OTP] ✅ User created: {user.id}")
+                    otp_log.info('✅ User created: %s', user.id)
                 else:
                     is_new_user = False
-                    print(f"[VERIFY-OTP] User already exists: {user.id}")
+                    otp_log.info('User already exists: %s', user.id)
                 
                 # Generate JWT token
                 token = generate_token(user.id)
-                print(f"[VERIFY-OTP] ✅ JWT token generated")
+                otp_log.info('✅ JWT token generated')
                 
                 return jsonify({
                     'message': 'Phone verified successfully',
@@ -978,27 +989,30 @@ def verify_otp():
                     'is_new_user': is_new_user
                 }), 200
             else:
-                print(f"[VERIFY-OTP] ❌ Verification FAILED for {phone}: Status = {verification_check.status}")
-                return jsonify({'error': f'Invalid OTP code. Status: {verification_check.status}'}), 401
-        
+                otp_log.info('❌ Verification FAILED for %s: Status = %s', phone, verification_check['status'])
+                return jsonify({'error': f'Invalid OTP code. Status: {verification_check["status"]}'}), 401
+        
+        except ProviderUnavailable as e:
+            otp_log.warning('Verification not attempted: %s', e.reason)
+            return provider_unavailable_response(e)
+        except HasherBusy:
+            raise
         except Exception as e:
-            print(f"[VERIFY-OTP] ❌ Verification error: {str(e)}")
-            print(f"[VERIFY-OTP] Error type: {type(e).__name__}")
-            import traceback
-            print(f"[VERIFY-OTP] Full traceback:\n{traceback.format_exc()}")
+            otp_log.exception('❌ Verification error (%s): %s', type(e).__name__, e)
             return jsonify({'error': f'Verification failed: {str(e)}', 'error_type': type(e).__name__}), 500
     
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Verify OTP failed: {str(e)}")
+        otp_log.exception('Verify OTP failed: %s', str(e))
         return jsonify({'error': 'Verification failed. Please try again.'}), 500
 
-print("[DEBUG] **GLOBAL SCOPE** About to register /api/auth/check-phone route", flush=True)
-
-@app.route('/api/test-new-registration', methods=['GET', 'POST'])
+@bp.route('/api/test-new-registration', methods=['GET', 'POST'])
 def check_phone():
     """Check if phone number exists in database"""
-    print("[DEBUG] check_phone handler called")
+    auth_log.debug('check_phone handler called')
     try:
         data = request.get_json()
         
@@ -1006,26 +1020,22 @@ def check_phone():
             return jsonify({'error': 'Phone is required'}), 400
         
         phone = data['phone'].strip()
-        print(f"[CHECK-PHONE] Raw input: {phone}, Length: {len(phone)}")
+        auth_log.debug('Raw input: %s, Length: %s', phone, len(phone))
         
         # Normalize phone to standard format
         formatted_phone = normalize_phone(phone)
-        print(f"[CHECK-PHONE] Formatted: {formatted_phone}")
+        auth_log.debug('Formatted: %s', formatted_phone)
         
         # Check if user exists
         user = User.query.filter_by(phone=formatted_phone).first()
         exists = user is not None
-        print(f"[CHECK-PHONE] Searching DB for: {formatted_phone}")
-        print(f"[CHECK-PHONE] User found: {exists}")
+        auth_log.debug('Searching DB for: %s', formatted_phone)
+        auth_log.debug('User found: %s', exists)
         
         if user:
-            print(f"[CHECK-PHONE] ✓ User exists - Phone: {user.phone}, Name: {user.first_name}")
+            auth_log.debug('✓ User exists - Phone: %s, Name: %s', user.phone, user.first_name)
         else:
-            print(f"[CHECK-PHONE] ✗ User NOT found - will create new account")
-            # DEBUG: List all phones in database
-            all_users = User.query.all()
-            db_phones = [u.phone for u in all_users if u.phone]
-            print(f"[CHECK-PHONE] Available phones in DB: {db_phones}")
+            auth_log.debug('✗ User NOT found - will create new account')
         
         return jsonify({
             'exists': exists,
@@ -1033,25 +1043,18 @@ def check_phone():
         }), 200
     
     except Exception as e:
-        print(f"[ERROR] check-phone failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        auth_log.exception('check-phone failed: %s', str(e))
         return jsonify({'error': 'Failed to check phone', 'debug': str(e)}), 500
 
-print("[DEBUG] **GLOBAL SCOPE** Registered /api/auth/check-phone route", flush=True)
-
-# DEBUG: Print all routes with their methods
-import sys
-print("\n" + "="*60 + "\n[ROUTES] Debugging all registered routes:", flush=True, file=sys.stderr)
-for rule in app.url_map.iter_rules():
-    if 'auth' in str(rule):
-        print(f"  {rule.rule:50} {sorted(rule.methods)}", flush=True, file=sys.stderr)
-print("="*60 + "\n", flush=True, file=sys.stderr)
-
-@app.route('/api/auth/phone-pin-login', methods=['POST'])
+@bp.route('/api/auth/phone-pin-login', methods=['POST'])
 def phone_pin_login():
     """Phone + PIN authentication (signup/login for group joining)"""
     try:
+        # Throttle before any DB lookup or hash work
+        throttled = login_throttled()
+        if throttled:
+            return throttled
+        
         data = request.get_json()
         
         if not data or not all(k in data for k in ['phone', 'pin']):
@@ -1061,41 +1064,47 @@ def phone_pin_login():
         pin = data['pin'].strip()
         is_signup = data.get('is_signup', False)  # True if new user
         
-        print(f"[AUTH] Request: phone={phone}, is_signup={is_signup}, pin_length={len(pin)}")
+        auth_log.debug('Request: phone=%s, is_signup=%s, pin_length=%s', phone, is_signup, len(pin))
         
-        print(f"[AUTH] Formatted phone: {phone}")
+        auth_log.debug('Formatted phone: %s', phone)
         
         # Validate phone length (basic)
-        if len(phone) < 10:
+        if not phone or len(phone) < 10:
             return jsonify({'error': 'Invalid phone number'}), 400
         
         # Validate PIN - must be exactly 4 digits
         if not pin.isdigit() or len(pin) != 4:
             return jsonify({'error': 'PIN must be 4 digits'}), 400
         
+        throttled = login_throttled(phone=phone)
+        if throttled:
+            return throttled
+        
         # Check if user exists
         user = User.query.filter_by(phone=phone).first()
-        print(f"[AUTH] User exists: {user is not None}")
+        auth_log.debug('User exists: %s', user is not None)
         
         if not user:
             # First-time signup
             if not is_signup:
-                print(f"[AUTH] Phone {phone} not found and is_signup=False - returning 404")
+                auth_log.info('Phone %s not found and is_signup=False - returning 404', phone)
                 return jsonify({'error': 'user_not_found', 'message': 'This phone is not registered'}), 404
             
-            print(f"[AUTH] Creating new user with phone {phone}")
+            auth_log.info('Creating new user with phone %s', phone)
             
             # Get email and name from request
             first_name = data.get('first_name', 'User').strip()
             last_name = data.get('last_name', '').strip()
             email = data.get('email', '').strip()
             
-            print(f"[AUTH] New user data: first_name={first_name}, email={email}")
+            auth_log.debug('New user data: first_name=%s, email=%s', first_name, email)
             
             # Validate email if provided
             if email and '@' not in email:
-                print(f"[AUTH] Invalid email format: {email}")
+                auth_log.info('Invalid email format: %s', email)
                 return jsonify({'error': 'Invalid email address'}), 400
+            if email and User.query.filter_by(email=email).first():
+                return jsonify({'error': 'Email already registered'}), 409
             
             # Create new user
             try:
@@ -1108,16 +1117,26 @@ def phone_pin_login():
                 user.set_password(pin)  # Store PIN as password hash
                 db.session.add(user)
                 db.session.commit()
-                print(f"[AUTH] ✓ New user created successfully: {phone}")
+                auth_log.info('✓ New user created successfully: %s', phone)
+            except IntegrityError:
+                # Concurrent signup with the same phone or email (both are unique)
+                db.session.rollback()
+                if User.query.filter_by(phone=phone).first():
+                    return jsonify({'error': 'This phone number is already registered'}), 409
+                if email and User.query.filter_by(email=email).first():
+                    return jsonify({'error': 'Email already registered'}), 409
+                auth_log.exception('✗ Error creating user')
+                return jsonify({'error': 'Failed to create user'}), 500
+            except HasherBusy:
+                raise
             except Exception as e:
                 db.session.rollback()
-                print(f"[AUTH] ✗ Error creating user: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                auth_log.exception('✗ Error creating user: %s', str(e))
                 return jsonify({'error': 'Failed to create user', 'debug': str(e)}), 500
             
+            login_succeeded(phone=phone)
             token = generate_token(user.id)
-            print(f"[AUTH] Token generated for new user: {phone}")
+            auth_log.info('Token generated for new user: %s', phone)
             
             return jsonify({
                 'message': 'Account created successfully',
@@ -1128,11 +1147,14 @@ def phone_pin_login():
         else:
             # Existing user - verify PIN
             if not user.check_password(pin):
-                print(f"[AUTH] PIN verification failed for {phone}")
+                auth_log.info('PIN verification failed for %s', phone)
                 return jsonify({'error': 'Invalid PIN'}), 401
+            if db.session.is_modified(user):
+                db.session.commit()  # hash upgraded to the current PASSWORD_HASH_METHOD
+            login_succeeded(phone=phone)
             
             token = generate_token(user.id)
-            print(f"[AUTH] User logged in with phone: {phone}")
+            auth_log.info('User logged in with phone: %s', phone)
             
             # Check if user needs to add email
             needs_email = not user.email or user.email.endswith('@hesappaylas.local')
@@ -1146,11 +1168,11 @@ def phone_pin_login():
                 'email_hint': 'Please add your email for password recovery'
             }), 200
     
+    except HasherBusy:
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Phone-PIN login failed: {str(e)}")
-        import traceback
-        print(f"[ERROR] Traceback: {traceback.format_exc()}")
+        auth_log.exception('Phone-PIN login failed: %s', str(e))
         
         # Return more specific error messages
         error_msg = str(e)
@@ -1161,28 +1183,27 @@ def phone_pin_login():
         else:
             return jsonify({'error': 'Authentication failed: ' + error_msg[:100]}), 500
 
-@app.route('/api/auth/reset-pin', methods=['POST'])
+@bp.route('/api/auth/reset-pin', methods=['POST'])
 def reset_pin():
     """Reset PIN for existing user - requires verification code from email"""
     try:
         data = request.get_json()
-        print(f"[DEBUG] reset_pin called with data: {data}")
+        auth_log.debug('reset_pin called with data: %s', data)
         
         if not data or not all(k in data for k in ['phone', 'new_pin', 'verification_code']):
-            print(f"[DEBUG] Missing required fields")
+            auth_log.debug('Missing required fields')
             return jsonify({'error': 'Phone, verification code, and new PIN are required'}), 400
         
         phone = data['phone'].strip()
         new_pin = data['new_pin'].strip()
         verification_code = data['verification_code'].strip()
         
-        print(f"[DEBUG] Phone: {phone}, Verification Code: {verification_code}, New PIN: {new_pin}")
+        auth_log.debug('Phone: %s, Verification Code: %s, New PIN: %s', phone, verification_code, new_pin)
         
-        # Validate phone format
-        if not phone.startswith('+'):
-            phone = '+90' + phone.lstrip('0')
+        # Canonical form, as stored in users.phone
+        phone = normalize_phone(phone)
         
-        print(f"[DEBUG] Formatted phone: {phone}")
+        auth_log.debug('Formatted phone: %s', phone)
         
         # Validate PIN - must be exactly 4 digits
         if not new_pin.isdigit() or len(new_pin) != 4:
@@ -1194,31 +1215,28 @@ def reset_pin():
         
         # Find user by phone
         user = User.query.filter_by(phone=phone).first()
-        print(f"[DEBUG] User found: {user is not None}")
+        auth_log.debug('User found: %s', user is not None)
         
         if not user:
             return jsonify({'error': 'User not found with this phone number'}), 404
         
         # Find and verify the OTP code
-        print(f"[DEBUG] Looking for OTP with phone={phone}, code={verification_code}, purpose=pin_reset")
+        auth_log.debug('Looking for OTP with phone=%s, code=%s, purpose=pin_reset', phone, verification_code)
         otp_record = OTPVerification.query.filter_by(
             phone=phone,
             code=verification_code,
             purpose='pin_reset'
-        ).first()
+        ).order_by(OTPVerification.id.desc()).first()
         
-        print(f"[DEBUG] OTP record found: {otp_record is not None}")
+        auth_log.debug('OTP record found: %s', otp_record is not None)
         
         if not otp_record:
-            print(f"[DEBUG] OTP not found. Checking all OTP records for this phone:")
-            all_otps = OTPVerification.query.filter_by(phone=phone, purpose='pin_reset').all()
-            for otp in all_otps:
-                print(f"  - Code: {otp.code}, Expires: {otp.expires_at}, Created: {otp.created_at}")
+            log_recent_otps(auth_log, phone, 'pin_reset')
             return jsonify({'error': 'Invalid or expired verification code'}), 400
         
         # Check if code has expired
         if datetime.utcnow() > otp_record.expires_at:
-            print(f"[DEBUG] OTP expired. Expires at: {otp_record.expires_at}, Now: {datetime.utcnow()}")
+            auth_log.debug('OTP expired. Expires at: %s, Now: %s', otp_record.expires_at, datetime.utcnow())
             return jsonify({'error': 'Verification code has expired'}), 400
         
         # Update PIN (stored as password hash)
@@ -1226,7 +1244,7 @@ def reset_pin():
         db.session.delete(otp_record)  # Delete the used verification code
         db.session.commit()
         
-        print(f"[AUTH] PIN reset successfully for phone: {phone}")
+        auth_log.info('PIN reset successfully for phone: %s', phone)
         
         # Generate JWT token for auto-login
         token = jwt.encode(
@@ -1235,7 +1253,7 @@ def reset_pin():
                 'phone': user.phone,
                 'exp': datetime.utcnow() + timedelta(days=30)
             },
-            app.config['JWT_SECRET'],
+            current_app.config['JWT_SECRET'],
             algorithm='HS256'
         )
         
@@ -1251,35 +1269,37 @@ def reset_pin():
             }
         }), 200
     
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] PIN reset failed: {str(e)}")
+        auth_log.error('PIN reset failed: %s', str(e))
         return jsonify({'error': 'PIN reset failed. Please try again.'}), 500
 
-@app.route('/api/auth/request-pin-reset', methods=['POST'])
+@bp.route('/api/auth/request-pin-reset', methods=['POST'])
 def request_pin_reset():
     """Request PIN reset - send code via EMAIL or WhatsApp"""
     try:
-        print("[DEBUG] request_pin_reset called")
+        auth_log.debug('request_pin_reset called')
         data = request.get_json()
-        print(f"[DEBUG] Request data: {data}")
+        auth_log.debug('Request data: %s', data)
         
         if not data or 'phone' not in data:
             return jsonify({'error': 'Phone is required'}), 400
         
         phone = data['phone'].strip()
         method = data.get('method', 'email').strip().lower()  # 'email' or 'whatsapp'
-        print(f"[DEBUG] Processing phone: {phone}, method: {method}")
+        auth_log.debug('Processing phone: %s, method: %s', phone, method)
         
-        # Validate phone format
-        if not phone.startswith('+'):
-            phone = '+90' + phone.lstrip('0')
+        # Canonical form, as stored in users.phone
+        phone = normalize_phone(phone)
         
-        print(f"[DEBUG] Formatted phone: {phone}")
+        auth_log.debug('Formatted phone: %s', phone)
         
         # Check if user exists
         user = User.query.filter_by(phone=phone).first()
-        print(f"[DEBUG] User found: {user is not None}")
+        auth_log.debug('User found: %s', user is not None)
         
         if not user:
             return jsonify({'error': 'User not found with this phone number'}), 404
@@ -1287,7 +1307,7 @@ def request_pin_reset():
         # For EMAIL: Check if user has email set
         if method == 'email':
             if not user.email or user.email.endswith('@hesappaylas.local'):
-                print(f"[DEBUG] User has no real email: {user.email}")
+                auth_log.debug('User has no real email: %s', user.email)
                 return jsonify({
                     'error': 'No email on file. Please add your email first in the app profile settings.',
                     'code': 'NO_EMAIL',
@@ -1295,31 +1315,43 @@ def request_pin_reset():
                 }), 400
         
         # For WHATSAPP: Just need the phone number (already have it)
+        if method not in ('email', 'whatsapp'):
+            return jsonify({'error': 'Invalid method. Use email or whatsapp'}), 400
         
-        # Generate 6-digit reset code
-        reset_code = f"{random.randint(0, 999999):06d}"
-        print(f"[DEBUG] Generated code: {reset_code}")
-        
-        # Store in OTPVerification table with 10 minute expiry
-        try:
-            otp_record = OTPVerification(
-                phone=phone,
-                otp_code=reset_code,  # Also set otp_code for backward compatibility
-                code=reset_code,
-                purpose='pin_reset',
-                expires_at=datetime.utcnow() + timedelta(minutes=10)
-            )
-            db.session.add(otp_record)
-            db.session.commit()
-            print(f"[DEBUG] OTP record saved to DB")
-        except Exception as db_error:
-            db.session.rollback()
-            print(f"[ERROR] Failed to save OTP record: {str(db_error)}")
-            return jsonify({'error': 'Failed to save reset code', 'debug': str(db_error)}), 500
+        # A repeat tap within OTP_RESEND_SECONDS gets the outstanding code back
+        otp_record = outstanding_otp(phone, 'pin_reset')
+        coalesced = otp_record is not None
+        if coalesced:
+            reset_code = otp_record.code
+            auth_log.debug('Reusing outstanding code %s', otp_record.id)
+        else:
+            # Generate 6-digit reset code
+            reset_code = f"{random.randint(0, 999999):06d}"
+            auth_log.debug('Generated code: %s', reset_code)
+            
+            # Store in OTPVerification table with 10 minute expiry
+            try:
+                otp_record = OTPVerification(
+                    phone=phone,
+                    otp_code=reset_code,  # Also set otp_code for backward compatibility
+                    code=reset_code,
+                    purpose='pin_reset',
+                    expires_at=datetime.utcnow() + timedelta(minutes=10)
+                )
+                db.session.add(otp_record)
+                db.session.commit()
+                auth_log.debug('OTP record saved to DB')
+            except Exception as db_error:
+                db.session.rollback()
+                auth_log.error('Failed to save OTP record: %s', str(db_error))
+                return jsonify({'error': 'Failed to save reset code', 'debug': str(db_error)}), 500
         
         # Send code via selected method
         if method == 'email':
-            email_sent = send_reset_email(user.email, reset_code, user.first_name)
+            # Keyed by the code: a reused code that was already emailed isn't queued again
+            email_sent = send_reset_email(user.email, reset_code, user.first_name,
+                                          dedupe_key=f'pin_reset_email:{otp_record.id}')
+            db.session.commit()
             response = {
                 'message': 'Reset code sent to your email' if email_sent else 'Reset code generated (check email)',
                 'phone': phone,
@@ -1339,24 +1371,21 @@ def request_pin_reset():
                 'method': 'whatsapp',
                 'whatsapp_hint': f'Send this code to our WhatsApp: {reset_code}'
             }
-            print(f"[DEBUG] WhatsApp verification code for {phone}: {reset_code}")
-        else:
-            return jsonify({'error': 'Invalid method. Use email or whatsapp'}), 400
+            auth_log.debug('WhatsApp verification code for %s: %s', phone, reset_code)
+        response.update(resend_info(otp_record, coalesced))
         
-        print(f"[DEBUG] Returning response: {response}")
+        auth_log.debug('Returning response: %s', response)
         return jsonify(response), 200
     
     except Exception as e:
-        print(f"[ERROR] PIN reset request failed: {str(e)}")
-        import traceback
-        print(f"[ERROR] Traceback: {traceback.format_exc()}")
+        auth_log.exception('PIN reset request failed: %s', str(e))
         return jsonify({'error': 'Failed to send reset code', 'debug': str(e)}), 500
 
-@app.route('/api/auth/set-email-for-reset', methods=['POST'])
+@bp.route('/api/auth/set-email-for-reset', methods=['POST'])
 def set_email_for_reset():
     """Set user email using phone number - for PIN reset flow"""
     try:
-        print("[DEBUG] set_email_for_reset called")
+        auth_log.debug('set_email_for_reset called')
         data = request.get_json()
         
         if not data or 'phone' not in data or 'email' not in data:
@@ -1365,7 +1394,7 @@ def set_email_for_reset():
         phone = normalize_phone(data['phone'].strip())
         email = data['email'].strip().lower()
         
-        print(f"[DEBUG] Looking for user with phone: {phone}, email: {email}")
+        auth_log.debug('Looking for user with phone: %s, email: %s', phone, email)
         
         # Find user
         user = User.query.filter_by(phone=phone).first()
@@ -1388,37 +1417,36 @@ def set_email_for_reset():
         # Update email
         user.email = email
         user.email_verified = True
+        bump_member_groups(user.id)
         db.session.commit()
         
-        print(f"[EMAIL-RESET] Email updated for phone {phone}: {email}")
+        email_log.info('Email updated for phone %s: %s', phone, email)
         return jsonify({'message': 'Email saved successfully', 'email': email}), 200
         
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] set_email_for_reset failed: {str(e)}")
-        import traceback
-        print(f"[ERROR] Traceback: {traceback.format_exc()}")
+        auth_log.exception('set_email_for_reset failed: %s', str(e))
         return jsonify({'error': 'Failed to save email', 'debug': str(e)}), 500
 
-@app.route('/api/auth/request-pin-reset-both', methods=['POST'])
+@bp.route('/api/auth/request-pin-reset-both', methods=['POST'])
 def request_pin_reset_both():
     """Request PIN reset - send code via EMAIL and SMS"""
     try:
-        print("[DEBUG] request_pin_reset_both called")
+        auth_log.debug('request_pin_reset_both called')
         data = request.get_json()
-        print(f"[DEBUG] Request data: {data}")
+        auth_log.debug('Request data: %s', data)
         
         if not data or 'phone' not in data:
             return jsonify({'error': 'Phone is required'}), 400
         
         phone = normalize_phone(data['phone'].strip())
-        print(f"[DEBUG] Processing phone: {phone}")
+        auth_log.debug('Processing phone: %s', phone)
         
-        print(f"[DEBUG] Formatted phone: {phone}")
+        auth_log.debug('Formatted phone: %s', phone)
         
         # Check if user exists
         user = User.query.filter_by(phone=phone).first()
-        print(f"[DEBUG] User found: {user is not None}")
+        auth_log.debug('User found: %s', user is not None)
         
         if not user:
             return jsonify({'error': 'User not found with this phone number', 'message': 'Bu telefon numarasına kayıtlı kullanıcı bulunamadı.'}), 404
@@ -1431,45 +1459,56 @@ def request_pin_reset_both():
                 'code': 'NO_EMAIL'
             }), 400
         
-        print(f"[DEBUG] Using email for reset: {user.email}")
+        auth_log.debug('Using email for reset: %s', user.email)
         
-        # Generate 6-digit reset code
-        reset_code = f"{random.randint(0, 999999):06d}"
-        print(f"[DEBUG] Generated code: {reset_code}")
-        
-        # Store in OTPVerification table with 5 minute expiry
-        try:
-            otp_record = OTPVerification(
-                phone=phone,
-                otp_code=reset_code,
-                code=reset_code,
-                purpose='pin_reset',
-                expires_at=datetime.utcnow() + timedelta(minutes=5)
-            )
-            db.session.add(otp_record)
-            db.session.commit()
-            print(f"[DEBUG] OTP record saved to DB")
-        except Exception as db_error:
-            db.session.rollback()
-            print(f"[ERROR] Failed to save OTP record: {str(db_error)}")
-            return jsonify({'error': 'Failed to save reset code', 'debug': str(db_error)}), 500
+        # A repeat tap within OTP_RESEND_SECONDS gets the outstanding code back
+        otp_record = outstanding_otp(phone, 'pin_reset')
+        coalesced = otp_record is not None
+        if coalesced:
+            reset_code = otp_record.code
+            auth_log.debug('Reusing outstanding code %s', otp_record.id)
+        else:
+            # Generate 6-digit reset code
+            reset_code = f"{random.randint(0, 999999):06d}"
+            auth_log.debug('Generated code: %s', reset_code)
+            
+            # Store in OTPVerification table with 5 minute expiry
+            try:
+                otp_record = OTPVerification(
+                    phone=phone,
+                    otp_code=reset_code,
+                    code=reset_code,
+                    purpose='pin_reset',
+                    expires_at=datetime.utcnow() + timedelta(minutes=5)
+                )
+                db.session.add(otp_record)
+                db.session.commit()
+                auth_log.debug('OTP record saved to DB')
+            except Exception as db_error:
+                db.session.rollback()
+                auth_log.error('Failed to save OTP record: %s', str(db_error))
+                return jsonify({'error': 'Failed to save reset code', 'debug': str(db_error)}), 500
         
         sms_sent = False
         email_sent = False
         
-        print(f"[DEBUG] PIN reset code for {phone}: {reset_code}")
+        auth_log.debug('PIN reset code for %s: %s', phone, reset_code)
         
         # Mock SMS sending (development/testing mode)
-        sms_message = f"HesapPaylas PIN Hatırlatma Kodu: {reset_code}\n\n5 dakika geçerlidir."
-        print(f"[SMS MOCK] Simulated SMS to {phone}: {sms_message}")
+        if not coalesced:
+            sms_message = f"HesapPaylas PIN Hatırlatma Kodu: {reset_code}\n\n5 dakika geçerlidir."
+            otp_log.info('Simulated SMS to %s: %s', phone, sms_message)
         sms_sent = True  # Mark as sent in mock mode
         
-        # Try to send via Email
+        # Try to send via Email (a reused code that was already emailed isn't queued again)
         try:
-            email_sent = send_reset_email(user.email, reset_code, user.first_name)
-            print(f"[DEBUG] Email sent to {user.email}: {email_sent}")
+            email_sent = send_reset_email(user.email, reset_code, user.first_name,
+                                          dedupe_key=f'pin_reset_email:{otp_record.id}')
+            db.session.commit()
+            auth_log.debug('Email queued for %s: %s', user.email, email_sent)
         except Exception as email_error:
-            print(f"[WARNING] Email sending failed: {str(email_error)}")
+            db.session.rollback()
+            auth_log.error('Email queueing failed: %s', str(email_error))
             email_sent = False
         
         response = {
@@ -1479,70 +1518,64 @@ def request_pin_reset_both():
             'email_hint': user.email,
             'sms_sent': sms_sent,
             'email_sent': email_sent,
-            'code_stored': True
+            'code_stored': True,
+            **resend_info(otp_record, coalesced)
         }
         
-        print(f"[DEBUG] Returning response: {response}")
+        auth_log.debug('Returning response: %s', response)
         return jsonify(response), 200
     
     except Exception as e:
-        print(f"[ERROR] PIN reset both request failed: {str(e)}")
-        import traceback
-        print(f"[ERROR] Traceback: {traceback.format_exc()}")
+        auth_log.exception('PIN reset both request failed: %s', str(e))
         return jsonify({'error': 'Failed to send reset code', 'debug': str(e)}), 500
 
-@app.route('/api/auth/verify-pin-reset', methods=['POST'])
+@bp.route('/api/auth/verify-pin-reset', methods=['POST'])
 def verify_pin_reset():
     """Verify PIN reset code"""
     try:
         data = request.get_json()
-        print(f"[VERIFY-RESET] Request received: {data}")
+        otp_log.debug('Request received: %s', data)
         
         if not data or not all(k in data for k in ['phone', 'code']):
-            print(f"[VERIFY-RESET] Missing required fields")
+            otp_log.debug('Missing required fields')
             return jsonify({'error': 'Phone and code are required'}), 400
         
         phone = data['phone'].strip()
         code = data['code'].strip()
         
-        print(f"[VERIFY-RESET] Raw phone: {phone}, Code: {code}")
+        otp_log.debug('Raw phone: %s, Code: %s', phone, code)
         
-        # Validate phone format
-        if not phone.startswith('+'):
-            phone = '+90' + phone.lstrip('0')
+        # Canonical form, as stored in users.phone
+        phone = normalize_phone(phone)
         
-        print(f"[VERIFY-RESET] Formatted phone: {phone}")
+        otp_log.debug('Formatted phone: %s', phone)
         
         # Find valid OTP record
-        print(f"[VERIFY-RESET] Looking for OTP record with phone={phone}, code={code}, purpose='pin_reset'")
+        otp_log.debug("Looking for OTP record with phone=%s, code=%s, purpose='pin_reset'", phone, code)
         otp_record = OTPVerification.query.filter_by(
             phone=phone,
             code=code,
             purpose='pin_reset',
             used=False
-        ).first()
+        ).order_by(OTPVerification.id.desc()).first()
         
-        print(f"[VERIFY-RESET] OTP record found: {otp_record is not None}")
+        otp_log.debug('OTP record found: %s', otp_record is not None)
         
         if not otp_record:
-            print(f"[VERIFY-RESET] ❌ No matching OTP record found")
-            # Debug: list all OTP records for this phone
-            all_otps = OTPVerification.query.filter_by(phone=phone).all()
-            print(f"[VERIFY-RESET] All OTPs for {phone}: {len(all_otps)}")
-            for otp in all_otps:
-                print(f"  - code={otp.code}, purpose={otp.purpose}, used={otp.used}, expires_at={otp.expires_at}")
+            otp_log.info('❌ No matching OTP record found')
+            log_recent_otps(otp_log, phone, 'pin_reset')
             return jsonify({'error': 'Invalid or expired code'}), 400
         
         # Check expiry
         if otp_record.expires_at < datetime.utcnow():
-            print(f"[VERIFY-RESET] ❌ OTP expired")
+            otp_log.info('❌ OTP expired')
             return jsonify({'error': 'Code expired'}), 400
         
         # Mark as used
         otp_record.used = True
         db.session.commit()
         
-        print(f"[VERIFY-RESET] ✅ PIN reset code verified for phone: {phone}")
+        otp_log.info('✅ PIN reset code verified for phone: %s', phone)
         
         return jsonify({
             'message': 'Code verified successfully'
@@ -1550,10 +1583,10 @@ def verify_pin_reset():
     
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] PIN reset verification failed: {str(e)}")
+        auth_log.error('PIN reset verification failed: %s', str(e))
         return jsonify({'error': 'Verification failed'}), 500
 
-@app.route('/api/auth/reset-pin', methods=['POST'])
+@bp.route('/api/auth/reset-pin', methods=['POST'])
 def reset_pin_direct():
     """Direct PIN reset with email verification"""
     try:
@@ -1566,9 +1599,8 @@ def reset_pin_direct():
         email = data['email'].strip()
         new_pin = data['new_pin'].strip()
         
-        # Validate phone format
-        if not phone.startswith('+'):
-            phone = '+90' + phone.lstrip('0')
+        # Canonical form, as stored in users.phone
+        phone = normalize_phone(phone)
         
         # Validate PIN
         if not new_pin.isdigit() or len(new_pin) != 4:
@@ -1588,19 +1620,22 @@ def reset_pin_direct():
         user.set_password(new_pin)
         db.session.commit()
         
-        print(f"[AUTH] PIN reset successfully for {phone}")
+        auth_log.info('PIN reset successfully for %s', phone)
         
         return jsonify({
             'message': 'PIN reset successfully',
             'success': True
         }), 200
     
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] PIN reset failed: {str(e)}")
+        auth_log.error('PIN reset failed: %s', str(e))
         return jsonify({'error': 'PIN reset failed'}), 500
 
-@app.route('/api/auth/confirm-pin-reset', methods=['POST'])
+@bp.route('/api/auth/confirm-pin-reset', methods=['POST'])
 def confirm_pin_reset():
     """Confirm PIN reset with new PIN"""
     try:
@@ -1613,9 +1648,8 @@ def confirm_pin_reset():
         code = data['code'].strip()
         new_pin = data['new_pin'].strip()
         
-        # Validate phone format
-        if not phone.startswith('+'):
-            phone = '+90' + phone.lstrip('0')
+        # Canonical form, as stored in users.phone
+        phone = normalize_phone(phone)
         
         # Validate PIN - must be exactly 4 digits
         if not new_pin.isdigit() or len(new_pin) != 4:
@@ -1627,7 +1661,7 @@ def confirm_pin_reset():
             code=code,
             purpose='pin_reset',
             used=True
-        ).first()
+        ).order_by(OTPVerification.id.desc()).first()
         
         if not otp_record:
             return jsonify({'error': 'Invalid reset session'}), 400
@@ -1641,18 +1675,21 @@ def confirm_pin_reset():
         user.set_password(new_pin)
         db.session.commit()
         
-        print(f"[AUTH] PIN successfully reset for phone: {phone}")
+        auth_log.info('PIN successfully reset for phone: %s', phone)
         
         return jsonify({
             'message': 'PIN reset successfully'
         }), 200
     
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] PIN reset confirmation failed: {str(e)}")
+        auth_log.error('PIN reset confirmation failed: %s', str(e))
         return jsonify({'error': 'PIN reset failed'}), 500
 
-@app.route('/api/auth/change-pin', methods=['POST'])
+@bp.route('/api/auth/change-pin', methods=['POST'])
 def change_pin():
     """Change PIN for authenticated user (from profile)"""
     try:
@@ -1663,14 +1700,14 @@ def change_pin():
         
         token = auth_header.replace('Bearer ', '')
         try:
-            payload = jwt.decode(token, app.config['JWT_SECRET'], algorithms=['HS256'])
+            payload = jwt.decode(token, current_app.config['JWT_SECRET'], algorithms=['HS256'])
             user_id = payload.get('user_id')
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Token expired'}), 401
         except jwt.InvalidTokenError:
             return jsonify({'error': 'Invalid token'}), 401
         except Exception as e:
-            print(f"[AUTH] Token decode error: {str(e)}")
+            auth_log.info('Token decode error: %s', str(e))
             return jsonify({'error': 'Invalid token'}), 401
         
         data = request.get_json()
@@ -1693,21 +1730,22 @@ def change_pin():
         user.set_password(new_pin)
         db.session.commit()
         
-        print(f"[AUTH] PIN changed for user: {user.phone}")
+        auth_log.info('PIN changed for user: %s', user.phone)
         
         return jsonify({
             'message': 'PIN changed successfully',
             'success': True
         }), 200
     
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] PIN change failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        auth_log.exception('PIN change failed: %s', str(e))
         return jsonify({'error': 'PIN change failed', 'debug': str(e)}), 500
 
-@app.route('/api/auth/debug-reset-codes', methods=['GET'])
+@bp.route('/api/auth/debug-reset-codes', methods=['GET'])
 def debug_reset_codes():
     """DEBUG ONLY: Show all pending reset codes (development only)"""
     if os.getenv('FLASK_ENV') != 'development':
@@ -1759,42 +1797,224 @@ def generate_token(user_id):
     """Generate JWT token"""
     payload = {
         'user_id': user_id,
-        'exp': datetime.utcnow() + timedelta(seconds=app.config['JWT_EXPIRATION'])
+        'exp': datetime.utcnow() + timedelta(seconds=current_app.config['JWT_EXPIRATION'])
     }
-    return jwt.encode(payload, app.config['JWT_SECRET'], algorithm='HS256')
+    return jwt.encode(payload, current_app.config['JWT_SECRET'], algorithm='HS256')
+
+def token_required(f=None, *, allow_inactive=False, query_token=False):
+    """Decorator for protected routes
+
+    Resolves the caller once into g.principal (see principal.py) and sets
+    request.user_id. Deleted accounts are always rejected; closed accounts
+    only reach endpoints declared with allow_inactive=True. Endpoints
+    declared with query_token=True also take ?token= (EventSource can't
+    send an Authorization header).
+    """
+    if f is None:
+        return lambda func: token_required(func, allow_inactive=allow_inactive, query_token=query_token)
 
-def token_required(f):
-    """Decorator for protected routes"""
     @wraps(f)
     def decorated(*args, **kwargs):
         try:
             token = request.headers.get('Authorization', '').replace('Bearer ', '')
+            if not token and query_token:
+                token = request.args.get('token', '')
             
-            print(f"[AUTH] Token check - Headers: {request.headers.get('Authorization')[:20] if request.headers.get('Authorization') else 'NONE'}")
+            auth_log.debug('Token check - header present: %s', bool(token))
             
             if not token:
-                print(f"[AUTH] Missing token!")
+                auth_log.debug('Missing token!')
                 return jsonify({'error': 'Missing token'}), 401
             
             try:
-                payload = jwt.decode(token, app.config['JWT_SECRET'], algorithms=['HS256'])
-                request.user_id = payload['user_id']
-                print(f"[AUTH] Token valid - User ID: {request.user_id}")
+                user_id = decode_token(token)
             except jwt.ExpiredSignatureError:
-                print(f"[AUTH] Token expired")
+                auth_log.debug('Token expired')
                 return jsonify({'error': 'Token expired'}), 401
             except jwt.InvalidTokenError as e:
-                print(f"[AUTH] Invalid token: {str(e)}")
+                auth_log.debug('Invalid token: %s', str(e))
                 return jsonify({'error': 'Invalid token'}), 401
             
+            principal = load_principal(user_id)
+            if principal is None:
+                auth_log.debug('Token for unknown user %s', user_id)
+                return jsonify({'error': 'User not found'}), 401
+            if principal.is_deleted:
+                return jsonify({'error': 'Account deleted'}), 403
+            if not principal.is_active and not allow_inactive:
+                return jsonify({'error': 'Account is closed'}), 403
+            
+            g.principal = principal
+            request.user_id = principal.id
+            auth_log.debug('Token valid - User ID: %s', request.user_id)
             return f(*args, **kwargs)
         except Exception as e:
-            print(f"[AUTH] DECORATOR ERROR: {str(e)}", flush=True)
-            import traceback
-            traceback.print_exc()
+            auth_log.exception('DECORATOR ERROR: %s', str(e))
             return jsonify({'error': f'Server error: {str(e)}'}), 500
     return decorated
 
+def login_throttled(phone=None, email=None):
+    """429 response if this client IP (or, given a phone or email, that account) is out of login attempts"""
+    throttle = get_login_throttle()
+    if phone is not None:
+        allowed, retry_after = throttle.check_phone(phone)
+        key = 'phone ' + phone
+    elif email is not None:
+        allowed, retry_after = throttle.check_email(email)
+        key = 'email ' + email
+    else:
+        allowed, retry_after = throttle.check_ip(client_ip())
+        key = 'ip ' + client_ip()
+    if allowed:
+        return None
+    auth_log.warning('Login throttled (%s) - retry in %ss', key, retry_after)
+    return jsonify({
+        'error': 'Too many login attempts. Please try again later.',
+        'retry_after': retry_after
+    }), 429, {'Retry-After': str(retry_after)}
+
+def login_succeeded(phone=None, email=None):
+    """Only failed attempts count: refund this request's IP token and clear the account's bucket"""
+    get_login_throttle().succeeded(client_ip(), phone=phone, email=email)
+
+def hasher_busy_response():
+    """503 when the password hashing pool is saturated (login storm)"""
+    return jsonify({'error': 'Too many login attempts in progress. Please retry.'}), 503, {'Retry-After': '1'}
+
+def bump_group_version(group_id, by=1):
+    """Mark a group changed (new ETag) as part of the caller's transaction; returns the new version
+
+    An atomic version = version + by, so concurrent changes never share a
+    version. A batch of changes takes `by` versions at once (apply_joins).
+    """
+    db.session.execute(
+        db.update(Group).where(Group.id == group_id).values(version=Group.version + by)
+        .execution_options(synchronize_session=False)
+    )
+    return db.session.execute(db.select(Group.version).where(Group.id == group_id)).scalar()
+
+def publish_group_event(group_id, version, kind, **data):
+    """Push a change to the group's live streams (group_events.py); call after commit"""
+    try:
+        get_group_events().publish(group_id, version, kind, **data)
+    except Exception as e:
+        # Streams only miss a push; the version (ETag) already moved
+        groups_log.warning('Could not publish %s for group %s: %s', kind, group_id, e)
+
+def apply_joins(group_id, joiners):
+    """Join a batch of (user_id, first_name) to a group in one transaction (join_batcher.py)
+
+    Returns {joiner: the version their join created, or None if they were
+    already a member}. Each new member gets a version of their own, so the
+    member_joined events keep distinct ids; they are published in order.
+    """
+    try:
+        added = set(add_members(group_id, [user_id for user_id, _ in joiners]))
+        versions = {}
+        if added:
+            version = bump_group_version(group_id, by=len(added))
+            for offset, joiner in enumerate(j for j in joiners if j[0] in added):
+                versions[joiner] = version - len(added) + 1 + offset
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    for (user_id, first_name), version in versions.items():
+        publish_group_event(group_id, version, 'member_joined', user_id=user_id, first_name=first_name)
+    return {joiner: versions.get(joiner) for joiner in joiners}
+
+def split_input(order):
+    """An Order (with its items) as bill_split input, in kuruş"""
+    to_minor = bill_split.to_minor
+    return bill_split.SplitOrder(
+        order.id, order.creator_id,
+        [bill_split.SplitItem(i.name, to_minor(i.price), i.quantity or 1, i.split_type or bill_split.PERSONAL,
+                              weights=i.shares and {int(user_id): weight for user_id, weight in i.shares.items()},
+                              amount=to_minor((i.price or 0) * (i.quantity or 1)))
+         for i in order.items],
+        to_minor(order.tip), to_minor(order.tax), to_minor(order.delivery), to_minor(order.total_amount))
+
+def parse_item_quantity(value):
+    """An item's "quantity": a positive integer, also as a string ("2"); 1 when absent
+
+    Raises ValueError otherwise (1.5, 0, "abc", true).
+    """
+    if value is None:
+        return 1
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError('quantity must be a positive integer')
+    return value
+
+def parse_item_shares(value):
+    """An item's "shares" as stored: [user id, ...] (equal) or {user id: weight} -> {"<user id>": weight}
+
+    Raises ValueError unless every user id is an integer and every weight a
+    positive integer.
+    """
+    if isinstance(value, list):
+        value = {user_id: 1 for user_id in value}
+    if not isinstance(value, dict) or not value:
+        raise ValueError('shares must be a list of user ids or an object of user id: weight')
+    shares = {}
+    for user_id, weight in value.items():
+        if isinstance(weight, bool) or not isinstance(weight, int) or weight < 1:
+            raise ValueError('share weights must be positive integers')
+        try:
+            shares[str(int(user_id))] = weight
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid user id in shares: {user_id!r}')
+    return shares
+
+def bill_rows(order_id, share):
+    """MemberBill values for one member's share of an order; items itemize the amount"""
+    to_major = bill_split.to_major
+    items = [{'name': name, 'type': bill_split.PERSONAL, 'quantity': quantity, 'amount': to_major(amount)}
+             for name, quantity, amount in share.items]
+    for kind in (bill_split.SHARED,) + bill_split.EXTRAS:
+        amount = getattr(share, kind)
+        if amount:
+            items.append({'name': kind, 'type': kind, 'amount': to_major(amount)})
+    return {'order_id': order_id, 'user_id': share.member, 'amount': to_major(share.total), 'items': items}
+
+def save_member_bills(order):
+    """Recompute the MemberBill rows of order's group (or of order alone) in the current transaction
+
+    Shared items without shares are divided among the group's current
+    members, so every order of the group is split again: one query for the
+    orders and their items, one for the members, one delete and one bulk
+    insert. The group row is locked first (SELECT ... FOR UPDATE), so two
+    orders placed at once rewrite the bills one after the other, the second
+    seeing the first's order.
+    """
+    if order.group_id:
+        db.session.execute(db.select(Group.id).where(Group.id == order.group_id).with_for_update())
+        orders = Order.query.options(selectinload(Order.items)).filter_by(group_id=order.group_id).all()
+        members = db.session.execute(
+            db.select(group_members.c.user_id).where(group_members.c.group_id == order.group_id)
+            .order_by(group_members.c.user_id)
+        ).scalars().all()
+    else:
+        orders, members = [order], [order.creator_id]
+    splits = bill_split.split_orders([split_input(o) for o in orders], members)
+    db.session.execute(db.delete(MemberBill).where(MemberBill.order_id.in_(list(splits)))
+                       .execution_options(synchronize_session=False))
+    rows = [bill_rows(order_id, share) for order_id, shares in splits.items()
+            for share in shares.values() if share.total]
+    if rows:
+        db.session.execute(db.insert(MemberBill), rows)
+
+def bump_member_groups(user_id):
+    """A user's profile changed: every group listing them as a member gets a new version"""
+    db.session.execute(
+        db.update(Group).where(Group.id.in_(user_group_ids(user_id)))
+        .values(version=Group.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
 def require_auth():
     """Check admin authentication for admin endpoints (can be empty for now)"""
     # TODO: Implement proper admin authentication
@@ -1812,25 +2032,25 @@ def require_auth():
 
 # ==================== User Routes ====================
 
-@app.route('/api/debug/token-test', methods=['GET'])
+@bp.route('/api/debug/token-test', methods=['GET'])
 @token_required
 def token_test():
     """Debug endpoint to test token"""
-    print(f"[DEBUG] Token test - user_id: {request.user_id}", flush=True)
-    user = User.query.get(request.user_id)
+    users_log.debug('Token test - user_id: %s', request.user_id)
+    principal = current_principal()
     return jsonify({
-        'user_id': request.user_id,
-        'user_email': user.email if user else 'NOT FOUND'
+        'user_id': principal.id,
+        'phone': principal.phone
     }), 200
 
-@app.route('/api/user/profile', methods=['GET'])
+@bp.route('/api/user/profile', methods=['GET'])
 @token_required
 def get_profile():
     """Get user profile"""
     user = User.query.get(request.user_id)
     return jsonify(user.to_dict()), 200
 
-@app.route('/api/user/profile', methods=['PUT'])
+@bp.route('/api/user/profile', methods=['PUT'])
 @token_required
 def update_profile():
     """Update user profile"""
@@ -1846,17 +2066,22 @@ def update_profile():
         if 'lastName' in data:
             user.last_name = data['lastName']
         if 'phone' in data:
-            user.phone = normalize_phone(data['phone'])
+            user.phone = data['phone']  # normalized by User._normalize_phone
         
+        bump_member_groups(user.id)
         db.session.commit()
-        print(f"[PROFILE] Updated for user {user.id}")
+        invalidate_principal(user.id)
+        users_log.info('Updated for user %s', user.id)
         return jsonify({'message': 'Profile updated', 'user': user.to_dict()}), 200
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'This phone number is already registered'}), 409
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Profile update failed: {str(e)}")
+        users_log.error('Profile update failed: %s', str(e))
         return jsonify({'error': 'Profile update failed. Please try again.'}), 500
 
-@app.route('/api/user/add-email', methods=['POST'])
+@bp.route('/api/user/add-email', methods=['POST'])
 @token_required
 def add_email():
     """Add or update user email"""
@@ -1883,9 +2108,10 @@ def add_email():
         # Update user email
         user.email = email
         user.email_verified = True  # Auto-verify (we'll send verification later if needed)
+        bump_member_groups(user.id)
         db.session.commit()
         
-        print(f"[EMAIL] Added email for user {user.id}: {email}")
+        email_log.info('Added email for user %s: %s', user.id, email)
         return jsonify({
             'message': 'Email saved successfully',
             'email': email,
@@ -1894,10 +2120,10 @@ def add_email():
         
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Add email failed: {str(e)}")
+        users_log.error('Add email failed: %s', str(e))
         return jsonify({'error': 'Failed to save email'}), 500
 
-@app.route('/api/user/change-password', methods=['POST'])
+@bp.route('/api/user/change-password', methods=['POST'])
 @token_required
 def change_password():
     """Change user password"""
@@ -1915,18 +2141,20 @@ def change_password():
             return jsonify({'error': 'Old password is incorrect'}), 401
         
         # Set new password
-        user.set_password(data['newPassword'])
+        user.password_hash = get_hasher().hash_bounded(data['newPassword'])
         db.session.commit()
         
-        print(f"[PROFILE] Password changed for user {user.id}")
+        users_log.info('Password changed for user %s', user.id)
         return jsonify({'message': 'Password changed successfully'}), 200
+    except HasherBusy:
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Password change failed: {str(e)}")
+        users_log.error('Password change failed: %s', str(e))
         return jsonify({'error': 'Password change failed. Please try again.'}), 500
 
-@app.route('/api/user/close-account', methods=['POST'])
-@token_required
+@bp.route('/api/user/close-account', methods=['POST'])
+@token_required(allow_inactive=True)
 def close_account():
     """Close user account (deactivate) - keeps all data - only for account owners"""
     try:
@@ -1945,19 +2173,20 @@ def close_account():
         
         user.is_active = False
         db.session.commit()
+        invalidate_principal(user.id)
         
-        print(f"[ACCOUNT] Closed for user {user.id}")
+        users_log.info('Closed for user %s', user.id)
         return jsonify({
             'message': 'Account closed successfully. Your data is preserved.',
             'is_active': user.is_active
         }), 200
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Account close failed: {str(e)}")
+        users_log.error('Account close failed: %s', str(e))
         return jsonify({'error': 'Account close failed. Please try again.'}), 500
 
-@app.route('/api/user/delete-account', methods=['DELETE'])
-@token_required
+@bp.route('/api/user/delete-account', methods=['DELETE'])
+@token_required(allow_inactive=True)
 def delete_account():
     """Permanently delete user account - only for active accounts and owners"""
     try:
@@ -1988,18 +2217,21 @@ def delete_account():
         user.is_deleted = True
         user.is_active = False
         db.session.commit()
+        invalidate_principal(user.id)
         
-        print(f"[ACCOUNT] Deleted for user {user.id}")
+        users_log.info('Deleted for user %s', user.id)
         return jsonify({
             'message': 'Account permanently deleted. All data has been removed.'
         }), 200
+    except HasherBusy:
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Account delete failed: {str(e)}")
+        users_log.error('Account delete failed: %s', str(e))
         return jsonify({'error': 'Account delete failed. Please try again.'}), 500
 
-@app.route('/api/user/reopen-account', methods=['POST'])
-@token_required
+@bp.route('/api/user/reopen-account', methods=['POST'])
+@token_required(allow_inactive=True)
 def reopen_account():
     """Reopen a closed account"""
     try:
@@ -2015,42 +2247,43 @@ def reopen_account():
         
         user.is_active = True
         db.session.commit()
+        invalidate_principal(user.id)
         
-        print(f"[ACCOUNT] Reopened for user {user.id}")
+        users_log.info('Reopened for user %s', user.id)
         return jsonify({
             'message': 'Account reopened successfully',
             'is_active': user.is_active
         }), 200
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Account reopen failed: {str(e)}")
+        users_log.error('Account reopen failed: %s', str(e))
         return jsonify({'error': 'Account reopen failed. Please try again.'}), 500
 
 # ==================== Health Check ====================
 
-@app.route('/health')
+@bp.route('/health')
 def health():
     """Simple health check endpoint"""
     return jsonify({'status': 'ok', 'timestamp': str(datetime.now())}), 200
 
 # ==================== Static Files & Root Route ====================
 
-@app.route('/')
+@bp.route('/')
 def serve_index():
     """Serve index.html for root path"""
     try:
         index_file = BASE_DIR / 'index.html'
-        print(f"[SERVE /] Attempting to serve from: {index_file}", flush=True)
-        print(f"[SERVE /] File exists: {index_file.exists()}", flush=True)
+        http_log.debug('Attempting to serve from: %s', index_file)
+        http_log.debug('File exists: %s', index_file.exists())
         
         if not index_file.exists():
-            print(f"[ERROR] index.html not found", flush=True)
+            http_log.error('index.html not found')
             return jsonify({'error': f'Frontend not found at {index_file}'}), 503
         
         with open(index_file, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        print(f"[SERVE /] SUCCESS: Serving {len(content)} bytes", flush=True)
+        http_log.debug('SUCCESS: Serving %s bytes', len(content))
         # NO-CACHE headers to prevent stale HTML on Render
         return content, 200, {
             'Content-Type': 'text/html; charset=utf-8',
@@ -2059,23 +2292,135 @@ def serve_index():
             'Expires': '0'
         }
     except Exception as e:
-        import traceback
-        print(f"[ERROR] serve_index failed: {e}", flush=True)
-        print(traceback.format_exc(), flush=True)
+        http_log.exception('serve_index failed: %s', e)
         return jsonify({'error': f'Error: {str(e)}'}), 500
 
 
 
+# ==================== Restaurant Routes ====================
+
+def restaurant_summary(rest_id, restaurant):
+    return {'id': rest_id, 'name': restaurant.get('name'), 'categories': list(restaurant.get('categories') or {})}
+
+@bp.route('/api/restaurants', methods=['GET'])
+def list_restaurants():
+    """Restaurant ids, names and categories (no menus); ?name= finds one, ?category= filters"""
+    catalog = get_catalog()
+    name = request.args.get('name')
+    if name:
+        rest_id, restaurant = catalog.find_by_name(name)
+        if rest_id is None:
+            return jsonify({'error': 'Restaurant not found'}), 404
+        return jsonify({'restaurant': restaurant_summary(rest_id, restaurant)}), 200
+    category = request.args.get('category')
+    restaurants = catalog.all()
+    ids = catalog.in_category(category) if category else list(restaurants)
+    return jsonify({'restaurants': [restaurant_summary(rest_id, restaurants[rest_id]) for rest_id in ids]}), 200
+
+@bp.route('/api/restaurants/<rest_id>/menu', methods=['GET'])
+def get_restaurant_menu(rest_id):
+    """One restaurant's menu; revalidated with ETag / If-None-Match"""
+    catalog = get_catalog()
+    restaurant = catalog.get(rest_id)
+    if restaurant is None:
+        return jsonify({'error': 'Restaurant not found'}), 404
+    response = jsonify({'id': rest_id, **restaurant})
+    response.set_etag(catalog.etag(rest_id))
+    response.cache_control.no_cache = True  # cache, but ask again (restaurants.json may change)
+    return response.make_conditional(request)
+
 # ==================== Group Routes ====================
 
-@app.route('/api/groups', methods=['POST'])
+def menu_fields(group):
+    """Menu part of a group response
+
+    menu_etag changes exactly when the menu does. Clients that keep menus
+    themselves pass ?menu=ref and get only the reference; they fetch
+    /api/menus/<menu_snapshot_id> (cacheable forever) when it is new to them.
+    """
+    fields = {'menu_snapshot_id': group.menu_snapshot_id, 'menu_etag': group_menu_etag(group)}
+    if request.args.get('menu') != 'ref' or not group.menu_snapshot_id:
+        fields['menu_data'] = group_menu(group)
+    return fields
+
+@bp.route('/api/menus/<snapshot_id>', methods=['GET'])
+def get_menu_snapshot(snapshot_id):
+    """A menu snapshot; its id is its content hash, so it never changes"""
+    menu = load_menu(snapshot_id)
+    if menu is None:
+        return jsonify({'error': 'Menu not found'}), 404
+    response = jsonify(menu)
+    response.set_etag(snapshot_id)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+@bp.route('/api/groups/<int:group_id>/menu', methods=['GET'])
+@token_required
+def get_group_menu(group_id):
+    """The group's current menu; 304 when If-None-Match has its menu_etag"""
+    if not is_member(group_id, request.user_id):
+        return jsonify({'error': 'Not a group member'}), 403
+    group = db.session.get(Group, group_id)
+    if group is None:
+        return jsonify({'error': 'Group not found'}), 404
+    menu = group_menu(group)
+    if menu is None:
+        return jsonify({'error': 'Group has no menu'}), 404
+    response = jsonify(menu)
+    response.set_etag(group_menu_etag(group))
+    response.cache_control.no_cache = True  # the group may switch menus
+    return response.make_conditional(request)
+
+@bp.route('/api/groups/<int:group_id>/events', methods=['GET'])
+@token_required(query_token=True)
+def group_events(group_id):
+    """Live changes of a group as Server-Sent Events (see group_events.py)
+
+    Resumes from Last-Event-ID (or ?last_event_id=). The database is only
+    touched before the stream starts; the session is released when this
+    view returns, so idle streams hold no connection.
+    """
+    if not is_member(group_id, request.user_id):
+        return jsonify({'error': 'Not a group member'}), 403
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    
+    events = get_group_events()
+    try:
+        # Subscribe before reading the version: nothing published in between is lost
+        subscription = events.subscribe(group_id)
+    except TooManyStreams:
+        return jsonify({'error': 'Too many live connections. Poll the group instead.'}), 503, {'Retry-After': '30'}
+    try:
+        group = db.session.execute(
+            db.select(Group.version, Group.is_active).where(Group.id == group_id)
+        ).first()
+    except Exception:
+        events.close(subscription)
+        raise
+    if group is None or (not group.is_active and last_event_id is not None and last_event_id >= group.version):
+        # 204 tells EventSource to stop reconnecting (the closed group was seen)
+        events.close(subscription)
+        return ('', 204) if group is not None else (jsonify({'error': 'Group not found'}), 404)
+    
+    response = current_app.response_class(
+        events.stream(subscription, group.version, last_event_id, closed=not group.is_active),
+        mimetype='text/event-stream'
+    )
+    response.cache_control.no_cache = True
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: don't buffer the stream
+    return response
+
+@bp.route('/api/groups', methods=['POST'])
 @token_required
 def create_group():
     """Create new group with random color name and 6-digit QR code"""
-    print("[GROUP] create_group called", flush=True)
+    groups_log.debug('create_group called')
     try:
         data = request.get_json()
-        print(f"[GROUP] Request data: {data}", flush=True)
+        groups_log.debug('Request data: %s', data)
         if not data:
             return jsonify({'error': 'Invalid request data'}), 400
         
@@ -2086,15 +2431,6 @@ def create_group():
             'İnci', 'Altın', 'Gümüş', 'Bakır', 'Bronz', 'Lacivert', 'Haki', 'Zeytin'
         ]
         
-        # Generate unique 6-digit code (store as: 123456, display as: 123-456)
-        group_code = generate_group_code()
-        
-        # Ensure code is unique
-        attempts = 0
-        while Group.query.filter_by(code=group_code).first() and attempts < 100:
-            group_code = generate_group_code()
-            attempts += 1
-        
         # Generate random color name if no name provided
         group_name = data.get('name')
         if not group_name:
@@ -2105,46 +2441,42 @@ def create_group():
         menu_data = None
         restaurant_name = None
         
-        # Load menu data if restaurant_id provided
+        # Menu data from the in-memory restaurant catalog (restaurants.json),
+        # stored once per distinct menu and shared by every group using it
+        menu_snapshot_id = None
         if restaurant_id:
-            try:
-                with open(BASE_DIR / 'restaurants.json', 'r', encoding='utf-8') as f:
-                    all_restaurants = json.load(f)
-                    if restaurant_id in all_restaurants:
-                        menu_data = all_restaurants[restaurant_id]
-                        restaurant_name = menu_data.get('name', restaurant_id)
-                        print(f"[GROUP] Loaded menu for restaurant: {restaurant_name}", flush=True)
-                    else:
-                        print(f"[GROUP] Restaurant {restaurant_id} not found in restaurants.json", flush=True)
-            except Exception as e:
-                print(f"[GROUP] Error loading restaurants.json: {e}", flush=True)
+            menu_data = get_catalog().get(restaurant_id)
+            if menu_data is not None:
+                restaurant_name = menu_data.get('name', restaurant_id)
+                menu_snapshot_id = store_menu(menu_data)
+                groups_log.info('Loaded menu for restaurant: %s', restaurant_name)
+            else:
+                groups_log.info('Restaurant %s not found in restaurants.json', restaurant_id)
         
         group = Group(
             name=group_name,
             description=data.get('description'),
-            code=group_code,
             qr_code=None,
             category=data.get('category', 'Genel Yaşam'),
             # 🆕 Restaurant/Menu fields
             restaurant_id=restaurant_id,
             restaurant_name=restaurant_name,
-            menu_data=menu_data,
+            menu_snapshot_id=menu_snapshot_id,
             created_by=request.user_id
         )
         
-        db.session.add(group)
+        # Unique 6-digit code (store as: 123456, display as: 123-456): the
+        # allocator inserts the group and retries on a unique violation
+        group_code = get_code_allocator().insert(db.session, group)
         
-        # Add creator to group members BEFORE commit
-        user = User.query.get(request.user_id)
-        if user:
-            group.members.append(user)
-        else:
-            print(f"[ERROR] User {request.user_id} not found!")
-            return jsonify({'error': 'User not found'}), 500
+        # Add creator to group members BEFORE commit (token_required already
+        # checked the user exists - no need to load the User row)
+        add_member(group.id, request.user_id)
         
         # Commit both group and membership at same time
         db.session.commit()
-        print(f"[GROUP] Created: {group.name} (ID: {group.id}, Code: {group_code}, Restaurant: {restaurant_name})")
+        get_group_lookup().invalidate(code=group_code)  # it may be cached as "no such code"
+        groups_log.info('Created: %s (ID: %s, Code: %s, Restaurant: %s)', group.name, group.id, group_code, restaurant_name)
         
         return jsonify({
             'success': True,
@@ -2158,25 +2490,44 @@ def create_group():
                 'code_formatted': format_group_code(group.code),  # Formatted code (123-456)
                 'restaurant_id': restaurant_id,  # 🆕
                 'restaurant_name': restaurant_name,  # 🆕
-                'menu_data': menu_data,  # 🆕
+                **menu_fields(group),
                 'created_at': group.created_at.isoformat()
             }
         }), 201
         
+    except CodeSpaceExhausted:
+        db.session.rollback()
+        return jsonify({'error': 'No free group code right now. Please retry.'}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Group creation failed: {str(e)}", flush=True)
-        import traceback
-        traceback.print_exc()
+        groups_log.exception('Group creation failed: %s', str(e))
         return jsonify({'error': f'Failed to create group: {str(e)}'}), 500
 
-@app.route('/api/groups/<int:group_id>', methods=['GET'])
+def group_etag(group_id, version):
+    """ETag of GET /api/groups/<id>: the group's version (?menu=ref is its own variant)"""
+    return f"{group_id}.{version}" + ('.ref' if request.args.get('menu') == 'ref' else '')
+
+@bp.route('/api/groups/<int:group_id>', methods=['GET'])
 @token_required
 def get_group(group_id):
-    """Get group details with menu data"""
+    """Get group details with menu data
+
+    Clients poll this. With If-None-Match the version is read first with a
+    primary-key lookup, and an unchanged group is answered 304 before its
+    creator, members, orders or menu are loaded.
+    """
+    if request.if_none_match:
+        version = db.session.execute(db.select(Group.version).where(Group.id == group_id)).scalar()
+        if version is not None and request.if_none_match.contains(group_etag(group_id, version)):
+            response = current_app.response_class(status=304)
+            response.set_etag(group_etag(group_id, version))
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+    
     group = Group.query.get_or_404(group_id)
     creator = User.query.get(group.created_by) if group.created_by else None
-    return jsonify({
+    response = jsonify({
         'id': group.id,
         'name': group.name,
         'description': group.description,
@@ -2184,10 +2535,11 @@ def get_group(group_id):
         'code': group.code,
         'code_formatted': format_group_code(group.code),
         'qr_code': group.qr_code,
+        'version': group.version,
         # 🆕 Restaurant/Menu fields
         'restaurant_id': group.restaurant_id,
         'restaurant_name': group.restaurant_name,
-        'menu_data': group.menu_data,
+        **menu_fields(group),
         'menu_locked': group.menu_locked,
         'created_at': group.created_at.isoformat(),
         'created_by': group.created_by,
@@ -2199,9 +2551,13 @@ def get_group(group_id):
             'total_amount': o.total_amount,
             'created_at': o.created_at.isoformat() if o.created_at else None
         } for o in group.orders]
-    }), 200
+    })
+    response.set_etag(group_etag(group.id, group.version))
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # revalidate every poll: 304 while nothing changed
+    return response
 
-@app.route('/api/groups/<int:group_id>', methods=['PUT'])
+@bp.route('/api/groups/<int:group_id>', methods=['PUT'])
 @token_required
 def update_group(group_id):
     """Update group menu data (OCR results) - only if not locked"""
@@ -2213,25 +2569,34 @@ def update_group(group_id):
             return jsonify({'error': 'Invalid request data'}), 400
         
         # Check if user is a group member
-        user = User.query.get(request.user_id)
-        if user not in group.members:
+        if not is_member(group.id, request.user_id):
             return jsonify({'error': 'Not a group member'}), 403
         
         # Check if menu is already locked
         if group.menu_locked:
             return jsonify({'error': 'Menü zaten kilitli. Başka bir üye tarafından değiştirilemez.'}), 403
         
-        # Update menu_data if provided
+        # Update the menu if provided: copy on write - the edited menu becomes
+        # its own snapshot, groups sharing the old one keep it
+        menu_etag = group_menu_etag(group)
         if 'menu_data' in data:
-            group.menu_data = data['menu_data']
-            print(f"[GROUP] Updated menu for group {group_id}")
+            group.menu_snapshot_id = store_menu(data['menu_data']) if data['menu_data'] else None
+            group.menu_data = None
+            groups_log.info('Updated menu for group %s', group_id)
+        changed = group_menu_etag(group) != menu_etag  # the menu's content hash
         
         # Lock menu if requested
         if data.get('menu_locked') == True:
             group.menu_locked = True
-            print(f"[GROUP] Locked menu for group {group_id}")
+            changed = True
+            groups_log.info('Locked menu for group %s', group_id)
         
+        # Only a real change gets a new version (ETag) and an event
+        version = bump_group_version(group.id) if changed else None
         db.session.commit()
+        if version:
+            publish_group_event(group.id, version, 'menu_updated',
+                                menu_etag=group_menu_etag(group), menu_locked=bool(group.menu_locked))
         
         return jsonify({
             'id': group.id,
@@ -2242,17 +2607,17 @@ def update_group(group_id):
             'code_formatted': format_group_code(group.code),
             'restaurant_id': group.restaurant_id,
             'restaurant_name': group.restaurant_name,
-            'menu_data': group.menu_data,
+            **menu_fields(group),
             'menu_locked': group.menu_locked,
             'created_at': group.created_at.isoformat(),
             'members': [u.to_dict() for u in group.members]
         }), 200
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Failed to update group: {e}")
+        groups_log.error('Failed to update group: %s', e)
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/groups/join', methods=['POST'])
+@bp.route('/api/groups/join', methods=['POST'])
 @token_required
 def join_group():
     """Join group using QR code or group code"""
@@ -2264,41 +2629,28 @@ def join_group():
         qr_code = data.get('qr_code')
         group_code = data.get('code')
         
-        group = None
-        
-        # Try to find by group code
-        if group_code:
-            # Handle both formats: "123456" (raw) and "123-456" (formatted)
-            clean_code = group_code.replace('-', '')
-            group = Group.query.filter_by(code=clean_code).first()
-        
-        # Fallback to QR code if not found
-        if not group and qr_code:
-            group = Group.query.filter_by(qr_code=qr_code).first()
+        # Group code ("123456" or "123-456"), falling back to the QR code;
+        # known codes and recent misses are answered from the lookup cache
+        group = get_group_lookup().find(db.session, Group, code=group_code, qr_code=qr_code)
         
         if not group:
             return jsonify({'error': 'Group not found'}), 404
         
-        # Kullanıcıyı grup üyelerine ekle (zaten üyeyse kontrol et)
-        user = User.query.get(request.user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        if user in group.members:
+        # Kullanıcıyı grup üyelerine ekle: aynı anda gelen katılımlar tek
+        # transaction'da, tek INSERT ile eklenir (zaten üyeyse eklenmez)
+        user_id = request.user_id
+        if get_join_batcher().join(group.id, (user_id, g.principal.first_name), apply_joins) is None:
             return jsonify({
                 'message': 'Already a member of this group',
                 'id': group.id,
                 'name': group.name,
                 'restaurant_id': group.restaurant_id,  # 🆕
                 'restaurant_name': group.restaurant_name,  # 🆕
-                'menu_data': group.menu_data,  # 🆕
+                **menu_fields(group),
                 'menu_locked': group.menu_locked  # 🆕
             }), 200
         
-        group.members.append(user)
-        db.session.commit()
-        
-        print(f"[GROUP] User {user.id} joined group {group.id}")
+        groups_log.info('User %s joined group %s', user_id, group.id)
         return jsonify({
             'message': 'Successfully joined group',
             'id': group.id,
@@ -2306,35 +2658,76 @@ def join_group():
             'description': group.description,
             'restaurant_id': group.restaurant_id,  # 🆕
             'restaurant_name': group.restaurant_name,  # 🆕
-            'menu_data': group.menu_data,  # 🆕
+            **menu_fields(group),
             'menu_locked': group.menu_locked  # 🆕
         }), 201
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Group join failed: {str(e)}")
+        groups_log.error('Group join failed: %s', str(e))
         return jsonify({'error': 'Failed to join group. Please try again.'}), 500
 
-@app.route('/api/user/groups', methods=['GET'])
+def member_previews(group_ids, preview_size):
+    """{group_id: (members_count, [first preview_size members])} in one query
+
+    Window functions number and count each group's rows in group_members,
+    so neither the counts nor the preview load whole member lists.
+    """
+    ranked = db.select(
+        group_members.c.group_id,
+        group_members.c.user_id,
+        db.func.row_number().over(partition_by=group_members.c.group_id,
+                                  order_by=group_members.c.user_id).label('position'),
+        db.func.count().over(partition_by=group_members.c.group_id).label('members_count'),
+    ).where(group_members.c.group_id.in_(group_ids)).subquery()
+    rows = db.session.execute(
+        db.select(ranked.c.group_id, ranked.c.members_count, User.id, User.first_name, User.last_name)
+        .join(User, User.id == ranked.c.user_id)
+        .where(ranked.c.position <= preview_size)
+        .order_by(ranked.c.group_id, ranked.c.position)
+    )
+    previews = {}
+    for group_id, members_count, user_id, first_name, last_name in rows:
+        previews.setdefault(group_id, (members_count, []))[1].append(
+            {'id': user_id, 'first_name': first_name, 'last_name': last_name})
+    return previews
+
+@bp.route('/api/user/groups', methods=['GET'])
 @token_required
 def get_user_groups():
-    """Get all groups for current user - using ORM for reliability"""
-    user = User.query.get(request.user_id)
-    
-    print(f"[GROUPS] User ID: {request.user_id}", flush=True)
-    print(f"[GROUPS] User found: {user is not None}", flush=True)
-    
-    if not user:
-        print(f"[GROUPS] User not found, returning empty array", flush=True)
-        return jsonify([]), 200
+    """Active groups of the current user, newest first, one page at a time
+
+    ?limit= (default USER_GROUPS_PAGE_SIZE) and ?cursor= (the X-Next-Cursor
+    header of the previous page). Two queries per page whatever the group
+    and member counts: the page of groups (list columns only - no menus),
+    then member counts and a USER_GROUPS_MEMBER_PREVIEW-member preview.
+    """
+    config = current_app.config
+    limit = request.args.get('limit', config['USER_GROUPS_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, config['USER_GROUPS_MAX_PAGE_SIZE']))
+    cursor = request.args.get('cursor')
+    if cursor is not None and not cursor.isdigit():
+        return jsonify({'error': 'Invalid cursor'}), 400
     
-    # Use ORM relationship instead of raw SQL to avoid tuple issues
-    groups = [g for g in user.groups if g.is_active]
+    # Keyset pagination on groups.id: each page is an index range, not an OFFSET
+    query = Group.query.options(load_only(
+        Group.id, Group.name, Group.description, Group.category, Group.code,
+        Group.qr_code, Group.created_at, Group.is_active
+    )).join(group_members, group_members.c.group_id == Group.id).filter(
+        group_members.c.user_id == request.user_id,
+        Group.is_active == True
+    )
+    if cursor is not None:
+        query = query.filter(Group.id < int(cursor))
+    groups = query.order_by(Group.id.desc()).limit(limit + 1).all()
+    next_cursor = str(groups[limit - 1].id) if len(groups) > limit else None
+    groups = groups[:limit]
     
-    print(f"[GROUPS] Found {len(groups)} active groups")
+    previews = member_previews([g.id for g in groups], config['USER_GROUPS_MEMBER_PREVIEW']) if groups else {}
+    groups_log.debug('User %s: %s active groups on this page', request.user_id, len(groups))
     
     groups_data = []
     for group in groups:
-        print(f"[GROUPS] Group: {group.id} - {group.name}")
+        members_count, members = previews.get(group.id, (0, []))
         groups_data.append({
             'id': group.id,
             'name': group.name,
@@ -2344,16 +2737,18 @@ def get_user_groups():
             'code_formatted': format_group_code(group.code),
             'qr_code': group.qr_code,
             'created_at': group.created_at.isoformat(),
-            'members_count': len(group.members),
-            'members': [{'id': m.id, 'first_name': m.first_name, 'last_name': m.last_name} for m in group.members],
+            'members_count': members_count,
+            'members': members,  # preview: the first USER_GROUPS_MEMBER_PREVIEW members
             'status': 'active' if group.is_active else 'closed'
         })
     
-    print(f"[GROUPS] Returning {len(groups_data)} groups")
-    
-    return jsonify(groups_data), 200
+    headers = {}
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'<{request.path}?limit={limit}&cursor={next_cursor}>; rel="next"'
+    return jsonify(groups_data), 200, headers
 
-@app.route('/api/groups/<int:group_id>/close', methods=['POST'])
+@bp.route('/api/groups/<int:group_id>/close', methods=['POST'])
 @token_required
 def close_group(group_id):
     """Close a group - soft delete"""
@@ -2362,26 +2757,25 @@ def close_group(group_id):
         if not group:
             return jsonify({'error': 'Group not found'}), 404
         
-        user = User.query.get(request.user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
         # Check if user is group creator (first member)
-        if user not in group.members:
+        if not is_member(group.id, request.user_id):
             return jsonify({'error': 'Unauthorized'}), 403
         
         # Mark as inactive (soft delete)
         group.is_active = False
+        version = bump_group_version(group.id)
         db.session.commit()
+        get_group_lookup().invalidate(code=group.code, qr_code=group.qr_code)
+        publish_group_event(group.id, version, 'group_closed')
         
-        print(f"[GROUP] Closed group {group_id} by user {user.id}")
+        groups_log.info('Closed group %s by user %s', group_id, request.user_id)
         return jsonify({'message': 'Group closed successfully'}), 200
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Group close failed: {str(e)}")
+        groups_log.error('Group close failed: %s', str(e))
         return jsonify({'error': 'Failed to close group. Please try again.'}), 500
 
-@app.route('/api/groups/<int:group_id>/delete', methods=['DELETE'])
+@bp.route('/api/groups/<int:group_id>/delete', methods=['DELETE'])
 @token_required
 def delete_group(group_id):
     """Delete a group permanently - hard delete"""
@@ -2390,19 +2784,15 @@ def delete_group(group_id):
         if not group:
             return jsonify({'error': 'Group not found'}), 404
         
-        user = User.query.get(request.user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
         data = request.get_json() or {}
         
         # Check if user is group creator
-        if user not in group.members:
+        if not is_member(group.id, request.user_id):
             return jsonify({'error': 'Unauthorized'}), 403
         
-        # Password verification
+        # Password verification (only then is the full User row needed)
         password = data.get('password')
-        if password and not user.check_password(password):
+        if password and not User.query.get(request.user_id).check_password(password):
             return jsonify({'error': 'Invalid password'}), 401
         
         # Only delete active groups
@@ -2410,19 +2800,24 @@ def delete_group(group_id):
             return jsonify({'error': 'Cannot delete closed groups'}), 400
         
         # Hard delete
+        codes = {'code': group.code, 'qr_code': group.qr_code}
+        remove_group_members(group.id)
         db.session.delete(group)
         db.session.commit()
+        get_group_lookup().invalidate(**codes)
         
-        print(f"[GROUP] Deleted group {group_id} by user {user.id}")
+        groups_log.info('Deleted group %s by user %s', group_id, request.user_id)
         return jsonify({'message': 'Group permanently deleted'}), 200
+    except HasherBusy:
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Group delete failed: {str(e)}")
+        groups_log.error('Group delete failed: %s', str(e))
         return jsonify({'error': 'Failed to delete group. Please try again.'}), 500
 
 # ==================== Order Routes ====================
 
-@app.route('/api/orders', methods=['POST'])
+@bp.route('/api/orders', methods=['POST'])
 @token_required
 def create_order():
     """Create new order"""
@@ -2431,38 +2826,83 @@ def create_order():
         if not data:
             return jsonify({'error': 'Invalid request data'}), 400
         
+        # The order rewrites every member's bill: only members may add one
+        group_id = data.get('groupId')
+        if group_id:
+            if db.session.get(Group, group_id) is None:
+                return jsonify({'error': 'Group not found'}), 404
+            if not is_member(group_id, request.user_id):
+                return jsonify({'error': 'Not a group member'}), 403
+        
         order = Order(
-            group_id=data.get('groupId'),
+            group_id=group_id,
             creator_id=request.user_id,
             restaurant=data.get('restaurant'),
             total_amount=data.get('totalAmount', 0),
             tax=data.get('tax', 0),
-            delivery=data.get('delivery', 0)
+            delivery=data.get('delivery', 0),
+            tip=data.get('tip', 0)
         )
         
-        # Add items
+        # Add items (type: personal / shared / excluded, see bill_split.py). Shared items may
+        # name who shares them: "shares": [user id, ...] or {user id: weight}
+        sharers = set()
         for item in data.get('items', []):
+            split_type = item.get('type', bill_split.PERSONAL)
+            if split_type not in bill_split.SPLIT_TYPES:
+                return jsonify({'error': f"Invalid item type: {split_type}"}), 400
+            try:
+                quantity = parse_item_quantity(item.get('quantity'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            shares = None
+            if item.get('shares') is not None:
+                if split_type != bill_split.SHARED:
+                    return jsonify({'error': 'Only shared items can have shares'}), 400
+                try:
+                    shares = parse_item_shares(item['shares'])
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                sharers.update(int(user_id) for user_id in shares)
             order_item = OrderItem(
                 name=item.get('name'),
                 price=item.get('price'),
-                quantity=item.get('quantity', 1)
+                quantity=quantity,
+                split_type=split_type,
+                shares=shares
             )
             order.items.append(order_item)
+        if sharers:
+            if order.group_id:
+                known = set(db.session.execute(
+                    db.select(group_members.c.user_id).where(group_members.c.group_id == order.group_id,
+                                                             group_members.c.user_id.in_(sharers))
+                ).scalars())
+            else:
+                known = {order.creator_id}
+            if sharers - known:
+                return jsonify({'error': 'Items can only be shared among group members'}), 400
         
         db.session.add(order)
+        db.session.flush()
+        save_member_bills(order)
+        version = bump_group_version(order.group_id) if order.group_id else None  # shown in GET /api/groups/<id>
         db.session.commit()
+        if version:
+            publish_group_event(order.group_id, version, 'order_created',
+                                order_id=order.id, total_amount=order.total_amount)
         
-        print(f"[ORDER] Created order {order.id}")
+        orders_log.info('Created order %s', order.id)
         return jsonify({
             'message': 'Order created',
             'orderId': order.id
         }), 201
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Order creation failed: {str(e)}")
+        orders_log.error('Order creation failed: %s', str(e))
         return jsonify({'error': 'Failed to create order. Please try again.'}), 500
 
-@app.route('/api/orders/<int:order_id>', methods=['GET'])
+@bp.route('/api/orders/<int:order_id>', methods=['GET'])
 @token_required
 def get_order(order_id):
     """Get order details"""
@@ -2473,21 +2913,31 @@ def get_order(order_id):
         'totalAmount': order.total_amount,
         'tax': order.tax,
         'delivery': order.delivery,
-        'items': [{'name': i.name, 'price': i.price, 'quantity': i.quantity} for i in order.items],
-        'bills': [{'userId': b.user_id, 'amount': b.amount} for b in order.bills]
+        'tip': order.tip,
+        'items': [{'name': i.name, 'price': i.price, 'quantity': i.quantity, 'type': i.split_type,
+                   'shares': i.shares} for i in order.items],
+        'bills': [{'userId': b.user_id, 'amount': b.amount, 'items': b.items} for b in order.bills]
     }), 200
 
 # ==================== Error Handlers ====================
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(e):
     return jsonify({'error': 'Not found'}), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def server_error(e):
     return jsonify({'error': 'Server error'}), 500
 
-@app.route('/api/debug/database', methods=['GET'])
+@bp.app_errorhandler(HasherBusy)
+def hasher_busy(e):
+    return hasher_busy_response()
+
+@bp.app_errorhandler(ProviderUnavailable)
+def provider_unavailable(e):
+    return provider_unavailable_response(e)
+
+@bp.route('/api/debug/database', methods=['GET'])
 def debug_database():
     """Debug endpoint - check database status"""
     from sqlalchemy import text
@@ -2515,7 +2965,7 @@ def debug_database():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/debug/current-user', methods=['GET'])
+@bp.route('/api/debug/current-user', methods=['GET'])
 @token_required
 def debug_current_user():
     """Debug endpoint - check current logged-in user"""
@@ -2548,7 +2998,7 @@ def debug_current_user():
         'groups_count': len(groups_list)
     }), 200
 
-@app.route('/api/stats', methods=['GET'])
+@bp.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get database statistics"""
     try:
@@ -2566,13 +3016,13 @@ def get_stats():
         return jsonify({'error': str(e)}), 500
 
 # Root index.html - must be BEFORE wildcard route
-@app.route('/api/admin/init-db', methods=['POST', 'GET'])
+@bp.route('/api/admin/init-db', methods=['POST', 'GET'])
 def init_db_admin():
     """Initialize database with default user and test group - Admin endpoint"""
     try:
         # Initialize tables
         db.create_all()
-        print("✓ Database tables created")
+        admin_log.info('✓ Database tables created')
         
         # Check/Create default user
         user = User.query.filter_by(email='metonline@gmail.com').first()
@@ -2587,9 +3037,9 @@ def init_db_admin():
             db.session.add(user)
             db.session.flush()  # Flush to get user.id without committing
             db.session.commit()
-            print(f"✓ Default user created (ID: {user.id})")
+            admin_log.info('✓ Default user created (ID: %s)', user.id)
         else:
-            print("✓ Default user already exists")
+            admin_log.info('✓ Default user already exists')
             # Reset password
             user.set_password('test123')
             db.session.commit()
@@ -2601,7 +3051,7 @@ def init_db_admin():
             'groups': len(user.groups)
         }), 200
     except Exception as e:
-        print(f"✗ Error: {str(e)}")
+        admin_log.error('✗ Error: %s', str(e))
         db.session.rollback()
         return jsonify({
             'status': 'error',
@@ -2610,7 +3060,7 @@ def init_db_admin():
 
 # ==================== ADMIN ENDPOINTS ====================
 
-@app.route('/api/admin/stats', methods=['GET'])
+@bp.route('/api/admin/stats', methods=['GET'])
 def admin_stats():
     """Get system statistics"""
     try:
@@ -2632,10 +3082,10 @@ def admin_stats():
             'total_amount': float(total_amount)
         }), 200
     except Exception as e:
-        print(f"[ADMIN] Error getting stats: {str(e)}")
+        admin_log.error('Error getting stats: %s', str(e))
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/admin/users', methods=['GET'])
+@bp.route('/api/admin/users', methods=['GET'])
 def admin_users():
     """Get all users"""
     try:
@@ -2646,10 +3096,10 @@ def admin_users():
         
         return jsonify({'users': users_data}), 200
     except Exception as e:
-        print(f"[ADMIN] Error getting users: {str(e)}")
+        admin_log.error('Error getting users: %s', str(e))
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/admin/users/<int:user_id>', methods=['DELETE'])
+@bp.route('/api/admin/users/<int:user_id>', methods=['DELETE'])
 def admin_delete_user(user_id):
     """Delete a user"""
     try:
@@ -2659,17 +3109,20 @@ def admin_delete_user(user_id):
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
+        bump_member_groups(user_id)
+        remove_user_memberships(user_id)
         db.session.delete(user)
         db.session.commit()
+        invalidate_principal(user_id)
         
-        print(f"[ADMIN] User deleted: {user.email}")
+        admin_log.info('User deleted: %s', user.email)
         return jsonify({'message': 'User deleted successfully'}), 200
     except Exception as e:
         db.session.rollback()
-        print(f"[ADMIN] Error deleting user: {str(e)}")
+        admin_log.error('Error deleting user: %s', str(e))
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/admin/users/<int:user_id>', methods=['PUT'])
+@bp.route('/api/admin/users/<int:user_id>', methods=['PUT'])
 def admin_update_user(user_id):
     """Update user information"""
     try:
@@ -2688,22 +3141,25 @@ def admin_update_user(user_id):
         if 'email' in data:
             user.email = data['email']
         
+        bump_member_groups(user_id)
         db.session.commit()
-        print(f"[ADMIN] User updated: {user.email}")
+        invalidate_principal(user_id)
+        admin_log.info('User updated: %s', user.email)
         
         return jsonify({'message': 'User updated successfully', 'user': user.to_dict()}), 200
     except Exception as e:
         db.session.rollback()
-        print(f"[ADMIN] Error updating user: {str(e)}")
+        admin_log.error('Error updating user: %s', str(e))
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/admin/groups', methods=['GET'])
+@bp.route('/api/admin/groups', methods=['GET'])
 def admin_groups():
     """Get all groups"""
     try:
         require_auth()
         
         groups = Group.query.all()
+        counts = member_counts([g.id for g in groups])
         groups_data = []
         for g in groups:
             group_dict = {
@@ -2711,32 +3167,48 @@ def admin_groups():
                 'name': g.name,
                 'code': g.code,
                 'created_at': g.created_at.isoformat() if g.created_at else None,
-                'member_count': len(g.members) if g.members else 0,
+                'member_count': counts.get(g.id, 0),
                 'is_active': g.is_active
             }
             groups_data.append(group_dict)
         
         return jsonify({'groups': groups_data}), 200
     except Exception as e:
-        print(f"[ADMIN] Error getting groups: {str(e)}")
+        admin_log.error('Error getting groups: %s', str(e))
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/admin/settings', methods=['GET'])
+@bp.route('/api/admin/settings', methods=['GET'])
 def admin_settings():
     """Get system settings"""
     try:
         require_auth()
         
         return jsonify({
-            'sender_email': os.getenv('SENDER_EMAIL', 'not set'),
+            'sender_email': current_app.config['SENDER_EMAIL'] or 'not set',
             'db_type': 'PostgreSQL (Render)',
-            'total_records': User.query.count() + Group.query.count()
+            'total_records': User.query.count() + Group.query.count(),
+            # This worker's SMTP throughput (empty until it has sent an email)
+            'smtp': current_app.extensions['smtp_pool'].stats() if 'smtp_pool' in current_app.extensions else {},
+            # ...and its Twilio Verify calls: errors, rejections, latency, circuit state
+            'twilio': current_app.extensions['twilio_gateway'].stats() if 'twilio_gateway' in current_app.extensions else {},
+            # ...its live group streams
+            'group_events': current_app.extensions['group_events'].stats()
+            if 'group_events' in current_app.extensions else {},
+            # ...its join-code lookups (hits + negative_hits skipped the code query)
+            'group_lookup': current_app.extensions['group_lookup'].stats()
+            if 'group_lookup' in current_app.extensions else {},
+            # ...its batched joins (joins / batches = joins per transaction)
+            'group_joins': current_app.extensions['join_batcher'].stats()
+            if 'join_batcher' in current_app.extensions else {},
+            # ...and its group code allocations (inserts / allocated = tries per group)
+            'group_codes': current_app.extensions['group_code_allocator'].stats()
+            if 'group_code_allocator' in current_app.extensions else {},
         }), 200
     except Exception as e:
-        print(f"[ADMIN] Error getting settings: {str(e)}")
+        admin_log.error('Error getting settings: %s', str(e))
         return jsonify({'error': str(e)}), 500
 
-@app.route('/admin')
+@bp.route('/admin')
 def admin_page():
     """Serve admin panel"""
     try:
@@ -2747,7 +3219,7 @@ def admin_page():
         else:
             return 'Admin panel not found', 404
     except Exception as e:
-        print(f'[ERROR] Failed to load admin.html: {e}')
+        admin_log.error('Failed to load admin.html: %s', e)
         return f'Error loading admin panel: {e}', 500
 
 # ==================== END ADMIN ENDPOINTS ====================
@@ -2756,33 +3228,33 @@ def admin_page():
 def index():
     try:
         index_path = BASE_DIR / 'index.html'
-        print(f'[DEBUG] Trying to load index.html from: {index_path}')
-        print(f'[DEBUG] BASE_DIR: {BASE_DIR}')
-        print(f'[DEBUG] Index exists: {index_path.exists()}')
+        http_log.debug('Trying to load index.html from: %s', index_path)
+        http_log.debug('BASE_DIR: %s', BASE_DIR)
+        http_log.debug('Index exists: %s', index_path.exists())
         with open(index_path, 'r', encoding='utf-8') as f:
             return f.read()
     except Exception as e:
-        print(f'[ERROR] Failed to load index.html: {e}')
+        http_log.error('Failed to load index.html: %s', e)
         return f'Error loading index.html: {e}', 500
 
 # Serve static files (CSS, JS, etc)
-@app.route('/css/<path:filename>')
+@bp.route('/css/<path:filename>')
 def serve_css(filename):
     return send_from_directory(str(BASE_DIR), f'css/{filename}')
 
-@app.route('/js/<path:filename>')
+@bp.route('/js/<path:filename>')
 def serve_js(filename):
     return send_from_directory(str(BASE_DIR), f'js/{filename}')
 
 # Serve v2 HTML page
-@app.route('/phone-join-group-v2.html')
+@bp.route('/phone-join-group-v2.html')
 def serve_v2():
     return send_from_directory(str(BASE_DIR), 'phone-join-group-v2.html')
 
 # ==================== 404 Handler - Serve SPA ====================
 # This catches ALL 404s and serves index.html for SPA routing
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(error):
     """Handle 404 by serving index.html for SPA routing"""
     try:
@@ -2796,22 +3268,22 @@ def not_found(error):
         # Otherwise serve index.html for SPA routing
         index_file = BASE_DIR / 'index.html'
         if index_file.exists():
-            print(f"[SPA-404] Serving index.html for path: {request.path}", flush=True)
+            http_log.debug('Serving index.html for path: %s', request.path)
             with open(index_file, 'r', encoding='utf-8') as f:
                 content = f.read()
             return content, 200, {'Content-Type': 'text/html; charset=utf-8'}
         
         # If index.html doesn't exist, return error
-        print(f"[ERROR-404] index.html not found, path: {request.path}", flush=True)
+        http_log.error('index.html not found, path: %s', request.path)
         return jsonify({'error': 'Not Found'}), 404
     except Exception as e:
-        print(f"[ERROR-404] Exception: {e}", flush=True)
+        http_log.error('Exception: %s', e)
         return jsonify({'error': 'Server Error'}), 500
 
 # ==================== Debug/Dev Routes (Available in both __main__ and WSGI) ====================
 
 # DEBUG: Endpoint to set PIN for a phone number (temporary - for testing only)
-@app.route('/api/debug/set-pin', methods=['POST'])
+@bp.route('/api/debug/set-pin', methods=['POST'])
 def debug_set_pin():
     """TEMPORARY DEBUG ENDPOINT: Set PIN for a phone number"""
     try:
@@ -2825,9 +3297,8 @@ def debug_set_pin():
         if not pin.isdigit() or len(pin) != 4:
             return jsonify({'error': 'PIN must be 4 digits'}), 400
         
-        # Normalize phone
-        if not phone.startswith('+'):
-            phone = '+90' + phone.lstrip('0')
+        # Canonical form, as stored in users.phone
+        phone = normalize_phone(phone)
         
         user = User.query.filter_by(phone=phone).first()
         if not user:
@@ -2837,21 +3308,21 @@ def debug_set_pin():
         user.set_password(pin)
         db.session.commit()
         
-        print(f"[DEBUG] PIN set for {phone}: {pin}")
+        admin_log.debug('PIN set for %s: %s', phone, pin)
         return jsonify({'message': 'PIN set successfully', 'phone': phone, 'pin': pin}), 200
     except Exception as e:
         db.session.rollback()
-        print(f"[ERROR] Failed to set PIN: {str(e)}")
+        admin_log.error('Failed to set PIN: %s', str(e))
         return jsonify({'error': str(e)}), 500
 
 # TEST ENDPOINT
-@app.route('/test-post', methods=['POST'])
+@bp.route('/test-post', methods=['POST'])
 def test_post():
     """Test POST endpoint"""
     return jsonify({'message': 'POST works!'}), 200
 
 # Admin endpoint to update script.js
-@app.route('/api/admin/update-script', methods=['POST'])
+@bp.route('/api/admin/update-script', methods=['POST'])
 def update_script():
     """Update script.js on server"""
     try:
@@ -2870,17 +3341,118 @@ def update_script():
         with open(script_path, 'w', encoding='utf-8') as f:
             f.write(script_content)
         
-        print(f"[ADMIN] script.js updated successfully ({len(script_content)} bytes)", flush=True)
+        admin_log.info('script.js updated successfully (%s bytes)', len(script_content))
         return jsonify({'success': True, 'message': 'script.js updated'}), 200
     except Exception as e:
-        print(f"[ERROR] Failed to update script.js: {str(e)}", flush=True)
-        import traceback
-        traceback.print_exc()
+        admin_log.exception('Failed to update script.js: %s', str(e))
         return jsonify({'error': str(e)}), 500
 
-# Print registered routes for debugging
-print(f"[INIT] Flask app fully initialized", flush=True)
-print_routes()
+startup_profile.checkpoint('routes')
+
+@click.command('startup-profile')
+@click.option('--budget', type=float, default=None, help='Fail if the cold import exceeds this many seconds')
+@click.option('--json', 'as_json', is_flag=True, help='Print the report as JSON')
+def startup_profile_command(budget, as_json):
+    """Report per-phase import/initialization time of a cold start"""
+    if budget is None and os.getenv('STARTUP_BUDGET_SECONDS'):
+        budget = float(os.getenv('STARTUP_BUDGET_SECONDS'))
+    sys.exit(startup_profile.run(budget=budget, as_json=as_json))
+
+# ==================== Application Factory ====================
+
+# Every app built by create_app(); used to re-initialize per-process state after fork
+_apps = weakref.WeakSet()
+
+def create_app(config=None):
+    """Build a Flask app from a config object (defaults to Config.from_env())"""
+    if config is None:
+        config = Config.from_env()
+    configure_logging()
+    startup_profile.checkpoint('config')
+
+    # Initialize Flask - DON'T use static_folder for now, serve manually
+    # Using explicit path serving instead of Flask's static system
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    # CORS configuration for GitHub Pages and local development
+    CORS(app, resources={
+        r"/api/*": {
+            "origins": ["*"],
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["ETag", "X-Next-Cursor", "Link"],
+            "supports_credentials": False,
+            "max_age": 3600
+        }
+    })
+    startup_profile.checkpoint('flask_app')
+
+    # NOTE: Engines/pools are created lazily on first use, so a preloaded
+    # master never opens connections that forked workers would inherit
+    db.init_app(app)
+    startup_profile.checkpoint('database')
+
+    app.register_blueprint(bp)
+    app.cli.add_command(startup_profile_command)
+    outbox.init_outbox(app, {'email': deliver_email, 'sms_verification': deliver_sms_verification})
+    _apps.add(app)
+    startup_profile.checkpoint('blueprints')
+
+    # Print registered routes for debugging
+    if app.config['STARTUP_DEBUG']:
+        print(f"[INIT] Flask app fully initialized", flush=True)
+        print_routes(app)
+
+    return app
+
+def reinit_after_fork():
+    """Drop per-process resources inherited from a preloading master
+
+    Runs automatically in every child created by os.fork() (gunicorn workers
+    with preload_app) and is safe to call again from a post_fork hook. Pooled
+    DB connections are discarded without closing the parent's sockets,
+    integration clients and auth caches are rebuilt lazily by the worker on
+    first use, and the log writer thread (which doesn't survive fork) is
+    restarted.
+    """
+    restart_logging_after_fork()
+    for flask_app in list(_apps):
+        flask_app.extensions.pop('twilio_client', None)
+        # The gateway's call threads (and its client) stay with the parent
+        flask_app.extensions.pop('twilio_gateway', None)
+        flask_app.extensions.pop('principal_cache', None)
+        # The hashing pool's threads don't exist in the child
+        flask_app.extensions.pop('password_hasher', None)
+        # ...and neither do the outbox dispatcher's
+        flask_app.extensions.pop('outbox_dispatcher', None)
+        flask_app.extensions.pop('otp_sweeper', None)
+        # SMTP sockets belong to the parent; the child logs in on its own
+        flask_app.extensions.pop('smtp_pool', None)
+        flask_app.extensions.pop('group_code_allocator', None)
+        flask_app.extensions.pop('join_batcher', None)
+        flask_app.extensions.pop('group_lookup', None)
+        flask_app.extensions.pop('menu_cache', None)
+        # Streams and the event poller belong to the parent
+        group_events = flask_app.extensions.pop('group_events', None)
+        if group_events is not None:
+            group_events.after_fork()
+        catalog = flask_app.extensions.get('restaurant_catalog')
+        if catalog is not None:
+            catalog.after_fork()
+        google_certs = flask_app.extensions.get('google_certs')
+        if google_certs is not None:
+            google_certs.after_fork()
+        throttle = flask_app.extensions.get('login_throttle')
+        if throttle is not None:
+            throttle.store.after_fork()
+        db.get_engine(flask_app).dispose(close=False)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reinit_after_fork)
+
+# Module-level app for `from app import app, db, User` scripts and wsgi.py
+app = create_app()
 
 # ==================== Main ====================
 
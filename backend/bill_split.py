@@ -0,0 +1,151 @@
+"""
+Bill split engine
+
+The splitting rules used to live only in bill_splitter.show_orders_and_split,
+between the CLI's print() and input() calls, and nothing on the server
+used them: MemberBill was never written. They are pure functions over plain
+data now, used by POST /api/orders (persisted as MemberBill rows) and by
+the CLI:
+
+    personal   paid by the member who ordered the item
+    shared     divided among the members: equally among all of them, or,
+               when the item has weights ({member: weight}), among just
+               those members in proportion to their weights (a dish for 3
+               of the 8 at the table, a bottle where one drank two glasses)
+    excluded   listed, never charged (paid separately)
+
+An order's extras (tip, tax, delivery) are divided by consumption ratio:
+each member's personal + shared amount over the order's charged total. An
+order without items charges its total to its owner.
+
+Amounts are integer minor units (kuruş; to_minor / to_major convert at the
+edges). Every division goes through allocate(): largest-remainder rounding,
+so the parts of an amount always add up to it and the members' totals add
+up to the bill to the kuruş; float division used to leave it a few kuruş
+off.
+
+Shared items form a sparse item x member allocation matrix. Items with the
+same weights (everyone equally, the same table of four) are one column of
+it: their amounts are summed and allocated once. An order costs
+O(items + nonzero weights), never items x members. No I/O, no ORM objects,
+no globals.
+"""
+
+from collections import namedtuple
+from decimal import ROUND_HALF_UP, Decimal
+
+PERSONAL = 'personal'
+SHARED = 'shared'
+EXCLUDED = 'excluded'
+SPLIT_TYPES = (PERSONAL, SHARED, EXCLUDED)
+EXTRAS = ('tip', 'tax', 'delivery')
+
+# owner None = the order's owner; weights ({member: positive int}) only apply to shared items,
+# None = all members equally; amount None = price * quantity (callers with fractional
+# quantities pass the line amount, rounded to minor units)
+SplitItem = namedtuple('SplitItem', 'name price quantity split_type owner weights amount',
+                       defaults=(1, PERSONAL, None, None, None))
+SplitOrder = namedtuple('SplitOrder', 'id owner items tip tax delivery total', defaults=((), 0, 0, 0, 0))
+# items: (name, quantity, amount) of the member's personal items; amounts in minor units
+Share = namedtuple('Share', 'member personal shared excluded tip tax delivery total ratio items')
+
+
+def to_minor(amount):
+    """12.345 (lira, float / Decimal / str) -> 1235 (kuruş), rounding half up"""
+    return int(Decimal(str(amount or 0)).scaleb(2).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+def to_major(minor):
+    """1235 -> 12.35"""
+    return minor / 100
+
+
+def allocate(amount, weights):
+    """Parts of amount (an int) in proportion to weights, summing to exactly amount
+
+    Largest-remainder rounding: each part is rounded down, and the kuruş
+    left over go one each to the largest remainders, ties to the earlier
+    weight. Zero weights (or all of them) get 0. Raises TypeError for a
+    non-int amount or weight: a float would make the parts floats.
+    """
+    if isinstance(amount, bool) or not isinstance(amount, int) \
+            or not all(isinstance(weight, int) for weight in weights):
+        raise TypeError(f'allocate() needs int amounts and weights, got {amount!r}, {weights!r}')
+    total = sum(weights)
+    if not total:
+        return [0] * len(weights)
+    products = [amount * weight for weight in weights]
+    parts = [product // total for product in products]
+    left = amount - sum(parts)
+    if left:
+        remainders = [product % total for product in products]
+        for i in sorted(range(len(weights)), key=remainders.__getitem__, reverse=True)[:left]:
+            parts[i] += 1
+    return parts
+
+
+def split_order(order, members):
+    """{member: Share} for one order; prices and extras in minor units
+
+    members are the people its shared items are divided among by default
+    (the group). Owners of personal or excluded items and weighted sharers
+    who aren't in members still get a Share; members who consumed nothing
+    get a zero one.
+    """
+    members = list(dict.fromkeys(members))
+    personal, excluded, personal_items = {}, {}, {}
+    everyone = dict.fromkeys(members or [order.owner], 1)
+    columns = {}  # (member, weight) pairs or None (everyone) -> [weights, amount of the items with them]
+
+    if not order.items and order.total:
+        personal[order.owner] = order.total
+    for item in order.items:
+        amount = item.price * item.quantity if item.amount is None else item.amount
+        owner = order.owner if item.owner is None else item.owner
+        if item.split_type == SHARED:
+            key = tuple(item.weights.items()) if item.weights else None
+            column = columns.setdefault(key, [item.weights or everyone, 0])
+            column[1] += amount
+        elif item.split_type == EXCLUDED:
+            excluded[owner] = excluded.get(owner, 0) + amount
+        else:
+            personal[owner] = personal.get(owner, 0) + amount
+            personal_items.setdefault(owner, []).append((item.name, item.quantity, amount))
+
+    shared = {}
+    for weights, amount in columns.values():
+        for member, part in zip(weights, allocate(amount, list(weights.values()))):
+            shared[member] = shared.get(member, 0) + part
+
+    payers = list(dict.fromkeys([*everyone, *shared, *personal, *excluded]))
+    consumption = [personal.get(member, 0) + shared.get(member, 0) for member in payers]
+    charged = sum(consumption)
+    if not charged:  # nothing charged: the owner pays the extras
+        if order.owner not in payers:
+            payers.append(order.owner)
+        consumption = [1 if member == order.owner else 0 for member in payers]
+    extras = [allocate(getattr(order, name) or 0, consumption) for name in EXTRAS]
+
+    shares = {}
+    for i, member in enumerate(payers):
+        member_extras = [parts[i] for parts in extras]
+        own = personal.get(member, 0) + shared.get(member, 0)
+        shares[member] = Share(
+            member, personal.get(member, 0), shared.get(member, 0), excluded.get(member, 0),
+            *member_extras, own + sum(member_extras), consumption[i] / (charged or 1),
+            personal_items.get(member, []))
+    return shares
+
+
+def split_orders(orders, members):
+    """{order id: {member: Share}} for a group's orders"""
+    return {order.id: split_order(order, members) for order in orders}
+
+
+def member_totals(splits):
+    """{member: amount owed} over the result of split_orders"""
+    totals = {}
+    for shares in splits.values():
+        for member, share in shares.items():
+            totals[member] = totals.get(member, 0) + share.total
+    return totals
@@ -0,0 +1,129 @@
+"""
+Restaurant catalog (restaurants.json), loaded once per process
+
+create_group used to open and parse restaurants.json for every group with a
+restaurant, and the bill_splitter CLI re-read it for every action.
+RestaurantCatalog parses the file once and keeps it indexed:
+
+    catalog.get('rest_001')          the restaurant (name, phone, categories)
+    catalog.find_by_name('...')      case-insensitive name lookup (QR scans)
+    catalog.in_category('Kebaplar')  ids of restaurants serving a category
+    catalog.etag('rest_001')         content hash of one restaurant's data
+
+The file's mtime is checked at most every RESTAURANT_CATALOG_CHECK_SECONDS;
+when it changed, the file is parsed again and the new indexes replace the
+old ones in one assignment, so readers never take a lock and never see a
+half-built index. A file that fails to parse (e.g. caught mid-write) keeps
+the previous catalog in service.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from extensions import app_singleton
+from logging_config import get_logger
+
+log = get_logger('catalog')
+
+
+def content_hash(data):
+    """Stable hash of JSON-compatible data (key order doesn't matter)"""
+    encoded = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class _Index:
+    """One parsed version of the file; never modified after it is built"""
+
+    def __init__(self, restaurants, mtime):
+        self.mtime = mtime
+        self.by_id = restaurants
+        self.by_name = {}
+        self.by_category = {}
+        self.etags = {}
+        for rest_id, restaurant in restaurants.items():
+            self.by_name.setdefault(str(restaurant.get('name', '')).casefold(), rest_id)
+            for category in restaurant.get('categories') or {}:
+                self.by_category.setdefault(category, []).append(rest_id)
+            self.etags[rest_id] = content_hash(restaurant)[:32]
+
+
+class RestaurantCatalog:
+    """restaurants.json indexed by id, name and category, reloaded when the file changes"""
+
+    def __init__(self, path, check_interval=2.0):
+        self.path = str(path)
+        self.check_interval = check_interval
+        self.loads = 0
+        self._index = _Index({}, None)
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._refresh(now)
+        return self._index
+
+    def _refresh(self, now):
+        # Until something was loaded, wait for the thread that is loading it
+        if not self._lock.acquire(blocking=self.loads == 0):
+            return  # another thread is already checking; serve the current index
+        try:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime == self._index.mtime:
+                return
+            if mtime is None:
+                log.warning('Restaurant catalog %s not found', self.path)
+                self._index = _Index({}, None)
+                return
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    restaurants = json.load(f)
+            except (OSError, ValueError) as e:
+                log.error('Could not load %s, keeping the previous catalog: %s', self.path, e)
+                return
+            self._index = _Index(restaurants, mtime)
+            self.loads += 1
+            log.info('Restaurant catalog loaded: %s restaurants', len(restaurants))
+        finally:
+            self._lock.release()
+
+    def after_fork(self):
+        """The child keeps the parsed catalog but not the parent's lock"""
+        self._lock = threading.Lock()
+
+    def all(self):
+        """{restaurant_id: restaurant}; shared, don't modify"""
+        return self._current().by_id
+
+    def get(self, rest_id):
+        return self._current().by_id.get(rest_id)
+
+    def find_by_name(self, name):
+        """(restaurant_id, restaurant) for a case-insensitive name, or (None, None)"""
+        index = self._current()
+        rest_id = index.by_name.get(name.strip().casefold())
+        return (rest_id, index.by_id[rest_id]) if rest_id else (None, None)
+
+    def in_category(self, category):
+        return list(self._current().by_category.get(category, ()))
+
+    def categories(self):
+        return sorted(self._current().by_category)
+
+    def etag(self, rest_id):
+        return self._current().etags.get(rest_id)
+
+
+def get_catalog(app=None):
+    """This app's RestaurantCatalog (RESTAURANTS_FILE), created on first use"""
+    return app_singleton(app, 'restaurant_catalog', lambda app: RestaurantCatalog(
+        app.config['RESTAURANTS_FILE'], app.config['RESTAURANT_CATALOG_CHECK_SECONDS']))
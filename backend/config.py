@@ -0,0 +1,342 @@
+"""
+Configuration objects for the Flask application factory
+
+create_app() takes one of these instead of reading os.environ at import
+time. Config.from_env() holds the environment parsing and database URL
+selection that used to run at module level in app.py.
+"""
+
+import importlib.util
+import os
+from pathlib import Path
+
+# Get parent directory (main project root)
+# On Render, working directory is /app, so this will resolve to /app
+BASE_DIR = Path(__file__).parent.parent
+
+# Fallback: if BASE_DIR/index.html doesn't exist, check common Render paths
+if not (BASE_DIR / 'index.html').exists():
+    # Try /app (Render default)
+    alt_dir = Path('/app')
+    if (alt_dir / 'index.html').exists():
+        BASE_DIR = alt_dir
+
+_HAS_PSYCOPG2 = None
+
+def has_psycopg2():
+    """Check (once) whether psycopg2 is installed, without importing it"""
+    global _HAS_PSYCOPG2
+    if _HAS_PSYCOPG2 is None:
+        _HAS_PSYCOPG2 = importlib.util.find_spec('psycopg2') is not None
+        if not _HAS_PSYCOPG2:
+            print("[IMPORT] ⚠️  psycopg2 NOT available - PostgreSQL disabled", flush=True)
+    return _HAS_PSYCOPG2
+
+def _env_flag(name, default='0'):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+class Config:
+    """Base configuration - defaults for every environment"""
+
+    BASE_DIR = BASE_DIR
+    SQLALCHEMY_DATABASE_URI = None
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    DB_TYPE = None
+    SECRET_KEY = 'dev-secret'
+    JWT_SECRET = 'jwt-secret'
+    JWT_EXPIRATION = 86400 * 7  # 7 days
+    # token_required caches (see principal.py)
+    TOKEN_CACHE_SIZE = 4096
+    PRINCIPAL_CACHE_SIZE = 4096
+    PRINCIPAL_CACHE_TTL = 30  # seconds a closed/deleted account may stay cached in other workers
+    # Password/PIN hashing (see passwords.py); outdated hashes are upgraded on login
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:260000'
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_MAX_PENDING = 32
+    # Login throttling (see throttle.py): "memory" (per worker) or "sql" (shared)
+    THROTTLE_STORE = 'memory'
+    THROTTLE_STORE_URL = None  # defaults to SQLALCHEMY_DATABASE_URI for "sql"
+    LOGIN_THROTTLE_PHONE = '5/900'  # attempts/seconds per phone number
+    LOGIN_THROTTLE_IP = '30/600'    # failed attempts/seconds per client IP
+    LOGIN_THROTTLE_EMAIL = '5/900'  # attempts/seconds per email (password login)
+    TRUSTED_PROXY_COUNT = 0         # X-Forwarded-For hops added by our own proxies
+    # SMS/email outbox (see outbox.py, worker.py)
+    OUTBOX_PROVIDER = 'live'     # "live" (Twilio/SMTP) or "fake" (offline, records only)
+    OUTBOX_DISPATCH = 'inline'   # "inline" (thread in each web process; development) or "worker" (worker.py)
+    OUTBOX_CONCURRENCY = 4       # deliveries in flight per dispatcher
+    OUTBOX_MAX_ATTEMPTS = 5
+    OUTBOX_BACKOFF_BASE = 2.0    # seconds before the first retry, doubled per attempt
+    OUTBOX_BACKOFF_MAX = 300
+    OUTBOX_POLL_SECONDS = 1.0
+    OUTBOX_LEASE_SECONDS = 60    # a claimed message is retried if its dispatcher dies
+    # Repeat code requests for a phone within this many seconds reuse the outstanding code
+    OTP_RESEND_SECONDS = 60
+    # Expired OTP cleanup (see otp_sweeper.py); runs with the outbox dispatcher
+    OTP_SWEEP_INTERVAL = 300          # seconds between sweeps (0 = off)
+    OTP_SWEEP_CHUNK = 1000            # rows per DELETE transaction
+    OTP_SWEEP_GRACE_SECONDS = 3600    # keep codes this long past expires_at
+    OTP_SWEEP_PAUSE = 0.05            # seconds between chunks
+    # Reset-code emails (see smtp_pool.py); port 465 means implicit TLS
+    SMTP_SERVER = 'smtp.gmail.com'
+    SMTP_PORT = 587
+    SMTP_STARTTLS = True
+    SENDER_EMAIL = None
+    SENDER_PASSWORD = None
+    SMTP_TIMEOUT = 10
+    SMTP_POOL_SIZE = 2                    # logged-in sessions kept per process
+    SMTP_MAX_MESSAGES_PER_SESSION = 100   # then log in again
+    SMTP_IDLE_SECONDS = 60                # providers drop idle sessions; don't reuse older ones
+    # Restaurant catalog (see catalog.py), reloaded when the file's mtime changes
+    RESTAURANTS_FILE = BASE_DIR / 'restaurants.json'
+    RESTAURANT_CATALOG_CHECK_SECONDS = 2.0
+    # Group codes (see group_codes.py): random inserts first, then block probes
+    GROUP_CODE_RANDOM_TRIES = 2
+    GROUP_CODE_MAX_PROBES = 8
+    # Join-code lookups (see group_lookup.py): code -> group id LRU, and how
+    # long a code no group holds is answered 404 without a query
+    GROUP_LOOKUP_CACHE_SIZE = 10000
+    GROUP_LOOKUP_NEGATIVE_TTL = 5.0
+    # Joins to the same group arriving within the window share one transaction
+    # (see join_batcher.py); 0 = no batching
+    GROUP_JOIN_BATCH_MS = 20
+    GROUP_JOIN_MAX_BATCH = 50
+    # GET /api/user/groups pages (keyset on groups.id) and member preview size
+    USER_GROUPS_PAGE_SIZE = 50
+    USER_GROUPS_MAX_PAGE_SIZE = 100
+    USER_GROUPS_MEMBER_PREVIEW = 5
+    # Live group streams (see group_events.py): memory (one process) or sql (shared table)
+    GROUP_EVENTS_BACKEND = 'memory'
+    GROUP_EVENTS_URL = None  # defaults to SQLALCHEMY_DATABASE_URI for "sql"
+    GROUP_EVENTS_HEARTBEAT_SECONDS = 15
+    GROUP_EVENTS_MAX_STREAM_SECONDS = 300  # then EventSource reconnects with Last-Event-ID
+    GROUP_EVENTS_MAX_STREAMS = 0           # per process; 0 = 5000 under gevent, else see below
+    # A stream holds a gthread/sync thread: the cap is GUNICORN_THREADS minus these
+    GROUP_EVENTS_RESERVED_THREADS = 4
+    GUNICORN_THREADS = 8                   # gunicorn.conf.py reads the same variable
+    GROUP_EVENTS_POLL_SECONDS = 1.0
+    GROUP_EVENTS_RETENTION_SECONDS = 600
+    FLASK_ENV = 'production'
+    IS_RENDER = False
+    # Verbose startup dumps (environment, files, routes) - off by default
+    STARTUP_DEBUG = False
+
+    TWILIO_ACCOUNT_SID = None
+    TWILIO_AUTH_TOKEN = None
+    TWILIO_SERVICE_SID = None
+    # Twilio Verify guards (see verify_gateway.py), per process
+    TWILIO_TIMEOUT = 5.0                # seconds per call
+    TWILIO_MAX_CONCURRENT = 4           # calls in flight; more are rejected with 503
+    TWILIO_BREAKER_THRESHOLD = 0.5      # failed fraction of recent calls that opens the circuit
+    TWILIO_BREAKER_MIN_CALLS = 10       # ...once there were at least this many
+    TWILIO_BREAKER_WINDOW = 30          # seconds of history considered
+    TWILIO_BREAKER_COOLDOWN = 30        # seconds open before one probe call is let through
+    GOOGLE_CLIENT_ID = '625132087724-43j0qmqgh8kds471d73oposqthr8tt1h.apps.googleusercontent.com'
+    # Google sign-in certificates (see google_keys.py), cached per process
+    GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+    GOOGLE_CERTS_REFRESH_MARGIN = 300  # refetch in the background this long before max-age runs out
+    GOOGLE_CERTS = None                # {kid: PEM}: fixed keys instead of fetching (tests)
+    RENDER_DATABASE_URL = None
+
+    # Connection pooling for PostgreSQL
+    POSTGRES_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'pool_recycle': 3600,
+        'pool_pre_ping': True,
+        'max_overflow': 20,
+    }
+
+    def __init__(self, **overrides):
+        for key, value in overrides.items():
+            setattr(self, key, value)
+        if self.SQLALCHEMY_DATABASE_URI and 'postgresql' in self.SQLALCHEMY_DATABASE_URI \
+                and not self.SQLALCHEMY_ENGINE_OPTIONS:
+            self.SQLALCHEMY_ENGINE_OPTIONS = dict(self.POSTGRES_ENGINE_OPTIONS)
+
+    @classmethod
+    def from_env(cls):
+        """Build a config from environment variables (and .env outside Render)"""
+        # Load env - BUT ONLY IF NOT ON RENDER
+        # On Render, environment variables are provided by render.yaml
+        is_render = bool(os.getenv('RENDER'))
+        if not is_render:
+            from dotenv import load_dotenv
+            load_dotenv()
+
+        startup_debug = _env_flag('STARTUP_DEBUG')
+        if startup_debug:
+            _print_environment(is_render)
+
+        database_url, db_type = select_database_url(is_render)
+        print(f"[DB] Database: {db_type}", flush=True)
+
+        return cls(
+            SQLALCHEMY_DATABASE_URI=database_url,
+            DB_TYPE=db_type,
+            SECRET_KEY=os.getenv('SECRET_KEY', cls.SECRET_KEY),
+            JWT_SECRET=os.getenv('JWT_SECRET', cls.JWT_SECRET),
+            PRINCIPAL_CACHE_TTL=int(os.getenv('PRINCIPAL_CACHE_TTL', cls.PRINCIPAL_CACHE_TTL)),
+            PASSWORD_HASH_METHOD=os.getenv('PASSWORD_HASH_METHOD', cls.PASSWORD_HASH_METHOD),
+            PASSWORD_HASH_WORKERS=int(os.getenv('PASSWORD_HASH_WORKERS', cls.PASSWORD_HASH_WORKERS)),
+            PASSWORD_HASH_MAX_PENDING=int(os.getenv('PASSWORD_HASH_MAX_PENDING', cls.PASSWORD_HASH_MAX_PENDING)),
+            THROTTLE_STORE=os.getenv('THROTTLE_STORE', cls.THROTTLE_STORE),
+            THROTTLE_STORE_URL=os.getenv('THROTTLE_STORE_URL'),
+            LOGIN_THROTTLE_PHONE=os.getenv('LOGIN_THROTTLE_PHONE', cls.LOGIN_THROTTLE_PHONE),
+            LOGIN_THROTTLE_IP=os.getenv('LOGIN_THROTTLE_IP', cls.LOGIN_THROTTLE_IP),
+            LOGIN_THROTTLE_EMAIL=os.getenv('LOGIN_THROTTLE_EMAIL', cls.LOGIN_THROTTLE_EMAIL),
+            # Render's load balancer appends the client address to X-Forwarded-For
+            TRUSTED_PROXY_COUNT=int(os.getenv('TRUSTED_PROXY_COUNT', '1' if is_render else '0')),
+            OUTBOX_PROVIDER=os.getenv('OUTBOX_PROVIDER', cls.OUTBOX_PROVIDER),
+            OUTBOX_DISPATCH=os.getenv('OUTBOX_DISPATCH', cls.OUTBOX_DISPATCH),
+            OUTBOX_CONCURRENCY=int(os.getenv('OUTBOX_CONCURRENCY', cls.OUTBOX_CONCURRENCY)),
+            OUTBOX_MAX_ATTEMPTS=int(os.getenv('OUTBOX_MAX_ATTEMPTS', cls.OUTBOX_MAX_ATTEMPTS)),
+            OUTBOX_BACKOFF_BASE=float(os.getenv('OUTBOX_BACKOFF_BASE', cls.OUTBOX_BACKOFF_BASE)),
+            OUTBOX_BACKOFF_MAX=float(os.getenv('OUTBOX_BACKOFF_MAX', cls.OUTBOX_BACKOFF_MAX)),
+            OUTBOX_POLL_SECONDS=float(os.getenv('OUTBOX_POLL_SECONDS', cls.OUTBOX_POLL_SECONDS)),
+            OUTBOX_LEASE_SECONDS=int(os.getenv('OUTBOX_LEASE_SECONDS', cls.OUTBOX_LEASE_SECONDS)),
+            OTP_RESEND_SECONDS=int(os.getenv('OTP_RESEND_SECONDS', cls.OTP_RESEND_SECONDS)),
+            OTP_SWEEP_INTERVAL=float(os.getenv('OTP_SWEEP_INTERVAL', cls.OTP_SWEEP_INTERVAL)),
+            OTP_SWEEP_CHUNK=int(os.getenv('OTP_SWEEP_CHUNK', cls.OTP_SWEEP_CHUNK)),
+            OTP_SWEEP_GRACE_SECONDS=int(os.getenv('OTP_SWEEP_GRACE_SECONDS', cls.OTP_SWEEP_GRACE_SECONDS)),
+            SMTP_SERVER=os.getenv('SMTP_SERVER', cls.SMTP_SERVER),
+            SMTP_PORT=int(os.getenv('SMTP_PORT', cls.SMTP_PORT)),
+            SMTP_STARTTLS=_env_flag('SMTP_STARTTLS', '1'),
+            SENDER_EMAIL=os.getenv('SENDER_EMAIL'),
+            SENDER_PASSWORD=os.getenv('SENDER_PASSWORD'),
+            SMTP_TIMEOUT=float(os.getenv('SMTP_TIMEOUT', cls.SMTP_TIMEOUT)),
+            SMTP_POOL_SIZE=int(os.getenv('SMTP_POOL_SIZE', cls.SMTP_POOL_SIZE)),
+            SMTP_MAX_MESSAGES_PER_SESSION=int(os.getenv('SMTP_MAX_MESSAGES_PER_SESSION',
+                                                        cls.SMTP_MAX_MESSAGES_PER_SESSION)),
+            SMTP_IDLE_SECONDS=float(os.getenv('SMTP_IDLE_SECONDS', cls.SMTP_IDLE_SECONDS)),
+            RESTAURANTS_FILE=os.getenv('RESTAURANTS_FILE', cls.RESTAURANTS_FILE),
+            RESTAURANT_CATALOG_CHECK_SECONDS=float(os.getenv('RESTAURANT_CATALOG_CHECK_SECONDS',
+                                                             cls.RESTAURANT_CATALOG_CHECK_SECONDS)),
+            GROUP_CODE_RANDOM_TRIES=int(os.getenv('GROUP_CODE_RANDOM_TRIES', cls.GROUP_CODE_RANDOM_TRIES)),
+            GROUP_CODE_MAX_PROBES=int(os.getenv('GROUP_CODE_MAX_PROBES', cls.GROUP_CODE_MAX_PROBES)),
+            GROUP_LOOKUP_CACHE_SIZE=int(os.getenv('GROUP_LOOKUP_CACHE_SIZE', cls.GROUP_LOOKUP_CACHE_SIZE)),
+            GROUP_LOOKUP_NEGATIVE_TTL=float(os.getenv('GROUP_LOOKUP_NEGATIVE_TTL', cls.GROUP_LOOKUP_NEGATIVE_TTL)),
+            GROUP_JOIN_BATCH_MS=float(os.getenv('GROUP_JOIN_BATCH_MS', cls.GROUP_JOIN_BATCH_MS)),
+            GROUP_JOIN_MAX_BATCH=int(os.getenv('GROUP_JOIN_MAX_BATCH', cls.GROUP_JOIN_MAX_BATCH)),
+            USER_GROUPS_PAGE_SIZE=int(os.getenv('USER_GROUPS_PAGE_SIZE', cls.USER_GROUPS_PAGE_SIZE)),
+            USER_GROUPS_MAX_PAGE_SIZE=int(os.getenv('USER_GROUPS_MAX_PAGE_SIZE', cls.USER_GROUPS_MAX_PAGE_SIZE)),
+            USER_GROUPS_MEMBER_PREVIEW=int(os.getenv('USER_GROUPS_MEMBER_PREVIEW', cls.USER_GROUPS_MEMBER_PREVIEW)),
+            GROUP_EVENTS_BACKEND=os.getenv('GROUP_EVENTS_BACKEND', cls.GROUP_EVENTS_BACKEND),
+            GROUP_EVENTS_URL=os.getenv('GROUP_EVENTS_URL'),
+            GROUP_EVENTS_HEARTBEAT_SECONDS=float(os.getenv('GROUP_EVENTS_HEARTBEAT_SECONDS',
+                                                           cls.GROUP_EVENTS_HEARTBEAT_SECONDS)),
+            GROUP_EVENTS_MAX_STREAM_SECONDS=float(os.getenv('GROUP_EVENTS_MAX_STREAM_SECONDS',
+                                                            cls.GROUP_EVENTS_MAX_STREAM_SECONDS)),
+            GROUP_EVENTS_MAX_STREAMS=int(os.getenv('GROUP_EVENTS_MAX_STREAMS', cls.GROUP_EVENTS_MAX_STREAMS)),
+            GROUP_EVENTS_RESERVED_THREADS=int(os.getenv('GROUP_EVENTS_RESERVED_THREADS',
+                                                        cls.GROUP_EVENTS_RESERVED_THREADS)),
+            GUNICORN_THREADS=int(os.getenv('GUNICORN_THREADS', cls.GUNICORN_THREADS)),
+            GROUP_EVENTS_POLL_SECONDS=float(os.getenv('GROUP_EVENTS_POLL_SECONDS', cls.GROUP_EVENTS_POLL_SECONDS)),
+            GROUP_EVENTS_RETENTION_SECONDS=float(os.getenv('GROUP_EVENTS_RETENTION_SECONDS',
+                                                           cls.GROUP_EVENTS_RETENTION_SECONDS)),
+            FLASK_ENV=os.getenv('FLASK_ENV', cls.FLASK_ENV),
+            IS_RENDER=is_render,
+            STARTUP_DEBUG=startup_debug,
+            TWILIO_ACCOUNT_SID=os.getenv('TWILIO_ACCOUNT_SID'),
+            TWILIO_AUTH_TOKEN=os.getenv('TWILIO_AUTH_TOKEN'),
+            TWILIO_SERVICE_SID=os.getenv('TWILIO_SERVICE_SID'),
+            TWILIO_TIMEOUT=float(os.getenv('TWILIO_TIMEOUT', cls.TWILIO_TIMEOUT)),
+            TWILIO_MAX_CONCURRENT=int(os.getenv('TWILIO_MAX_CONCURRENT', cls.TWILIO_MAX_CONCURRENT)),
+            TWILIO_BREAKER_THRESHOLD=float(os.getenv('TWILIO_BREAKER_THRESHOLD', cls.TWILIO_BREAKER_THRESHOLD)),
+            TWILIO_BREAKER_MIN_CALLS=int(os.getenv('TWILIO_BREAKER_MIN_CALLS', cls.TWILIO_BREAKER_MIN_CALLS)),
+            TWILIO_BREAKER_WINDOW=float(os.getenv('TWILIO_BREAKER_WINDOW', cls.TWILIO_BREAKER_WINDOW)),
+            TWILIO_BREAKER_COOLDOWN=float(os.getenv('TWILIO_BREAKER_COOLDOWN', cls.TWILIO_BREAKER_COOLDOWN)),
+            GOOGLE_CLIENT_ID=os.getenv('GOOGLE_CLIENT_ID', cls.GOOGLE_CLIENT_ID),
+            GOOGLE_CERTS_REFRESH_MARGIN=int(os.getenv('GOOGLE_CERTS_REFRESH_MARGIN', cls.GOOGLE_CERTS_REFRESH_MARGIN)),
+            RENDER_DATABASE_URL=os.getenv('RENDER_DATABASE_URL'),
+        )
+
+
+class TestingConfig(Config):
+    """In-memory SQLite, no external integrations"""
+
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    DB_TYPE = 'SQLite (memory)'
+    FLASK_ENV = 'testing'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # fast hashing for tests
+    OUTBOX_PROVIDER = 'fake'
+    OUTBOX_DISPATCH = 'worker'  # tests drain the outbox with run_once()
+
+
+def select_database_url(is_render):
+    """Pick the database URL: RENDER_DATABASE_URL > DATABASE_URL > local SQLite"""
+    database_url = None
+    db_type = None
+
+    # Priority 1: Check RENDER_DATABASE_URL (Render's PostgreSQL - HIGHEST PRIORITY)
+    if os.getenv('RENDER_DATABASE_URL'):
+        test_url = os.getenv('RENDER_DATABASE_URL')
+        if has_psycopg2():
+            database_url = test_url
+            if database_url.startswith('postgres://'):
+                database_url = database_url.replace('postgres://', 'postgresql://', 1)
+            db_type = 'PostgreSQL (Render RENDER_DATABASE_URL)'
+
+    # Priority 2: If no RENDER_DATABASE_URL, check if DATABASE_URL is PostgreSQL
+    elif os.getenv('DATABASE_URL'):
+        test_url = os.getenv('DATABASE_URL')
+
+        # If we're on Render and got PostgreSQL in DATABASE_URL, use it
+        if 'postgres' in test_url.lower() and is_render:
+            if has_psycopg2():
+                database_url = test_url
+                if database_url.startswith('postgres://'):
+                    database_url = database_url.replace('postgres://', 'postgresql://', 1)
+                db_type = 'PostgreSQL (Render DATABASE_URL)'
+            else:
+                print(f"[DB] ⚠️  PostgreSQL in DATABASE_URL but psycopg2 not available", flush=True)
+        # If it's SQLite, use it
+        elif 'sqlite' in test_url.lower():
+            database_url = test_url
+            db_type = 'SQLite (Local)'
+
+    # Priority 3: Fall back to local SQLite if we're NOT on Render
+    if not database_url and not is_render:
+        instance_path = os.path.join(BASE_DIR, 'backend', 'instance')
+        os.makedirs(instance_path, exist_ok=True)
+        db_path = os.path.join(instance_path, 'hesap_paylas.db')
+        database_url = f'sqlite:///{db_path}'
+        db_type = 'SQLite (Local)'
+
+    return database_url, db_type
+
+
+def _print_environment(is_render):
+    """STARTUP_DEBUG dump of the environment the app was started with"""
+    if not is_render:
+        print("[APP] .env loaded (local development)", flush=True)
+    else:
+        print("[APP] Skipping .env on Render - using only environment variables", flush=True)
+        # DEBUG: Show what Render gave us
+        print("[APP] ========== RENDER ENVIRONMENT DEBUG ==========", flush=True)
+        for key in sorted(os.environ.keys()):
+            if len(os.environ[key]) < 500:
+                if any(x in key.upper() for x in ['RENDER', 'DB', 'DATABASE', 'POSTGRES', 'HOST', 'USER', 'PASS', 'PORT']):
+                    print(f"[APP] {key}={os.environ[key]}", flush=True)
+        print("[APP] =============================================", flush=True)
+
+    print(f"[APP] BASE_DIR: {BASE_DIR}")
+    print(f"[APP] BASE_DIR exists: {BASE_DIR.exists()}")
+    print(f"[APP] index.html exists: {(BASE_DIR / 'index.html').exists()}")
+    print(f"[APP] Files in BASE_DIR: {sorted([f.name for f in BASE_DIR.glob('*') if f.is_file()])[:10]}", flush=True)
+
+    # DEBUG: Log all environment variables that might contain database info
+    print("\n[DB] ===== DATABASE ENVIRONMENT DEBUG =====", flush=True)
+    print(f"[DB] RENDER: {os.getenv('RENDER', 'NOT SET')}", flush=True)
+    print(f"[DB] RENDER_DATABASE_URL: {os.getenv('RENDER_DATABASE_URL', 'NOT SET')[:80] if os.getenv('RENDER_DATABASE_URL') else 'NOT SET'}", flush=True)
+    print(f"[DB] DATABASE_URL: {os.getenv('DATABASE_URL', 'NOT SET')[:80] if os.getenv('DATABASE_URL') else 'NOT SET'}", flush=True)
+    print(f"[DB] Checking all env vars with 'DB' or 'DATABASE' or 'POSTGRES':", flush=True)
+    for key in sorted(os.environ.keys()):
+        if any(x in key.upper() for x in ['DB', 'DATABASE', 'POSTGRES', 'SQL']):
+            value = os.getenv(key)
+            if value and len(value) > 100:
+                print(f"[DB]   {key}: {value[:100]}...", flush=True)
+            else:
+                print(f"[DB]   {key}: {value}", flush=True)
+    print("[DB] ==========================================\n", flush=True)
@@ -0,0 +1,38 @@
+"""
+Flask extension instances, created unbound
+
+They are attached to an application in create_app() (see app.py), so that
+models and helper modules can import them without importing the app itself.
+
+Per-process objects the helper modules build from an app's config (caches,
+pools, clients) live in app.extensions, created by app_singleton() on first
+use; reinit_after_fork() drops them so each forked worker builds its own.
+"""
+
+import threading
+
+from flask import current_app
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+
+_singletons_lock = threading.RLock()  # reentrant: a factory may build another singleton
+
+
+def app_singleton(app, name, factory):
+    """app.extensions[name], built once by factory(app) (app None = current_app)
+
+    Threads racing on the first use get the same object. A factory that
+    returns None (not configured) stores nothing, so the next call tries
+    again.
+    """
+    app = app or current_app._get_current_object()
+    value = app.extensions.get(name)
+    if value is None:
+        with _singletons_lock:
+            value = app.extensions.get(name)
+            if value is None:
+                value = factory(app)
+                if value is not None:
+                    app.extensions[name] = value
+    return value
@@ -0,0 +1,167 @@
+"""
+Google ID-token verification with a per-process certificate cache
+
+id_token.verify_oauth2_token() downloads Google's signing certificates on
+every call. GoogleCertCache keeps them for as long as Google's
+Cache-Control max-age allows (certificates rotate roughly daily):
+
+    fresh                   served from memory - verification is local CPU only
+    < refresh margin left   served from memory, one background thread refetches
+    expired / never fetched fetched once under a lock; concurrent callers wait
+    fetch failed            the stale certificates keep being served (Google
+                            publishes new keys well before using them)
+    unknown key id          one early refetch, at most every retry_after seconds
+
+GOOGLE_CERTS (a {kid: PEM} dict) replaces the download entirely, so tests can
+sign tokens with a local key and run the whole sign-in flow offline.
+"""
+
+import base64
+import json
+import re
+import threading
+import time
+
+from extensions import app_singleton
+from logging_config import get_logger
+
+log = get_logger('auth')
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+def http_fetch(url, timeout=5):
+    """GET Google's certificate document; returns ({kid: PEM}, max_age seconds or None)"""
+    import requests
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    match = _MAX_AGE.search(response.headers.get('Cache-Control', ''))
+    max_age = None
+    if match:
+        max_age = int(match.group(1)) - int(response.headers.get('Age', 0) or 0)
+    return response.json(), max_age
+
+
+class GoogleCertCache:
+    """{kid: PEM} certificates, refreshed according to Cache-Control max-age"""
+
+    def __init__(self, url, fetch=None, refresh_margin=300, default_ttl=3600, retry_after=30,
+                 static_certs=None):
+        self.url = url
+        self.fetch = fetch or http_fetch
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl  # when Google sends no max-age
+        self.retry_after = retry_after  # after a failed refresh, wait this long before the next one
+        self.static = static_certs is not None
+        self._certs = dict(static_certs or {})
+        self._expires_at = float('inf') if self.static else 0.0
+        self._refresh_due = self._expires_at
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_fetch = 0.0
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def certs(self):
+        """Current certificates; only blocks when there is nothing usable yet"""
+        now = time.monotonic()
+        if now < self._expires_at:
+            if now >= self._refresh_due:
+                self._refresh_in_background()
+            return self._certs
+        with self._lock:
+            if time.monotonic() >= self._expires_at:
+                try:
+                    self._refresh()
+                except Exception:
+                    if not self._certs:
+                        raise
+                    # Google is down or slow: keep verifying with the last known keys
+                    self._expires_at = time.monotonic() + self.retry_after
+            return self._certs
+
+    def _refresh(self):
+        """Fetch now (caller holds the lock or is the single background refresher)"""
+        try:
+            self._last_fetch = time.monotonic()
+            certs, max_age = self.fetch(self.url)
+        except Exception as e:
+            self.fetch_errors += 1
+            self._refresh_due = time.monotonic() + self.retry_after
+            log.warning('Fetching Google certificates failed: %s', e)
+            raise
+        ttl = max_age if max_age is not None else self.default_ttl
+        now = self._last_fetch = time.monotonic()
+        self._certs = certs
+        self._expires_at = now + ttl
+        self._refresh_due = now + max(ttl - self.refresh_margin, ttl / 2)
+        self.fetches += 1
+        log.debug('Google certificates refreshed (%s keys, max-age %ss)', len(certs), ttl)
+
+    def certs_with(self, kid):
+        """Like certs(), but refetch early if `kid` is unknown (a key Google just rotated in)"""
+        certs = self.certs()
+        if self.static or kid is None or kid in certs:
+            return certs
+        with self._lock:
+            if kid not in self._certs and time.monotonic() - self._last_fetch >= self.retry_after:
+                try:
+                    self._refresh()
+                except Exception:
+                    pass
+            return self._certs
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                with self._lock:
+                    self._refresh()
+            except Exception:
+                pass  # logged in _refresh; stale certificates stay in use
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='google-certs', daemon=True).start()
+
+    def after_fork(self):
+        """The child keeps the certificates but not the parent's lock/refresher state"""
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+
+def get_google_certs(app=None):
+    """This process's GoogleCertCache (GOOGLE_CERTS in config = fixed local keys)"""
+    return app_singleton(app, 'google_certs', lambda app: GoogleCertCache(
+        app.config['GOOGLE_CERTS_URL'],
+        refresh_margin=app.config['GOOGLE_CERTS_REFRESH_MARGIN'],
+        static_certs=app.config['GOOGLE_CERTS'],
+    ))
+
+
+def _key_id(token):
+    """The 'kid' from a JWT header (None if absent or unreadable)"""
+    try:
+        header = token.split('.', 1)[0] if isinstance(token, str) else token.decode().split('.', 1)[0]
+        return json.loads(base64.urlsafe_b64decode(header + '=' * (-len(header) % 4))).get('kid')
+    except (ValueError, AttributeError):
+        return None
+
+
+def verify_google_id_token(token, audience, cache=None):
+    """Verify signature, exp/iat, audience and issuer locally; returns the claims
+
+    Raises ValueError for any invalid token (like id_token.verify_oauth2_token).
+    """
+    from google.auth import jwt as google_jwt
+
+    cache = cache or get_google_certs()
+    claims = google_jwt.decode(token, certs=cache.certs_with(_key_id(token)), audience=audience)
+    if claims.get('iss') not in GOOGLE_ISSUERS:
+        raise ValueError(f"Wrong issuer. 'iss' should be one of {GOOGLE_ISSUERS} but is {claims.get('iss')!r}")
+    return claims
@@ -0,0 +1,140 @@
+"""
+Group code allocation (6-digit join codes, 000000-999999)
+
+create_group used to draw random codes and look each one up until it found
+a free one - up to 100 round trips once the code space filled up, and two
+workers could still pick the same code between lookup and insert.
+GroupCodeAllocator lets the unique index on groups.code decide instead:
+
+    1. Insert the group with a random code inside a SAVEPOINT; a unique
+       violation rolls back only the savepoint and the next code is tried.
+       At occupancy p that is 1 / (1 - p) inserts on average.
+    2. After GROUP_CODE_RANDOM_TRIES misses, read one block of the code
+       space with an index range scan and try the codes it doesn't hold,
+       so even a nearly full space costs a few statements, not dozens.
+
+Closed groups keep their code until it is needed: when the code a new
+group collides with belongs to a closed group, that group's code is
+replaced by a tombstone ('-<group id>', outside the 6-digit space) and the
+new group takes it. Only active groups therefore count towards occupancy.
+"""
+
+import random
+import threading
+
+from sqlalchemy import String, and_, cast, literal, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import app_singleton
+from logging_config import get_logger
+
+log = get_logger('groups')
+
+CODE_SPACE = 1_000_000
+CODE_DIGITS = 6
+PROBE_BLOCK = 100  # codes read per range probe; divides CODE_SPACE
+
+
+class CodeSpaceExhausted(Exception):
+    """No free group code was found (the service answers 503)"""
+
+
+def random_code(rng=random):
+    return f"{rng.randrange(CODE_SPACE):0{CODE_DIGITS}d}"
+
+
+def _is_code_conflict(error):
+    message = str(error.orig).lower()
+    return ('unique' in message or 'duplicate' in message) and 'code' in message
+
+
+class GroupCodeAllocator:
+    """Gives new groups a free code in O(1) expected statements"""
+
+    def __init__(self, random_tries=2, max_probes=8, rng=None):
+        self.random_tries = random_tries
+        self.max_probes = max_probes
+        self.rng = rng or random.SystemRandom()
+        self._lock = threading.Lock()
+        self._counters = {'allocated': 0, 'inserts': 0, 'collisions': 0,
+                          'reclaimed': 0, 'probes': 0, 'exhausted': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        """Counters; inserts / allocated is the average number of tries per group"""
+        with self._lock:
+            return dict(self._counters)
+
+    def insert(self, session, group):
+        """Add group to the session with a free code and flush it; returns the code
+
+        Everything already pending in the session is flushed first
+        (begin_nested does that), so a unique violation can only come from
+        the group row itself.
+        """
+        table = type(group).__table__
+        for code in self._candidates(session, table):
+            if self._try(session, group, code):
+                return code
+            if self._reclaim(session, table, code) and self._try(session, group, code):
+                return code
+        self._count('exhausted')
+        log.error('No free group code after %s random tries and %s probes', self.random_tries, self.max_probes)
+        raise CodeSpaceExhausted()
+
+    def _try(self, session, group, code):
+        group.code = code
+        self._count('inserts')
+        try:
+            with session.begin_nested():
+                session.add(group)
+        except IntegrityError as e:
+            if not _is_code_conflict(e):
+                raise
+            self._count('collisions')
+            return False
+        self._count('allocated')
+        return True
+
+    def _reclaim(self, session, table, code):
+        """Move code off the closed group holding it; True if one did"""
+        reclaimed = session.execute(
+            update(table)
+            .where(and_(table.c.code == code, table.c.is_active.is_(False)))
+            .values(code=literal('-').concat(cast(table.c.id, String)))
+        ).rowcount
+        if reclaimed:
+            self._count('reclaimed')
+            log.info('Reclaimed group code %s from a closed group', code)
+        return bool(reclaimed)
+
+    def _candidates(self, session, table):
+        for _ in range(self.random_tries):
+            yield random_code(self.rng)
+        for _ in range(self.max_probes):
+            self._count('probes')
+            free = self._probe(session, table)
+            yield from free[:self.random_tries]
+
+    def _probe(self, session, table):
+        """Codes in one random block that no active group holds, shuffled"""
+        start = self.rng.randrange(CODE_SPACE // PROBE_BLOCK) * PROBE_BLOCK
+        lo = f"{start:0{CODE_DIGITS}d}"
+        hi = f"{start + PROBE_BLOCK - 1:0{CODE_DIGITS}d}"
+        taken = set(session.execute(
+            table.select().with_only_columns(table.c.code)
+            .where(and_(table.c.code >= lo, table.c.code <= hi, table.c.is_active.isnot(False)))
+        ).scalars())
+        free = [code for code in (f"{n:0{CODE_DIGITS}d}" for n in range(start, start + PROBE_BLOCK))
+                if code not in taken]
+        self.rng.shuffle(free)
+        return free
+
+
+def get_code_allocator(app=None):
+    """This app's GroupCodeAllocator, created on first use"""
+    return app_singleton(app, 'group_code_allocator', lambda app: GroupCodeAllocator(
+        app.config['GROUP_CODE_RANDOM_TRIES'], app.config['GROUP_CODE_MAX_PROBES']))
@@ -0,0 +1,417 @@
+"""
+Live group updates: GET /api/groups/<id>/events (Server-Sent Events)
+
+Members' browsers used to re-fetch GET /api/groups/<id> to notice joins,
+menu changes and orders. Now they keep one SSE connection per open group
+and get a compact event whenever one of those happens:
+
+    id: 7
+    event: member_joined
+    data: {"version": 7, "user_id": 12, "first_name": "Ayşe"}
+
+The event id is the group's version (groups.version), so a reconnecting
+EventSource sends Last-Event-ID and the stream replays what it missed, or
+sends `resync` when it can't (the client then re-fetches the group once).
+A version jump between two events means a change without an event of its
+own (a member edited their profile).
+
+Fan-out happens in each process (EventBroker): streams subscribe to a group
+and wait on their own wakeup flag, so an idle stream costs one parked
+greenlet/thread and a heartbeat comment every GROUP_EVENTS_HEARTBEAT_SECONDS.
+
+Backends (GROUP_EVENTS_BACKEND) carry events between processes:
+    memory   publish delivers to this process only - one worker / development
+    sql      events go through a `group_events` table (GROUP_EVENTS_URL,
+             default: the app DB). Each worker polls it once per
+             GROUP_EVENTS_POLL_SECONDS while it has streams - one query per
+             worker, not per connection - and replays Last-Event-ID gaps
+             from it. Rows older than GROUP_EVENTS_RETENTION_SECONDS are
+             deleted as it goes.
+
+Event types: member_joined, menu_updated, order_created, group_closed (the
+stream ends), plus `version` (the current version, first message of a new
+connection) and `resync`.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, Text, create_engine, select
+
+from extensions import app_singleton
+from logging_config import get_logger
+
+log = get_logger('group_events')
+
+
+class TooManyStreams(Exception):
+    """This process already holds GROUP_EVENTS_MAX_STREAMS streams (503)"""
+
+
+class GroupEvent:
+    __slots__ = ('group_id', 'version', 'type', 'data')
+
+    def __init__(self, group_id, version, type, data=None):
+        self.group_id = group_id
+        self.version = version
+        self.type = type
+        self.data = data or {}
+
+    def encode(self):
+        """The event as an SSE message"""
+        payload = json.dumps({'version': self.version, **self.data}, ensure_ascii=False, separators=(',', ':'))
+        return f"id: {self.version}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+def resync(version):
+    """Tell the client it missed events: re-fetch the group"""
+    return GroupEvent(None, version, 'resync').encode()
+
+
+class Subscription:
+    """One stream's inbox; the broker pushes, the stream waits"""
+
+    def __init__(self, group_id, max_pending):
+        self.group_id = group_id
+        self.max_pending = max_pending
+        self.overflowed = False
+        self._pending = deque()
+        self._wakeup = threading.Event()
+
+    def push(self, event):
+        if len(self._pending) >= self.max_pending:
+            self.overflowed = True  # a stalled client; it gets a resync instead
+        else:
+            self._pending.append(event)
+        self._wakeup.set()
+
+    def wait(self, timeout):
+        """Events pushed since the last call; [] if none came within timeout seconds"""
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+        events = []
+        while self._pending:
+            events.append(self._pending.popleft())
+        return events
+
+
+class EventBroker:
+    """In-process fan-out to subscribed streams, plus a short history per group"""
+
+    def __init__(self, history=32, max_groups=10000, max_pending=64):
+        self.history_size = history
+        self.max_groups = max_groups
+        self.max_pending = max_pending
+        self._subscribers = {}         # group_id -> set of Subscription
+        self._history = OrderedDict()  # group_id -> deque of recent events (LRU)
+        self._lock = threading.Lock()
+        self._counters = {'delivered': 0, 'pushed': 0, 'overflows': 0}
+
+    def subscribe(self, group_id):
+        subscription = Subscription(group_id, self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(group_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.group_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.group_id]
+
+    def streams(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def deliver(self, event):
+        with self._lock:
+            history = self._history.get(event.group_id)
+            if history is None:
+                history = self._history[event.group_id] = deque(maxlen=self.history_size)
+                while len(self._history) > self.max_groups:
+                    self._history.popitem(last=False)
+            else:
+                self._history.move_to_end(event.group_id)
+            history.append(event)
+            subscribers = list(self._subscribers.get(event.group_id, ()))
+            self._counters['delivered'] += 1
+            self._counters['pushed'] += len(subscribers)
+        for subscription in subscribers:
+            subscription.push(event)
+            if subscription.overflowed:
+                self._count_overflow()
+
+    def _count_overflow(self):
+        with self._lock:
+            self._counters['overflows'] += 1
+
+    def recent(self, group_id, after_version, up_to_version):
+        """Events after_version < version <= up_to_version, or None if they aren't all here"""
+        with self._lock:
+            events = [e for e in self._history.get(group_id, ()) if after_version < e.version <= up_to_version]
+        return _complete(events, after_version, up_to_version)
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, 'streams': sum(len(s) for s in self._subscribers.values()),
+                    'groups_watched': len(self._subscribers)}
+
+
+def _complete(events, after_version, up_to_version):
+    """events if they cover every version in (after_version, up_to_version] that had one
+
+    Versions without an event (profile edits) leave gaps we can't tell
+    from lost events, so "complete" means the newest one reached
+    up_to_version; the client re-fetches on any version jump anyway.
+    """
+    if up_to_version > after_version and (not events or events[-1].version != up_to_version):
+        return None
+    return events
+
+
+class MemoryBackend:
+    """Events stay in this process"""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def publish(self, event):
+        self.broker.deliver(event)
+
+    def history(self, group_id, after_version, up_to_version):
+        return self.broker.recent(group_id, after_version, up_to_version)
+
+    def watch(self):
+        pass
+
+    def after_fork(self):
+        pass
+
+
+class SQLBackend:
+    """Events shared by every worker through a `group_events` table"""
+
+    def __init__(self, broker, url, poll_interval=1.0, retention=600, grace=2.0):
+        self.broker = broker
+        self.poll_interval = poll_interval
+        self.retention = retention
+        # Rows are read by created_at with this overlap: an id allocated
+        # earlier can commit later, so "id > last id" could skip it
+        self.grace = grace
+        if url.startswith('sqlite'):
+            self.engine = create_engine(url, connect_args={'timeout': 5})
+        else:
+            self.engine = create_engine(url, pool_pre_ping=True)
+        self.table = Table(
+            'group_events', MetaData(),
+            Column('id', Integer, primary_key=True, autoincrement=True),
+            Column('group_id', Integer, nullable=False, index=True),
+            Column('version', Integer, nullable=False),
+            Column('type', String(30), nullable=False),
+            Column('data', Text, nullable=False),
+            Column('created_at', Float, nullable=False, index=True),
+        )
+        self.table.create(self.engine, checkfirst=True)
+        self.polls = 0
+        self._polled_at = None
+        self._seen = {}  # id -> created_at of rows inside the overlap window
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        with self.engine.begin() as conn:
+            conn.execute(self.table.insert().values(
+                group_id=event.group_id, version=event.version, type=event.type,
+                data=json.dumps(event.data, ensure_ascii=False), created_at=time.time()))
+
+    def _event(self, row):
+        return GroupEvent(row.group_id, row.version, row.type, json.loads(row.data))
+
+    def history(self, group_id, after_version, up_to_version):
+        t = self.table
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(t).where(t.c.group_id == group_id, t.c.version > after_version, t.c.version <= up_to_version)
+                .order_by(t.c.version)
+            ).fetchall()
+        return _complete([self._event(row) for row in rows], after_version, up_to_version)
+
+    def watch(self):
+        """Make sure this process polls the table (called when a stream opens)"""
+        with self._lock:
+            if self._thread is None:
+                self._polled_at = time.time()  # nothing before this stream subscribed is needed
+                self._thread = threading.Thread(target=self._run, name='group-events', daemon=True)
+                self._thread.start()
+
+    def poll(self):
+        """Deliver rows added since the last poll; returns how many"""
+        t = self.table
+        now = time.time()
+        since = (self._polled_at if self._polled_at is not None else now) - self.grace
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(t).where(t.c.created_at >= since).order_by(t.c.id)).fetchall()
+        fresh = [row for row in rows if row.id not in self._seen]
+        for row in fresh:
+            self._seen[row.id] = row.created_at
+            self.broker.deliver(self._event(row))
+        for row_id, created_at in list(self._seen.items()):
+            if created_at < since:
+                del self._seen[row_id]
+        self._polled_at = now
+        self.polls += 1
+        return len(fresh)
+
+    def prune(self):
+        with self.engine.begin() as conn:
+            return conn.execute(self.table.delete().where(
+                self.table.c.created_at < time.time() - self.retention)).rowcount
+
+    def _run(self):
+        # Poll while this process has streams; the first stream after that starts a new thread
+        while True:
+            with self._lock:
+                if not self.broker.streams():
+                    self._thread = None
+                    self._seen.clear()
+                    return
+            try:
+                self.poll()
+                if self.polls % 600 == 1:
+                    self.prune()
+            except Exception as e:
+                log.warning('Group event poll failed: %s', e)
+            time.sleep(self.poll_interval)
+
+    def after_fork(self):
+        self.engine.dispose(close=False)
+        self._thread = None
+        self._seen = {}
+        self._lock = threading.Lock()
+
+
+def default_max_streams(threads=8, reserved=4):
+    """Thousands under gevent (a parked greenlet per stream); under a threaded
+    worker, its threads minus `reserved` kept for normal requests (maybe 0)"""
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            return 5000
+    except ImportError:
+        pass
+    return max(threads - reserved, 0)
+
+
+class GroupEvents:
+    """Publishing side for the routes, and the SSE streams"""
+
+    def __init__(self, backend, broker, heartbeat=15, max_stream_seconds=300, max_streams=None, retry_ms=3000):
+        self.backend = backend
+        self.broker = broker
+        self.heartbeat = heartbeat
+        self.max_stream_seconds = max_stream_seconds
+        self.max_streams = default_max_streams() if max_streams is None else max_streams
+        self.retry_ms = retry_ms
+        self._lock = threading.Lock()
+        self._open = 0
+
+    def publish(self, group_id, version, type, **data):
+        self.backend.publish(GroupEvent(group_id, version, type, data))
+
+    def subscribe(self, group_id):
+        """Reserve a stream slot and start buffering the group's events
+
+        Subscribe before reading the group's current version, so nothing
+        published in between is lost.
+        """
+        with self._lock:
+            if self._open >= self.max_streams:
+                raise TooManyStreams()
+            self._open += 1
+        subscription = self.broker.subscribe(group_id)
+        try:
+            self.backend.watch()
+        except Exception:
+            self.close(subscription)
+            raise
+        return subscription
+
+    def close(self, subscription):
+        """Release a subscription (stream() does this itself once it runs)"""
+        self.broker.unsubscribe(subscription)
+        with self._lock:
+            self._open -= 1
+
+    def stream(self, subscription, current_version, last_event_id=None, closed=False):
+        """SSE messages for one connection; unsubscribes when the client goes away"""
+        try:
+            yield f"retry: {self.retry_ms}\n\n"
+            sent = current_version
+            if last_event_id is None or last_event_id > current_version:
+                # New connection (or a client that saw a group that no longer matches): current state
+                yield GroupEvent(subscription.group_id, current_version, 'version').encode()
+            elif last_event_id < current_version:
+                missed = self.backend.history(subscription.group_id, last_event_id, current_version)
+                if missed is None:
+                    yield resync(current_version)
+                else:
+                    for event in missed:
+                        yield event.encode()
+            if closed:
+                return
+
+            deadline = time.monotonic() + self.max_stream_seconds
+            last_write = time.monotonic()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return  # EventSource reconnects with Last-Event-ID (fresh auth, rebalanced workers)
+                events = subscription.wait(min(self.heartbeat, remaining))
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    events = []
+                    yield resync(sent)
+                    last_write = time.monotonic()
+                for event in events:
+                    if event.version <= sent:
+                        continue  # already covered by the replay
+                    sent = event.version
+                    yield event.encode()
+                    last_write = time.monotonic()
+                    if event.type == 'group_closed':
+                        return
+                if time.monotonic() - last_write >= self.heartbeat:
+                    yield ": heartbeat\n\n"  # keeps proxies from timing out, detects dead clients
+                    last_write = time.monotonic()
+        finally:
+            self.close(subscription)
+
+    def stats(self):
+        return {**self.broker.stats(), 'max_streams': self.max_streams}
+
+    def after_fork(self):
+        self.backend.after_fork()
+
+
+def _build_group_events(app):
+    config = app.config
+    broker = EventBroker()
+    if config['GROUP_EVENTS_BACKEND'] == 'sql':
+        backend = SQLBackend(broker, config['GROUP_EVENTS_URL'] or config['SQLALCHEMY_DATABASE_URI'],
+                             config['GROUP_EVENTS_POLL_SECONDS'], config['GROUP_EVENTS_RETENTION_SECONDS'])
+    else:
+        backend = MemoryBackend(broker)
+    return GroupEvents(
+        backend, broker, config['GROUP_EVENTS_HEARTBEAT_SECONDS'],
+        config['GROUP_EVENTS_MAX_STREAM_SECONDS'],
+        config['GROUP_EVENTS_MAX_STREAMS'] or default_max_streams(
+            config['GUNICORN_THREADS'], config['GROUP_EVENTS_RESERVED_THREADS']))
+
+
+def get_group_events(app=None):
+    """This app's GroupEvents (GROUP_EVENTS_BACKEND), created on first use"""
+    return app_singleton(app, 'group_events', _build_group_events)
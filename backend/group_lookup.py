@@ -0,0 +1,103 @@
+"""
+Join-code lookup cache (code / QR code -> group)
+
+join_group looked every code up in groups.code and then, on a miss, again
+in groups.qr_code. With only 1,000,000 six-digit codes, scanners and typos
+produce a steady stream of codes that don't exist, and each cost both round
+trips. GroupLookup keeps two per-process caches in front of them:
+
+    groups   ('code' | 'qr', normalized code) -> group id, LRU of
+             GROUP_LOOKUP_CACHE_SIZE; a hit is one primary-key get (usually
+             the identity map) instead of an index lookup plus the fallback
+    missing  codes no group holds, for GROUP_LOOKUP_NEGATIVE_TTL seconds;
+             a hit answers 404 without touching the database
+
+A code can move: closed groups give theirs up when a new group reclaims it
+(group_codes.py). Positive hits are therefore checked against the loaded
+row and dropped if the group no longer holds the code, so a stale entry
+costs one extra lookup, never a wrong group. Creating, closing and deleting
+a group invalidates its codes here; other workers rely on that check and
+on the negative TTL.
+"""
+
+import threading
+import time
+
+from extensions import app_singleton
+from principal import ExpiringLRU
+
+FOREVER = float('inf')
+
+
+def normalize_code(code):
+    """'123-456', ' 123 456 ' -> '123456'"""
+    return ''.join(str(code).split()).replace('-', '')
+
+
+class GroupLookup:
+    """Per-process code -> group id LRU with a short-lived negative cache"""
+
+    def __init__(self, size=10000, negative_ttl=5.0, negative_size=10000):
+        self.negative_ttl = negative_ttl
+        self._groups = ExpiringLRU(size)
+        self._missing = ExpiringLRU(negative_size)
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'stale': 0, 'invalidations': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        """Counters; hits + negative_hits are lookups answered without a code query"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats['entries'] = len(self._groups)
+        stats['negative_entries'] = len(self._missing)
+        return stats
+
+    def find(self, session, model, code=None, qr_code=None):
+        """The model instance holding code (or, failing that, qr_code), or None"""
+        for column, value in (('code', code and normalize_code(code)), ('qr_code', qr_code)):
+            if value:
+                group = self._find(session, model, column, value)
+                if group is not None:
+                    return group
+        return None
+
+    def _find(self, session, model, column, value):
+        key = (column, value)
+        group_id = self._groups.get(key)
+        if group_id is not None:
+            group = session.get(model, group_id)
+            if group is not None and getattr(group, column) == value:
+                self._count('hits')
+                return group
+            self._count('stale')
+            self._groups.pop(key)
+        elif self._missing.get(key) is not None:
+            self._count('negative_hits')
+            return None
+
+        self._count('misses')
+        group = session.query(model).filter(getattr(model, column) == value).first()
+        if group is None:
+            self._missing.put(key, True, time.time() + self.negative_ttl)
+        else:
+            self._groups.put(key, group.id, FOREVER)
+        return group
+
+    def invalidate(self, code=None, qr_code=None):
+        """Forget what this worker knows about these codes (group created, closed or deleted)"""
+        self._count('invalidations')
+        for key in (('code', code and normalize_code(code)), ('qr_code', qr_code)):
+            if key[1]:
+                self._groups.pop(key)
+                self._missing.pop(key)
+
+
+def get_group_lookup(app=None):
+    """This app's GroupLookup, created on first use"""
+    return app_singleton(app, 'group_lookup', lambda app: GroupLookup(
+        app.config['GROUP_LOOKUP_CACHE_SIZE'], app.config['GROUP_LOOKUP_NEGATIVE_TTL'],
+        app.config['GROUP_LOOKUP_CACHE_SIZE']))
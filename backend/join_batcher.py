@@ -0,0 +1,132 @@
+"""
+Micro-batched group joins
+
+When a table scans the same QR code, 10-30 phones call POST /api/groups/join
+within a second. One transaction per join means one commit and one version
+bump per phone, all on the same groups row, so the joins queue on that row
+lock one after another. JoinBatcher coalesces the joins that reach a
+process within GROUP_JOIN_BATCH_MS of each other into one transaction:
+
+    1. The first join for a group opens a batch and becomes its leader; it
+       waits up to the window (or until GROUP_JOIN_MAX_BATCH joins arrived).
+    2. Joins arriving meanwhile add their user to the batch and wait.
+    3. The leader runs apply(group_id, joiners) once in its own request
+       context (one insert-if-absent, one version bump, one commit) and
+       hands every waiting join its own result.
+
+Batches of the same group are applied one after another: a leader whose
+window ended while the previous batch is still committing keeps its batch
+open until that commit, so the next batch is larger instead of queueing
+on the groups row lock, and a second tap can't race its first.
+
+A joiner is any hashable naming the joining user; app.py passes
+(user_id, first_name) so the leader can publish every member_joined event,
+in version order, right after its commit. A joiner repeated within one
+batch (a phone that sent the request twice) is applied once, and its later
+copies get None, the "already a member" answer.
+
+If the batch's transaction fails, each waiting join retries on its own, so
+one bad batch doesn't fail the whole table. GROUP_JOIN_BATCH_MS=0 turns
+batching off: every join applies itself immediately.
+"""
+
+import threading
+
+from extensions import app_singleton
+
+
+class _Batch:
+    __slots__ = ('previous', 'joiners', 'full', 'done', 'results', 'error')
+
+    def __init__(self, previous):
+        self.previous = previous  # the group's batch before this one, applied first
+        self.joiners = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = {}
+        self.error = None
+
+
+class JoinBatcher:
+    """Per-process coalescing of simultaneous joins to the same group"""
+
+    def __init__(self, window=0.02, max_batch=50):
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._open = {}  # group_id -> batch still accepting joins
+        self._last = {}  # group_id -> newest batch, until it is applied
+        self._counters = {'joins': 0, 'batches': 0, 'largest_batch': 0, 'failed_batches': 0}
+
+    def stats(self):
+        """Counters; joins / batches is the average number of joins per transaction"""
+        with self._lock:
+            return dict(self._counters)
+
+    def join(self, group_id, joiner, apply):
+        """apply(group_id, joiners) -> {joiner: result} for a batch; returns this joiner's result"""
+        if self.window <= 0:
+            with self._lock:
+                self._counters['joins'] += 1
+            return self._run(group_id, [joiner], apply)[joiner]
+
+        with self._lock:
+            self._counters['joins'] += 1
+            batch = self._open.get(group_id)
+            leader = batch is None
+            if leader:
+                batch = self._open[group_id] = _Batch(self._last.get(group_id))
+                self._last[group_id] = batch
+            position = len(batch.joiners)
+            batch.joiners.append(joiner)
+            if len(batch.joiners) >= self.max_batch:
+                del self._open[group_id]  # the next join starts a new batch
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            if batch.previous is not None:
+                batch.previous.done.wait()
+            with self._lock:
+                if self._open.get(group_id) is batch:
+                    del self._open[group_id]
+                batch.previous = None
+            try:
+                batch.results = self._run(group_id, list(dict.fromkeys(batch.joiners)), apply)
+            except Exception as e:
+                batch.error = e
+            finally:
+                with self._lock:
+                    if self._last.get(group_id) is batch:
+                        del self._last[group_id]
+                batch.done.set()
+            if batch.error is not None:
+                # The batch's transaction failed; the leader retries alone, like every follower
+                return self._run(group_id, [joiner], apply)[joiner]
+            return batch.results[joiner]
+
+        batch.done.wait()
+        if batch.error is not None:
+            # The leader's transaction failed; join alone, in this request's own transaction
+            return self._run(group_id, [joiner], apply)[joiner]
+        if batch.joiners.index(joiner) != position:
+            return None
+        return batch.results[joiner]
+
+    def _run(self, group_id, joiners, apply):
+        try:
+            results = apply(group_id, joiners)
+        except Exception:
+            with self._lock:
+                self._counters['failed_batches'] += 1
+            raise
+        with self._lock:
+            self._counters['batches'] += 1
+            self._counters['largest_batch'] = max(self._counters['largest_batch'], len(joiners))
+        return results
+
+
+def get_join_batcher(app=None):
+    """This app's JoinBatcher, created on first use"""
+    return app_singleton(app, 'join_batcher', lambda app: JoinBatcher(
+        app.config['GROUP_JOIN_BATCH_MS'] / 1000, app.config['GROUP_JOIN_MAX_BATCH']))
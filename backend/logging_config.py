@@ -0,0 +1,172 @@
+"""
+Structured, non-blocking logging for the backend
+
+Request handlers log through standard `logging` loggers under the "hesap"
+namespace. Records go into a bounded in-memory queue (QueueHandler) and are
+formatted and written by a background QueueListener thread, so a request
+never waits on a stdout write. When the queue is full the record is dropped
+and counted instead of blocking the worker.
+
+Environment:
+    LOG_LEVEL                default level for "hesap.*" (INFO)
+    LOG_LEVELS               per-module overrides, e.g. "hesap.http=WARNING,hesap.auth=DEBUG"
+    LOG_FORMAT               "json" (default) or "text"
+    LOG_DEBUG_SAMPLE_RATE    fraction of DEBUG records kept (1.0 = all)
+    LOG_QUEUE_SIZE           max queued records before dropping (10000)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+ROOT_LOGGER = 'hesap'
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_lock = threading.Lock()
+_state = {'listener': None, 'handler': None, 'settings': None}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, plus any `extra=` fields"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records (per-request debug lines)"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records are dropped when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_levels(spec):
+    """'hesap.http=WARNING,hesap.auth=DEBUG' -> {'hesap.http': 'WARNING', ...}"""
+    levels = {}
+    for part in (spec or '').split(','):
+        if '=' in part:
+            name, level = part.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def settings_from_env():
+    return {
+        'level': os.getenv('LOG_LEVEL', 'INFO').upper(),
+        'levels': _parse_levels(os.getenv('LOG_LEVELS')),
+        'format': os.getenv('LOG_FORMAT', 'json').lower(),
+        'debug_sample_rate': float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1.0')),
+        'queue_size': int(os.getenv('LOG_QUEUE_SIZE', '10000')),
+    }
+
+
+def _build_output_handler(fmt, stream=None):
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if fmt == 'text':
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+    else:
+        handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def _start(settings, stream=None):
+    """(Re)create the queue, the queue handler and the background listener"""
+    log_queue = queue.Queue(maxsize=settings['queue_size'])
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(settings['debug_sample_rate']))
+    listener = logging.handlers.QueueListener(
+        log_queue, _build_output_handler(settings['format'], stream), respect_handler_level=True
+    )
+    listener.start()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    if _state['handler'] is not None:
+        root.removeHandler(_state['handler'])
+    root.addHandler(queue_handler)
+    root.propagate = False
+
+    _state.update(listener=listener, handler=queue_handler, settings=settings)
+
+
+def configure_logging(settings=None, stream=None):
+    """Set up the "hesap" logger tree (idempotent; call once per process)"""
+    with _lock:
+        if _state['listener'] is not None:
+            return logging.getLogger(ROOT_LOGGER)
+        settings = settings or settings_from_env()
+        logging.getLogger(ROOT_LOGGER).setLevel(settings['level'])
+        for name, level in settings['levels'].items():
+            logging.getLogger(name).setLevel(level)
+        _start(settings, stream)
+        atexit.register(shutdown_logging)
+    return logging.getLogger(ROOT_LOGGER)
+
+
+def restart_after_fork():
+    """The listener thread doesn't survive fork(); give the child its own"""
+    with _lock:
+        if _state['listener'] is None:
+            return
+        # The parent's thread is gone in the child - don't join it, just replace it
+        _state['listener'] = None
+        _start(_state['settings'])
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background writer"""
+    with _lock:
+        listener = _state['listener']
+        if listener is not None:
+            listener.stop()
+            _state['listener'] = None
+
+
+def dropped_records():
+    """Records discarded because the queue was full (exposed for monitoring)"""
+    handler = _state['handler']
+    return handler.dropped if handler is not None else 0
+
+
+def get_logger(name):
+    """Logger under the "hesap" namespace, e.g. get_logger('auth') -> hesap.auth"""
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
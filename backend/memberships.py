@@ -0,0 +1,139 @@
+"""
+Group membership (the group_members association table)
+
+Handlers used to test `user in group.members`, which loads the User row of
+every member just to answer yes or no, and deleting a group or a user went
+through the ORM collections, loading them the same way. Every membership
+read and write in the handlers goes through this module instead, and each
+call is one statement on group_members:
+
+    is_member(group_id, user_id)         primary-key lookup
+    add_member(group_id, user_id)        insert unless present; True if added
+    add_members(group_id, user_ids)      one multi-row insert-if-absent; ids added
+    remove_member(group_id, user_id)     primary-key delete; True if removed
+    remove_group_members(group_id)       all rows of a group (before deleting it)
+    remove_user_memberships(user_id)     all rows of a user (before deleting them)
+    member_counts(group_ids)             {group_id: members}, one grouped count
+    user_group_ids(user_id)              subquery of the user's group ids
+
+The primary key (group_id, user_id) serves every lookup by group.
+ix_group_members_user_id serves the lookups by user: a user's group list,
+bumping their groups' versions and removing them (migrate_group_members_index.py
+adds it to existing databases).
+"""
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+
+group_members = db.Table('group_members',
+    db.Column('group_id', db.Integer, db.ForeignKey('groups.id'), primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
+    db.Index('ix_group_members_user_id', 'user_id'),
+)
+
+
+def _key(group_id, user_id):
+    return (group_members.c.group_id == group_id) & (group_members.c.user_id == user_id)
+
+
+def is_member(group_id, user_id):
+    """Whether user_id belongs to group_id (no User/Group rows loaded)"""
+    return db.session.execute(
+        db.select(group_members.c.group_id).where(_key(group_id, user_id))
+    ).first() is not None
+
+
+def _insert_ignore(dialect):
+    """INSERT that skips an existing (group_id, user_id) row, or None if the dialect has none"""
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(group_members).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(group_members).on_conflict_do_nothing()
+    if dialect in ('mysql', 'mariadb'):
+        return group_members.insert().prefix_with('IGNORE')
+    return None
+
+
+def add_member(group_id, user_id):
+    """Add user_id to group_id in the current transaction; False if already a member
+
+    A single INSERT that skips duplicates, so two concurrent joins of the same
+    user can't both fail on the primary key. Dialects without one fall back to
+    a plain insert inside a savepoint.
+    """
+    values = {'group_id': group_id, 'user_id': user_id}
+    statement = _insert_ignore(db.engine.dialect.name)
+    if statement is not None:
+        return db.session.execute(statement.values(**values)).rowcount > 0
+    try:
+        with db.session.begin_nested():
+            db.session.execute(group_members.insert().values(**values))
+    except IntegrityError:
+        return False
+    return True
+
+
+def add_members(group_id, user_ids):
+    """Add several users to group_id in the current transaction; returns the ids that were added
+
+    One primary-key range read finds who already belongs, then one
+    multi-row insert-if-absent adds the rest. PostgreSQL reports exactly
+    which rows it inserted; elsewhere a user added by another transaction
+    between the read and the insert is still returned (they are a member
+    either way, only the 200/201 distinction is lost).
+    """
+    if len(user_ids) == 1:
+        return list(user_ids) if add_member(group_id, user_ids[0]) else []
+    existing = set(db.session.execute(
+        db.select(group_members.c.user_id).where(
+            group_members.c.group_id == group_id, group_members.c.user_id.in_(user_ids))
+    ).scalars())
+    added = [user_id for user_id in user_ids if user_id not in existing]
+    if not added:
+        return []
+    dialect = db.engine.dialect.name
+    statement = _insert_ignore(dialect)
+    if statement is None:
+        return [user_id for user_id in added if add_member(group_id, user_id)]
+    statement = statement.values([{'group_id': group_id, 'user_id': user_id} for user_id in added])
+    if dialect == 'postgresql':
+        inserted = set(db.session.execute(statement.returning(group_members.c.user_id)).scalars())
+        return [user_id for user_id in added if user_id in inserted]
+    db.session.execute(statement)
+    return added
+
+
+def remove_member(group_id, user_id):
+    """Remove user_id from group_id; False if they weren't a member"""
+    return db.session.execute(group_members.delete().where(_key(group_id, user_id))).rowcount > 0
+
+
+def remove_group_members(group_id):
+    """Drop every membership of a group; returns how many"""
+    return db.session.execute(
+        group_members.delete().where(group_members.c.group_id == group_id)).rowcount
+
+
+def remove_user_memberships(user_id):
+    """Drop every membership of a user; returns how many"""
+    return db.session.execute(
+        group_members.delete().where(group_members.c.user_id == user_id)).rowcount
+
+
+def member_counts(group_ids):
+    """{group_id: number of members} for group_ids, groups without members left out"""
+    if not group_ids:
+        return {}
+    return dict(db.session.execute(
+        db.select(group_members.c.group_id, db.func.count())
+        .where(group_members.c.group_id.in_(group_ids))
+        .group_by(group_members.c.group_id)
+    ).all())
+
+
+def user_group_ids(user_id):
+    """Subquery selecting the ids of user_id's groups (ix_group_members_user_id)"""
+    return db.select(group_members.c.group_id).where(group_members.c.user_id == user_id)
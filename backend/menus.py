@@ -0,0 +1,91 @@
+"""
+Content-addressed menu snapshots
+
+Groups used to carry a full copy of their restaurant's menu in
+groups.menu_data, so a busy restaurant had thousands of identical copies
+and every group response shipped the whole blob. A menu is now stored once
+in menu_snapshots, keyed by the SHA-256 of its canonical JSON, and groups
+point at it with groups.menu_snapshot_id:
+
+    store_menu(data)        id of the snapshot holding data (inserted if new)
+    load_menu(snapshot_id)  the menu, from a per-process cache after first use
+    group_menu(group)       a group's menu (snapshot, or legacy menu_data)
+
+Snapshots are never modified. Editing a group's menu (the OCR flow) stores
+the edited menu as another snapshot and repoints that group only: copy on
+write. Because the id is the content hash, it doubles as the menu's ETag,
+and a cached snapshot can never go stale.
+"""
+
+import math
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from catalog import content_hash
+from extensions import app_singleton, db
+from principal import ExpiringLRU
+
+MENU_CACHE_SIZE = 256
+
+
+class MenuSnapshot(db.Model):
+    __tablename__ = 'menu_snapshots'
+
+    id = db.Column(db.String(64), primary_key=True)  # sha256 of the canonical JSON
+    data = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def _cache():
+    """This process's snapshot id -> menu LRU; content-addressed, so entries never expire"""
+    return app_singleton(None, 'menu_cache', lambda app: ExpiringLRU(MENU_CACHE_SIZE))
+
+
+def _remember(snapshot_id, data):
+    _cache().put(snapshot_id, data, math.inf)
+
+
+def store_menu(data):
+    """Snapshot id for a menu, inserting the snapshot in the current session if it is new
+
+    Always checked against the database (one primary-key lookup): the read
+    cache may hold menus whose insert was rolled back.
+    """
+    snapshot_id = content_hash(data)
+    if db.session.get(MenuSnapshot, snapshot_id) is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(MenuSnapshot(id=snapshot_id, data=data))
+        except IntegrityError:
+            pass  # another request stored the same menu first
+    _remember(snapshot_id, data)
+    return snapshot_id
+
+
+def load_menu(snapshot_id):
+    """The menu stored under snapshot_id, or None"""
+    if snapshot_id is None:
+        return None
+    data = _cache().get(snapshot_id)
+    if data is not None:
+        return data
+    snapshot = db.session.get(MenuSnapshot, snapshot_id)
+    if snapshot is None:
+        return None
+    _remember(snapshot_id, snapshot.data)
+    return snapshot.data
+
+
+def group_menu(group):
+    """The group's menu: its snapshot, or menu_data on rows not migrated yet"""
+    if group.menu_snapshot_id:
+        return load_menu(group.menu_snapshot_id)
+    return group.menu_data
+
+
+def group_menu_etag(group):
+    """Content hash of the group's menu (None without a menu)"""
+    if group.menu_snapshot_id:
+        return group.menu_snapshot_id
+    return content_hash(group.menu_data) if group.menu_data else None
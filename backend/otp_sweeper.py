@@ -0,0 +1,109 @@
+"""
+Expiry sweeper for otp_verifications
+
+Every PIN reset request inserts a row, and nothing used to delete them. The
+sweeper deletes rows whose expires_at is more than OTP_SWEEP_GRACE_SECONDS
+in the past. Used codes go too: confirm-pin-reset still needs a used code
+for a short while after verify-pin-reset, so the grace period covers that.
+
+Deletes run in chunks of OTP_SWEEP_CHUNK ids, one short transaction each,
+driven by ix_otp_expires_at, so a backlog of millions of rows never holds
+a long lock. It runs wherever background jobs run: worker.py, or a thread
+in each web process when OUTBOX_DISPATCH=inline.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from extensions import app_singleton, db
+from logging_config import get_logger
+
+log = get_logger('otp')
+
+
+def sweep_expired_otps(chunk_size=1000, grace_seconds=3600, pause=0.0, max_chunks=None, now=None):
+    """Delete expired codes chunk by chunk; returns the number of rows deleted"""
+    otps = db.metadata.tables['otp_verifications']
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=grace_seconds)
+    deleted = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        ids = [row.id for row in db.session.execute(
+            select(otps.c.id).where(otps.c.expires_at < cutoff).limit(chunk_size)
+        )]
+        if not ids:
+            break
+        db.session.execute(otps.delete().where(otps.c.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+        chunks += 1
+        if len(ids) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)  # let request transactions in between
+    db.session.commit()  # end the read transaction of an empty sweep
+    return deleted
+
+
+class OTPSweeper:
+    """Runs sweep_expired_otps() every OTP_SWEEP_INTERVAL seconds on a daemon thread"""
+
+    def __init__(self, app):
+        self.app = app
+        config = app.config
+        self.interval = config['OTP_SWEEP_INTERVAL']
+        self.chunk_size = config['OTP_SWEEP_CHUNK']
+        self.grace_seconds = config['OTP_SWEEP_GRACE_SECONDS']
+        self.pause = config['OTP_SWEEP_PAUSE']
+        self._stop = threading.Event()
+        self._thread = None
+        self.deleted = 0
+        self.runs = 0
+
+    def run_once(self):
+        started = time.monotonic()
+        with self.app.app_context():
+            try:
+                deleted = sweep_expired_otps(self.chunk_size, self.grace_seconds, self.pause)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+        self.deleted += deleted
+        self.runs += 1
+        if deleted:
+            log.info('Swept %s expired OTP codes in %.1fs', deleted, time.monotonic() - started)
+        return deleted
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                log.exception('OTP sweep failed')
+            self._stop.wait(self.interval)
+
+    def start_background(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self.run_forever, name='otp-sweeper', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def get_sweeper(app=None):
+    """This process's OTPSweeper"""
+    return app_singleton(app, 'otp_sweeper', OTPSweeper)
+
+
+def start_inline_sweeper(app=None):
+    """OUTBOX_DISPATCH=inline: web processes also run the background jobs"""
+    app = app or current_app._get_current_object()
+    if app.config['OUTBOX_DISPATCH'] == 'inline':
+        get_sweeper(app).start_background()
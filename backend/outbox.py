@@ -0,0 +1,315 @@
+"""
+Durable outbox for SMS and email delivery
+
+Request handlers never talk to Twilio or SMTP. They call enqueue(), which
+adds an OutboxMessage to the current DB session, so the message commits (or
+rolls back) together with the handler's own changes. A Dispatcher then
+drains the table:
+
+    worker.py                 separate process (OUTBOX_DISPATCH=worker)
+    inline dispatcher thread  inside each web process (OUTBOX_DISPATCH=inline,
+                              for single-process development)
+
+Both claim a message with a conditional UPDATE (pending -> sending, plus a
+lease), so several dispatchers never send the same message twice. Failures
+are retried with exponential backoff up to OUTBOX_MAX_ATTEMPTS; a
+PermanentDeliveryError fails the message at once. An optional dedupe_key
+(unique) makes enqueueing the same logical message a no-op.
+
+Providers are plain callables `provider(kind, payload) -> result dict`,
+registered per kind. OUTBOX_PROVIDER=fake swaps every kind for FakeProvider
+so the whole pipeline runs offline.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from extensions import app_singleton, db
+from logging_config import get_logger
+
+log = get_logger('outbox')
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+
+class OutboxMessage(db.Model):
+    __tablename__ = 'outbox_messages'
+    __table_args__ = (
+        db.Index('ix_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)  # 'email' or 'sms_verification'
+    payload = db.Column(db.JSON, nullable=False)
+    dedupe_key = db.Column(db.String(200), nullable=True, unique=True)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.JSON, nullable=True)  # provider response, e.g. Twilio SID
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+
+class PermanentDeliveryError(Exception):
+    """The provider rejected the message; retrying won't help"""
+
+
+def enqueue(kind, payload, dedupe_key=None):
+    """Add a message to the current session (committed by the caller)
+
+    Returns the new message, or the existing one when dedupe_key was
+    already enqueued. A deduplicated message is inserted in a savepoint, so
+    a concurrent enqueue of the same key rolls back only the savepoint
+    (not the caller's transaction) and returns the other request's row.
+    """
+    message = OutboxMessage(kind=kind, payload=payload, dedupe_key=dedupe_key,
+                            status=PENDING, attempts=0, next_attempt_at=datetime.utcnow())
+    if dedupe_key:
+        try:
+            with db.session.begin_nested():
+                db.session.add(message)
+        except IntegrityError:
+            return OutboxMessage.query.filter_by(dedupe_key=dedupe_key).one()
+    else:
+        db.session.add(message)
+    db.session.info['outbox_wake'] = True  # see _wake_after_commit
+    return message
+
+
+def _wake_after_commit(session):
+    """Nudge this process's dispatcher as soon as an enqueue is committed"""
+    if session.info.pop('outbox_wake', None):
+        dispatcher = current_app.extensions.get('outbox_dispatcher')
+        if dispatcher is not None:
+            dispatcher.wake()
+
+
+def backoff_seconds(attempts, base, maximum):
+    """base * 2^(attempts-1), capped, with +/-20% jitter so retries spread out"""
+    delay = min(maximum, base * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class FakeProvider:
+    """Offline provider: records deliveries; can fail or be slow on demand"""
+
+    def __init__(self, fail_times=0, permanent=False, delay=0.0):
+        self.fail_times = fail_times
+        self.permanent = permanent
+        self.delay = delay
+        self.sent = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, kind, payload):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.calls += 1
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                if self.permanent:
+                    raise PermanentDeliveryError('fake provider rejected the message')
+                raise ConnectionError('fake provider unavailable')
+            self.sent.append((kind, payload))
+            return {'fake_id': f'fake-{len(self.sent)}'}
+
+
+class Dispatcher:
+    """Claims due messages and delivers them on a bounded thread pool"""
+
+    def __init__(self, app, providers, concurrency=4):
+        self.app = app
+        self.providers = providers
+        self.concurrency = concurrency
+        self.config = app.config
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='outbox')
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0}
+
+    # ---------- claiming ----------
+
+    def _due_ids(self, limit):
+        now = datetime.utcnow()
+        rows = db.session.query(OutboxMessage.id).filter(
+            db.or_(
+                db.and_(OutboxMessage.status == PENDING, OutboxMessage.next_attempt_at <= now),
+                # A dispatcher died mid-send: take the message over once its lease expires
+                db.and_(OutboxMessage.status == SENDING, OutboxMessage.locked_until < now),
+            )
+        ).order_by(OutboxMessage.next_attempt_at).limit(limit).all()
+        return [row.id for row in rows]
+
+    def _claim(self, message_id):
+        now = datetime.utcnow()
+        claimed = OutboxMessage.query.filter(
+            OutboxMessage.id == message_id,
+            db.or_(
+                db.and_(OutboxMessage.status == PENDING, OutboxMessage.next_attempt_at <= now),
+                db.and_(OutboxMessage.status == SENDING, OutboxMessage.locked_until < now),
+            )
+        ).update({
+            'status': SENDING,
+            'locked_until': now + timedelta(seconds=self.config['OUTBOX_LEASE_SECONDS']),
+        }, synchronize_session=False)
+        db.session.commit()
+        return claimed == 1
+
+    # ---------- delivery ----------
+
+    def _deliver(self, message_id):
+        with self.app.app_context():
+            try:
+                message = db.session.get(OutboxMessage, message_id)
+                provider = self.providers.get(message.kind)
+                try:
+                    if provider is None:
+                        raise PermanentDeliveryError(f'no provider for {message.kind!r}')
+                    result = provider(message.kind, message.payload)
+                except PermanentDeliveryError as e:
+                    message.attempts += 1
+                    self._finish(message, FAILED, error=e)
+                except Exception as e:
+                    message.attempts += 1
+                    self._retry(message, e)
+                else:
+                    message.attempts += 1
+                    self._finish(message, SENT, result=result)
+            except Exception:
+                db.session.rollback()
+                log.exception('Outbox bookkeeping failed for message %s', message_id)
+            finally:
+                db.session.remove()
+                self._slots.release()
+
+    def _finish(self, message, status, result=None, error=None):
+        message.status = status
+        message.locked_until = None
+        if status == SENT:
+            message.sent_at = datetime.utcnow()
+            message.result = result
+        else:
+            message.last_error = str(error)[:2000]
+        db.session.commit()
+        self.stats[status] += 1
+        if status == SENT:
+            log.info('Delivered %s message %s', message.kind, message.id)
+        else:
+            log.error('Gave up on %s message %s: %s', message.kind, message.id, error)
+
+    def _retry(self, message, error):
+        if message.attempts >= self.config['OUTBOX_MAX_ATTEMPTS']:
+            self._finish(message, FAILED, error=error)
+            return
+        delay = backoff_seconds(message.attempts, self.config['OUTBOX_BACKOFF_BASE'],
+                                self.config['OUTBOX_BACKOFF_MAX'])
+        message.status = PENDING
+        message.locked_until = None
+        message.last_error = str(error)[:2000]
+        message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        db.session.commit()
+        self.stats['retried'] += 1
+        log.warning('Retrying %s message %s in %.1fs (attempt %s): %s',
+                    message.kind, message.id, delay, message.attempts, error)
+
+    # ---------- loop ----------
+
+    def run_once(self, wait=True):
+        """Claim and dispatch up to `concurrency` due messages; returns how many"""
+        dispatched = 0
+        with self.app.app_context():
+            try:
+                for message_id in self._due_ids(self.concurrency):
+                    if not self._slots.acquire(blocking=False):
+                        break  # pool is full; the rest waits for the next round
+                    if not self._claim(message_id):
+                        self._slots.release()  # another dispatcher got it
+                        continue
+                    self._executor.submit(self._deliver, message_id)
+                    dispatched += 1
+            finally:
+                db.session.remove()
+        if wait:
+            # Block until every in-flight delivery finished (tests, --once)
+            for _ in range(self.concurrency):
+                self._slots.acquire()
+            for _ in range(self.concurrency):
+                self._slots.release()
+        return dispatched
+
+    def run_forever(self):
+        poll = self.config['OUTBOX_POLL_SECONDS']
+        while not self._stop.is_set():
+            try:
+                dispatched = self.run_once(wait=False)
+            except Exception:
+                log.exception('Outbox poll failed')
+                dispatched = 0
+            if not dispatched:
+                self._wakeup.wait(poll)
+                self._wakeup.clear()
+        self._executor.shutdown(wait=True)  # let in-flight deliveries finish
+
+    def wake(self):
+        self._wakeup.set()
+
+    def start_background(self):
+        """Inline mode: drain the outbox from a daemon thread in this process"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run_forever, name='outbox-dispatcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Make run_forever() return once in-flight deliveries are done"""
+        self._stop.set()
+        self._wakeup.set()
+
+
+def init_outbox(app, providers):
+    """Register the live providers ({kind: callable}) for this app"""
+    app.extensions['outbox_providers'] = providers
+    if not event.contains(db.session, 'after_commit', _wake_after_commit):
+        event.listen(db.session, 'after_commit', _wake_after_commit)
+
+
+def _build_dispatcher(app):
+    providers = app.extensions['outbox_providers']
+    if app.config['OUTBOX_PROVIDER'] == 'fake':
+        fake = app.extensions.setdefault('outbox_fake_provider', FakeProvider())
+        providers = {kind: fake for kind in providers}
+    return Dispatcher(app, providers, concurrency=app.config['OUTBOX_CONCURRENCY'])
+
+
+def get_dispatcher(app=None):
+    """This process's Dispatcher (live providers, or FakeProvider for OUTBOX_PROVIDER=fake)"""
+    return app_singleton(app, 'outbox_dispatcher', _build_dispatcher)
+
+
+def ensure_table(app=None):
+    """Create outbox_messages if this database predates it"""
+    app = app or current_app._get_current_object()
+    with app.app_context():
+        OutboxMessage.__table__.create(db.engine, checkfirst=True)
+
+
+def start_inline_dispatcher(app=None):
+    """OUTBOX_DISPATCH=inline: drain the outbox from this (web) process"""
+    app = app or current_app._get_current_object()
+    if app.config['OUTBOX_DISPATCH'] == 'inline':
+        ensure_table(app)
+        get_dispatcher(app).start_background()
@@ -0,0 +1,109 @@
+"""
+Password / PIN hashing
+
+Hashes are stored as "<method>$<salt>$<hash>", the same layout werkzeug
+uses, where <method> names the algorithm and its cost:
+
+    pbkdf2:sha256:260000$salt$hex      (werkzeug's default, existing rows)
+    scrypt:16384:8:1$salt$hex
+
+PASSWORD_HASH_METHOD selects the method for new hashes. A stored hash with
+a different method still verifies, and User.check_password() re-hashes it
+with the current method after a successful login, so changing the cost
+upgrades accounts as their owners log in.
+
+Verification, and hashing a new password or PIN (User.set_password:
+signups, resets), run in a small per-process thread pool
+(PASSWORD_HASH_WORKERS). hashlib releases the GIL while hashing, so the
+pool caps how many CPU cores logins can take; when more than
+PASSWORD_HASH_MAX_PENDING hashes are already waiting, HasherBusy is
+raised and the endpoint answers 503 instead of queueing forever.
+"""
+
+import hashlib
+import hmac
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash
+
+from extensions import app_singleton
+
+SALT_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+
+class HasherBusy(Exception):
+    """Too many password hashes/verifications are already queued"""
+
+
+def _salt(length=16):
+    return ''.join(secrets.choice(SALT_CHARS) for _ in range(length))
+
+
+def _digest(method, salt, password):
+    """Hex digest for a method string like 'pbkdf2:sha256:260000' or 'scrypt:16384:8:1'"""
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2':
+        hash_name = parts[1] if len(parts) > 1 else 'sha256'
+        iterations = int(parts[2]) if len(parts) > 2 else 260000
+        return hashlib.pbkdf2_hmac(hash_name, password.encode(), salt.encode(), iterations).hex()
+    if parts[0] == 'scrypt':
+        n, r, p = (int(x) for x in parts[1:4])
+        return hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+                              maxmem=132 * n * r * p).hex()
+    raise ValueError(f'Unsupported password hash method: {method}')
+
+
+class PasswordHasher:
+    """Hash/verify with one configured method and a bounded verification pool"""
+
+    def __init__(self, method='pbkdf2:sha256:260000', workers=2, max_pending=32):
+        _digest(method, 'salt', '')  # fail fast on a bad method string
+        self.method = method
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pwhash')
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def hash(self, password):
+        salt = _salt()
+        return f'{self.method}${salt}${_digest(self.method, salt, password)}'
+
+    def verify(self, password, stored):
+        """Constant-time check against any supported stored format (runs inline)"""
+        if not stored or stored.count('$') < 2:
+            return False
+        method, salt, expected = stored.split('$', 2)
+        if method.startswith('scrypt:'):
+            return hmac.compare_digest(_digest(method, salt, password), expected)
+        # pbkdf2 with any hash/iterations, plus werkzeug's legacy formats
+        return check_password_hash(stored, password)
+
+    def needs_rehash(self, stored):
+        return not stored or stored.split('$', 1)[0] != self.method
+
+    def run(self, fn, *args):
+        """Run fn in the hashing pool; HasherBusy if the pool is saturated"""
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def verify_bounded(self, password, stored):
+        return self.run(self.verify, password, stored)
+
+    def hash_bounded(self, password):
+        return self.run(self.hash, password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def get_hasher(app=None):
+    """The app's hasher, created on first use (and again in each forked worker)"""
+    return app_singleton(app, 'password_hasher', lambda app: PasswordHasher(
+        app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+    ))
@@ -0,0 +1,43 @@
+"""
+Phone number normalization
+
+users.phone and otp_verifications.phone always hold the canonical form
+produced here (User normalizes on assignment), so every lookup is an exact
+match on the unique index ix_users_phone.
+"""
+
+
+def normalize_phone(phone):
+    """
+    Normalize phone number to international format: +905323133277
+    Standards: Always use +90 prefix for Turkish numbers
+
+        "0532 313 32 77", "532-313-3277", "905323133277",
+        "+90 (532) 313 32 77", "00905323133277"  ->  "+905323133277"
+    """
+    if not phone:
+        return None
+
+    phone = str(phone).strip()
+
+    # Keep digits only (drops spaces, hyphens, parentheses, dots)
+    has_plus = phone.startswith('+')
+    digits = ''.join(ch for ch in phone if ch.isdigit())
+    if not digits:
+        return None
+
+    # Already international: "+<country><number>" or "00<country><number>"
+    if has_plus:
+        return '+' + digits
+    if digits.startswith('00'):
+        return '+' + digits[2:]
+
+    # Remove leading 0 if present (for Turkish numbers entered as 05323133277)
+    if digits.startswith('0'):
+        digits = digits[1:]
+
+    # Add country code if not present (a 10-digit national number never starts with 90)
+    if not (digits.startswith('90') and len(digits) == 12):
+        digits = '90' + digits
+
+    return '+' + digits
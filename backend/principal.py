@@ -0,0 +1,126 @@
+"""
+Authenticated principal for token_required
+
+Every protected request used to decode the JWT and then load the full User
+row (password hash, reset tokens, ...) again in the handler. Instead,
+token_required resolves a small read-only Principal once per request and
+stores it on flask.g, backed by two per-process LRU caches:
+
+    tokens      raw JWT -> user_id, kept until the token's own `exp`
+    principals  user_id -> Principal (id, names, phone, account status),
+                kept for PRINCIPAL_CACHE_TTL seconds
+
+Handlers that change a user's name or account status call
+invalidate_principal(); other workers pick the change up within the TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import jwt
+from flask import current_app, g
+
+from extensions import app_singleton, db
+
+Principal = namedtuple('Principal', [
+    'id', 'first_name', 'last_name', 'phone', 'account_type', 'is_active', 'is_deleted'
+])
+
+
+class ExpiringLRU:
+    """Thread-safe LRU where every entry carries its own expiry (epoch seconds)"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _caches(app=None):
+    """Per-app (and, after reinit_after_fork, per-process) caches"""
+    return app_singleton(app, 'principal_cache', lambda app: {
+        'tokens': ExpiringLRU(app.config['TOKEN_CACHE_SIZE']),
+        'principals': ExpiringLRU(app.config['PRINCIPAL_CACHE_SIZE']),
+    })
+
+
+def decode_token(token):
+    """user_id for a JWT, using the token cache; raises jwt errors like jwt.decode"""
+    tokens = _caches()['tokens']
+    user_id = tokens.get(token)
+    if user_id is not None:
+        return user_id
+    # An expired-but-cached token falls through here and raises ExpiredSignatureError
+    payload = jwt.decode(token, current_app.config['JWT_SECRET'], algorithms=['HS256'])
+    user_id = payload['user_id']
+    tokens.put(token, user_id, payload.get('exp', time.time()))
+    return user_id
+
+
+def load_principal(user_id):
+    """Principal for user_id (None if the user doesn't exist), cached for a short TTL"""
+    principals = _caches()['principals']
+    principal = principals.get(user_id)
+    if principal is not None:
+        return principal
+
+    # Core select on the mapped table: only these columns, no ORM identity map
+    users = db.metadata.tables['users']
+    row = db.session.execute(
+        db.select(
+            users.c.id, users.c.first_name, users.c.last_name, users.c.phone,
+            users.c.account_type, users.c.is_active, users.c.is_deleted
+        ).where(users.c.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    principal = Principal(
+        row.id, row.first_name, row.last_name, row.phone, row.account_type,
+        row.is_active is not False, bool(row.is_deleted)
+    )
+    principals.put(user_id, principal, time.time() + current_app.config['PRINCIPAL_CACHE_TTL'])
+    return principal
+
+
+def invalidate_principal(user_id):
+    """Forget the cached principal after its name or account status changed"""
+    _caches()['principals'].pop(user_id)
+
+
+def current_principal():
+    """The Principal resolved by token_required for this request"""
+    return g.principal
@@ -0,0 +1,203 @@
+"""
+Pooled, persistent SMTP sessions
+
+Opening a session costs a TCP connect, EHLO, STARTTLS and AUTH - several
+round trips, and mail providers throttle accounts that log in too often.
+SMTPPool keeps up to SMTP_POOL_SIZE authenticated sessions per process and
+reuses them for every email the outbox dispatcher sends: pool.send(message)
+borrows a session, sends and gives it back.
+
+A session that the server dropped (idle timeout, restart) is detected on
+use; the pool opens a fresh one and retries the message once. Sessions are
+closed after SMTP_MAX_MESSAGES_PER_SESSION messages or SMTP_IDLE_SECONDS
+without use. pool.stats() reports connections, messages and throughput.
+"""
+
+import smtplib
+import threading
+import time
+
+from extensions import app_singleton
+from logging_config import get_logger
+
+log = get_logger('email')
+
+
+def _is_connection_error(error):
+    """The session is dead (dropped, timed out, 421) - as opposed to a rejected message"""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == 421
+    # SMTPException subclasses OSError; anything else from the socket layer is fatal
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class _Session:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.opened_at = time.monotonic()
+        self.last_used = self.opened_at
+        self.sent = 0
+        self.reused = False  # has carried a message before; may have gone stale meanwhile
+
+
+class SMTPPool:
+    """Thread-safe pool of logged-in SMTP sessions to one server"""
+
+    def __init__(self, host, port, username=None, password=None, size=2, starttls=True,
+                 use_ssl=False, timeout=10, max_messages=100, max_idle=60):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.max_idle = max_idle
+        self._idle = []  # LIFO: the most recently used session is the least likely to be stale
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)  # caps concurrent connections to the provider
+        self._counters = {
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'reconnects': 0,
+            'messages_sent': 0,
+            'messages_failed': 0,
+        }
+        self._busy_seconds = 0.0
+
+    # ---------- sessions ----------
+
+    def _open(self):
+        started = time.monotonic()
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls and not self.use_ssl:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        self._count('connections_opened')
+        log.debug('SMTP session opened to %s:%s in %.0f ms', self.host, self.port,
+                  (time.monotonic() - started) * 1000)
+        return _Session(smtp)
+
+    def _close(self, smtp, polite=True):
+        try:
+            smtp.quit() if polite else smtp.close()
+        except Exception:
+            smtp.close()
+
+    def _discard(self, session, polite=True):
+        self._close(session.smtp, polite)
+        self._count('connections_closed')
+
+    def _checkout(self):
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                return self._open()
+            if now - session.last_used > self.max_idle:
+                self._discard(session)  # the server has probably timed it out already
+                continue
+            return session
+
+    def _checkin(self, session):
+        session.last_used = time.monotonic()
+        if session.sent >= self.max_messages:
+            self._discard(session)
+            return
+        with self._lock:
+            self._idle.append(session)
+
+    # ---------- sending ----------
+
+    def send(self, message):
+        """Send one email.message.Message on a pooled session
+
+        A session that turns out to be dead is replaced and the message
+        retried once; a rejected message (bad recipient, ...) is not retried
+        and its session is kept.
+        """
+        with self._slots:
+            started = time.monotonic()
+            session = None
+            try:
+                for attempt in (1, 2):
+                    try:
+                        if session is None:
+                            session = self._checkout()
+                        session.smtp.send_message(message)
+                    except Exception as e:
+                        if session is not None and _is_connection_error(e):
+                            self._discard(session, polite=False)
+                            stale, session = session.reused, None
+                            if attempt == 1 and stale:
+                                self._count('reconnects')
+                                continue
+                        self._count('messages_failed')
+                        raise
+                    session.sent += 1
+                    session.reused = True
+                    self._count('messages_sent')
+                    return
+            finally:
+                if session is not None:
+                    self._checkin(session)
+                with self._lock:
+                    self._busy_seconds += time.monotonic() - started
+
+    # ---------- metrics / lifecycle ----------
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        """Counters plus derived throughput (messages per busy second, per connection)"""
+        with self._lock:
+            stats = dict(self._counters)
+            busy = self._busy_seconds
+            stats['idle_sessions'] = len(self._idle)
+        sent = stats['messages_sent']
+        stats['busy_seconds'] = round(busy, 3)
+        stats['messages_per_second'] = round(sent / busy, 1) if busy else 0.0
+        stats['messages_per_connection'] = round(sent / stats['connections_opened'], 1) \
+            if stats['connections_opened'] else 0.0
+        stats['avg_send_ms'] = round(busy / sent * 1000, 1) if sent else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            self._discard(session)
+
+
+def _build_smtp_pool(app):
+    config = app.config
+    return SMTPPool(
+        config['SMTP_SERVER'], config['SMTP_PORT'],
+        username=config['SENDER_EMAIL'], password=config['SENDER_PASSWORD'],
+        size=config['SMTP_POOL_SIZE'],
+        starttls=config['SMTP_STARTTLS'],
+        use_ssl=config['SMTP_PORT'] == 465,
+        timeout=config['SMTP_TIMEOUT'],
+        max_messages=config['SMTP_MAX_MESSAGES_PER_SESSION'],
+        max_idle=config['SMTP_IDLE_SECONDS'],
+    )
+
+
+def get_smtp_pool(app=None):
+    """This process's SMTPPool for the configured server (built on first use)"""
+    return app_singleton(app, 'smtp_pool', _build_smtp_pool)
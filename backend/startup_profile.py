@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Startup profiling for backend.app
+
+app.py calls checkpoint() after each initialization phase; the recorded
+timings are reported by the `startup-profile` command, which imports the
+app in a fresh interpreter so the numbers reflect a real cold start
+(Render deploy, gunicorn worker respawn).
+
+Usage:
+    python backend/startup_profile.py [--budget SECONDS] [--json]
+    FLASK_APP=backend.app flask startup-profile [--budget SECONDS]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Phase name -> seconds, in the order they were recorded
+_phases = []
+_last_mark = time.perf_counter()
+
+
+def checkpoint(name):
+    """Record the time spent since the previous checkpoint under `name`"""
+    global _last_mark
+    now = time.perf_counter()
+    _phases.append((name, now - _last_mark))
+    _last_mark = now
+
+
+def report():
+    """Return the recorded phases as a JSON-serializable dict"""
+    return {
+        'phases': [{'name': name, 'seconds': round(seconds, 4)} for name, seconds in _phases],
+        'total_seconds': round(sum(seconds for _, seconds in _phases), 4)
+    }
+
+
+# Runs in the child interpreter: import the app, then dump the phase report
+_CHILD_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import backend.app
+import startup_profile
+result = startup_profile.report()
+result['wall_seconds'] = round(time.perf_counter() - started, 4)
+with open({out!r}, 'w') as f:
+    json.dump(result, f)
+"""
+
+
+def profile_cold_start():
+    """Import backend.app in a fresh interpreter and return its phase report"""
+    with tempfile.TemporaryDirectory() as tmp:
+        out_file = os.path.join(tmp, 'startup_profile.json')
+        script = _CHILD_SCRIPT.format(root=str(PROJECT_ROOT), out=out_file)
+        proc = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=str(PROJECT_ROOT),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"backend.app failed to import:\n{proc.stderr}")
+        with open(out_file) as f:
+            return json.load(f)
+
+
+def format_report(result, budget=None):
+    """Render a phase report as a human-readable table"""
+    lines = [f"{'Phase':<24} {'Seconds':>9}", '-' * 34]
+    for item in result['phases']:
+        lines.append(f"{item['name']:<24} {item['seconds']:>9.4f}")
+    lines.append('-' * 34)
+    lines.append(f"{'total (phases)':<24} {result['total_seconds']:>9.4f}")
+    lines.append(f"{'wall (import)':<24} {result['wall_seconds']:>9.4f}")
+    if budget is not None:
+        status = 'OK' if result['wall_seconds'] <= budget else 'OVER BUDGET'
+        lines.append(f"{'budget':<24} {budget:>9.4f}  {status}")
+    return '\n'.join(lines)
+
+
+def run(budget=None, as_json=False):
+    """Profile a cold start, print the report and return a process exit code"""
+    result = profile_cold_start()
+    if as_json:
+        result['budget_seconds'] = budget
+        print(json.dumps(result, indent=2))
+    else:
+        print(format_report(result, budget))
+    if budget is not None and result['wall_seconds'] > budget:
+        return 1
+    return 0
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Report backend.app import/initialization time per phase')
+    parser.add_argument('--budget', type=float, default=os.getenv('STARTUP_BUDGET_SECONDS'),
+                        help='Fail (exit 1) if the cold import takes longer than this many seconds')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+    budget = float(args.budget) if args.budget is not None else None
+    return run(budget=budget, as_json=args.json)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
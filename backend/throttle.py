@@ -0,0 +1,206 @@
+"""
+Login throttling with token buckets
+
+Each key ("phone:+905551112233", "email:a@example.com", "ip:203.0.113.7")
+owns a bucket of `capacity` tokens that refills continuously at
+`capacity / period` tokens per second. An attempt takes one token; an empty
+bucket means the attempt is rejected with the number of seconds until a
+token is available.
+
+Only failures should count. The IP token is taken before the request is
+read (so a flood is turned away cheaply) and given back when the login or
+signup succeeds: a restaurant's shared NAT with a table of phones signing
+in doesn't use up its budget. A success also clears the account's bucket.
+
+Stores (THROTTLE_STORE):
+    memory   per-process dict - fine for a single worker / development
+    sql      a `throttle_buckets` table, shared by every worker that points
+             at the same database (THROTTLE_STORE_URL, default: the app DB;
+             a SQLite file works for several workers on one host)
+
+Limits are written "<attempts>/<seconds>", e.g. LOGIN_THROTTLE_PHONE=5/900
+allows a burst of 5 PIN guesses per phone, refilling 5 per 15 minutes.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+from sqlalchemy import Column, Float, MetaData, String, Table, create_engine, event, select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import app_singleton
+
+
+def parse_limit(spec):
+    """'5/900' -> (capacity=5, refill_per_second=5/900)"""
+    attempts, seconds = spec.split('/', 1)
+    capacity = float(attempts)
+    return capacity, capacity / float(seconds)
+
+
+def _refill(tokens, updated_at, capacity, rate, now):
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+def _retry_after(tokens, rate, cost):
+    return max(1, math.ceil((cost - tokens) / rate)) if rate > 0 else 3600
+
+
+class MemoryBucketStore:
+    """Buckets in a per-process LRU dict (least recently used keys are dropped)"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1, now=None):
+        """(allowed, retry_after_seconds)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated_at, capacity, rate, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else _retry_after(tokens, rate, cost)
+
+    def refund(self, key, capacity, rate, cost=1, now=None):
+        """Give back a token taken by an attempt that turned out to be legitimate"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated_at = self._buckets[key]
+                self._buckets[key] = (min(capacity, _refill(tokens, updated_at, capacity, rate, now) + cost), now)
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+
+
+def _sqlite_manual_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+class SQLBucketStore:
+    """Buckets in a database table, updated under a row/database write lock"""
+
+    def __init__(self, url):
+        if url.startswith('sqlite'):
+            self.engine = create_engine(url, connect_args={'timeout': 5})
+            # SQLite ignores FOR UPDATE: take the write lock when the
+            # transaction starts instead (SQLAlchemy's pysqlite recipe)
+            event.listen(self.engine, 'connect', _sqlite_manual_transactions)
+            event.listen(self.engine, 'begin', lambda conn: conn.exec_driver_sql('BEGIN IMMEDIATE'))
+        else:
+            self.engine = create_engine(url, pool_pre_ping=True)
+        self.table = Table(
+            'throttle_buckets', MetaData(),
+            Column('key', String(120), primary_key=True),
+            Column('tokens', Float, nullable=False),
+            Column('updated_at', Float, nullable=False),
+        )
+        self.table.create(self.engine, checkfirst=True)
+
+    def _take_once(self, conn, key, capacity, rate, cost, now):
+        t = self.table
+        row = conn.execute(select(t.c.tokens, t.c.updated_at).where(t.c.key == key).with_for_update()).first()
+        if row is None:
+            tokens = capacity
+        else:
+            tokens = _refill(row.tokens, row.updated_at, capacity, rate, now)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        if row is None:
+            conn.execute(t.insert().values(key=key, tokens=tokens, updated_at=now))
+        else:
+            conn.execute(t.update().where(t.c.key == key).values(tokens=tokens, updated_at=now))
+        return allowed, 0 if allowed else _retry_after(tokens, rate, cost)
+
+    def take(self, key, capacity, rate, cost=1, now=None):
+        now = time.time() if now is None else now
+        for attempt in range(2):
+            try:
+                with self.engine.begin() as conn:
+                    return self._take_once(conn, key, capacity, rate, cost, now)
+            except IntegrityError:
+                # Another worker created the same bucket first; its row is locked-readable now
+                if attempt:
+                    raise
+
+    def refund(self, key, capacity, rate, cost=1, now=None):
+        now = time.time() if now is None else now
+        t = self.table
+        with self.engine.begin() as conn:
+            row = conn.execute(select(t.c.tokens, t.c.updated_at).where(t.c.key == key).with_for_update()).first()
+            if row is not None:
+                tokens = min(capacity, _refill(row.tokens, row.updated_at, capacity, rate, now) + cost)
+                conn.execute(t.update().where(t.c.key == key).values(tokens=tokens, updated_at=now))
+
+    def reset(self, key):
+        with self.engine.begin() as conn:
+            conn.execute(self.table.delete().where(self.table.c.key == key))
+
+    def after_fork(self):
+        self.engine.dispose(close=False)
+
+
+class LoginThrottle:
+    """Per-IP, per-phone (PIN login) and per-email (password login) limits over one bucket store"""
+
+    def __init__(self, store, phone_limit='5/900', ip_limit='30/600', email_limit='5/900'):
+        self.store = store
+        self.phone_limit = parse_limit(phone_limit)
+        self.ip_limit = parse_limit(ip_limit)
+        self.email_limit = parse_limit(email_limit)
+
+    def check_ip(self, ip):
+        return self.store.take(f'ip:{ip}', *self.ip_limit)
+
+    def check_phone(self, phone):
+        return self.store.take(f'phone:{phone}', *self.phone_limit)
+
+    def check_email(self, email):
+        return self.store.take(f'email:{email.strip().lower()}', *self.email_limit)
+
+    def succeeded(self, ip, phone=None, email=None):
+        """A login or signup succeeded: refund its IP token and clear the account's bucket"""
+        self.store.refund(f'ip:{ip}', *self.ip_limit)
+        if phone:
+            self.store.reset(f'phone:{phone}')
+        if email:
+            self.store.reset(f'email:{email.strip().lower()}')
+
+
+def _build_login_throttle(app):
+    if app.config['THROTTLE_STORE'] == 'sql':
+        store = SQLBucketStore(app.config['THROTTLE_STORE_URL'] or app.config['SQLALCHEMY_DATABASE_URI'])
+    else:
+        store = MemoryBucketStore()
+    return LoginThrottle(store, app.config['LOGIN_THROTTLE_PHONE'], app.config['LOGIN_THROTTLE_IP'],
+                         app.config['LOGIN_THROTTLE_EMAIL'])
+
+
+def get_login_throttle(app=None):
+    """The app's LoginThrottle, created on first use"""
+    return app_singleton(app, 'login_throttle', _build_login_throttle)
+
+
+def client_ip():
+    """Client address, trusting TRUSTED_PROXY_COUNT hops of X-Forwarded-For"""
+    route = request.access_route
+    hops = current_app.config['TRUSTED_PROXY_COUNT']
+    if hops and len(route) >= hops and request.headers.get('X-Forwarded-For'):
+        return route[-hops]
+    return request.remote_addr or 'unknown'
@@ -0,0 +1,306 @@
+"""
+Guarded calls to Twilio Verify
+
+request-otp (through the outbox) and verify-otp used to call Twilio inline
+with no timeout, so a slow Twilio held a gunicorn thread per request until
+every worker was stuck on it. VerifyGateway puts three guards in front of
+the provider:
+
+    timeout     each call waits at most TWILIO_TIMEOUT seconds for an answer
+                (the HTTP client gets the same timeout, so the thread is
+                freed too)
+    bulkhead    calls run on a dedicated pool of TWILIO_MAX_CONCURRENT
+                threads; when all of them are busy, new calls are rejected
+                at once instead of queueing behind a hung provider
+    breaker     when at least TWILIO_BREAKER_THRESHOLD of the calls in the
+                last TWILIO_BREAKER_WINDOW seconds failed (and there were
+                TWILIO_BREAKER_MIN_CALLS of them), calls fail fast for
+                TWILIO_BREAKER_COOLDOWN seconds; then a single probe call
+                decides whether to close it again
+
+Every rejection raises ProviderUnavailable, which the API answers with 503
+and a Retry-After header. A 4xx from Twilio (wrong number, expired
+verification) is the caller's problem and doesn't count against the
+provider. gateway.stats() reports calls, errors, rejections and latency.
+
+The provider itself is a small backend object, so tests can swap Twilio
+for FakeVerifyBackend, which can be slow or failing on demand. It approves
+a fixed code for any phone, so only a TESTING app ever uses it.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from extensions import app_singleton
+from logging_config import get_logger
+
+log = get_logger('otp')
+
+LATENCY_SAMPLES = 512
+
+
+class ProviderUnavailable(Exception):
+    """The SMS provider is failing, too slow, or already saturated; retry later"""
+
+    def __init__(self, reason, retry_after=1):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+def is_client_error(error):
+    """A 4xx answer (other than 429): the request was wrong, the provider is fine"""
+    status = getattr(error, 'status', None)
+    return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+
+class CircuitBreaker:
+    """Error-rate breaker over a sliding time window: closed -> open -> half-open"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, threshold=0.5, min_calls=10, window=30, cooldown=30, clock=time.monotonic):
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.opened = 0
+        self._outcomes = deque()  # (timestamp, ok)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def retry_after(self):
+        """Seconds until an open breaker lets a probe through"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(0.0, self._opened_at + self.cooldown - self.clock())
+
+    def is_open(self):
+        """Would a call be rejected right now? (doesn't use up the half-open probe)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return self.clock() < self._opened_at + self.cooldown
+            return self.state == self.HALF_OPEN and self._probing
+
+    def allow(self):
+        """Admit one call; False while open or while the half-open probe is out"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() < self._opened_at + self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record(self, ok):
+        with self._lock:
+            now = self.clock()
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if ok:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                    log.info('Twilio circuit closed again')
+                else:
+                    self._open(now)
+                return
+            self._outcomes.append((now, ok))
+            self._trim(now)
+            if self.state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for _, outcome in self._outcomes if not outcome)
+                if failures / len(self._outcomes) >= self.threshold:
+                    self._open(now)
+                    log.warning('Twilio circuit opened: %s of the last %s calls failed',
+                                failures, len(self._outcomes))
+
+    def _open(self, now):
+        self.state = self.OPEN
+        self._opened_at = now
+        self.opened += 1
+        self._outcomes.clear()
+
+
+class TwilioVerifyBackend:
+    """The real provider: one Twilio client and Verify service"""
+
+    def __init__(self, client, service_sid):
+        self.client = client
+        self.service_sid = service_sid
+
+    def start(self, phone):
+        verification = self.client.verify.v2.services(self.service_sid) \
+            .verifications.create(to=phone, channel='sms')
+        return {'sid': verification.sid, 'status': verification.status}
+
+    def check(self, phone, code):
+        check = self.client.verify.v2.services(self.service_sid) \
+            .verification_checks.create(to=phone, code=code)
+        return {'status': check.status, 'to': check.to}
+
+
+class FakeVerifyBackend:
+    """Offline Verify service: approves `code`; can be slow or fail on demand"""
+
+    def __init__(self, code='123456', delay=0.0, fail_times=0, error=ConnectionError):
+        self.code = code
+        self.delay = delay
+        self.fail_times = fail_times
+        self.error = error
+        self.started = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.calls += 1
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise self.error('fake Verify service unavailable')
+
+    def start(self, phone):
+        self._call()
+        with self._lock:
+            self.started.append(phone)
+            return {'sid': f'VEfake{len(self.started)}', 'status': 'pending'}
+
+    def check(self, phone, code):
+        self._call()
+        return {'status': 'approved' if code == self.code else 'pending', 'to': phone}
+
+
+class VerifyGateway:
+    """Timeout + bulkhead + circuit breaker around a Verify backend"""
+
+    def __init__(self, backend, timeout=5.0, max_concurrent=4, breaker=None):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_concurrent = max_concurrent
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='twilio')
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._counters = {'calls': 0, 'succeeded': 0, 'failed': 0, 'client_errors': 0,
+                          'timeouts': 0, 'rejected_open': 0, 'rejected_busy': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def start_verification(self, phone):
+        """Send a verification SMS: {'sid', 'status'}"""
+        return self.call(self.backend.start, phone)
+
+    def check_verification(self, phone, code):
+        """Check a code: {'status', 'to'}"""
+        return self.call(self.backend.check, phone, code)
+
+    def call(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected_busy')
+            raise ProviderUnavailable('too many calls in flight')
+        if not self.breaker.allow():
+            self._slots.release()
+            self._count('rejected_open')
+            raise ProviderUnavailable('circuit open', self.breaker.retry_after())
+        self._count('calls')
+        started = time.monotonic()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is freed when the call really ends, not when we stop waiting:
+        # a hung call keeps holding one, which is what caps the stuck threads
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self._finish(started, ok=False, counter='timeouts')
+            log.warning('Twilio call timed out after %.1fs', self.timeout)
+            raise ProviderUnavailable('provider timed out', self.breaker.retry_after())
+        except Exception as e:
+            if is_client_error(e):
+                self._finish(started, ok=True, counter='client_errors')
+            else:
+                self._finish(started, ok=False, counter='failed')
+            raise
+        self._finish(started, ok=True, counter='succeeded')
+        return result
+
+    def _finish(self, started, ok, counter):
+        elapsed = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._counters[counter] += 1
+            self._latencies.append(elapsed)
+        self.breaker.record(ok)
+
+    def stats(self):
+        """Counters, breaker state and latency percentiles (ms) of the recent calls"""
+        with self._lock:
+            stats = dict(self._counters)
+            latencies = sorted(self._latencies)
+        stats['breaker'] = self.breaker.state
+        stats['breaker_opened'] = self.breaker.opened
+        if latencies:
+            stats['latency_ms'] = {
+                'p50': round(latencies[len(latencies) // 2], 1),
+                'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                'max': round(latencies[-1], 1),
+            }
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def build_gateway(config, backend):
+    return VerifyGateway(
+        backend,
+        timeout=config['TWILIO_TIMEOUT'],
+        max_concurrent=config['TWILIO_MAX_CONCURRENT'],
+        breaker=CircuitBreaker(
+            threshold=config['TWILIO_BREAKER_THRESHOLD'],
+            min_calls=config['TWILIO_BREAKER_MIN_CALLS'],
+            window=config['TWILIO_BREAKER_WINDOW'],
+            cooldown=config['TWILIO_BREAKER_COOLDOWN'],
+        ),
+    )
+
+
+def get_gateway(app=None, client_factory=None):
+    """This process's VerifyGateway (None if Twilio isn't configured)
+
+    Under TESTING, OUTBOX_PROVIDER=fake uses FakeVerifyBackend; otherwise
+    client_factory() must return a Twilio client (or None when Twilio is not
+    configured). FakeVerifyBackend approves a fixed code for any phone, so
+    outside TESTING the fake provider never reaches it: verification goes
+    to Twilio or fails with None.
+    """
+    def build(app):
+        if app.config['OUTBOX_PROVIDER'] == 'fake' and app.config['TESTING']:
+            backend = FakeVerifyBackend()
+        else:
+            client = client_factory() if client_factory else None
+            if client is None:
+                return None
+            backend = TwilioVerifyBackend(client, app.config['TWILIO_SERVICE_SID'])
+        return build_gateway(app.config, backend)
+
+    return app_singleton(app, 'twilio_gateway', build)
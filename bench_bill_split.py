@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: splitting 1,000-item, 200-member bills (corporate events)
+
+Builds one order per scenario, with a 10% tip and 8% tax:
+
+    everyone  every item shared equally by all members
+    tables    tables of 8; each item is personal or shared by 2-8 people
+              of its table, weights 1-3 (who had how many glasses)
+    dense     each item shared by 50-200 random members, weights 1-3:
+              the allocation matrix is nearly full
+
+and splits it two ways, reporting the time per split, the matrix's nonzero
+entries and what the members' totals, rounded to the kuruş, miss the bill
+by:
+
+    float   the dense items x members float matrix (amount * weight /
+            total weight), extras by consumption ratio, each member's total
+            rounded to 2 decimals
+    engine  bill_split.split_order: integer kuruş, items with the same
+            weights allocated as one column, largest-remainder rounding
+
+Usage:
+    python bench_bill_split.py [--items 1000] [--members 200] [--repeat 20] [--seed 1]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT / 'backend'))
+
+from bill_split import PERSONAL, SHARED, SplitItem, SplitOrder, split_order, to_minor  # noqa: E402
+
+TIP, TAX = 0.10, 0.08
+
+
+def build_items(scenario, items, members, rng):
+    """[(name, price in lira, split type, owner, {member: weight} or None)]"""
+    rows = []
+    for i in range(items):
+        price = rng.randrange(1500, 250000) / 100
+        if scenario == 'everyone':
+            rows.append((f'item {i}', price, SHARED, None, None))
+            continue
+        if scenario == 'tables':
+            table = rng.randrange(0, members, 8)
+            people = list(range(table, min(table + 8, members)))
+            if rng.random() < 0.4:
+                rows.append((f'item {i}', price, PERSONAL, rng.choice(people), None))
+                continue
+            people = rng.sample(people, min(len(people), rng.randint(2, 8)))
+        else:
+            people = rng.sample(range(members), rng.randint(50, members))
+        rows.append((f'item {i}', price, SHARED, None, {m: rng.randint(1, 3) for m in people}))
+    return rows
+
+
+def float_split(rows, members):
+    """{member: total in lira}: the dense float matrix"""
+    consumption = [0.0] * members
+    for name, price, split_type, owner, weights in rows:
+        if split_type == PERSONAL:
+            consumption[owner] += price
+            continue
+        row = [weights.get(m, 0) if weights else 1 for m in range(members)]
+        total_weight = sum(row)
+        for m in range(members):
+            consumption[m] += price * row[m] / total_weight
+    charged = sum(consumption)
+    return {m: round(c + (TIP + TAX) * charged * c / charged, 2) for m, c in enumerate(consumption)}
+
+
+def engine_split(rows, members):
+    """{member: total in kuruş} through bill_split"""
+    charged = sum(to_minor(price) for _, price, *_ in rows)
+    order = SplitOrder(1, 0, [SplitItem(name, to_minor(price), 1, split_type, owner, weights)
+                              for name, price, split_type, owner, weights in rows],
+                       tip=round(charged * TIP), tax=round(charged * TAX))
+    return {m: share.total for m, share in split_order(order, range(members)).items()}
+
+
+def timed(fn, repeat):
+    latencies, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--members', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f'{args.items} items, {args.members} members, median of {args.repeat} splits')
+    print()
+    print('| scenario | nonzero entries | columns | float ms | float off by | engine ms | engine off by |')
+    print('|---|---|---|---|---|---|---|')
+    for scenario in ('everyone', 'tables', 'dense'):
+        rows = build_items(scenario, args.items, args.members, random.Random(args.seed))
+        charged = sum(to_minor(price) for _, price, *_ in rows)
+        bill = charged + round(charged * TIP) + round(charged * TAX)
+        entries = sum(len(w) if w else (args.members if t == SHARED else 1) for _, _, t, _, w in rows)
+        columns = len({tuple(w.items()) if w else None for _, _, t, _, w in rows if t == SHARED})
+
+        float_ms, totals = timed(lambda: float_split(rows, args.members), args.repeat)
+        float_off = sum(to_minor(total) for total in totals.values()) - bill
+        engine_ms, totals = timed(lambda: engine_split(rows, args.members), args.repeat)
+        engine_off = sum(totals.values()) - bill
+        print(f'| {scenario} | {entries:,} | {columns} | {float_ms:.1f} | {float_off:+d} kuruş | '
+              f'{engine_ms:.1f} | {engine_off:+d} kuruş |')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: group code allocation at 10%, 50% and 90% occupancy
+
+For each occupancy, builds a SQLite database whose groups table holds that
+share of the 1,000,000 codes in active groups (plus --closed of closed
+groups), then creates --groups groups two ways and reports statements and
+latency per group:
+
+    legacy     random code + SELECT until one is free (up to 100), INSERT
+    allocator  group_codes.GroupCodeAllocator: INSERT in a SAVEPOINT,
+               retry on the unique index, probe a block when crowded,
+               reclaim codes from closed groups
+
+Usage:
+    python bench_group_codes.py [--occupancy 0.1 0.5 0.9] [--groups 500] [--closed 0.05]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT / 'backend'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from sqlalchemy import event  # noqa: E402
+
+from group_codes import CODE_SPACE, GroupCodeAllocator, random_code  # noqa: E402
+
+
+def build_database(path, occupancy, closed):
+    """Schema from the app models, then bulk active/closed groups on random codes"""
+    from app import create_app, db
+    from config import TestingConfig
+
+    app = create_app(TestingConfig(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}'))
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+    active_count = int(CODE_SPACE * occupancy)
+    closed_count = int(CODE_SPACE * closed)
+    codes = random.sample(range(CODE_SPACE), active_count + closed_count)
+    conn = sqlite3.connect(path)
+    for start in range(0, len(codes), 50000):
+        conn.executemany('INSERT INTO groups (name, code, is_active, menu_locked) VALUES (?, ?, ?, 0)', [
+            ('Bench', f'{code:06d}', i < active_count)
+            for i, code in enumerate(codes[start:start + 50000], start)])
+    conn.commit()
+    conn.close()
+    return app
+
+
+def legacy_insert(session, group):
+    """The old create_group loop"""
+    from app import Group
+
+    code = random_code()
+    attempts = 0
+    while Group.query.filter_by(code=code).first() and attempts < 100:
+        code = random_code()
+        attempts += 1
+    group.code = code
+    session.add(group)
+    session.flush()
+    return code
+
+
+def run(app, insert, groups):
+    from app import Group, db
+
+    latencies = []
+    statements = [0]
+    failures = 0
+    with app.app_context():
+        def count(*args):
+            statements[0] += 1
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            for _ in range(groups):
+                started = time.perf_counter()
+                try:
+                    insert(db.session, Group(name='Bench'))
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    failures += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        db.engine.dispose()
+    latencies.sort()
+    return {
+        'statements': statements[0] / groups,
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'failures': failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--occupancy', type=float, nargs='+', default=[0.1, 0.5, 0.9])
+    parser.add_argument('--groups', type=int, default=500)
+    parser.add_argument('--closed', type=float, default=0.05, help='share of codes held by closed groups')
+    args = parser.parse_args()
+
+    rows = []
+    for occupancy in args.occupancy:
+        path = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        try:
+            started = time.time()
+            app = build_database(path, occupancy, args.closed)
+            print(f'{occupancy:.0%} occupancy: built in {time.time() - started:.1f}s')
+            legacy = run(app, legacy_insert, args.groups)
+            allocator = GroupCodeAllocator()
+            new = run(app, allocator.insert, args.groups)
+            rows.append((occupancy, legacy, new, allocator.stats()))
+        finally:
+            os.unlink(path)
+
+    print()
+    print('| occupancy | legacy stmts/group | legacy p50 / p99 ms | allocator stmts/group | allocator p50 / p99 ms | inserts/group | probes | reclaimed |')
+    print('|---|---|---|---|---|---|---|---|')
+    for occupancy, legacy, new, stats in rows:
+        print(f"| {occupancy:.0%} + {args.closed:.0%} closed | {legacy['statements']:.2f} | "
+              f"{legacy['p50']:.2f} / {legacy['p99']:.2f} | {new['statements']:.2f} | "
+              f"{new['p50']:.2f} / {new['p99']:.2f} | {stats['inserts'] / max(stats['allocated'], 1):.2f} | "
+              f"{stats['probes']} | {stats['reclaimed']} |")
+
+
+if __name__ == '__main__':
+    main()
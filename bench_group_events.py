@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: idle SSE streams per process (group_events.py under gevent)
+
+Opens --streams group event streams as greenlets, the way a gevent worker
+(GUNICORN_WORKER_CLASS=gevent) holds them, spread over groups of --members
+streams each, and reports:
+
+    memory   RSS growth per idle stream
+    idle     CPU used while every stream waits (heartbeats only)
+    fan-out  publish -> last stream of a group has the event, while the
+             other streams stay idle
+
+Usage:
+    python bench_group_events.py [--streams 5000] [--members 20] [--publishes 200]
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse  # noqa: E402
+import os  # noqa: E402
+import resource  # noqa: E402
+import statistics  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+import gevent  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from group_events import EventBroker, GroupEvents, MemoryBackend  # noqa: E402
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--streams', type=int, default=5000)
+    parser.add_argument('--members', type=int, default=20, help='streams per group')
+    parser.add_argument('--publishes', type=int, default=200)
+    parser.add_argument('--heartbeat', type=float, default=15)
+    args = parser.parse_args()
+
+    broker = EventBroker()
+    events = GroupEvents(MemoryBackend(broker), broker, heartbeat=args.heartbeat,
+                         max_stream_seconds=3600, max_streams=args.streams)
+    groups = args.streams // args.members
+    received = {}  # group_id -> [arrival times of the latest event]
+
+    def client(group_id):
+        for message in events.stream(events.subscribe(group_id), current_version=1):
+            if message.startswith('id:'):
+                received.setdefault(group_id, []).append(time.perf_counter())
+
+    before = rss_mb()
+    started = time.perf_counter()
+    clients = [gevent.spawn(client, i % groups) for i in range(args.streams)]
+    gevent.sleep(0.5)
+    opened_s = time.perf_counter() - started
+    per_stream_kb = (rss_mb() - before) * 1024 / args.streams
+
+    received.clear()  # the initial `version` events
+    cpu = time.process_time()
+    gevent.sleep(5)
+    idle_cpu = (time.process_time() - cpu) / 5 * 100
+
+    latencies = []
+    for n in range(args.publishes):
+        group_id = n % groups
+        received.pop(group_id, None)
+        published = time.perf_counter()
+        events.publish(group_id, n + 2, 'order_created', order_id=n)
+        while len(received.get(group_id, ())) < args.members:
+            gevent.sleep(0)
+        latencies.append((max(received[group_id]) - published) * 1000)
+
+    gevent.killall(clients)
+    latencies.sort()
+    print(f'{args.streams} streams over {groups} groups opened in {opened_s:.2f}s')
+    print()
+    print('| metric | result |')
+    print('|---|---|')
+    print(f'| memory per idle stream | {per_stream_kb:.1f} KB |')
+    print(f'| CPU while idle | {idle_cpu:.1f}% of a core |')
+    print(f'| fan-out to {args.members} streams, p50 / p99 | '
+          f'{statistics.median(latencies):.2f} / {latencies[int(len(latencies) * 0.99)]:.2f} ms |')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a 50-phone join burst on one group (POST /api/groups/join)
+
+Builds a SQLite database with an event-sized group (--members existing
+members), then releases --phones threads at once, each joining the group
+with its own token; --double-tap of them send the request twice, like a
+phone that scanned the QR code twice. Each mode runs on a fresh copy:
+
+    legacy   the old handler: User load, `user in group.members` (loads
+             every member), members.append, commit
+    single   insert-if-absent per join, one transaction each
+             (GROUP_JOIN_BATCH_MS=0)
+    batched  joins within GROUP_JOIN_BATCH_MS share one transaction
+             (join_batcher.py)
+
+and reports responses by status, commits, the burst's wall time and the
+per-request latency.
+
+Usage:
+    python bench_group_joins.py [--phones 50] [--members 200] [--double-tap 0.2] [--window-ms 20]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT / 'backend'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from flask import jsonify, request  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+GROUP_CODE = '123456'
+
+
+def build_database(path, phones, members):
+    from app import Group, User, create_app, db, group_members
+    from config import TestingConfig
+
+    app = create_app(TestingConfig(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}'))
+    with app.app_context():
+        db.create_all()
+        users = [User(first_name=f'u{i}', last_name='Bench', email=f'u{i}@example.com', password_hash='x')
+                 for i in range(members + phones)]
+        db.session.add_all(users)
+        db.session.flush()
+        group = Group(name='Düğün', code=GROUP_CODE, created_by=users[0].id)
+        db.session.add(group)
+        db.session.flush()
+        db.session.execute(group_members.insert(), [
+            {'group_id': group.id, 'user_id': u.id} for u in users[:members]])
+        db.session.commit()
+        phone_ids = [u.id for u in users[members:]]
+        db.engine.dispose()
+    return phone_ids
+
+
+def legacy_join():
+    """The handler before membership inserts were idempotent"""
+    from app import Group, User, db
+
+    try:
+        group = Group.query.filter_by(code=request.get_json()['code']).first()
+        user = db.session.get(User, request.user_id)
+        if user in group.members:
+            return jsonify({'message': 'Already a member of this group'}), 200
+        group.members.append(user)
+        db.session.commit()
+        return jsonify({'message': 'Successfully joined group'}), 201
+    except Exception:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to join group. Please try again.'}), 500
+
+
+def run(mode, template, phone_ids, double_tap, window_ms):
+    from app import create_app, db, generate_token, token_required
+    from config import TestingConfig
+
+    workdir = tempfile.mkdtemp()
+    path = Path(workdir) / 'hesap.db'
+    shutil.copy(template, path)
+    app = create_app(TestingConfig(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}',
+                                   GROUP_JOIN_BATCH_MS=window_ms if mode == 'batched' else 0))
+    url = '/api/groups/join'
+    if mode == 'legacy':
+        url = '/bench/legacy-join'
+        app.add_url_rule(url, 'legacy_join', token_required(legacy_join), methods=['POST'])
+
+    commits = [0]
+    with app.app_context():
+        event.listen(db.engine, 'commit', lambda conn: commits.__setitem__(0, commits[0] + 1))
+        tokens = [generate_token(user_id) for user_id in phone_ids]
+    taps = [token for token in tokens] + tokens[:int(len(tokens) * double_tap)]
+
+    statuses, latencies = Counter(), []
+    barrier = threading.Barrier(len(taps) + 1)
+    lock = threading.Lock()
+
+    def phone(token):
+        client = app.test_client()
+        barrier.wait()
+        started = time.perf_counter()
+        status = client.post(url, json={'code': GROUP_CODE},
+                             headers={'Authorization': f'Bearer {token}'}).status_code
+        with lock:
+            statuses[status] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=phone, args=(token,)) for token in taps]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    with app.app_context():
+        from memberships import member_counts
+        from app import Group
+        group_id = Group.query.filter_by(code=GROUP_CODE).first().id
+        members = member_counts([group_id])[group_id]
+        db.engine.dispose()
+    shutil.rmtree(workdir)
+    latencies.sort()
+    return {
+        'statuses': ' '.join(f'{status}×{n}' for status, n in sorted(statuses.items())),
+        'commits': commits[0],
+        'wall_ms': wall_ms,
+        'p50': statistics.median(latencies),
+        'p99': latencies[int(len(latencies) * 0.99)],
+        'members': members,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--phones', type=int, default=50)
+    parser.add_argument('--members', type=int, default=200, help='members already in the group')
+    parser.add_argument('--double-tap', type=float, default=0.2, help='share of phones that send twice')
+    parser.add_argument('--window-ms', type=float, default=20)
+    parser.add_argument('--modes', nargs='+', default=['legacy', 'single', 'batched'])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    template = Path(workdir) / 'template.db'
+    phone_ids = build_database(template, args.phones, args.members)
+    requests = args.phones + int(args.phones * args.double_tap)
+    print(f'{args.phones} phones ({requests} requests) joining a group of {args.members}')
+    print()
+    print('| mode | responses | commits | burst ms | p50 / p99 ms | members after |')
+    print('|---|---|---|---|---|---|')
+    for mode in args.modes:
+        r = run(mode, template, phone_ids, args.double_tap, args.window_ms)
+        print(f"| {mode} | {r['statuses']} | {r['commits']} | {r['wall_ms']:.0f} | "
+              f"{r['p50']:.0f} / {r['p99']:.0f} | {r['members']} |")
+    shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark: PIN-reset code verification as otp_verifications grows
+
+Two SQLite databases receive the same rows (--rows issued codes over
+--phones numbers, with one "busy" phone holding 0.1% of all codes):
+
+    legacy   the old schema (index on phone only) and the old miss path,
+             which loaded every code ever issued to the phone
+    current  ix_otp_lookup + the bounded miss path
+
+At each checkpoint the median SQL latency of a hit and a miss for the busy
+phone is printed for both, plus a full verify-pin-reset request through the
+Flask route on the current database; the current numbers should stay flat. Finally the
+expiry sweeper deletes the expired backlog in chunks and is timed.
+
+Usage:
+    python bench_otp_verify.py [--rows 2000000] [--phones 200000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT / 'backend'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+BUSY_PHONE = '+905550000000'
+INSERT = ('INSERT INTO otp_verifications (phone, otp_code, code, purpose, is_verified, used, attempts, '
+          'max_attempts, created_at, expires_at) VALUES (?, ?, ?, ?, 0, ?, 0, 3, ?, ?)')
+
+
+def create_schemas(legacy_path, current_path):
+    from app import create_app, db
+    from config import TestingConfig
+
+    for path in (legacy_path, current_path):
+        app = create_app(TestingConfig(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}'))
+        with app.app_context():
+            db.create_all()
+            db.engine.dispose()
+    conn = sqlite3.connect(legacy_path)
+    conn.execute('DROP INDEX ix_otp_lookup')
+    conn.execute('DROP INDEX ix_otp_expires_at')
+    conn.execute('CREATE INDEX ix_otp_verifications_phone ON otp_verifications (phone)')
+    conn.commit()
+    conn.close()
+
+
+def insert_rows(conns, count, phones, busy_every=1000):
+    """Mostly expired, mostly used codes - what months of resets leave behind"""
+    now = datetime.utcnow()
+    batch = []
+    for i in range(count):
+        phone = BUSY_PHONE if i % busy_every == 0 else f'+90555{random.randrange(phones):07d}'
+        code = f'{random.randrange(1000000):06d}'
+        created = now - timedelta(minutes=random.randrange(60 * 24 * 180))
+        batch.append((phone, code, code, 'pin_reset', random.random() < 0.7, created, created + timedelta(minutes=10)))
+        if len(batch) == 50000:
+            for conn in conns:
+                conn.executemany(INSERT, batch)
+            batch = []
+    for conn in conns:
+        if batch:
+            conn.executemany(INSERT, batch)
+        conn.commit()
+
+
+def median_ms(fn, repeat=30):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def add_fresh_code(conn):
+    code = f'{random.randrange(1000000):06d}'
+    now = datetime.utcnow()
+    conn.execute(INSERT, (BUSY_PHONE, code, code, 'pin_reset', 0, now, now + timedelta(minutes=5)))
+    conn.commit()
+    return code
+
+
+LOOKUP = ('SELECT * FROM otp_verifications WHERE phone = ? AND code = ? AND purpose = ? AND used = 0 '
+          'ORDER BY id DESC LIMIT 1')
+
+
+def sql_timings(conn, miss_path):
+    """Median ms of the lookup for a fresh code (hit), and of a wrong code plus `miss_path` (miss)"""
+    def hit():
+        code = add_fresh_code(conn)
+        started = time.perf_counter()
+        assert conn.execute(LOOKUP, (BUSY_PHONE, code, 'pin_reset')).fetchone()
+        return (time.perf_counter() - started) * 1000
+
+    def miss():
+        if conn.execute(LOOKUP, (BUSY_PHONE, 'xxxxxx', 'pin_reset')).fetchone() is None:
+            conn.execute(miss_path, (BUSY_PHONE,)).fetchall()
+
+    return statistics.median(hit() for _ in range(30)), median_ms(miss)
+
+
+# Old miss path: every code ever issued to the phone, just to print them
+LEGACY_MISS = 'SELECT * FROM otp_verifications WHERE phone = ?'
+# log_recent_otps() (and only with DEBUG logging on)
+CURRENT_MISS = ("SELECT * FROM otp_verifications WHERE phone = ? AND purpose = 'pin_reset' "
+                'ORDER BY id DESC LIMIT 5')
+
+
+def route_ms(client, conn):
+    """Median ms of a successful POST /api/auth/verify-pin-reset (lookup + mark used + commit)"""
+    def hit():
+        code = add_fresh_code(conn)
+        started = time.perf_counter()
+        response = client.post('/api/auth/verify-pin-reset', json={'phone': BUSY_PHONE, 'code': code})
+        assert response.status_code == 200, response.get_json()
+        return (time.perf_counter() - started) * 1000
+
+    return statistics.median(hit() for _ in range(30))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--phones', type=int, default=200_000)
+    args = parser.parse_args()
+
+    from app import create_app, db
+    from config import TestingConfig
+    from otp_sweeper import sweep_expired_otps
+
+    legacy_path = tempfile.NamedTemporaryFile(suffix='-legacy.db', delete=False).name
+    current_path = tempfile.NamedTemporaryFile(suffix='-current.db', delete=False).name
+    try:
+        create_schemas(legacy_path, current_path)
+        legacy = sqlite3.connect(legacy_path)
+        current = sqlite3.connect(current_path)
+        app = create_app(TestingConfig(SQLALCHEMY_DATABASE_URI=f'sqlite:///{current_path}'))
+        client = app.test_client()
+
+        print('| issued codes | busy phone codes | legacy hit | legacy miss | current hit | current miss | route |')
+        print('|---|---|---|---|---|---|---|')
+        total = 0
+        for checkpoint in (10_000, 100_000, 1_000_000, args.rows):
+            if checkpoint > args.rows or checkpoint <= total:
+                continue
+            insert_rows([legacy, current], checkpoint - total, args.phones)
+            total = checkpoint
+            busy = current.execute('SELECT COUNT(*) FROM otp_verifications WHERE phone = ?', (BUSY_PHONE,)).fetchone()[0]
+            legacy_hit, legacy_miss = sql_timings(legacy, LEGACY_MISS)
+            current_hit, current_miss = sql_timings(current, CURRENT_MISS)
+            print(f'| {total:,} | {busy:,} | {legacy_hit:.3f} ms | {legacy_miss:.3f} ms '
+                  f'| {current_hit:.3f} ms | {current_miss:.3f} ms | {route_ms(client, current):.2f} ms |', flush=True)
+
+        with app.app_context():
+            started = time.time()
+            deleted = sweep_expired_otps(chunk_size=5000, grace_seconds=3600)
+            swept_in = time.time() - started
+            db.session.remove()
+        remaining = current.execute('SELECT COUNT(*) FROM otp_verifications').fetchone()[0]
+        current_hit, current_miss = sql_timings(current, CURRENT_MISS)
+        print(f'\nsweeper: {deleted:,} expired rows deleted in {swept_in:.1f}s (chunks of 5000), {remaining:,} left')
+        print(f'after sweep: hit {current_hit:.3f} ms, miss {current_miss:.3f} ms, route {route_ms(client, current):.2f} ms')
+        legacy.close()
+        current.close()
+    finally:
+        os.unlink(legacy_path)
+        os.unlink(current_path)
+
+
+if __name__ == '__main__':
+    main()
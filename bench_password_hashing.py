@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: PIN login throughput per PASSWORD_HASH_METHOD
+
+For each hash method, builds the app with that method (temporary SQLite
+file), creates one user, then runs a login storm against
+/api/auth/phone-pin-login from --clients threads for --seconds. A separate
+thread keeps calling /health during the storm to show how much the
+bounded hashing pool (PASSWORD_HASH_WORKERS) protects other requests.
+
+Usage:
+    python bench_password_hashing.py [--seconds 5] [--clients 16] [--workers 2]
+        [--methods pbkdf2:sha256:1000,pbkdf2:sha256:260000,scrypt:16384:8:1]
+
+Results are printed as a Markdown table.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT / 'backend'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+DEFAULT_METHODS = 'pbkdf2:sha256:1000,pbkdf2:sha256:50000,pbkdf2:sha256:260000,pbkdf2:sha256:600000,scrypt:16384:8:1'
+PHONE = '5550000001'
+PIN = '1234'
+
+
+def bench_method(method, seconds, clients, workers):
+    from app import create_app, db
+    from config import TestingConfig
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    app = create_app(TestingConfig(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{db_file.name}',
+        PASSWORD_HASH_METHOD=method,
+        PASSWORD_HASH_WORKERS=workers,
+        PASSWORD_HASH_MAX_PENDING=clients * 2,
+        # Measure hashing, not the login throttle
+        LOGIN_THROTTLE_PHONE='1000000/1',
+        LOGIN_THROTTLE_IP='1000000/1',
+        LOGIN_THROTTLE_EMAIL='1000000/1',
+    ))
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post('/api/auth/phone-pin-login', json={
+        'phone': PHONE, 'pin': PIN, 'is_signup': True, 'first_name': 'Bench', 'last_name': 'User'
+    })
+
+    logins = []
+    errors = [0]
+    health_latencies = []
+    lock = threading.Lock()
+    stop_at = time.time() + seconds
+
+    def login_client():
+        c = app.test_client()
+        ok = err = 0
+        while time.time() < stop_at:
+            r = c.post('/api/auth/phone-pin-login', json={'phone': PHONE, 'pin': PIN})
+            if r.status_code == 200:
+                ok += 1
+            else:
+                err += 1
+        with lock:
+            logins.append(ok)
+            errors[0] += err
+
+    def health_client():
+        c = app.test_client()
+        while time.time() < stop_at:
+            started = time.perf_counter()
+            c.get('/health')
+            health_latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_client) for _ in range(clients)]
+    threads.append(threading.Thread(target=health_client))
+    started = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - started
+
+    single = _single_verify_ms(method)
+    os.unlink(db_file.name)
+    health_p95 = statistics.quantiles(health_latencies, n=20)[-1] if len(health_latencies) > 1 else 0
+    return sum(logins) / elapsed, single, health_p95, errors[0]
+
+
+def _single_verify_ms(method, rounds=5):
+    from passwords import PasswordHasher
+    hasher = PasswordHasher(method, workers=1)
+    stored = hasher.hash(PIN)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        hasher.verify(PIN, stored)
+    hasher.shutdown()
+    return (time.perf_counter() - started) * 1000 / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=2, help='PASSWORD_HASH_WORKERS')
+    parser.add_argument('--methods', default=DEFAULT_METHODS)
+    args = parser.parse_args()
+
+    print(f'clients={args.clients} hash_workers={args.workers} seconds={args.seconds} cpus={os.cpu_count()}')
+    print()
+    print('| method | verify ms | logins/s | /health p95 ms | errors |')
+    print('|---|---|---|---|---|')
+    for method in args.methods.split(','):
+        rate, single, health_p95, errors = bench_method(method, args.seconds, args.clients, args.workers)
+        print(f'| {method} | {single:.1f} | {rate:.0f} | {health_p95:.1f} | {errors} |')
+
+
+if __name__ == '__main__':
+    main()
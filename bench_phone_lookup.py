@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: phone lookups before/after migrate_normalize_phones.py
+
+Builds a SQLite database with --users accounts whose phones are stored in
+the mixed legacy formats ("0532...", "532...", "+90532...", "90 532 ..."),
+with no index on users.phone, then measures:
+
+    legacy   User.query.filter_by(phone=<canonical>) - full table scan, and
+             misses every row stored in another format
+    migrate  backfill + dedupe + CREATE UNIQUE INDEX
+    indexed  the same lookup after the migration (ix_users_phone)
+
+Usage:
+    python bench_phone_lookup.py [--users 1000000] [--lookups 200]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT / 'backend'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from migrate_normalize_phones import migrate  # noqa: E402
+from phones import normalize_phone  # noqa: E402
+
+LEGACY_FORMATS = [
+    lambda n: f'0{n}',
+    lambda n: n,
+    lambda n: f'+90{n}',
+    lambda n: f'90 {n[:3]} {n[3:6]} {n[6:]}',
+]
+
+
+def build_database(path, users, duplicate_every=1000):
+    """Schema from the app models, then bulk rows with legacy phone formats"""
+    from app import create_app, db
+    from config import TestingConfig
+
+    app = create_app(TestingConfig(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}'))
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.execute('DROP INDEX IF EXISTS ix_users_phone')  # legacy schema: no index
+    numbers = []
+    batch = []
+    for i in range(1, users + 1):
+        # Every `duplicate_every`-th user re-registered the previous number in another format
+        national = numbers[-1] if i % duplicate_every == 0 else f'5{i:09d}'
+        numbers.append(national)
+        phone = LEGACY_FORMATS[i % len(LEGACY_FORMATS)](national)
+        batch.append((i, 'Bench', 'User', f'user{i}@bench.local', phone, 'pbkdf2:sha256:1000$x$y', 1, 0))
+        if len(batch) == 50000:
+            conn.executemany(
+                'INSERT INTO users (id, first_name, last_name, email, phone, password_hash, is_active, is_deleted) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+            batch = []
+    if batch:
+        conn.executemany(
+            'INSERT INTO users (id, first_name, last_name, email, phone, password_hash, is_active, is_deleted) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+    conn.commit()
+    conn.close()
+    return numbers
+
+
+def time_lookups(path, phones):
+    conn = sqlite3.connect(path)
+    latencies = []
+    found = 0
+    for phone in phones:
+        started = time.perf_counter()
+        row = conn.execute('SELECT id FROM users WHERE phone = ? LIMIT 1', (phone,)).fetchone()
+        latencies.append((time.perf_counter() - started) * 1000)
+        found += row is not None
+    plan = conn.execute('EXPLAIN QUERY PLAN SELECT id FROM users WHERE phone = ?', (phones[0],)).fetchone()[-1]
+    conn.close()
+    return statistics.median(latencies), found, plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    path = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    try:
+        started = time.time()
+        numbers = build_database(path, args.users)
+        print(f'built {args.users} users in {time.time() - started:.1f}s ({path})')
+
+        sample = [normalize_phone(n) for n in random.sample(numbers, args.lookups)]
+        legacy_ms, legacy_found, legacy_plan = time_lookups(path, sample[:20])
+
+        from sqlalchemy import create_engine
+        started = time.time()
+        changed, retired = migrate(create_engine(f'sqlite:///{path}'), batch_size=5000, log=lambda msg: None)
+        migrate_s = time.time() - started
+
+        indexed_ms, indexed_found, indexed_plan = time_lookups(path, sample)
+
+        print()
+        print('| step | result |')
+        print('|---|---|')
+        print(f'| legacy lookup (median) | {legacy_ms:.2f} ms, {legacy_found}/20 found, plan: {legacy_plan} |')
+        print(f'| migration | {migrate_s:.1f}s, {changed} normalized, {retired} duplicates merged |')
+        print(f'| indexed lookup (median) | {indexed_ms:.3f} ms, {indexed_found}/{len(sample)} found, plan: {indexed_plan} |')
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
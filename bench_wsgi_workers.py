@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark: requests/sec per gunicorn worker class
+
+Starts gunicorn (with gunicorn.conf.py) once per worker class and drives it
+with a threaded HTTP client. Two endpoints are measured:
+
+    /health      - the real app, no I/O (framework + WSGI overhead)
+    /bench/io    - the real app's WSGI stack plus a simulated 50 ms upstream
+                   call, standing in for Twilio/SMTP/Google latency
+
+Usage:
+    python bench_wsgi_workers.py [--seconds 10] [--clients 50] [--classes sync,gthread,gevent]
+
+Results are printed as a Markdown table (see WSGI_SERVER.md).
+"""
+
+import argparse
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+
+# Simulated upstream latency for /bench/io (seconds)
+IO_DELAY = float(os.getenv('BENCH_IO_DELAY', '0.05'))
+
+
+def _load_application():
+    """The real WSGI app wrapped with a slow-upstream endpoint"""
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from backend.app import app as flask_app
+
+    def application(environ, start_response):
+        if environ.get('PATH_INFO') == '/bench/io':
+            time.sleep(IO_DELAY)  # cooperative under gevent (monkey-patched)
+            environ['PATH_INFO'] = '/health'
+        return flask_app(environ, start_response)
+
+    return application
+
+
+# gunicorn target: bench_wsgi_workers:application (only built inside workers)
+if os.getenv('BENCH_WSGI_WORKER') == '1':
+    application = _load_application()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def _drive(port, path, seconds, clients):
+    """Hammer `path` from `clients` threads for `seconds`; return (req/s, errors)"""
+    done = [0]
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + seconds
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        ok = err = 0
+        while time.time() < stop_at:
+            try:
+                conn.request('GET', path)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status == 200:
+                    ok += 1
+                else:
+                    err += 1
+            except (OSError, http.client.HTTPException):
+                err += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.close()
+        with lock:
+            done[0] += ok
+            errors[0] += err
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - started
+    return done[0] / elapsed, errors[0]
+
+
+def bench_worker_class(worker_class, seconds, clients):
+    port = _free_port()
+    env = dict(os.environ,
+               BENCH_WSGI_WORKER='1',
+               GUNICORN_BIND=f'127.0.0.1:{port}',
+               GUNICORN_WORKER_CLASS=worker_class,
+               GUNICORN_ACCESS_LOG='/dev/null',
+               GUNICORN_LOG_LEVEL='warning')
+    if worker_class == 'sync':
+        env['GUNICORN_THREADS'] = '1'  # gunicorn turns sync+threads into gthread
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', str(PROJECT_ROOT / 'gunicorn.conf.py'),
+         'bench_wsgi_workers:application'],
+        cwd=str(PROJECT_ROOT), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not _wait_for(port):
+            raise RuntimeError(f'gunicorn ({worker_class}) did not start')
+        results = {}
+        for path in ('/health', '/bench/io'):
+            results[path] = _drive(port, path, seconds, clients)
+        return results
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--classes', default='sync,gthread,gevent')
+    args = parser.parse_args()
+
+    print(f"workers={os.getenv('WEB_CONCURRENCY', 'default')} threads={os.getenv('GUNICORN_THREADS', 'default')} "
+          f"clients={args.clients} seconds={args.seconds} io_delay={IO_DELAY}s cpus={os.cpu_count()}")
+    print()
+    print('| worker class | /health req/s | /bench/io req/s | errors |')
+    print('|---|---|---|---|')
+    for worker_class in args.classes.split(','):
+        try:
+            results = bench_worker_class(worker_class, args.seconds, args.clients)
+        except Exception as e:
+            print(f'| {worker_class} | skipped: {e} | | |')
+            continue
+        health, io = results['/health'], results['/bench/io']
+        print(f'| {worker_class} | {health[0]:.0f} | {io[0]:.0f} | {health[1] + io[1]} |')
+
+
+if __name__ == '__main__':
+    main()
@@ -7,11 +7,16 @@ Restaurant Bill Splitter - Group Management
 
 import json
 import os
+import sys
 import uuid
 import qrcode
 from pathlib import Path
 import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+from catalog import RestaurantCatalog
+from bill_split import SplitItem, SplitOrder, split_order, to_major, to_minor
+
 # Twilio için (isteğe bağlı)
 try:
     from twilio.rest import Client
@@ -19,15 +24,12 @@ try:
 except ImportError:
     TWILIO_AVAILABLE = False
 
+# restaurants.json bir kez okunur; dosya değişirse otomatik yeniden yüklenir
+RESTAURANTS = RestaurantCatalog(Path(__file__).parent / "restaurants.json")
+
 def load_restaurants():
-    """Restaurant menüsünü yükle"""
-    script_dir = Path(__file__).parent
-    restaurants_file = script_dir / "restaurants.json"
-    
-    if restaurants_file.exists():
-        with open(restaurants_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    """Restaurant menüsünü yükle (paylaşılan katalog - değiştirmeyin)"""
+    return RESTAURANTS.all()
 
 def load_groups():
     """Grup verilerini yükle"""
@@ -617,8 +619,19 @@ def show_orders_and_split(group_members, group_id):
     # Toplam hesaplama
     total_with_extras = total_bill + tip_amount + tax_amount
     
+    # Paylaşım kuralları sunucuyla aynı motordan (backend/bill_split.py): bireysel
+    # ürünü sahibi öder, ortak ürünler eşit bölünür, bahşiş/vergi tüketim oranıyla.
+    # Motor kuruş cinsinden hesaplar; kişi toplamları hesabı kuruşu kuruşuna tutar.
+    split = split_order(SplitOrder(
+        group_id, None,
+        [SplitItem(order['name'], to_minor(order['price']), order['quantity'], order['type'], person,
+                   amount=to_minor(order['price'] * order['quantity']))
+         for person, orders in group_members.items() for order in orders],
+        tip=to_minor(tip_amount), tax=to_minor(tax_amount)
+    ), list(group_members))
+    
     # Ortak sipariş payı (eşit bölüş)
-    shared_per_person = total_shared / num_people if num_people > 0 else 0
+    shared_per_person = to_major(split[next(iter(group_members))].shared) if group_members else 0
     
     # Sonuçlar
     print("\n" + "="*80)
@@ -660,33 +673,22 @@ def show_orders_and_split(group_members, group_id):
     person_accounts = {}
     
     for person, orders in group_members.items():
-        person_personal = sum(order['total'] for order in orders if order['type'] == 'personal')
-        person_excluded = sum(order['total'] for order in orders if order['type'] == 'excluded')
-        person_consumption = person_personal + shared_per_person * num_people  # Tüketim oranı hesaplaması için
-        
-        # Her kişinin tüketiminin toplam oranı
-        consumption_ratio = person_consumption / total_bill if total_bill > 0 else 0
-        
-        # Her kişinin bahşişi, tüketim oranına göre dağıtılır
-        person_tip = tip_amount * consumption_ratio
-        
-        # Vergi hesaplaması
-        person_tax = tax_amount * consumption_ratio if tax_amount > 0 else 0
-        
-        person_total = person_personal + shared_per_person + person_tip + person_tax
+        share = split[person]
+        person_consumption = to_major(share.personal + share.shared)  # Tüketim oranı hesaplaması için
         
-        # Hesabı sakla
+        # Hesabı sakla (bahşiş ve vergi, tüketim oranına göre dağıtıldı)
         person_accounts[person] = {
             'orders': orders,
-            'personal': person_personal,
-            'shared': shared_per_person,
-            'tip': person_tip,
-            'tax': person_tax,
-            'total': person_total,
-            'ratio': consumption_ratio
+            'personal': to_major(share.personal),
+            'shared': to_major(share.shared),
+            'tip': to_major(share.tip),
+            'tax': to_major(share.tax),
+            'total': to_major(share.total),
+            'ratio': share.ratio
         }
+        account = person_accounts[person]
         
-        print(f"{person:20s} {person_consumption:>12.2f} ₺ {consumption_ratio*100:>9.1f}% {person_personal:>12.2f} ₺ {shared_per_person:>12.2f} ₺ {person_tip:>12.2f} ₺ {person_total:>12.2f} ₺")
+        print(f"{person:20s} {person_consumption:>12.2f} ₺ {share.ratio*100:>9.1f}% {account['personal']:>12.2f} ₺ {account['shared']:>12.2f} ₺ {account['tip']:>12.2f} ₺ {account['total']:>12.2f} ₺")
     
     print("="*80 + "\n")
     
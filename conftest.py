@@ -0,0 +1,79 @@
+"""
+Shared test fixtures: an app on a fresh database, with optional users,
+a group and their tokens.
+
+    def test_x(make_app):
+        app = make_app(['ayse', 'mehmet'], group='123456', GROUP_LOOKUP_NEGATIVE_TTL=0.2)
+        client_for(app, 1).post('/api/groups/join', json={'code': '123456'})
+
+Keyword arguments that aren't make_app's own override config.TestingConfig.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+import config  # noqa: E402
+
+
+def build_app(users=(), group=None, members=1, group_name='Mor', **overrides):
+    """An app with its tables created
+
+    users      first names, or a count (u0, u1, ...); emails <name>@example.com,
+               distinct phones, a placeholder password hash
+    group      a group code: users[0] creates the group, the first `members`
+               users belong to it
+
+    app.config gets USER_IDS, TOKENS (one per user) and GROUP_ID.
+    """
+    from app import Group, User, create_app, db, generate_token, group_members
+
+    app = create_app(config.TestingConfig(**overrides))
+    if isinstance(users, int):
+        users = [f'u{i}' for i in range(users)]
+    with app.app_context():
+        db.create_all()
+        rows = [User(first_name=name, last_name='Y', email=f'{name.lower()}@example.com',
+                     phone=f'+90532{i:07d}', password_hash='x') for i, name in enumerate(users)]
+        db.session.add_all(rows)
+        db.session.flush()
+        app.config['USER_IDS'] = [user.id for user in rows]
+        app.config['GROUP_ID'] = None
+        if group is not None:
+            created = Group(name=group_name, code=group, created_by=rows[0].id if rows else None)
+            db.session.add(created)
+            db.session.flush()
+            if rows[:members]:
+                db.session.execute(group_members.insert(), [
+                    {'group_id': created.id, 'user_id': user.id} for user in rows[:members]])
+            app.config['GROUP_ID'] = created.id
+        db.session.commit()
+        app.config['TOKENS'] = [generate_token(user_id) for user_id in app.config['USER_IDS']]
+    return app
+
+
+@pytest.fixture
+def make_app():
+    """build_app, with each app's sessions and connections closed after the test"""
+    apps = []
+
+    def make(*args, **kwargs):
+        apps.append(build_app(*args, **kwargs))
+        return apps[-1]
+
+    yield make
+    from app import db
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+def client_for(app, user=0):
+    """A test client signed in as app.config['TOKENS'][user]"""
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {app.config['TOKENS'][user]}"
+    return client
@@ -0,0 +1,106 @@
+"""
+Gunicorn configuration for Hesap Paylaş (production)
+
+Picked up automatically by `gunicorn wsgi:application` from the project root.
+Every setting can be overridden with an environment variable, so Render,
+Docker and the Procfile share one file. See WSGI_SERVER.md for the worker
+model and benchmark numbers.
+
+Our requests spend most of their time waiting on Twilio, SMTP, Google and
+the database, so the default is gthread (threads per worker) rather than
+sync. gevent is supported for high-concurrency deployments
+(`pip install gevent`, GUNICORN_WORKER_CLASS=gevent).
+"""
+
+import multiprocessing
+import os
+
+
+def _int_env(name, default):
+    return int(os.getenv(name, default))
+
+
+def _bool_env(name, default):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+# ==================== Binding ====================
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+
+# ==================== Worker Model ====================
+# gthread: N processes x M threads; a thread blocked on Twilio/SMTP only
+# holds its own slot. gevent: one process serves many greenlets.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+# Processes: WEB_CONCURRENCY is the convention Render/Heroku set for us
+workers = _int_env('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 4))
+
+# Threads per worker (gthread only). I/O-bound handlers benefit from more
+# threads than cores; 8 keeps memory low while covering slow providers.
+# Each open group event stream (SSE) holds one of them: a worker serves at
+# most GUNICORN_THREADS - GROUP_EVENTS_RESERVED_THREADS (4) streams, and
+# answers 503 past that. render.yaml raises it to 32 (28 streams a worker);
+# for thousands of phones use gevent instead (see GROUP_EVENTS.md).
+threads = _int_env('GUNICORN_THREADS', 8)
+
+# Concurrent greenlets per worker (gevent only)
+worker_connections = _int_env('GUNICORN_WORKER_CONNECTIONS', 1000)
+
+# ==================== Worker Recycling ====================
+# Restart a worker after N requests (+ random jitter so they don't all
+# restart together) to bound memory growth from long-lived processes.
+max_requests = _int_env('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _int_env('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# ==================== Timeouts & Graceful Reload ====================
+# A worker silent for this long is killed and replaced
+timeout = _int_env('GUNICORN_TIMEOUT', 60)
+# On SIGHUP / SIGTERM, in-flight requests get this long to finish
+graceful_timeout = _int_env('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _int_env('GUNICORN_KEEPALIVE', 5)
+# Development only: restart workers when code changes
+reload = _bool_env('GUNICORN_RELOAD', '0')
+
+# ==================== Preloading ====================
+# Import the app once in the master and fork workers from it, so workers
+# share the imported code copy-on-write. backend.app.reinit_after_fork()
+# gives each worker its own DB pool and integration clients.
+# gevent patches the stdlib when the worker starts, which is too late for a
+# preloaded app, so preload defaults to off for gevent.
+preload_app = _bool_env('GUNICORN_PRELOAD', '0' if worker_class == 'gevent' else '1')
+
+# ==================== Logging ====================
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+# Behind Render's proxy: trust X-Forwarded-Proto so request.scheme is https
+forwarded_allow_ips = os.getenv('FORWARDED_ALLOW_IPS', '*')
+
+
+# ==================== Server Hooks ====================
+
+def on_starting(server):
+    """Warn about settings that only work with one worker"""
+    if workers > 1 and os.getenv('GROUP_EVENTS_BACKEND', 'memory') == 'memory':
+        server.log.warning(f"{workers} workers with GROUP_EVENTS_BACKEND=memory: group events only "
+                           "reach streams on the worker that published them; set GROUP_EVENTS_BACKEND=sql")
+    if workers > 1 and os.getenv('OUTBOX_DISPATCH', 'inline') == 'inline':
+        server.log.warning(f"{workers} workers with OUTBOX_DISPATCH=inline: each runs its own outbox "
+                           "dispatcher and OTP sweeper; run worker.py and set OUTBOX_DISPATCH=worker")
+
+
+def post_fork(server, worker):
+    """Give each worker its own DB pool and integration clients"""
+    if preload_app:
+        from backend.app import reinit_after_fork
+        reinit_after_fork()
+
+
+def worker_abort(worker):
+    """Log which request a timed-out worker was stuck on (SIGABRT)"""
+    import traceback
+    import sys
+    worker.log.warning(f"Worker {worker.pid} aborted (timeout)")
+    for frame in sys._current_frames().values():
+        worker.log.warning(''.join(traceback.format_stack(frame)))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Database migration: bill split columns (backend/bill_split.py)
+
+1. orders.tip FLOAT DEFAULT 0
+2. order_items.split_type VARCHAR(10) NOT NULL DEFAULT 'personal'
+   (personal / shared / excluded; existing items stay personal)
+3. order_items.shares JSON (shared items split among some members, by
+   weight; NULL = all members equally)
+4. ix_member_bills_order_id, used when an order change rewrites the bills
+5. uq_member_bills_order_user: one bill per (order_id, user_id); duplicates
+   left by concurrent orders are deleted first, keeping the oldest row
+
+MemberBill rows for existing orders are written by the next order of their
+group. Safe to re-run.
+
+Usage:
+    python migrate_bill_split.py [--database-url URL]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from sqlalchemy import create_engine, inspect, text
+
+COLUMNS = {
+    ('orders', 'tip'): "ALTER TABLE orders ADD COLUMN tip FLOAT DEFAULT 0",
+    ('order_items', 'split_type'):
+        "ALTER TABLE order_items ADD COLUMN split_type VARCHAR(10) NOT NULL DEFAULT 'personal'",
+    ('order_items', 'shares'): "ALTER TABLE order_items ADD COLUMN shares JSON",
+}
+INDEX_NAME = 'ix_member_bills_order_id'
+UNIQUE_NAME = 'uq_member_bills_order_user'
+
+
+def migrate(engine, log=print):
+    started = time.time()
+    log("=" * 60)
+    log("BILL SPLIT")
+    log("=" * 60)
+
+    inspector = inspect(engine)
+    changed = False
+    with engine.begin() as conn:
+        for (table, column), ddl in COLUMNS.items():
+            if column in {c['name'] for c in inspector.get_columns(table)}:
+                log(f"   [OK] {table}.{column} already exists")
+                continue
+            conn.execute(text(ddl))
+            log(f"   [OK] {table}.{column} added")
+            changed = True
+        if INDEX_NAME in {i['name'] for i in inspector.get_indexes('member_bills')}:
+            log(f"   [OK] {INDEX_NAME} already exists")
+        else:
+            conn.execute(text(f"CREATE INDEX {INDEX_NAME} ON member_bills (order_id)"))
+            log(f"   [OK] {INDEX_NAME} created")
+            changed = True
+        if UNIQUE_NAME in {i['name'] for i in inspector.get_indexes('member_bills')}:
+            log(f"   [OK] {UNIQUE_NAME} already exists")
+        else:
+            deleted = conn.execute(text(
+                "DELETE FROM member_bills WHERE id NOT IN "
+                "(SELECT MIN(id) FROM member_bills GROUP BY order_id, user_id)")).rowcount
+            conn.execute(text(f"CREATE UNIQUE INDEX {UNIQUE_NAME} ON member_bills (order_id, user_id)"))
+            log(f"   [OK] {UNIQUE_NAME} created ({deleted} duplicate bills deleted)")
+            changed = True
+
+    log(f"\nDone in {time.time() - started:.1f}s")
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', help='defaults to the app configuration (.env / DATABASE_URL)')
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        from config import Config
+        url = Config.from_env().SQLALCHEMY_DATABASE_URI
+    migrate(create_engine(url))
+
+
+if __name__ == '__main__':
+    main()
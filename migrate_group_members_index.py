@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Database migration: ix_group_members_user_id
+
+group_members is keyed by (group_id, user_id), which serves lookups by
+group but not by user. This adds the user_id index that a user's group
+list (GET /api/user/groups), profile-change version bumps and user
+deletion use (backend/memberships.py).
+
+Safe to re-run.
+
+Usage:
+    python migrate_group_members_index.py [--database-url URL]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from sqlalchemy import create_engine, inspect, text
+
+INDEX_NAME = 'ix_group_members_user_id'
+
+
+def migrate(engine, log=print):
+    started = time.time()
+    log("=" * 60)
+    log("GROUP_MEMBERS USER INDEX")
+    log("=" * 60)
+
+    if INDEX_NAME in {i['name'] for i in inspect(engine).get_indexes('group_members')}:
+        log(f"   [OK] {INDEX_NAME} already exists")
+        return False
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE INDEX {INDEX_NAME} ON group_members (user_id)"))
+    log(f"   [OK] {INDEX_NAME} created")
+
+    log(f"\nDone in {time.time() - started:.1f}s")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', help='defaults to the app configuration (.env / DATABASE_URL)')
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        from config import Config
+        url = Config.from_env().SQLALCHEMY_DATABASE_URI
+    migrate(create_engine(url))
+
+
+if __name__ == '__main__':
+    main()
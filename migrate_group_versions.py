@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Database migration: groups.version (ETag of GET /api/groups/<id>)
+
+Adds groups.version INTEGER NOT NULL DEFAULT 1. Existing groups start at
+version 1; every join, menu edit, order, close and member profile change
+bumps it from then on. Adding a column with a constant default doesn't
+rewrite the table on PostgreSQL 11+ or SQLite.
+
+Run it before starting this version of the app. Safe to re-run.
+
+Usage:
+    python migrate_group_versions.py [--database-url URL]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from sqlalchemy import create_engine, inspect, text
+
+
+def migrate(engine, log=print):
+    started = time.time()
+    log("=" * 60)
+    log("GROUP VERSIONS")
+    log("=" * 60)
+
+    columns = {c['name'] for c in inspect(engine).get_columns('groups')}
+    if 'version' in columns:
+        log("   [OK] groups.version already exists")
+        return False
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE groups ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+    log("   [OK] groups.version added")
+
+    log(f"\nDone in {time.time() - started:.1f}s")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', help='defaults to the app configuration (.env / DATABASE_URL)')
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        from config import Config
+        url = Config.from_env().SQLALCHEMY_DATABASE_URI
+    migrate(create_engine(url))
+
+
+if __name__ == '__main__':
+    main()
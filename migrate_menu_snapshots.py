@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Database migration: per-group menu copies -> shared menu snapshots
+
+1. Create menu_snapshots and add groups.menu_snapshot_id (+ index).
+2. Backfill in id-ordered batches: each group's menu_data is stored once
+   under its content hash (backend/menus.py), the group is pointed at it
+   and its menu_data copy is cleared. One transaction per batch.
+3. --prune deletes snapshots no group references any more (menus replaced
+   through the OCR flow).
+
+Run it before starting this version of the app, which expects
+groups.menu_snapshot_id. The app keeps serving menu_data for groups the
+backfill has not reached yet, so a long backfill can be interrupted and
+resumed while it is up. Safe to re-run.
+
+Usage:
+    python migrate_menu_snapshots.py [--database-url URL] [--batch-size 500] [--prune]
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from sqlalchemy import create_engine, inspect, text
+
+from catalog import content_hash
+
+
+def create_schema(engine, log=print):
+    from menus import MenuSnapshot
+
+    MenuSnapshot.__table__.create(engine, checkfirst=True)
+    log("   [OK] menu_snapshots")
+    columns = {c['name'] for c in inspect(engine).get_columns('groups')}
+    with engine.begin() as conn:
+        if 'menu_snapshot_id' not in columns:
+            conn.execute(text("ALTER TABLE groups ADD COLUMN menu_snapshot_id VARCHAR(64)"))
+            log("   [OK] groups.menu_snapshot_id added")
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_groups_menu_snapshot_id ON groups (menu_snapshot_id)"))
+        log("   [OK] ix_groups_menu_snapshot_id")
+
+
+def backfill(engine, batch_size=500, log=print):
+    """Move every groups.menu_data into a snapshot; returns (groups migrated, snapshots created)"""
+    last_id = 0
+    migrated = 0
+    created = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, menu_data FROM groups WHERE id > :last AND menu_data IS NOT NULL "
+                "ORDER BY id LIMIT :limit"
+            ), {'last': last_id, 'limit': batch_size}).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                data = row.menu_data if not isinstance(row.menu_data, str) else json.loads(row.menu_data)
+                if data is None:  # a JSON null
+                    snapshot_id = None
+                else:
+                    snapshot_id = content_hash(data)
+                    exists = conn.execute(text("SELECT 1 FROM menu_snapshots WHERE id = :id"),
+                                          {'id': snapshot_id}).first()
+                    if not exists:
+                        conn.execute(text(
+                            "INSERT INTO menu_snapshots (id, data, created_at) VALUES (:id, :data, :now)"
+                        ), {'id': snapshot_id, 'data': json.dumps(data, ensure_ascii=False), 'now': datetime.utcnow()})
+                        created += 1
+                conn.execute(text("UPDATE groups SET menu_snapshot_id = :sid, menu_data = NULL WHERE id = :id"),
+                             {'sid': snapshot_id, 'id': row.id})
+            last_id = rows[-1].id
+            migrated += len(rows)
+        log(f"   ... {migrated} groups migrated, {created} distinct menus")
+    return migrated, created
+
+
+def prune(engine, log=print):
+    """Delete snapshots that no group references; returns the number deleted"""
+    with engine.begin() as conn:
+        deleted = conn.execute(text(
+            "DELETE FROM menu_snapshots WHERE id NOT IN "
+            "(SELECT menu_snapshot_id FROM groups WHERE menu_snapshot_id IS NOT NULL)"
+        )).rowcount
+    log(f"   [OK] {deleted} unreferenced snapshots deleted")
+    return deleted
+
+
+def migrate(engine, batch_size=500, prune_orphans=False, log=print):
+    started = time.time()
+    log("=" * 60)
+    log("MENU SNAPSHOTS")
+    log("=" * 60)
+
+    log("\n1. Schema...")
+    create_schema(engine, log)
+
+    log("\n2. Moving group menus into snapshots...")
+    migrated, created = backfill(engine, batch_size, log)
+    log(f"   [OK] {migrated} groups now share {created} new snapshots")
+
+    if prune_orphans:
+        log("\n3. Pruning...")
+        prune(engine, log)
+
+    log(f"\nDone in {time.time() - started:.1f}s")
+    return migrated, created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', help='defaults to the app configuration (.env / DATABASE_URL)')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--prune', action='store_true', help='delete snapshots no group uses')
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        from config import Config
+        url = Config.from_env().SQLALCHEMY_DATABASE_URI
+    migrate(create_engine(url), args.batch_size, args.prune)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Database migration: canonical phone numbers + unique index on users.phone
+
+1. Backfill: rewrite users.phone into the canonical +90... form
+   (backend/phones.py), in id-ordered batches with a commit per batch.
+2. Dedupe: phones that now belong to several users are merged into one
+   account (not deleted > has a PIN/password > oldest). Group memberships,
+   created groups, orders and bills move to the kept account; the others
+   are marked deleted and lose their phone.
+3. Create the unique index ix_users_phone.
+
+Safe to re-run. --dry-run writes nothing: it counts the phones that would
+be rewritten and lists duplicates among values that are already canonical.
+
+Usage:
+    python migrate_normalize_phones.py [--database-url URL] [--batch-size 1000] [--dry-run]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from sqlalchemy import create_engine, text
+
+from phones import normalize_phone
+
+INDEX_NAME = 'ix_users_phone'
+
+
+def backfill(engine, batch_size=1000, dry_run=False, log=print):
+    """Normalize every users.phone; returns the number of rows rewritten"""
+    last_id = 0
+    changed = 0
+    scanned = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, phone FROM users WHERE id > :last_id AND phone IS NOT NULL "
+                "ORDER BY id LIMIT :limit"
+            ), {'last_id': last_id, 'limit': batch_size}).fetchall()
+            if not rows:
+                break
+            updates = [
+                {'id': row.id, 'phone': normalize_phone(row.phone)}
+                for row in rows if normalize_phone(row.phone) != row.phone
+            ]
+            if updates and not dry_run:
+                conn.execute(text("UPDATE users SET phone = :phone WHERE id = :id"), updates)
+        last_id = rows[-1].id
+        scanned += len(rows)
+        changed += len(updates)
+        if scanned % (batch_size * 100) == 0:
+            log(f"   ... {scanned} rows scanned, {changed} normalized")
+    return changed
+
+
+def _merge_user(conn, keep_id, dup_id):
+    """Move everything that references dup_id to keep_id, then retire dup_id"""
+    params = {'keep': keep_id, 'dup': dup_id}
+    conn.execute(text(
+        "INSERT INTO group_members (group_id, user_id) "
+        "SELECT gm.group_id, :keep FROM group_members gm WHERE gm.user_id = :dup "
+        "AND NOT EXISTS (SELECT 1 FROM group_members k WHERE k.group_id = gm.group_id AND k.user_id = :keep)"
+    ), params)
+    conn.execute(text("DELETE FROM group_members WHERE user_id = :dup"), params)
+    conn.execute(text("UPDATE groups SET created_by = :keep WHERE created_by = :dup"), params)
+    conn.execute(text("UPDATE orders SET creator_id = :keep WHERE creator_id = :dup"), params)
+    # One bill per (order, user) (uq_member_bills_order_user): add to the kept account's bill
+    conn.execute(text(
+        "UPDATE member_bills SET amount = amount + (SELECT SUM(d.amount) FROM member_bills d "
+        "WHERE d.user_id = :dup AND d.order_id = member_bills.order_id) "
+        "WHERE user_id = :keep AND order_id IN (SELECT order_id FROM member_bills WHERE user_id = :dup)"
+    ), params)
+    conn.execute(text(
+        "DELETE FROM member_bills WHERE user_id = :dup "
+        "AND order_id IN (SELECT order_id FROM member_bills WHERE user_id = :keep)"
+    ), params)
+    conn.execute(text("UPDATE member_bills SET user_id = :keep WHERE user_id = :dup"), params)
+    conn.execute(text(
+        "UPDATE users SET phone = NULL, is_deleted = :true, is_active = :false WHERE id = :dup"
+    ), {**params, 'true': True, 'false': False})
+
+
+def dedupe(engine, dry_run=False, log=print):
+    """Merge users sharing a phone; returns the number of retired accounts"""
+    # One pass for every duplicated phone (the phone index doesn't exist yet)
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT id, phone, is_deleted, password_hash FROM users WHERE phone IN "
+            "(SELECT phone FROM users WHERE phone IS NOT NULL GROUP BY phone HAVING COUNT(*) > 1) "
+            "ORDER BY phone"
+        )).fetchall()
+    by_phone = {}
+    for row in rows:
+        by_phone.setdefault(row.phone, []).append(row)
+
+    retired = 0
+    for phone, users in by_phone.items():
+        users.sort(key=lambda u: (bool(u.is_deleted), u.password_hash is None, u.id))
+        keep, dups = users[0], users[1:]
+        log(f"   {phone}: keeping user {keep.id}, merging {[u.id for u in dups]}")
+        if not dry_run:
+            with engine.begin() as conn:
+                for dup in dups:
+                    _merge_user(conn, keep.id, dup.id)
+        retired += len(dups)
+    return retired
+
+
+def create_unique_index(engine, log=print):
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {INDEX_NAME} ON users (phone)"))
+    log(f"   [OK] {INDEX_NAME} in place")
+
+
+def migrate(engine, batch_size=1000, dry_run=False, log=print):
+    started = time.time()
+    log("=" * 60)
+    log("NORMALIZING users.phone")
+    log("=" * 60)
+
+    if not dry_run:
+        # An older non-unique or partial index would block rewriting values
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+
+    log("\n1. Backfilling canonical phone numbers...")
+    changed = backfill(engine, batch_size, dry_run, log)
+    log(f"   [OK] {changed} phone numbers normalized")
+
+    log("\n2. Merging accounts that share a phone number...")
+    retired = dedupe(engine, dry_run, log)
+    log(f"   [OK] {retired} duplicate accounts merged")
+
+    if not dry_run:
+        log("\n3. Creating unique index...")
+        create_unique_index(engine, log)
+
+    log(f"\nDone in {time.time() - started:.1f}s{' (dry run, nothing written)' if dry_run else ''}")
+    return changed, retired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', help='defaults to the app configuration (.env / DATABASE_URL)')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        from config import Config
+        url = Config.from_env().SQLALCHEMY_DATABASE_URI
+    migrate(create_engine(url), args.batch_size, args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Database migration: otp_verifications lookup/expiry indexes + first sweep
+
+1. Create ix_otp_lookup (phone, purpose, code, used), which matches the
+   verify-pin-reset / confirm-pin-reset / reset-pin lookups, and
+   ix_otp_expires_at for the sweeper.
+2. Drop the old single-column ix_otp_verifications_phone (a prefix of
+   ix_otp_lookup, so it only costs writes).
+3. Delete the expired backlog in chunks (--grace-hours past expires_at),
+   one transaction per chunk; the running app's sweeper keeps it small
+   afterwards (backend/otp_sweeper.py).
+
+Safe to re-run.
+
+Usage:
+    python migrate_otp_indexes.py [--database-url URL] [--chunk-size 5000] [--grace-hours 1] [--skip-sweep]
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from sqlalchemy import create_engine, text
+
+INDEXES = {
+    'ix_otp_lookup': 'otp_verifications (phone, purpose, code, used)',
+    'ix_otp_expires_at': 'otp_verifications (expires_at)',
+}
+OLD_INDEX = 'ix_otp_verifications_phone'
+
+
+def create_indexes(engine, log=print):
+    with engine.begin() as conn:
+        for name, columns in INDEXES.items():
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}"))
+            log(f"   [OK] {name}")
+        conn.execute(text(f"DROP INDEX IF EXISTS {OLD_INDEX}"))
+        log(f"   [OK] {OLD_INDEX} dropped")
+
+
+def sweep(engine, chunk_size=5000, grace_hours=1, log=print):
+    """Delete codes expired more than grace_hours ago; returns the number deleted"""
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            ids = [row.id for row in conn.execute(text(
+                "SELECT id FROM otp_verifications WHERE expires_at < :cutoff LIMIT :limit"
+            ), {'cutoff': cutoff, 'limit': chunk_size})]
+            if ids:
+                conn.execute(text("DELETE FROM otp_verifications WHERE id = :id"), [{'id': i} for i in ids])
+        deleted += len(ids)
+        if len(ids) < chunk_size:
+            break
+        if deleted % (chunk_size * 20) == 0:
+            log(f"   ... {deleted} rows deleted")
+    return deleted
+
+
+def migrate(engine, chunk_size=5000, grace_hours=1, skip_sweep=False, log=print):
+    started = time.time()
+    log("=" * 60)
+    log("OTP_VERIFICATIONS INDEXES")
+    log("=" * 60)
+
+    log("\n1. Creating indexes...")
+    create_indexes(engine, log)
+
+    deleted = 0
+    if not skip_sweep:
+        log("\n2. Deleting expired codes...")
+        deleted = sweep(engine, chunk_size, grace_hours, log)
+        log(f"   [OK] {deleted} expired codes deleted")
+
+    log(f"\nDone in {time.time() - started:.1f}s")
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', help='defaults to the app configuration (.env / DATABASE_URL)')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--grace-hours', type=float, default=1)
+    parser.add_argument('--skip-sweep', action='store_true')
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        from config import Config
+        url = Config.from_env().SQLALCHEMY_DATABASE_URI
+    migrate(create_engine(url), args.chunk_size, args.grace_hours, args.skip_sweep)
+
+
+if __name__ == '__main__':
+    main()
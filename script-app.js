@@ -763,6 +763,26 @@ const api = {
         }
     },
 
+    // GET /user/groups comes in pages (newest first); follow X-Next-Cursor
+    // until every active group is in
+    async userGroups() {
+        const token = localStorage.getItem('hesapPaylas_token');
+        const groups = [];
+        let cursor = null;
+        do {
+            const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+            const response = await fetch(`${API_BASE_URL}/user/groups${query}`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            groups.push(...await response.json());
+            cursor = response.headers.get('X-Next-Cursor');
+        } while (cursor);
+        return groups;
+    },
+
     signup(firstName, lastName, email, password, phone) {
         return this.request('POST', '/auth/signup', {
             firstName,
@@ -1057,8 +1077,8 @@ function handleManualLogin(event) {
             // IMPORTANT: Start with button hidden - let loadActiveGroups() decide
             document.getElementById('activeGroupButton').style.display = 'none';
             
-            // Use api.request to send token as query parameter
-            api.request('GET', '/user/groups')
+            // All pages of the active groups (api.userGroups follows the cursor)
+            api.userGroups()
             .then(groups => {
                 // loadActiveGroups() will show/hide button based on groups
                 loadActiveGroups();
@@ -2723,20 +2743,7 @@ function loadUserGroups() {
     console.log('[GROUPS] Fetching groups from:', baseURL + '/api/user/groups');
     
     // Backend'den gerçek grupları yükle
-    fetch(`${baseURL}/api/user/groups`, {
-        method: 'GET',
-        headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${token}`
-        }
-    })
-    .then(response => {
-        console.log('[GROUPS] Response status:', response.status);
-        if (!response.ok) {
-            throw new Error(`HTTP ${response.status}`);
-        }
-        return response.json();
-    })
+    api.userGroups()
     .then(data => {
         console.log('[GROUPS] API Response:', data);
         if (data && Array.isArray(data) && data.length > 0) {
@@ -2791,7 +2798,7 @@ function displayGroups(groups) {
         try {
             const html = activeGroups.map((group, index) => {
                 console.log('[DISPLAY-MODAL] Rendering modal group', index + 1, ':', group.name, 'Status:', group.status);
-                const memberCount = (group.members || []).length;
+                const memberCount = group.members_count ?? (group.members || []).length;
                 const groupName = group.name || 'İsimsiz Grup';
                 const groupDesc = group.description || 'Açıklama yok';
                 const groupCode = formatQRCode(group.qr_code);
@@ -2835,7 +2842,7 @@ function displayGroups(groups) {
     const closedList = document.getElementById('closedGroupsList');
     if (closedGroups.length > 0) {
         const closedHtml = closedGroups.map(group => {
-            const memberCount = (group.members || []).length;
+            const memberCount = group.members_count ?? (group.members || []).length;
             const groupName = group.name || 'İsimsiz Grup';
             const groupDesc = group.description || 'Açıklama yok';
             const groupCode = formatQRCode(group.qr_code);
@@ -2997,6 +3004,9 @@ function showGroupDetails(groupId, groupName, groupDesc, groupDate, qrCode) {
         detailsModal.classList.remove('modal-close');
         detailsModal.classList.add('modal-open');
         detailsModal.style.display = 'flex';
+
+        // Başka bir üye katılınca / sipariş verince detayları yenile
+        watchGroup(groupId, () => showGroupDetails(groupId, groupName, groupDesc, groupDate, qrCode));
     })
     .catch(error => {
         console.error('[GROUP-DETAILS] ERROR loading group details:', error);
@@ -3298,6 +3308,7 @@ function closeGroupDetailsModal() {
     
     // Clear current group ID
     currentGroupDetailsId = null;
+    unwatchGroup();
     
     // Fade-out animasyonu
     detailsModal.classList.add('modal-close');
@@ -3465,20 +3476,14 @@ async function findRestaurantAndCreateGroup(restaurantName) {
         const resultsDiv = document.getElementById('qr-reader-results');
         if (resultsDiv) resultsDiv.textContent = '⏳ Restoran aranıyor...';
         
-        // Fetch restaurants data
-        const response = await fetch('/restaurants.json');
-        const allRestaurants = await response.json();
-        
-        // Search for restaurant by name (case-insensitive)
+        // Look the restaurant up by name (case-insensitive) - no need to download every menu
         let restaurantId = null;
         let restaurantData = null;
         
-        for (const [id, data] of Object.entries(allRestaurants)) {
-            if (data.name.toLowerCase() === restaurantName.toLowerCase()) {
-                restaurantId = id;
-                restaurantData = data;
-                break;
-            }
+        const response = await fetch(`${API_BASE_URL}/restaurants?name=${encodeURIComponent(restaurantName)}`);
+        if (response.ok) {
+            restaurantData = (await response.json()).restaurant;
+            restaurantId = restaurantData.id;
         }
         
         if (!restaurantId) {
@@ -3531,8 +3536,7 @@ async function createGroupWithRestaurant(restaurantId, restaurantData) {
                 name: restaurantData.name,
                 description: `${restaurantData.name} - Grup Siparişi`,
                 category: 'Restoran',
-                restaurant_id: restaurantId,
-                menu_data: restaurantData
+                restaurant_id: restaurantId  // the server copies the menu from its catalog
             })
         });
         
@@ -3560,6 +3564,77 @@ async function createGroupWithRestaurant(restaurantId, restaurantData) {
     }
 }
 
+// Menus are content-addressed snapshots: group responses fetched with ?menu=ref
+// carry only menu_snapshot_id, and each distinct menu is downloaded once
+// (/api/menus/<id> never changes, so the browser may cache it for good)
+const menuSnapshotCache = new Map();
+
+async function withMenu(groupData) {
+    const snapshotId = groupData.menu_snapshot_id;
+    if (groupData.menu_data || !snapshotId) {
+        return groupData;
+    }
+    if (!menuSnapshotCache.has(snapshotId)) {
+        const response = await fetch(`${API_BASE_URL}/menus/${snapshotId}`);
+        if (!response.ok) {
+            return groupData;
+        }
+        menuSnapshotCache.set(snapshotId, await response.json());
+    }
+    return { ...groupData, menu_data: menuSnapshotCache.get(snapshotId) };
+}
+
+// Live group updates: the server pushes an event (id = group version) when a
+// member joins, the menu changes, an order is placed or the group is closed.
+// EventSource reconnects on its own and resumes with Last-Event-ID; `resync`
+// means events were missed and the group should simply be re-fetched.
+// A refused stream (503 when the server's stream slots are full) isn't
+// retried by EventSource: re-fetch the group and try again in 30 seconds.
+let groupEventSource = null;
+let watchedGroupId = null;
+let groupEventRetry = null;
+
+function watchGroup(groupId, onChange) {
+    if (watchedGroupId === groupId && groupEventSource) {
+        return;
+    }
+    unwatchGroup();
+    if (typeof EventSource === 'undefined') {
+        return;
+    }
+    const token = localStorage.getItem('hesapPaylas_token');
+    groupEventSource = new EventSource(
+        `${API_BASE_URL}/groups/${groupId}/events?token=${encodeURIComponent(token)}`);
+    watchedGroupId = groupId;
+    ['member_joined', 'menu_updated', 'order_created', 'resync'].forEach(type => {
+        groupEventSource.addEventListener(type, event => {
+            console.log('[GROUP-EVENTS]', type, event.data);
+            onChange(JSON.parse(event.data));
+        });
+    });
+    groupEventSource.addEventListener('group_closed', event => {
+        unwatchGroup();
+        onChange(JSON.parse(event.data));
+    });
+    const source = groupEventSource;
+    source.addEventListener('error', () => {
+        if (source === groupEventSource && source.readyState === EventSource.CLOSED) {
+            unwatchGroup();
+            groupEventRetry = setTimeout(() => onChange({ type: 'resync' }), 30000);
+        }
+    });
+}
+
+function unwatchGroup() {
+    if (groupEventSource) {
+        groupEventSource.close();
+    }
+    clearTimeout(groupEventRetry);
+    groupEventRetry = null;
+    groupEventSource = null;
+    watchedGroupId = null;
+}
+
 function showRestaurantMenu(groupData) {
     console.log('[MENU] Showing menu for group:', groupData);
     
@@ -3603,10 +3678,11 @@ function startMenuQRScan() {
     
     // Check if menu already exists and is locked
     const token = localStorage.getItem('hesapPaylas_token');
-    fetch(`${API_BASE_URL}/groups/${groupId}`, {
+    fetch(`${API_BASE_URL}/groups/${groupId}?menu=ref`, {
         headers: { 'Authorization': `Bearer ${token}` }
     })
     .then(r => r.json())
+    .then(withMenu)
     .then(groupData => {
         if (groupData.menu_data && groupData.menu_locked) {
             alert('🔒 Menü zaten kaydedilmiş ve kilitli. Başka bir üye tarafından değiştirilemez.');
@@ -3747,7 +3823,7 @@ async function validateAndDisplayMenuForGroup(restaurantName) {
         const token = localStorage.getItem('hesapPaylas_token');
         
         // Fetch group details to get restaurant info
-        const groupResponse = await fetch(`${API_BASE_URL}/groups/${groupId}`, {
+        const groupResponse = await fetch(`${API_BASE_URL}/groups/${groupId}?menu=ref`, {
             headers: { 'Authorization': `Bearer ${token}` }
         });
         
@@ -3755,7 +3831,7 @@ async function validateAndDisplayMenuForGroup(restaurantName) {
             throw new Error('Grup bilgileri alınamadı');
         }
         
-        const groupData = await groupResponse.json();
+        const groupData = await withMenu(await groupResponse.json());
         console.log('[MENU-SCAN] Group data:', groupData);
         
         // Check if scanned restaurant matches group's restaurant
@@ -4621,7 +4697,7 @@ function joinGroupWithCode(code) {
         messageDiv.style.color = '#3498db';
     }
     
-    fetch(`${baseURL}/api/groups/join`, {
+    fetch(`${baseURL}/api/groups/join?menu=ref`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -4954,8 +5030,8 @@ function loadActiveGroups() {
     const token = localStorage.getItem('hesapPaylas_token');
     if (!token) return Promise.resolve();
     
-    // Use api.request() to send token as query parameter instead of Authorization header
-    return api.request('GET', '/user/groups')
+    // All pages of the active groups (api.userGroups follows the cursor)
+    return api.userGroups()
     .then(groups => {
         console.log('[GROUPS] API returned:', groups.length, 'groups', groups);
         const listContainer = document.getElementById('activeGroupsFloatingList');
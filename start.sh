@@ -24,16 +24,7 @@ python3 seed_render.py 2>&1 || echo "[START] ⚠️  Seed failed but continuing.
 # Give database a moment
 sleep 2
 
-# Start Gunicorn with explicit configuration
+# Start Gunicorn - worker class, threads, recycling and preload come from
+# gunicorn.conf.py (override with WEB_CONCURRENCY, GUNICORN_* env vars)
 echo "[START] Starting Gunicorn on 0.0.0.0:$PORT..."
-exec python3 -m gunicorn \
-    --bind 0.0.0.0:$PORT \
-    --workers 1 \
-    --threads 4 \
-    --worker-class sync \
-    --timeout 120 \
-    --access-logfile - \
-    --error-logfile - \
-    --log-level debug \
-    wsgi:application
-
+exec python3 -m gunicorn --config gunicorn.conf.py wsgi:application
@@ -0,0 +1,190 @@
+"""
+Bill split tests: the engine's rules (personal / shared / excluded items,
+weighted sharers, extras by consumption ratio), totals that reconcile to
+the kuruş, and the MemberBill rows POST /api/orders writes from it.
+
+Run with: python -m pytest -q test_bill_split.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import Group, MemberBill  # noqa: E402
+from bill_split import (EXCLUDED, SHARED, SplitItem, SplitOrder, allocate, member_totals, split_order,  # noqa: E402
+                        split_orders, to_minor)
+from conftest import client_for  # noqa: E402
+from migrate_bill_split import migrate  # noqa: E402
+
+
+def test_rules():
+    order = SplitOrder(1, 'ayse', [
+        SplitItem('Kebap', 30000),
+        SplitItem('Pide', 10000, 2, owner='mehmet'),
+        SplitItem('Salata', 9000, 1, SHARED),
+        SplitItem('Şarap', 50000, 1, EXCLUDED, 'mehmet'),
+    ], tip=5900, tax=4720)
+    shares = split_order(order, ['ayse', 'mehmet', 'zeynep'])
+
+    assert [shares[m].personal for m in ('ayse', 'mehmet', 'zeynep')] == [30000, 20000, 0]
+    assert {share.shared for share in shares.values()} == {3000}
+    assert shares['mehmet'].excluded == 50000
+    assert sum(share.ratio for share in shares.values()) == pytest.approx(1)
+    assert shares['zeynep'].tip == 5900 * 3000 // 59000
+    assert sum(share.total for share in shares.values()) == 59000 + 5900 + 4720
+    assert shares['ayse'].items == [('Kebap', 1, 30000)]
+
+
+def test_orders_without_items_and_outside_owners():
+    shares = split_order(SplitOrder(1, 'ayse', total=12000, delivery=1000), ['mehmet'])
+    assert shares['ayse'].total == 13000  # the owner's own spend, delivery included
+    assert shares['mehmet'].total == 0
+
+    splits = split_orders([SplitOrder(1, 'a', [SplitItem('Çay', 1000, 3, SHARED)]),
+                           SplitOrder(2, 'b', [SplitItem('Su', 500)])], ['a', 'b', 'c'])
+    assert member_totals(splits) == {'a': 1000, 'b': 1500, 'c': 1000}
+
+
+def test_largest_remainder():
+    assert to_minor(12.345) == 1235 and to_minor('0.1') == 10
+    assert allocate(10000, [1, 1, 1]) == [3334, 3333, 3333]
+    assert allocate(100, [1, 2, 0, 4]) == [14, 29, 0, 57]  # 14.28, 28.57, 57.14
+    assert allocate(5, [0, 0]) == [0, 0]
+
+    # 100 TL among 3 plus a 10% tip: every part adds up to the bill
+    shares = split_order(SplitOrder(1, 'a', [SplitItem('Meze', 10000, 1, SHARED)], tip=1000), 'abc')
+    assert [(s.shared, s.tip) for s in shares.values()] == [(3334, 334), (3333, 333), (3333, 333)]
+    assert sum(s.total for s in shares.values()) == 11000
+
+
+def test_amounts_must_be_whole_kurus():
+    # The CLI reads quantities as floats: callers pass the line amount in kuruş
+    for amount in (10000.0, 100.5, '100'):
+        with pytest.raises(TypeError):
+            allocate(amount, [1, 1])
+    with pytest.raises(TypeError):
+        split_order(SplitOrder(1, 'a', [SplitItem('Meze', 10000, 1.0, SHARED)], tip=1000), 'abc')
+    item = SplitItem('Meze', 10000, 1.0, SHARED, amount=to_minor(100.0 * 1.0))
+    shares = split_order(SplitOrder(1, 'a', [item], tip=1000), 'abc')
+    assert [s.total for s in shares.values()] == [3668, 3666, 3666]
+
+
+def test_weighted_sharers():
+    order = SplitOrder(1, 'a', [
+        SplitItem('Rakı', 90000, 1, SHARED, weights={'a': 2, 'b': 1, 'c': 0}),
+        SplitItem('Meze', 3000, 2, SHARED, weights={'a': 1, 'b': 1, 'd': 1}),
+        SplitItem('Meze 2', 1000, 1, SHARED, weights={'a': 1, 'b': 1, 'd': 1}),  # same column as Meze
+        SplitItem('Ekmek', 800, 1, SHARED),
+        SplitItem('Çorba', 12345, 1),
+    ], tip=10001)
+    shares = split_order(order, 'abcdefgh')
+
+    assert shares['a'].shared == 60000 + 2334 + 100
+    assert shares['b'].shared == 30000 + 2333 + 100
+    assert shares['c'].shared == 100 and shares['d'].shared == 2333 + 100
+    assert shares['h'].shared == 100 and shares['h'].tip == 9  # 100 / 110145 of the tip: 9.08
+    assert sum(s.shared for s in shares.values()) == 90000 + 7000 + 800
+    assert sum(s.total for s in shares.values()) == 90000 + 7000 + 800 + 12345 + 10001
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(['ayse', 'mehmet', 'zeynep'], group='123456', members=3)
+
+
+def order(app, user, items, **extra):
+    response = client_for(app, user).post('/api/orders', json={
+        'groupId': app.config['GROUP_ID'], 'restaurant': 'Mor', 'totalAmount': 0, 'items': items, **extra})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['orderId']
+
+
+def bills(app):
+    with app.app_context():
+        return {(b.order_id, b.user_id): b.amount for b in MemberBill.query.all()}
+
+
+def test_create_order_writes_member_bills(app):
+    ayse, mehmet, zeynep = app.config['USER_IDS']
+    first = order(app, 0, [{'name': 'Kebap', 'price': 300},
+                           {'name': 'Salata', 'price': 90, 'type': 'shared'}], tip=39)
+    assert bills(app) == {(first, ayse): 363.0, (first, mehmet): 33.0, (first, zeynep): 33.0}
+
+    second = order(app, 1, [{'name': 'Şarap', 'price': 500, 'type': 'excluded'},
+                            {'name': 'Çay', 'price': 10, 'quantity': 3, 'type': 'shared'}])
+    assert bills(app) == {(first, ayse): 363.0, (first, mehmet): 33.0, (first, zeynep): 33.0,
+                          (second, ayse): 10.0, (second, mehmet): 10.0, (second, zeynep): 10.0}
+
+    client = client_for(app)
+    details = client.get(f'/api/orders/{first}').get_json()
+    ayse_bill = next(b for b in details['bills'] if b['userId'] == ayse)
+    assert [(i['type'], i['amount']) for i in ayse_bill['items']] == [('personal', 300), ('shared', 30), ('tip', 33)]
+    assert details['items'][1]['type'] == 'shared'
+
+    for item in ({'name': 'X', 'price': 1, 'type': 'half'},
+                 {'name': 'X', 'price': 1, 'shares': [ayse]},
+                 {'name': 'X', 'price': 1, 'type': 'shared', 'shares': {str(ayse): 0}},
+                 {'name': 'X', 'price': 1, 'type': 'shared', 'shares': [ayse, 10 ** 6]}):
+        bad = client.post('/api/orders', json={'groupId': app.config['GROUP_ID'], 'restaurant': 'Mor',
+                                               'items': [item]})
+        assert bad.status_code == 400, item
+
+
+def test_create_order_with_shares(app):
+    ayse, mehmet, zeynep = app.config['USER_IDS']
+    first = order(app, 0, [{'name': 'Rakı', 'price': 100, 'type': 'shared', 'shares': {ayse: 2, mehmet: 1}},
+                           {'name': 'Meze', 'price': 100, 'type': 'shared', 'shares': [mehmet, zeynep]},
+                           {'name': 'Ekmek', 'price': 10, 'type': 'shared'}], tip=21)
+    assert bills(app) == {(first, ayse): 77.01, (first, mehmet): 95.33, (first, zeynep): 58.66}
+    assert round(sum(bills(app).values()), 2) == 231
+
+    client = client_for(app)
+    assert client.get(f'/api/orders/{first}').get_json()['items'][0]['shares'] == {str(ayse): 2, str(mehmet): 1}
+
+
+def test_create_order_quantities(app):
+    ayse, mehmet, zeynep = app.config['USER_IDS']
+    first = order(app, 0, [{'name': 'Çay', 'price': 10, 'quantity': '3', 'type': 'shared'}])
+    assert bills(app) == {(first, ayse): 10.0, (first, mehmet): 10.0, (first, zeynep): 10.0}
+
+    client = client_for(app)
+    for quantity in (1.5, 0, -1, 'iki', True, [2]):
+        response = client.post('/api/orders', json={'groupId': app.config['GROUP_ID'], 'items': [
+            {'name': 'Çay', 'price': 10, 'quantity': quantity, 'type': 'shared'}]})
+        assert response.status_code == 400, quantity
+        assert response.get_json()['error'] == 'quantity must be a positive integer'
+    assert len(bills(app)) == 3
+
+
+def test_only_members_create_group_orders(make_app):
+    app = make_app(['ayse', 'mehmet', 'zeynep', 'ali'], group='123456', members=3)
+    outsider = client_for(app, 3)
+    item = {'name': 'Meze', 'price': 900, 'type': 'shared'}
+    response = outsider.post('/api/orders', json={'groupId': app.config['GROUP_ID'], 'items': [item]})
+    assert response.status_code == 403
+    assert outsider.post('/api/orders', json={'groupId': 10 ** 6, 'items': [item]}).status_code == 404
+    assert bills(app) == {}
+    with app.app_context():
+        assert Group.query.one().version == 1  # no bump, no event
+
+
+def test_migration(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hesap.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY, tax FLOAT)"))
+        conn.execute(text("CREATE TABLE order_items (id INTEGER PRIMARY KEY, name VARCHAR(100))"))
+        conn.execute(text("CREATE TABLE member_bills (id INTEGER PRIMARY KEY, order_id INTEGER, user_id INTEGER)"))
+        conn.execute(text("INSERT INTO order_items (name) VALUES ('Kebap')"))
+        conn.execute(text("INSERT INTO member_bills (order_id, user_id) VALUES (1, 1), (1, 2), (1, 1)"))
+    assert migrate(engine, log=lambda *a: None) is True
+    assert migrate(engine, log=lambda *a: None) is False
+    assert {'ix_member_bills_order_id', 'uq_member_bills_order_user'} <= {
+        i['name'] for i in inspect(engine).get_indexes('member_bills')}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT split_type FROM order_items")).scalar() == 'personal'
+        assert conn.execute(text("SELECT id FROM member_bills ORDER BY id")).scalars().all() == [1, 2]
+    assert 'shares' in {c['name'] for c in inspect(engine).get_columns('order_items')}
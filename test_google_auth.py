@@ -0,0 +1,141 @@
+"""
+Google sign-in tests (offline): tokens are signed with a local RSA key that
+is injected through GOOGLE_CERTS, and the certificate cache is driven by a
+fake fetch function.
+
+Run with: python -m pytest -q test_google_auth.py
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import rsa
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import User  # noqa: E402
+from google_keys import GoogleCertCache, verify_google_id_token  # noqa: E402
+
+CLIENT_ID = 'test-client.apps.googleusercontent.com'
+_public, _private = rsa.newkeys(1024)
+PUBLIC_PEM = _public.save_pkcs1().decode()
+SIGNER = crypt.RSASigner.from_string(_private.save_pkcs1().decode())
+
+
+def google_token(email='ayse@example.com', aud=CLIENT_ID, iss='https://accounts.google.com', expires_in=3600,
+                 kid='local-key'):
+    now = int(time.time())
+    payload = {'iss': iss, 'aud': aud, 'sub': '1234567890', 'email': email, 'given_name': 'Ayşe',
+               'family_name': 'Yılmaz', 'iat': now, 'exp': now + expires_in}
+    return google_jwt.encode(SIGNER, payload, key_id=kid).decode()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(GOOGLE_CLIENT_ID=CLIENT_ID, GOOGLE_CERTS={'local-key': PUBLIC_PEM})
+
+
+def test_google_signup_offline(app):
+    client = app.test_client()
+    response = client.post('/api/auth/google', json={'token': google_token()})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['user']['email'] == 'ayse@example.com'
+    with app.app_context():
+        assert User.query.filter_by(email='ayse@example.com').count() == 1
+
+    # Second sign-in logs into the same account
+    assert client.post('/api/auth/google', json={'token': google_token()}).status_code == 200
+    with app.app_context():
+        assert User.query.filter_by(email='ayse@example.com').count() == 1
+
+
+@pytest.mark.parametrize('token', [
+    lambda: google_token(aud='someone-else'),
+    lambda: google_token(iss='https://evil.example.com'),
+    lambda: google_token(expires_in=-600),
+    lambda: google_token(kid='unknown-key'),
+    lambda: google_token()[:-4] + 'AAAA',
+    lambda: 'not-a-jwt',
+])
+def test_google_signup_rejects_bad_tokens(app, token):
+    response = app.test_client().post('/api/auth/google', json={'token': token()})
+    assert response.status_code == 401
+
+
+class FakeFetch:
+    def __init__(self, max_age=3600, delay=0.0):
+        self.max_age = max_age
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+        self.certs = {'local-key': PUBLIC_PEM}
+
+    def __call__(self, url):
+        time.sleep(self.delay)
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError('google unreachable')
+        return dict(self.certs), self.max_age
+
+
+def test_cache_honors_max_age():
+    fetch = FakeFetch(max_age=3600)
+    cache = GoogleCertCache('https://certs', fetch=fetch)
+    for _ in range(50):
+        assert verify_google_id_token(google_token(), CLIENT_ID, cache=cache)['email'] == 'ayse@example.com'
+    assert fetch.calls == 1
+
+
+def test_concurrent_first_use_fetches_once():
+    fetch = FakeFetch(delay=0.1)
+    cache = GoogleCertCache('https://certs', fetch=fetch)
+    threads = [threading.Thread(target=cache.certs) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fetch.calls == 1
+
+
+def test_refreshes_in_background_before_expiry():
+    fetch = FakeFetch(max_age=2)
+    cache = GoogleCertCache('https://certs', fetch=fetch, refresh_margin=1.5)
+    cache.certs()
+    time.sleep(1.1)  # inside the refresh margin, still valid
+    fetch.delay = 0.2
+    started = time.monotonic()
+    assert 'local-key' in cache.certs()
+    assert time.monotonic() - started < 0.1  # served from memory, not waiting on the fetch
+    time.sleep(0.4)
+    assert fetch.calls == 2
+
+
+def test_stale_certs_survive_a_failed_refresh():
+    fetch = FakeFetch(max_age=0)
+    cache = GoogleCertCache('https://certs', fetch=fetch, retry_after=60)
+    cache.certs()
+    fetch.fail = True
+    assert verify_google_id_token(google_token(), CLIENT_ID, cache=cache)
+    assert cache.fetch_errors == 1
+    assert verify_google_id_token(google_token(), CLIENT_ID, cache=cache)
+    assert fetch.calls == 2  # no refetch storm while Google is down
+
+
+def test_unknown_kid_triggers_one_early_refresh():
+    fetch = FakeFetch()
+    fetch.certs = {}
+    cache = GoogleCertCache('https://certs', fetch=fetch, retry_after=0)
+    cache.certs()
+    fetch.certs = {'local-key': PUBLIC_PEM}  # Google rotated a new key in
+    assert verify_google_id_token(google_token(), CLIENT_ID, cache=cache)
+    assert fetch.calls == 2
+
+    cache.retry_after = 60
+    with pytest.raises(ValueError):
+        verify_google_id_token(google_token(kid='forged'), CLIENT_ID, cache=cache)
+    assert fetch.calls == 2
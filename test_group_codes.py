@@ -0,0 +1,107 @@
+"""
+Group code allocator tests: inserts retry on the unique index, closed
+groups give their codes back, and a crowded space falls back to probing.
+
+Run with: python -m pytest -q test_group_codes.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import Group, db  # noqa: E402
+from conftest import client_for  # noqa: E402
+from group_codes import CODE_SPACE, CodeSpaceExhausted, GroupCodeAllocator  # noqa: E402
+
+
+class ScriptedRng:
+    """Hands out the given codes, then `fallback`; always probes block `block`"""
+
+    def __init__(self, codes=(), fallback=999999, block=0):
+        self.codes = list(codes)
+        self.fallback = fallback
+        self.block = block
+
+    def randrange(self, n):
+        if n == CODE_SPACE:
+            return self.codes.pop(0) if self.codes else self.fallback
+        return self.block
+
+    def shuffle(self, items):
+        pass
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(['Ayşe'])
+
+
+def add_groups(codes, active=True):
+    db.session.execute(Group.__table__.insert(), [
+        {'name': f'G{code}', 'code': code, 'is_active': active} for code in codes])
+    db.session.commit()
+
+
+def use_allocator(app, allocator):
+    app.extensions['group_code_allocator'] = allocator
+    return allocator
+
+
+def create_group(app):
+    return client_for(app).post('/api/groups', json={'name': 'Masa'})
+
+
+def test_collision_retries_with_another_code(app):
+    allocator = use_allocator(app, GroupCodeAllocator(rng=ScriptedRng([42, 7])))
+    with app.app_context():
+        add_groups(['000042'])
+    response = create_group(app)
+    assert response.status_code == 201
+    assert response.get_json()['group']['code_formatted'] == '000-007'
+    assert allocator.stats() == {'allocated': 1, 'inserts': 2, 'collisions': 1,
+                                 'reclaimed': 0, 'probes': 0, 'exhausted': 0}
+    with app.app_context():
+        assert Group.query.count() == 2
+        # the failed insert rolled back only its savepoint: the creator's membership is there
+        assert [u.id for u in Group.query.filter_by(code='000007').one().members] == [1]
+
+
+def test_closed_groups_give_their_code_back(app):
+    allocator = use_allocator(app, GroupCodeAllocator(rng=ScriptedRng([123456])))
+    with app.app_context():
+        add_groups(['123456'], active=False)
+        closed_id = Group.query.one().id
+    assert create_group(app).get_json()['group']['code'] == '123456'
+    assert allocator.stats()['reclaimed'] == 1
+    with app.app_context():
+        assert db.session.get(Group, closed_id).code == f'-{closed_id}'
+
+
+def test_crowded_space_probes_a_block(app):
+    allocator = use_allocator(app, GroupCodeAllocator(random_tries=2, max_probes=1, rng=ScriptedRng()))
+    with app.app_context():
+        add_groups([f'{n:06d}' for n in range(100) if n != 31] + ['999999'])
+    assert create_group(app).get_json()['group']['code'] == '000031'
+    assert allocator.stats()['probes'] == 1
+
+    response = create_group(app)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert allocator.stats()['exhausted'] == 1
+    with app.app_context():
+        with pytest.raises(CodeSpaceExhausted):
+            allocator.insert(db.session, Group(name='Mor'))
+        db.session.rollback()
+        assert Group.query.count() == 101
+    assert allocator.stats()['exhausted'] == 2
+
+
+def test_other_integrity_errors_are_not_retried(app):
+    with app.app_context():
+        group = Group(name=None)  # name is NOT NULL
+        with pytest.raises(IntegrityError):
+            GroupCodeAllocator(rng=ScriptedRng([1, 2])).insert(db.session, group)
@@ -0,0 +1,166 @@
+"""
+Live group update tests: the SSE stream, resuming from Last-Event-ID,
+heartbeats, the stream cap and the cross-worker SQL backend.
+
+Run with: python -m pytest -q test_group_events.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from conftest import client_for  # noqa: E402
+from group_events import (EventBroker, GroupEvent, GroupEvents, MemoryBackend, SQLBackend,  # noqa: E402
+                          TooManyStreams, default_max_streams)
+
+
+def make_events(**kwargs):
+    broker = EventBroker(**{k: kwargs.pop(k) for k in ('history', 'max_pending') if k in kwargs})
+    return GroupEvents(MemoryBackend(broker), broker, **kwargs)
+
+
+def parse(message):
+    """(event type, id) of an SSE message; ('comment', None) for heartbeats"""
+    if message.startswith(':'):
+        return 'comment', None
+    fields = dict(line.split(': ', 1) for line in message.strip().split('\n'))
+    return fields.get('event'), fields.get('id')
+
+
+def test_stream_pushes_events_and_ends_on_close():
+    events = make_events(heartbeat=0.05)
+    subscription = events.subscribe(1)
+    stream = events.stream(subscription, current_version=3)
+    assert next(stream).startswith('retry:')
+    assert parse(next(stream)) == ('version', '3')
+
+    events.publish(1, 4, 'member_joined', user_id=7, first_name='Ayşe')
+    events.publish(2, 9, 'member_joined', user_id=8, first_name='Other group')
+    message = next(stream)
+    assert parse(message) == ('member_joined', '4')
+    assert '"first_name":"Ayşe"' in message
+
+    assert parse(next(stream)) == ('comment', None)  # heartbeat while idle
+    events.publish(1, 5, 'group_closed')
+    assert parse(next(stream)) == ('group_closed', '5')
+    assert list(stream) == []
+    assert events.stats()['streams'] == 0
+
+
+def test_resume_from_last_event_id():
+    events = make_events(heartbeat=0.05, max_stream_seconds=0.01)
+    for version in (2, 3, 4):
+        events.publish(1, version, 'order_created', order_id=version)
+
+    messages = list(events.stream(events.subscribe(1), current_version=4, last_event_id=2))
+    assert [parse(m) for m in messages[1:]] == [('order_created', '3'), ('order_created', '4')]
+
+    # Older than anything this process remembers: the client re-fetches the group
+    messages = list(events.stream(events.subscribe(5), current_version=9, last_event_id=1))
+    assert parse(messages[1]) == ('resync', '9')
+
+
+def test_stream_cap_and_stalled_clients():
+    events = make_events(max_streams=2, max_pending=2, heartbeat=0.05, max_stream_seconds=0.2)
+    first, second = events.subscribe(1), events.subscribe(1)
+    with pytest.raises(TooManyStreams):
+        events.subscribe(1)
+
+    stream = events.stream(first, current_version=1)
+    next(stream), next(stream)
+    for version in range(2, 6):
+        events.publish(1, version, 'order_created')
+    assert parse(next(stream)) == ('resync', '1')  # overflowed: re-fetch instead of a partial list
+    events.close(second)
+    stream.close()
+    assert events.stats()['streams'] == 0
+    events.subscribe(1)  # slots are released
+
+
+def test_threaded_cap_leaves_threads_for_requests():
+    assert default_max_streams(threads=8, reserved=4) == 4
+    assert default_max_streams(threads=32, reserved=4) == 28
+    assert default_max_streams(threads=4, reserved=4) == 0  # no streams: clients re-fetch
+    events = make_events(max_streams=0)
+    with pytest.raises(TooManyStreams):
+        events.subscribe(1)
+
+
+def test_sql_backend_carries_events_between_workers(tmp_path):
+    url = f"sqlite:///{tmp_path / 'events.db'}"
+    worker_a, worker_b = EventBroker(), EventBroker()
+    backend_a, backend_b = SQLBackend(worker_a, url), SQLBackend(worker_b, url)
+    subscription = worker_b.subscribe(1)
+
+    backend_a.publish(GroupEvent(1, 2, 'menu_updated', {'menu_locked': True}))
+    assert backend_b.poll() == 1
+    assert backend_b.poll() == 0  # the overlap window doesn't deliver twice
+    [event] = subscription.wait(0)
+    assert (event.version, event.type, event.data) == (2, 'menu_updated', {'menu_locked': True})
+
+    backend_a.publish(GroupEvent(1, 3, 'group_closed'))
+    assert [e.version for e in backend_b.history(1, 1, 3)] == [2, 3]
+    assert backend_b.history(1, 1, 4) is None
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(['ayse', 'mehmet', 'zeynep'], group='123456',
+                    GROUP_EVENTS_HEARTBEAT_SECONDS=0.05, GROUP_EVENTS_MAX_STREAM_SECONDS=0.3)
+
+
+def open_stream(app, user=0, headers=None):
+    return app.test_client().get(
+        f"/api/groups/{app.config['GROUP_ID']}/events?token={app.config['TOKENS'][user]}",
+        headers=headers or {}, buffered=False)
+
+
+def messages(response):
+    """Events of a streamed response, without the retry: preamble"""
+    return [parse(chunk.decode()) for chunk in response.response if not chunk.startswith(b'retry:')]
+
+
+def test_events_endpoint(app):
+    group_id = app.config['GROUP_ID']
+    guest = client_for(app, 1)
+
+    assert open_stream(app, user=1).status_code == 403  # not a member yet
+    response = open_stream(app)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    started = time.monotonic()
+    assert guest.post('/api/groups/join', json={'code': '123456'}).status_code == 201
+    assert guest.post('/api/orders', json={'groupId': group_id, 'restaurant': 'Mor', 'totalAmount': 50}).status_code == 201
+    received = messages(response)
+    assert time.monotonic() - started < 2
+    assert [m for m in received if m[0] != 'comment'] == [
+        ('version', '1'), ('member_joined', '2'), ('order_created', '3')]
+    assert ('comment', None) in received  # heartbeats until the stream's lifetime ends
+
+    # Reconnect after the stream ended: nothing missed, then the close
+    response = open_stream(app, headers={'Last-Event-ID': '3'})
+    assert guest.post(f'/api/groups/{group_id}/close').status_code == 200
+    assert [m for m in messages(response) if m[0] != 'comment'] == [('group_closed', '4')]
+    assert open_stream(app, headers={'Last-Event-ID': '4'}).status_code == 204
+
+
+def test_events_endpoint_cap(app):
+    app.config['GROUP_EVENTS_MAX_STREAMS'] = 1
+    first = open_stream(app)
+    second = open_stream(app)
+    assert second.status_code == 503
+    first.close()
+    assert open_stream(app).status_code == 200
+
+
+def test_events_endpoint_cap_follows_threads(make_app):
+    app = make_app(['ayse'], group='123456', GUNICORN_THREADS=5, GROUP_EVENTS_MAX_STREAM_SECONDS=0.3)
+    first = open_stream(app)
+    assert open_stream(app).status_code == 503  # 5 threads, 4 kept for requests
+    first.close()
+    assert open_stream(app).status_code == 200
@@ -0,0 +1,102 @@
+"""
+Join burst tests: simultaneous joins to one group share a transaction,
+repeated joins are answered "already a member", and nothing fails on the
+group_members primary key.
+
+Run with: python -m pytest -q test_group_joins.py
+"""
+
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import Group, db  # noqa: E402
+from join_batcher import JoinBatcher  # noqa: E402
+from memberships import member_counts  # noqa: E402
+
+
+def burst(count, target):
+    """Run target(i) for i in range(count) on threads released together"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(i):
+        barrier.wait()
+        results[i] = target(i)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_batcher_coalesces_and_answers_repeats():
+    batcher = JoinBatcher(window=0.2)
+    calls = []
+
+    def apply(group_id, joiners):
+        calls.append((group_id, joiners))
+        return {joiner: 'added' for joiner in joiners}
+
+    results = burst(6, lambda i: batcher.join(1, [1, 2, 3, 4, 5, 1][i], apply))
+    assert len(calls) == 1 and sorted(calls[0][1]) == [1, 2, 3, 4, 5]
+    assert Counter(results) == {'added': 5, None: 1}
+    assert batcher.stats() == {'joins': 6, 'batches': 1, 'largest_batch': 5, 'failed_batches': 0}
+
+
+def test_failed_batch_retries_each_join_alone():
+    batcher = JoinBatcher(window=0.2)
+    calls = []
+
+    def apply(group_id, joiners):
+        calls.append(joiners)
+        if len(joiners) > 1:
+            raise RuntimeError('deadlock')
+        return {joiner: 'added' for joiner in joiners}
+
+    results = burst(3, lambda i: batcher.join(1, i, apply))
+    assert results == ['added'] * 3  # the leader's join too
+    assert sorted(calls[0]) == [0, 1, 2] and sorted(calls[1:]) == [[0], [1], [2]]
+    assert batcher.stats()['failed_batches'] == 1
+
+    def fail(group_id, joiners):
+        raise RuntimeError('database down')
+
+    with pytest.raises(RuntimeError):
+        batcher.join(1, 'x', fail)  # failing alone too: the error reaches the request
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    return make_app(11, group='123456', group_name='Masa 4',
+                    SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'hesap.db'}", GROUP_JOIN_BATCH_MS=100)
+
+
+def test_join_burst(app):
+    group_id, tokens = app.config['GROUP_ID'], app.config['TOKENS'][1:]
+    with app.app_context():
+        from group_events import get_group_events
+        subscription = get_group_events().subscribe(group_id)
+    taps = tokens + tokens[:3]  # three phones scanned twice
+
+    def join(i):
+        return app.test_client().post('/api/groups/join', json={'code': '123-456'},
+                                      headers={'Authorization': f'Bearer {taps[i]}'}).status_code
+
+    assert Counter(burst(len(taps), join)) == {201: 10, 200: 3}
+    with app.app_context():
+        assert member_counts([group_id]) == {group_id: 11}
+        assert db.session.get(Group, group_id).version == 11  # one version per new member
+        stats = app.extensions['join_batcher'].stats()
+    assert stats['joins'] == 13 and stats['batches'] < 13
+
+    events = subscription.wait(0)
+    assert [e.type for e in events] == ['member_joined'] * 10
+    assert [e.version for e in events] == list(range(2, 12))
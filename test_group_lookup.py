@@ -0,0 +1,91 @@
+"""
+Join-code lookup cache tests: repeated codes skip the code query, unknown
+codes are answered from the negative cache until its TTL, and creating,
+closing or reclaiming a code never leaves a join pointing at the wrong group.
+
+Run with: python -m pytest -q test_group_lookup.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import Group, db  # noqa: E402
+from conftest import client_for  # noqa: E402
+from group_codes import get_code_allocator  # noqa: E402
+from group_lookup import get_group_lookup, normalize_code  # noqa: E402
+
+
+class FixedRng:
+    def __init__(self, code):
+        self.code = code
+
+    def randrange(self, n):
+        return self.code
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(['ayse', 'mehmet'], group='123456', GROUP_LOOKUP_NEGATIVE_TTL=0.2)
+
+
+def code_queries(app):
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+    return lambda: [s for s in statements if 'groups.code =' in s or 'groups.qr_code =' in s]
+
+
+def test_normalize_code():
+    assert normalize_code(' 123-456 ') == normalize_code('123 456') == '123456'
+
+
+def test_hits_and_negative_hits(app):
+    guest = client_for(app, 1)
+    queries = code_queries(app)
+
+    assert guest.post('/api/groups/join', json={'code': '999-999'}).status_code == 404
+    assert len(queries()) == 1
+    assert guest.post('/api/groups/join', json={'code': '999999'}).status_code == 404
+    assert len(queries()) == 1  # answered from the negative cache
+    time.sleep(0.25)
+    assert guest.post('/api/groups/join', json={'code': '999999'}).status_code == 404
+    assert len(queries()) == 2  # the miss expired
+
+    assert guest.post('/api/groups/join', json={'code': '123-456'}).status_code == 201
+    assert guest.post('/api/groups/join', json={'code': '123456'}).status_code == 200
+    assert len(queries()) == 3
+
+    stats = app.test_client().get('/api/admin/settings').get_json()['group_lookup']
+    assert (stats['hits'], stats['negative_hits'], stats['misses']) == (1, 1, 3)
+
+
+def test_create_close_and_reclaim_invalidate(app):
+    owner = client_for(app)
+    assert owner.post('/api/groups/join', json={'code': '654321'}).status_code == 404  # cached as missing
+
+    with app.app_context():
+        get_code_allocator(app).rng = FixedRng(654321)
+    created = owner.post('/api/groups', json={'name': 'Yeni'})
+    assert created.status_code == 201
+    assert client_for(app, 1).post('/api/groups/join', json={'code': '654321'}).status_code == 201
+
+    # The old group closes and a new group reclaims its code: the cached id is stale
+    new_id = created.get_json()['group']['id']
+    assert owner.post(f'/api/groups/{new_id}/close').status_code == 200
+    with app.app_context():
+        assert db.session.get(Group, new_id).code == '654321'  # closed groups keep their code
+        lookup = get_group_lookup(app)
+        assert lookup.find(db.session, Group, code='654321').id == new_id
+        db.session.execute(db.update(Group).where(Group.id == new_id).values(code='-x'))
+        reclaimed = Group(name='Sonraki', code='654321')
+        db.session.add(reclaimed)
+        db.session.commit()
+        assert lookup.find(db.session, Group, code='654-321').id == reclaimed.id
+        assert lookup.stats()['stale'] == 1
@@ -0,0 +1,94 @@
+"""
+Group version tests: every change a poller can see bumps groups.version,
+and If-None-Match on GET /api/groups/<id> is answered 304 from one lookup.
+
+Run with: python -m pytest -q test_group_versions.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import db  # noqa: E402
+from conftest import client_for  # noqa: E402
+from migrate_group_versions import migrate  # noqa: E402
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(['ayse', 'mehmet'], group='123456')
+
+
+def poll(client, app, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.get(f"/api/groups/{app.config['GROUP_ID']}", headers=headers)
+
+
+def test_unchanged_group_is_a_single_lookup(app):
+    client = client_for(app)
+    first = poll(client, app)
+    assert first.status_code == 200
+    assert first.get_json()['version'] == 1
+    etag = first.headers['ETag']
+    assert 'no-cache' in first.headers['Cache-Control']
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+    response = poll(client, app, etag)
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert len(statements) == 1 and 'groups.version' in statements[0]
+
+    by_ref = client.get(f"/api/groups/{app.config['GROUP_ID']}?menu=ref", headers={'If-None-Match': etag})
+    assert by_ref.status_code == 200  # a different representation, a different ETag
+
+
+def test_changes_bump_the_version(app):
+    owner, guest = client_for(app, 0), client_for(app, 1)
+    group_id = app.config['GROUP_ID']
+    etags = [poll(owner, app).headers['ETag']]
+
+    def changed():
+        response = poll(owner, app, etags[-1])
+        assert response.status_code == 200
+        etags.append(response.headers['ETag'])
+        return response.get_json()
+
+    assert guest.post('/api/groups/join', json={'code': '123-456'}).status_code == 201
+    assert len(changed()['members']) == 2
+    assert guest.post('/api/groups/join', json={'code': '123456'}).status_code == 200  # already a member
+    assert poll(owner, app, etags[-1]).status_code == 304
+
+    assert guest.put(f'/api/groups/{group_id}', json={'menu_data': {'categories': {}}}).status_code == 200
+    assert changed()['menu_data'] == {'categories': {}}
+    for no_op in ({'menu_data': {'categories': {}}}, {'menu_locked': False}, {'name': 'ignored'}):
+        assert guest.put(f'/api/groups/{group_id}', json=no_op).status_code == 200
+        assert poll(owner, app, etags[-1]).status_code == 304, no_op  # same menu: same version
+
+    assert guest.post('/api/orders', json={'groupId': group_id, 'restaurant': 'Mor', 'totalAmount': 90}).status_code == 201
+    assert len(changed()['orders']) == 1
+
+    assert guest.put('/api/user/profile', json={'firstName': 'Memo'}).status_code == 200
+    assert 'Memo' in [m['firstName'] for m in changed()['members']]
+
+    assert owner.post(f'/api/groups/{group_id}/close').status_code == 200
+    assert changed()['version'] == 6
+    assert len(set(etags)) == 6
+
+
+def test_migration_adds_the_column(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hesap.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE groups (id INTEGER PRIMARY KEY, name VARCHAR(100))"))
+        conn.execute(text("INSERT INTO groups (name) VALUES ('Mor')"))
+    assert migrate(engine, log=lambda *a: None) is True
+    assert migrate(engine, log=lambda *a: None) is False
+    assert 'version' in {c['name'] for c in inspect(engine).get_columns('groups')}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version FROM groups")).scalar() == 1
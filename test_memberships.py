@@ -0,0 +1,94 @@
+"""
+Membership tests: membership checks, joins and deletes are single
+statements on group_members and never load a group's member list.
+
+Run with: python -m pytest -q test_memberships.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import Group, db  # noqa: E402
+from conftest import client_for  # noqa: E402
+from memberships import add_member, group_members, is_member, member_counts, remove_member  # noqa: E402
+from migrate_group_members_index import migrate  # noqa: E402
+
+MEMBERS = 300
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(MEMBERS + 2, group='123456', members=MEMBERS, group_name='Düğün')
+
+
+def record_statements(app):
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_service(app):
+    group_id, user_ids = app.config['GROUP_ID'], app.config['USER_IDS']
+    newcomer = user_ids[-1]
+    with app.app_context():
+        assert is_member(group_id, user_ids[0])
+        assert not is_member(group_id, newcomer)
+        assert add_member(group_id, newcomer) is True
+        assert add_member(group_id, newcomer) is False  # no duplicate, no IntegrityError
+        assert member_counts([group_id, 999]) == {group_id: MEMBERS + 1}
+        assert remove_member(group_id, newcomer) is True
+        assert remove_member(group_id, newcomer) is False
+        db.session.commit()
+        assert 'ix_group_members_user_id' in {i['name'] for i in inspect(db.engine).get_indexes('group_members')}
+
+
+def test_handlers_never_load_the_member_list(app):
+    group_id = app.config['GROUP_ID']
+    member, newcomer = client_for(app, 1), client_for(app, -2)
+    statements = record_statements(app)
+
+    assert newcomer.post('/api/groups/join', json={'code': '123-456'}).status_code == 201
+    assert newcomer.post('/api/groups/join', json={'code': '123456'}).status_code == 200
+    assert member.put(f'/api/groups/{group_id}', json={'menu_locked': True}).status_code == 200
+    assert client_for(app, -1).post(f'/api/groups/{group_id}/close').status_code == 403
+
+    # update_group still lists the members in its response: one query for all of them
+    member_loads = [s for s in statements if 'FROM users' in s and 'group_members' in s]
+    assert len(member_loads) == 1
+    assert not [s for s in statements if 'FROM users' in s and 'group_members' not in s
+                and 'users.id = ?' not in s]
+
+    statements.clear()
+    assert member.delete(f'/api/groups/{group_id}/delete', json={}).status_code == 200
+    assert not [s for s in statements if 'FROM users' in s]
+    assert len([s for s in statements if s.startswith('DELETE FROM group_members')]) == 1
+    with app.app_context():
+        assert db.session.execute(db.select(db.func.count()).select_from(group_members)).scalar() == 0
+        assert db.session.get(Group, group_id) is None
+
+
+def test_admin_user_delete_removes_memberships(app):
+    group_id, user_ids = app.config['GROUP_ID'], app.config['USER_IDS']
+    statements = record_statements(app)
+    assert app.test_client().delete(f'/api/admin/users/{user_ids[5]}').status_code == 200
+    assert not [s for s in statements if 'FROM groups' in s and 'group_members' in s and 'SELECT' in s]
+    with app.app_context():
+        assert not is_member(group_id, user_ids[5])
+        assert member_counts([group_id]) == {group_id: MEMBERS - 1}
+
+
+def test_migration_adds_the_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hesap.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE group_members (group_id INTEGER, user_id INTEGER, "
+                          "PRIMARY KEY (group_id, user_id))"))
+    assert migrate(engine, log=lambda *a: None) is True
+    assert migrate(engine, log=lambda *a: None) is False
+    assert 'ix_group_members_user_id' in {i['name'] for i in inspect(engine).get_indexes('group_members')}
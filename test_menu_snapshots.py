@@ -0,0 +1,145 @@
+"""
+Menu snapshot tests: groups share one content-addressed copy of a menu,
+edits are copy-on-write, and the content hash is the menu's ETag.
+
+Run with: python -m pytest -q test_menu_snapshots.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import Group, db, group_members  # noqa: E402
+from catalog import content_hash  # noqa: E402
+from conftest import client_for  # noqa: E402
+from menus import MenuSnapshot  # noqa: E402
+from migrate_menu_snapshots import migrate  # noqa: E402
+
+RESTAURANTS = {
+    'rest_001': {'name': 'Tarihi Kebapçı', 'phone': '0216-123-4567',
+                 'categories': {'Kebaplar': [{'name': 'Adana Kebap', 'price': 45.0}]}},
+}
+
+
+@pytest.fixture
+def restaurants_file(tmp_path):
+    path = tmp_path / 'restaurants.json'
+    path.write_text(json.dumps(RESTAURANTS, ensure_ascii=False), encoding='utf-8')
+    return path
+
+
+@pytest.fixture
+def app(make_app, restaurants_file):
+    return make_app(['Ayşe'], RESTAURANTS_FILE=restaurants_file)
+
+
+@pytest.fixture
+def client(app):
+    return client_for(app)
+
+
+def create_groups(client, n):
+    groups = []
+    for _ in range(n):
+        response = client.post('/api/groups', json={'restaurant_id': 'rest_001'})
+        assert response.status_code == 201, response.get_json()
+        groups.append(response.get_json()['group'])
+    return groups
+
+
+def test_groups_of_a_restaurant_share_one_snapshot(app, client):
+    groups = create_groups(client, 3)
+    menu = RESTAURANTS['rest_001']
+    assert {g['menu_snapshot_id'] for g in groups} == {content_hash(menu)}
+    assert all(g['menu_data'] == menu for g in groups)
+    with app.app_context():
+        assert MenuSnapshot.query.count() == 1
+        assert all(g.menu_data is None for g in Group.query)
+
+
+def test_menu_edit_is_copy_on_write(app, client):
+    first, second = create_groups(client, 2)
+    edited = {'categories': {'Kebaplar': [{'name': 'Adana Kebap', 'price': 50.0}]}}
+    response = client.put(f"/api/groups/{first['id']}", json={'menu_data': edited})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['menu_etag'] == content_hash(edited)
+
+    assert client.get(f"/api/groups/{first['id']}").get_json()['menu_data'] == edited
+    assert client.get(f"/api/groups/{second['id']}").get_json()['menu_data'] == RESTAURANTS['rest_001']
+    with app.app_context():
+        assert MenuSnapshot.query.count() == 2
+
+
+def test_menu_ref_and_etags(client):
+    [group] = create_groups(client, 1)
+    snapshot_id = group['menu_snapshot_id']
+
+    by_ref = client.get(f"/api/groups/{group['id']}?menu=ref").get_json()
+    assert 'menu_data' not in by_ref
+    assert by_ref['menu_etag'] == snapshot_id
+
+    response = client.get(f'/api/menus/{snapshot_id}')
+    assert response.get_json() == RESTAURANTS['rest_001']
+    assert response.headers['ETag'] == f'"{snapshot_id}"'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert client.get(f'/api/menus/{snapshot_id}', headers={'If-None-Match': f'"{snapshot_id}"'}).status_code == 304
+    assert client.get('/api/menus/' + '0' * 64).status_code == 404
+
+    response = client.get(f"/api/groups/{group['id']}/menu", headers={'If-None-Match': f'"{snapshot_id}"'})
+    assert response.status_code == 304
+
+
+def test_group_menu_is_for_members(make_app, restaurants_file):
+    app = make_app(['Ayşe', 'Mehmet'], group='123456', RESTAURANTS_FILE=restaurants_file)
+    group_id = app.config['GROUP_ID']
+    assert client_for(app, 0).get(f'/api/groups/{group_id}/menu').status_code == 404  # no menu yet
+    response = client_for(app, 1).get(f'/api/groups/{group_id}/menu')
+    assert response.status_code == 403
+    assert response.get_json()['error'] == 'Not a group member'
+
+
+def test_legacy_groups_keep_their_menu_data(app, client):
+    menu = {'categories': {'Çorbalar': [{'name': 'Mercimek', 'price': 20.0}]}}
+    with app.app_context():
+        group = Group(name='Eski', code='123456', menu_data=menu)
+        db.session.add(group)
+        db.session.flush()
+        db.session.execute(group_members.insert(), {'group_id': group.id, 'user_id': app.config['USER_IDS'][0]})
+        db.session.commit()
+        group_id = group.id
+
+    body = client.get(f'/api/groups/{group_id}?menu=ref').get_json()
+    assert body['menu_snapshot_id'] is None
+    assert body['menu_data'] == menu
+    response = client.get(f'/api/groups/{group_id}/menu')
+    assert response.get_json() == menu
+    assert response.headers['ETag'] == f'"{content_hash(menu)}"'
+
+
+def test_migration_moves_menus_into_snapshots(make_app, restaurants_file, tmp_path):
+    url = f"sqlite:///{tmp_path / 'hesap.db'}"
+    app = make_app(RESTAURANTS_FILE=restaurants_file, SQLALCHEMY_DATABASE_URI=url)
+    menus = [{'categories': {'A': [{'name': 'x', 'price': 1.0}]}},
+             {'categories': {'B': [{'name': 'y', 'price': 2.0}]}}]
+    with app.app_context():
+        for i in range(5):
+            db.session.add(Group(name=f'G{i}', code=f'10000{i}', menu_data=menus[i % 2]))
+        db.session.add(Group(name='Boş', code='100009'))
+        db.session.commit()
+        db.session.remove()
+
+    engine = create_engine(url)
+    assert migrate(engine, batch_size=2, log=lambda *a: None) == (5, 2)
+    assert migrate(engine, batch_size=2, log=lambda *a: None) == (0, 0)  # re-run is a no-op
+
+    with app.app_context():
+        groups = Group.query.order_by(Group.id).all()
+        assert [g.menu_snapshot_id for g in groups] == [content_hash(menus[i % 2]) for i in range(5)] + [None]
+        assert all(g.menu_data is None for g in groups)
+        assert app.test_client().get(f'/api/menus/{groups[1].menu_snapshot_id}').get_json() == menus[1]
+        db.session.remove()
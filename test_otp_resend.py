@@ -0,0 +1,92 @@
+"""
+Resend coalescing tests: repeated code requests within OTP_RESEND_SECONDS
+reuse the outstanding code instead of sending another SMS/email.
+
+Run with: python -m pytest -q test_otp_resend.py
+"""
+
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import OTPVerification, User, db  # noqa: E402
+from outbox import OutboxMessage  # noqa: E402
+
+PHONE = '+905323133277'
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(OTP_RESEND_SECONDS=60)
+    with app.app_context():
+        db.session.add(User(first_name='Ayşe', last_name='Y', email='ayse@example.com', phone=PHONE,
+                            password_hash='x'))
+        db.session.commit()
+    return app
+
+
+def outbox_kinds(app):
+    with app.app_context():
+        return [m.kind for m in OutboxMessage.query.order_by(OutboxMessage.id)]
+
+
+def age_codes(app, seconds):
+    with app.app_context():
+        for otp in OTPVerification.query:
+            otp.created_at -= timedelta(seconds=seconds)
+        db.session.commit()
+
+
+def test_request_otp_taps_coalesce(app):
+    client = app.test_client()
+    first = client.post('/api/auth/request-otp', json={'phone': '0532 313 32 77'}).get_json()
+    second = client.post('/api/auth/request-otp', json={'phone': PHONE}).get_json()
+
+    assert (first['coalesced'], second['coalesced']) == (False, True)
+    assert 0 < second['resend_available_in'] <= 60
+    assert second['resend_available_at'] == first['resend_available_at']
+    assert outbox_kinds(app) == ['sms_verification']
+
+    age_codes(app, 61)
+    third = client.post('/api/auth/request-otp', json={'phone': PHONE}).get_json()
+    assert third['coalesced'] is False
+    assert outbox_kinds(app) == ['sms_verification', 'sms_verification']
+
+
+def test_successful_verification_ends_the_window(app):
+    client = app.test_client()
+    client.post('/api/auth/request-otp', json={'phone': PHONE})
+    assert client.post('/api/auth/verify-otp', json={'phone': PHONE, 'code': '123456'}).status_code == 200
+    assert client.post('/api/auth/request-otp', json={'phone': PHONE}).get_json()['coalesced'] is False
+
+
+def test_pin_reset_reuses_the_outstanding_code(app):
+    client = app.test_client()
+    first = client.post('/api/auth/request-pin-reset', json={'phone': PHONE, 'method': 'whatsapp'}).get_json()
+    # Switching to email sends the same code, once
+    second = client.post('/api/auth/request-pin-reset', json={'phone': PHONE, 'method': 'email'}).get_json()
+    third = client.post('/api/auth/request-pin-reset', json={'phone': PHONE, 'method': 'email'}).get_json()
+
+    assert (first['coalesced'], second['coalesced'], third['coalesced']) == (False, True, True)
+    assert outbox_kinds(app) == ['email']
+    with app.app_context():
+        [otp] = OTPVerification.query.all()
+        assert first['whatsapp_hint'].endswith(otp.code)
+        assert OutboxMessage.query.one().payload['reset_code'] == otp.code
+
+
+def test_pin_reset_both_coalesces_and_used_codes_do_not_count(app):
+    client = app.test_client()
+    assert client.post('/api/auth/request-pin-reset-both', json={'phone': PHONE}).get_json()['coalesced'] is False
+    assert client.post('/api/auth/request-pin-reset-both', json={'phone': PHONE}).get_json()['coalesced'] is True
+    assert outbox_kinds(app) == ['email']
+
+    with app.app_context():
+        code = OTPVerification.query.one().code
+    assert client.post('/api/auth/verify-pin-reset', json={'phone': PHONE, 'code': code}).status_code == 200
+    assert client.post('/api/auth/request-pin-reset-both', json={'phone': PHONE}).get_json()['coalesced'] is False
+    assert outbox_kinds(app) == ['email', 'email']
@@ -0,0 +1,80 @@
+"""
+OTP lifecycle tests: expiry sweeper and the reset-code lookups it must not break.
+
+Run with: python -m pytest -q test_otp_sweeper.py
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import OTPVerification, db  # noqa: E402
+from otp_sweeper import OTPSweeper, sweep_expired_otps  # noqa: E402
+
+PHONE = '+905323133277'
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(OTP_SWEEP_CHUNK=3, OTP_SWEEP_GRACE_SECONDS=3600)
+    with app.app_context():
+        yield app
+        db.drop_all()
+
+
+def add_code(code, expires_in_minutes, used=False, phone=PHONE):
+    otp = OTPVerification(phone=phone, code=code, otp_code=code, purpose='pin_reset', used=used,
+                          expires_at=datetime.utcnow() + timedelta(minutes=expires_in_minutes))
+    db.session.add(otp)
+    db.session.commit()
+    return otp
+
+
+def test_sweep_deletes_only_codes_past_the_grace_period(app):
+    for i in range(10):
+        add_code(f'{i:06d}', expires_in_minutes=-120, used=i % 2 == 0)   # long expired
+    add_code('100000', expires_in_minutes=-30, used=True)               # verified, still in grace
+    add_code('200000', expires_in_minutes=5)                             # live
+
+    assert sweep_expired_otps(chunk_size=3, grace_seconds=3600) == 10
+    assert sorted(o.code for o in OTPVerification.query) == ['100000', '200000']
+    assert sweep_expired_otps(chunk_size=3, grace_seconds=3600) == 0
+
+
+def test_sweep_can_be_bounded_per_run(app):
+    for i in range(10):
+        add_code(f'{i:06d}', expires_in_minutes=-120)
+    assert sweep_expired_otps(chunk_size=3, grace_seconds=3600, max_chunks=2) == 6
+    assert OTPVerification.query.count() == 4
+
+
+def test_sweeper_thread_object(app):
+    add_code('000001', expires_in_minutes=-120)
+    sweeper = OTPSweeper(app)
+    assert sweeper.run_once() == 1
+    assert (sweeper.deleted, sweeper.runs) == (1, 1)
+
+
+def test_reset_flow_survives_a_sweep(app):
+    client = app.test_client()
+    for i in range(20):
+        add_code(f'{i:06d}', expires_in_minutes=-120, used=True)
+    add_code('123456', expires_in_minutes=5)
+
+    assert client.post('/api/auth/verify-pin-reset', json={'phone': PHONE, 'code': '999999'}).status_code == 400
+    assert client.post('/api/auth/verify-pin-reset', json={'phone': PHONE, 'code': '123456'}).status_code == 200
+    sweep_expired_otps(chunk_size=3, grace_seconds=3600)
+    # confirm-pin-reset looks the (now used) code up again; it is within the grace period
+    assert OTPVerification.query.filter_by(phone=PHONE, code='123456', used=True).count() == 1
+    assert OTPVerification.query.count() == 1
+
+
+def test_newest_matching_code_wins(app):
+    add_code('123456', expires_in_minutes=-20)  # an old, expired code with the same digits
+    add_code('123456', expires_in_minutes=5)
+    response = app.test_client().post('/api/auth/verify-pin-reset', json={'phone': PHONE, 'code': '123456'})
+    assert response.status_code == 200
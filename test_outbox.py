@@ -0,0 +1,170 @@
+"""
+Outbox tests (offline): request handlers only enqueue, the dispatcher
+delivers through FakeProvider with retries, backoff and dedupe.
+
+Run with: python -m pytest -q test_outbox.py
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+import outbox  # noqa: E402
+from app import User, db  # noqa: E402
+from outbox import FakeProvider, OutboxMessage  # noqa: E402
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    # A file database: the dispatcher's threads use their own connections
+    return make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'outbox.db'}",
+                    OUTBOX_CONCURRENCY=2, OUTBOX_MAX_ATTEMPTS=3, OUTBOX_BACKOFF_BASE=60)
+
+
+def use_provider(app, provider):
+    app.extensions['outbox_fake_provider'] = provider
+    app.extensions.pop('outbox_dispatcher', None)
+    return outbox.get_dispatcher(app)
+
+
+def messages(app):
+    with app.app_context():
+        return [(m.kind, m.status, m.attempts, m.payload) for m in OutboxMessage.query.order_by(OutboxMessage.id)]
+
+
+def make_due(app):
+    with app.app_context():
+        OutboxMessage.query.update({'next_attempt_at': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+
+
+def test_request_otp_only_enqueues(app):
+    fake = FakeProvider()
+    dispatcher = use_provider(app, fake)
+
+    response = app.test_client().post('/api/auth/request-otp', json={'phone': '0532 313 32 77'})
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'queued'
+    assert fake.sent == []
+    assert messages(app) == [('sms_verification', 'pending', 0, {'phone': '+905323133277'})]
+
+    assert dispatcher.run_once() == 1
+    assert fake.sent == [('sms_verification', {'phone': '+905323133277'})]
+    assert messages(app)[0][1:3] == ('sent', 1)
+
+
+def test_pin_reset_email_is_queued(app):
+    fake = FakeProvider()
+    dispatcher = use_provider(app, fake)
+    with app.app_context():
+        user = User(first_name='Ayşe', last_name='Y', email='ayse@example.com', phone='5323133277')
+        user.set_password('secret1')
+        db.session.add(user)
+        db.session.commit()
+
+    response = app.test_client().post('/api/auth/request-pin-reset-both', json={'phone': '05323133277'})
+    assert response.status_code == 200
+    assert response.get_json()['email_sent'] is True
+
+    dispatcher.run_once()
+    [(kind, payload)] = fake.sent
+    assert kind == 'email'
+    assert payload['email'] == 'ayse@example.com'
+    assert len(payload['reset_code']) == 6
+
+
+def test_dedupe_key(app):
+    with app.app_context():
+        first = outbox.enqueue('sms_verification', {'phone': '+905323133277'}, dedupe_key='k1')
+        db.session.commit()
+        again = outbox.enqueue('sms_verification', {'phone': '+905323133277'}, dedupe_key='k1')
+        db.session.commit()
+        assert again.id == first.id
+
+        # Within one transaction too: only the savepoint rolls back, the caller's work stays
+        user = User(first_name='A', last_name='Y', email='a@example.com', password_hash='x')
+        db.session.add(user)
+        second = outbox.enqueue('email', {'email': 'a@example.com'}, dedupe_key='k2')
+        assert outbox.enqueue('email', {'email': 'a@example.com'}, dedupe_key='k2') is second
+        db.session.commit()
+        assert user.id is not None
+    assert len(messages(app)) == 2
+
+
+def test_retry_with_backoff_then_success(app):
+    fake = FakeProvider(fail_times=2)
+    dispatcher = use_provider(app, fake)
+    with app.app_context():
+        outbox.enqueue('email', {'email': 'a@example.com'})
+        db.session.commit()
+
+    dispatcher.run_once()
+    with app.app_context():
+        message = OutboxMessage.query.one()
+        assert (message.status, message.attempts) == ('pending', 1)
+        assert message.next_attempt_at > datetime.utcnow() + timedelta(seconds=40)
+        assert 'unavailable' in message.last_error
+    assert dispatcher.run_once() == 0  # not due yet
+
+    make_due(app)
+    dispatcher.run_once()
+    make_due(app)
+    dispatcher.run_once()
+    assert messages(app)[0][1:3] == ('sent', 3)
+    assert dispatcher.stats == {'sent': 1, 'retried': 2, 'failed': 0}
+
+
+def test_gives_up_after_max_attempts(app):
+    dispatcher = use_provider(app, FakeProvider(fail_times=10))
+    with app.app_context():
+        outbox.enqueue('email', {'email': 'a@example.com'})
+        db.session.commit()
+    for _ in range(5):
+        make_due(app)
+        dispatcher.run_once()
+    assert messages(app)[0][1:3] == ('failed', 3)
+
+
+def test_permanent_error_fails_at_once(app):
+    dispatcher = use_provider(app, FakeProvider(fail_times=1, permanent=True))
+    with app.app_context():
+        outbox.enqueue('sms_verification', {'phone': '+90'})
+        db.session.commit()
+    dispatcher.run_once()
+    assert messages(app)[0][1:3] == ('failed', 1)
+
+
+def test_bounded_pool_and_single_claim(app):
+    fake = FakeProvider(delay=0.05)
+    dispatcher = use_provider(app, fake)
+    other = outbox.Dispatcher(app, dispatcher.providers, concurrency=2)
+    with app.app_context():
+        for i in range(5):
+            outbox.enqueue('email', {'email': f'u{i}@example.com'})
+        db.session.commit()
+
+    assert dispatcher.run_once() == 2  # OUTBOX_CONCURRENCY
+    while dispatcher.run_once() + other.run_once():
+        pass
+    assert sorted(p['email'] for _, p in fake.sent) == [f'u{i}@example.com' for i in range(5)]
+
+
+def test_claimed_message_is_taken_over_after_lease(app):
+    dispatcher = use_provider(app, FakeProvider())
+    with app.app_context():
+        message = outbox.enqueue('email', {'email': 'a@example.com'})
+        db.session.commit()
+        # A dispatcher claimed it and died
+        message.status = outbox.SENDING
+        message.locked_until = datetime.utcnow() + timedelta(seconds=30)
+        db.session.commit()
+    assert dispatcher.run_once() == 0
+    with app.app_context():
+        OutboxMessage.query.update({'locked_until': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+    assert dispatcher.run_once() == 1
+    assert messages(app)[0][1] == 'sent'
@@ -0,0 +1,112 @@
+"""
+Password hashing tests: verification of every stored format, the rehash
+on login, and 503s once the bounded hashing pool is full.
+
+Run with: python -m pytest -q test_passwords.py
+"""
+
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import OTPVerification, User, db  # noqa: E402
+from passwords import HasherBusy, PasswordHasher, get_hasher  # noqa: E402
+
+PHONE = '+905320000000'
+
+
+def test_verify_bounded_accepts_every_stored_format():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', workers=1, max_pending=2)
+    stored = hasher.hash('1234')
+    assert stored.startswith('pbkdf2:sha256:1000$')
+    assert hasher.verify_bounded('1234', stored)
+    assert not hasher.verify_bounded('4321', stored)
+
+    scrypt = PasswordHasher('scrypt:1024:8:1').hash('1234')
+    legacy = generate_password_hash('1234', method='pbkdf2:sha256:2000')
+    for other in (scrypt, legacy):
+        assert hasher.verify_bounded('1234', other)
+        assert hasher.needs_rehash(other)
+    assert not hasher.needs_rehash(stored)
+    for broken in (None, '', 'x', 'pbkdf2:sha256$only-one'):
+        assert not hasher.verify_bounded('1234', broken)
+    hasher.shutdown()
+
+
+def test_run_is_bounded():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hasher.run, args=(lambda: started.set() or release.wait(),))
+    holder.start()
+    started.wait(1)
+    with pytest.raises(HasherBusy):
+        hasher.verify_bounded('1234', hasher.hash('1234'))
+    release.set()
+    holder.join()
+    assert hasher.hash_bounded('1234')  # the slot is free again
+    hasher.shutdown()
+
+
+def login(client, pin='1234', **extra):
+    return client.post('/api/auth/phone-pin-login', json={'phone': PHONE, 'pin': pin, **extra})
+
+
+def test_login_rehashes_an_outdated_hash(make_app):
+    app = make_app(['ayse'])
+    user_id = app.config['USER_IDS'][0]
+    with app.app_context():
+        db.session.get(User, user_id).password_hash = PasswordHasher('pbkdf2:sha256:500').hash('1234')
+        db.session.commit()
+
+    client = app.test_client()
+    assert login(client, pin='0000').status_code == 401
+    with app.app_context():
+        assert db.session.get(User, user_id).password_hash.startswith('pbkdf2:sha256:500$')  # only after a match
+
+    assert login(client).status_code == 200
+    with app.app_context():
+        stored = db.session.get(User, user_id).password_hash  # committed, read back in a new session
+    assert stored.startswith('pbkdf2:sha256:1000$')
+    assert login(client).status_code == 200
+
+
+def test_full_hashing_pool_answers_503(make_app):
+    app = make_app(['ayse'], PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=1)
+    with app.app_context():
+        db.session.get(User, app.config['USER_IDS'][0]).set_password('1234')
+        db.session.add(OTPVerification(phone=PHONE, code='123456', purpose='pin_reset',
+                                       expires_at=datetime.utcnow() + timedelta(minutes=10)))
+        db.session.commit()
+        hasher = get_hasher()
+    client = app.test_client()
+
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hasher.run, args=(lambda: started.set() or release.wait(),))
+    holder.start()
+    started.wait(1)
+    try:
+        for response in (
+                login(client),
+                client.post('/api/auth/phone-pin-login', json={'phone': '05321111111', 'pin': '1234',
+                                                               'is_signup': True}),
+                client.post('/api/auth/reset-pin', json={'phone': PHONE, 'new_pin': '4321',
+                                                         'verification_code': '123456'})):
+            assert response.status_code == 503
+            assert response.headers['Retry-After'] == '1'
+    finally:
+        release.set()
+        holder.join()
+
+    with app.app_context():
+        assert User.query.count() == 1  # the refused signup wasn't half-created
+    assert login(client).status_code == 200
+    response = client.post('/api/auth/reset-pin', json={'phone': PHONE, 'new_pin': '4321',
+                                                        'verification_code': '123456'})
+    assert response.status_code == 200
+    assert login(client, pin='4321').status_code == 200
@@ -0,0 +1,97 @@
+"""
+Phone number tests: normalize_phone, the phone normalizing/merging
+migration, and PIN signup conflicts on the unique phone and email.
+
+Run with: python -m pytest -q test_phones.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import inspect, text
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import Group, MemberBill, Order, User, db, group_members  # noqa: E402
+from migrate_normalize_phones import migrate  # noqa: E402
+from phones import normalize_phone  # noqa: E402
+
+
+@pytest.mark.parametrize('raw', [
+    '+905323133277', '+90 (532) 313 32 77', '905323133277', '00905323133277',
+    '05323133277', '0532 313 32 77', '532-313-3277', ' 532.313.32.77 '])
+def test_normalize_phone(raw):
+    assert normalize_phone(raw) == '+905323133277'
+
+
+def test_normalize_phone_keeps_other_countries_and_rejects_no_digits():
+    assert normalize_phone('+44 20 7946 0958') == '+442079460958'
+    for raw in (None, '', '   ', 'abc', '+() -'):
+        assert normalize_phone(raw) is None
+
+
+def test_migration_merges_accounts_sharing_a_phone(make_app, tmp_path):
+    app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'hesap.db'}")
+    with app.app_context():
+        engine = db.engine
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_users_phone"))  # as before the migration
+            conn.execute(User.__table__.insert(), [
+                {'id': 1, 'first_name': 'A', 'last_name': 'Y', 'email': 'a@example.com',
+                 'phone': '0532 313 32 77', 'password_hash': None},
+                {'id': 2, 'first_name': 'A', 'last_name': 'Y', 'email': 'a2@example.com',
+                 'phone': '+905323133277', 'password_hash': 'h'},
+                {'id': 3, 'first_name': 'B', 'last_name': 'Y', 'email': 'b@example.com',
+                 'phone': '555 111 22 33', 'password_hash': 'h'}])
+            conn.execute(Group.__table__.insert(), [
+                {'id': 1, 'name': 'Mor', 'code': '111111', 'created_by': 1},
+                {'id': 2, 'name': 'Sarı', 'code': '222222', 'created_by': 3}])
+            conn.execute(group_members.insert(), [
+                {'group_id': 1, 'user_id': 1}, {'group_id': 1, 'user_id': 2}, {'group_id': 2, 'user_id': 1}])
+            conn.execute(Order.__table__.insert(), [
+                {'id': 1, 'group_id': 1, 'creator_id': 1, 'restaurant': 'Mor', 'total_amount': 15}])
+            conn.execute(MemberBill.__table__.insert(), [
+                {'order_id': 1, 'user_id': 1, 'amount': 10}, {'order_id': 1, 'user_id': 2, 'amount': 5}])
+
+        # User 2 has a PIN: it keeps the phone and takes over user 1's groups, orders and bills
+        assert migrate(engine, batch_size=2, log=lambda *a: None) == (2, 1)
+        assert migrate(engine, log=lambda *a: None) == (0, 0)
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT id, phone, is_deleted FROM users ORDER BY id")).fetchall() == [
+                (1, None, True), (2, '+905323133277', False), (3, '+905551112233', False)]
+            assert sorted(conn.execute(text("SELECT group_id, user_id FROM group_members")).fetchall()) == [
+                (1, 2), (2, 2)]
+            assert conn.execute(text("SELECT created_by FROM groups WHERE id = 1")).scalar() == 2
+            assert conn.execute(text("SELECT creator_id FROM orders")).scalar() == 2
+            assert conn.execute(text("SELECT user_id, amount FROM member_bills")).fetchall() == [(2, 15.0)]
+        assert any(i['name'] == 'ix_users_phone' and i['unique'] for i in inspect(engine).get_indexes('users'))
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(['ayse'])  # phone +905320000000, ayse@example.com
+
+
+def signup(app, phone, email=''):
+    return app.test_client().post('/api/auth/phone-pin-login', json={
+        'phone': phone, 'pin': '1234', 'is_signup': True, 'first_name': 'Mehmet', 'email': email})
+
+
+def test_verify_otp_rejects_phones_without_digits(app):
+    response = app.test_client().post('/api/auth/verify-otp', json={'phone': 'abc', 'code': '123456'})
+    assert response.status_code == 400
+
+
+def test_signup_conflicts_name_the_taken_field(app):
+    # The phone is taken: it's a login with the wrong PIN, not a signup
+    assert signup(app, '0532 000 00 00').status_code == 401
+
+    response = signup(app, '0532 111 11 11', email='ayse@example.com')
+    assert response.status_code == 409
+    assert response.get_json()['error'] == 'Email already registered'
+
+    response = signup(app, '0532 111 11 11', email='mehmet@example.com')
+    assert response.status_code == 201
+    with app.app_context():
+        assert User.query.filter_by(email='mehmet@example.com').one().phone == '+905321111111'
@@ -0,0 +1,123 @@
+"""
+token_required principal tests: the expiring LRU caches, invalidation
+when a profile or account status changes, and closed/deleted accounts.
+
+Run with: python -m pytest -q test_principal.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import jwt
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+import principal  # noqa: E402
+from app import User, db  # noqa: E402
+from conftest import client_for  # noqa: E402
+from principal import ExpiringLRU, _caches, decode_token, load_principal  # noqa: E402
+
+
+def test_expiring_lru():
+    cache = ExpiringLRU(maxsize=2)
+    cache.put('a', 1, expires_at=10)
+    cache.put('b', 2, expires_at=20)
+    assert cache.get('a', now=9) == 1
+    assert cache.get('a', now=10) is None  # expired at expires_at, and dropped
+    assert len(cache) == 1
+
+    cache.put('a', 1, expires_at=30)
+    cache.get('b', now=0)
+    cache.put('c', 3, expires_at=30)       # over maxsize: the least recently used goes
+    assert [cache.get(key, now=0) for key in 'abc'] == [None, 2, 3]
+    cache.pop('b')
+    assert cache.get('b', now=0) is None
+    assert (cache.hits, cache.misses) == (4, 3)
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(principal, 'time', clock)
+    return clock
+
+
+def test_tokens_are_cached_until_they_expire(make_app, clock):
+    app = make_app(['ayse'])
+    user_id = app.config['USER_IDS'][0]
+    secret = app.config['JWT_SECRET']
+    with app.app_context():
+        token = jwt.encode({'user_id': user_id, 'exp': int(clock.now) + 60}, secret, algorithm='HS256')
+        assert decode_token(token) == user_id
+        assert decode_token(token) == user_id
+        tokens = _caches()['tokens']
+        assert (tokens.hits, tokens.misses) == (1, 1)
+
+        # A token that expired a second ago, cached while it was valid
+        exp = int(time.time()) - 1
+        expired = jwt.encode({'user_id': user_id, 'exp': exp}, secret, algorithm='HS256')
+        clock.now = exp - 10
+        tokens.put(expired, user_id, exp)
+        assert decode_token(expired) == user_id  # served from the cache, not decoded
+        clock.now = exp
+        with pytest.raises(jwt.ExpiredSignatureError):
+            decode_token(expired)  # the entry ends with the token's exp
+
+
+def test_principals_expire_after_the_ttl(make_app, clock):
+    app = make_app(['ayse'], PRINCIPAL_CACHE_TTL=30)
+    user_id = app.config['USER_IDS'][0]
+    with app.app_context():
+        assert load_principal(user_id).first_name == 'ayse'
+        # Changed by another worker: this one keeps its copy for up to the TTL
+        db.session.get(User, user_id).first_name = 'Ayşe'
+        db.session.commit()
+        assert load_principal(user_id).first_name == 'ayse'
+        clock.now += 30
+        assert load_principal(user_id).first_name == 'Ayşe'
+        assert load_principal(10 ** 6) is None
+
+
+def test_profile_changes_invalidate_the_principal(make_app):
+    app = make_app(['ayse'], PRINCIPAL_CACHE_TTL=3600)
+    user_id = app.config['USER_IDS'][0]
+    client = client_for(app)
+    assert client.get('/api/user/profile').status_code == 200
+    assert client.put('/api/user/profile', json={'firstName': 'Ayşe'}).status_code == 200
+    with app.app_context():
+        assert load_principal(user_id).first_name == 'Ayşe'
+
+
+def test_closed_accounts_only_reach_allow_inactive_endpoints(make_app):
+    app = make_app(['ayse', 'mehmet'], PRINCIPAL_CACHE_TTL=3600)
+    client = client_for(app)
+    assert client.get('/api/user/profile').status_code == 200  # cached as active
+
+    assert client.post('/api/user/close-account').status_code == 200
+    response = client.get('/api/user/profile')
+    assert response.status_code == 403
+    assert response.get_json()['error'] == 'Account is closed'
+    assert client.post('/api/groups', json={'name': 'Mor'}).status_code == 403
+
+    # close, delete and reopen stay reachable, and answer for themselves
+    assert client.post('/api/user/close-account').status_code == 400   # already closed
+    assert client.delete('/api/user/delete-account', json={}).status_code == 400  # reopen first
+    assert client.post('/api/user/reopen-account').status_code == 200
+    assert client.get('/api/user/profile').status_code == 200
+
+    assert client.delete('/api/user/delete-account', json={}).status_code == 200
+    for response in (client.get('/api/user/profile'), client.post('/api/user/reopen-account')):
+        assert response.status_code == 403
+        assert response.get_json()['error'] == 'Account deleted'
+
+    assert client_for(app, 1).get('/api/user/profile').status_code == 200  # others are unaffected
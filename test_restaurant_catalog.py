@@ -0,0 +1,110 @@
+"""
+Restaurant catalog tests: restaurants.json is parsed once per process,
+indexed, and reloaded when the file changes.
+
+Run with: python -m pytest -q test_restaurant_catalog.py
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from catalog import RestaurantCatalog, get_catalog  # noqa: E402
+from conftest import client_for  # noqa: E402
+
+RESTAURANTS = {
+    'rest_001': {'name': 'Tarihi Kebapçı', 'phone': '0216-123-4567',
+                 'categories': {'Kebaplar': [{'name': 'Adana Kebap', 'price': 45.0}],
+                                'Tatlılar': [{'name': 'Künefe', 'price': 30.0}]}},
+    'rest_002': {'name': 'Deniz Balık', 'phone': '0216-765-4321',
+                 'categories': {'Balıklar': [{'name': 'Levrek', 'price': 90.0}],
+                                'Tatlılar': [{'name': 'Helva', 'price': 20.0}]}},
+}
+
+
+def write(path, data, bump=0):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    if bump:  # coarse filesystem timestamps: make sure the mtime moves
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 1_000_000_000))
+
+
+@pytest.fixture
+def restaurants_file(tmp_path):
+    path = tmp_path / 'restaurants.json'
+    write(path, RESTAURANTS)
+    return path
+
+
+@pytest.fixture
+def app(make_app, restaurants_file):
+    return make_app(['Ayşe'], RESTAURANTS_FILE=restaurants_file, RESTAURANT_CATALOG_CHECK_SECONDS=0)
+
+
+def test_indexes(restaurants_file):
+    catalog = RestaurantCatalog(restaurants_file)
+    assert catalog.get('rest_002')['name'] == 'Deniz Balık'
+    assert catalog.get('missing') is None
+    assert catalog.find_by_name('  TARIHI kebapçı ')[0] == 'rest_001'
+    assert catalog.find_by_name('nowhere') == (None, None)
+    assert sorted(catalog.in_category('Tatlılar')) == ['rest_001', 'rest_002']
+    assert catalog.in_category('Balıklar') == ['rest_002']
+    assert catalog.categories() == ['Balıklar', 'Kebaplar', 'Tatlılar']
+    assert catalog.loads == 1
+
+
+def test_reloads_when_the_file_changes(restaurants_file):
+    catalog = RestaurantCatalog(restaurants_file, check_interval=0)
+    etag = catalog.etag('rest_001')
+    for _ in range(5):
+        catalog.get('rest_001')
+    assert catalog.loads == 1
+
+    changed = json.loads(json.dumps(RESTAURANTS))
+    changed['rest_001']['categories']['Kebaplar'][0]['price'] = 50.0
+    changed['rest_003'] = {'name': 'Yeni', 'phone': '-', 'categories': {}}
+    write(restaurants_file, changed, bump=1)
+    assert catalog.get('rest_003')['name'] == 'Yeni'
+    assert catalog.etag('rest_001') != etag
+    assert catalog.etag('rest_002') == RestaurantCatalog(restaurants_file).etag('rest_002')
+    assert catalog.loads == 2
+
+
+def test_broken_file_keeps_the_previous_catalog(restaurants_file):
+    catalog = RestaurantCatalog(restaurants_file, check_interval=0)
+    assert catalog.get('rest_001')
+    restaurants_file.write_text('{"rest_001": {"name": "half writ', encoding='utf-8')
+    os.utime(restaurants_file, ns=(0, restaurants_file.stat().st_mtime_ns + 2_000_000_000))
+    assert catalog.get('rest_001')['name'] == 'Tarihi Kebapçı'
+
+
+def test_create_group_reads_the_catalog(app):
+    client = client_for(app)
+    for _ in range(3):
+        response = client.post('/api/groups', json={'restaurant_id': 'rest_001'})
+        assert response.status_code == 201, response.get_json()
+        group = response.get_json()['group']
+        assert group['restaurant_name'] == 'Tarihi Kebapçı'
+        assert group['menu_data']['categories']['Kebaplar'][0]['name'] == 'Adana Kebap'
+    assert get_catalog(app).loads == 1
+
+
+def test_restaurant_endpoints(app):
+    client = app.test_client()
+    response = client.get('/api/restaurants?name=deniz balık')
+    assert response.get_json()['restaurant'] == {'id': 'rest_002', 'name': 'Deniz Balık',
+                                                 'categories': ['Balıklar', 'Tatlılar']}
+    assert client.get('/api/restaurants?name=nowhere').status_code == 404
+    assert [r['id'] for r in client.get('/api/restaurants?category=Kebaplar').get_json()['restaurants']] == ['rest_001']
+
+    response = client.get('/api/restaurants/rest_001/menu')
+    assert response.status_code == 200
+    assert response.get_json()['categories']['Tatlılar'][0]['name'] == 'Künefe'
+    etag = response.headers['ETag']
+    assert client.get('/api/restaurants/rest_001/menu', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/restaurants/nope/menu').status_code == 404
@@ -0,0 +1,220 @@
+"""
+SMTPPool tests against a local SMTP stand-in (no network, no TLS).
+
+Run with: python -m pytest -q test_smtp_pool.py
+"""
+
+import base64
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+from email.message import EmailMessage
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from smtp_pool import SMTPPool  # noqa: E402
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib: EHLO, AUTH PLAIN, MAIL/RCPT/DATA, RSET, NOOP, QUIT
+
+    Counts connections and logins, rejects recipients containing "refused",
+    can drop every open connection (drop_all) and add latency to the
+    greeting and AUTH (handshake_delay) to model a remote provider.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, username='sender@example.com', password='secret', handshake_delay=0.0):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.username = username
+        self.password = password
+        self.handshake_delay = handshake_delay
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self._sockets = set()
+        self._lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def drop_all(self):
+        with self._lock:
+            sockets, self._sockets = self._sockets, set()
+        for sock in sockets:
+            try:
+                sock.shutdown(2)
+            except OSError:
+                pass
+
+    def stop(self):
+        self.shutdown()
+        self.drop_all()
+        self.server_close()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server._lock:
+            server.connections += 1
+            server._sockets.add(self.connection)
+        time.sleep(server.handshake_delay)
+        self.reply('220 localhost stand-in')
+        recipients = []
+        for raw in self.rfile:
+            line = raw.decode().rstrip('\r\n')
+            verb = line.split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 AUTH PLAIN')
+            elif verb == 'AUTH':
+                time.sleep(server.handshake_delay)
+                _, user, password = base64.b64decode(line.split()[2]).decode().split('\0')
+                if (user, password) == (server.username, server.password):
+                    with server._lock:
+                        server.logins += 1
+                    self.reply('235 ok')
+                else:
+                    self.reply('535 bad credentials')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 ok')
+            elif verb == 'RCPT':
+                if 'refused' in line:
+                    self.reply('550 no such user')
+                else:
+                    recipients.append(line)
+                    self.reply('250 ok')
+            elif verb == 'DATA':
+                self.reply('354 go ahead')
+                body = []
+                for data in self.rfile:
+                    if data == b'.\r\n':
+                        break
+                    body.append(data)
+                with server._lock:
+                    server.messages.append(b''.join(body))
+                self.reply('250 queued')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 ok')
+            elif verb == 'QUIT':
+                self.reply('221 bye')
+                break
+            else:
+                self.reply('502 not implemented')
+        with server._lock:
+            server._sockets.discard(self.connection)
+
+
+def email(to='user@example.com', subject='PIN code'):
+    message = EmailMessage()
+    message['From'] = 'sender@example.com'
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content('123456')
+    return message
+
+
+@pytest.fixture
+def server():
+    server = LocalSMTPServer()
+    yield server
+    server.stop()
+
+
+def make_pool(server, **kwargs):
+    kwargs.setdefault('size', 2)
+    return SMTPPool('127.0.0.1', server.port, username=server.username, password=server.password,
+                    starttls=False, timeout=5, **kwargs)
+
+
+def test_reuses_one_logged_in_session(server):
+    pool = make_pool(server)
+    for i in range(20):
+        pool.send(email(subject=f'#{i}'))
+    assert len(server.messages) == 20
+    assert (server.connections, server.logins) == (1, 1)
+    stats = pool.stats()
+    assert stats['messages_sent'] == 20
+    assert stats['messages_per_connection'] == 20.0
+    assert stats['messages_per_second'] > 0
+
+
+def test_rejected_recipient_keeps_the_session(server):
+    pool = make_pool(server)
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.send(email('refused@example.com'))
+    pool.send(email())
+    assert len(server.messages) == 1
+    assert server.connections == 1
+    assert pool.stats()['messages_failed'] == 1
+
+
+def test_reconnects_when_server_dropped_the_session(server):
+    pool = make_pool(server)
+    pool.send(email())
+    server.drop_all()
+    time.sleep(0.05)
+    pool.send(email())
+    assert len(server.messages) == 2
+    assert server.connections == 2
+    assert pool.stats()['reconnects'] == 1
+
+
+def test_recycles_sessions(server):
+    pool = make_pool(server, max_messages=5)
+    for _ in range(12):
+        pool.send(email())
+    assert server.connections == 3
+
+    idle_pool = make_pool(server, max_idle=0.05)
+    idle_pool.send(email())
+    time.sleep(0.1)
+    idle_pool.send(email())
+    assert idle_pool.stats()['connections_opened'] == 2
+
+
+def test_concurrent_senders_are_bounded_by_pool_size(server):
+    pool = make_pool(server, size=3)
+    threads = [threading.Thread(target=lambda: [pool.send(email()) for _ in range(10)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(server.messages) == 80
+    assert server.connections <= 3
+
+
+def test_bad_credentials_raise(server):
+    pool = SMTPPool('127.0.0.1', server.port, username='sender@example.com', password='wrong',
+                    starttls=False, timeout=5)
+    with pytest.raises(smtplib.SMTPAuthenticationError):
+        pool.send(email())
+    assert pool.stats()['messages_failed'] == 1
+
+
+def test_deliver_email_uses_the_pool(server, make_app):
+    from app import deliver_email
+
+    app = make_app(SMTP_SERVER='127.0.0.1', SMTP_PORT=server.port, SMTP_STARTTLS=False,
+                   SENDER_EMAIL=server.username, SENDER_PASSWORD=server.password)
+    with app.app_context():
+        for i in range(3):
+            deliver_email('email', {'email': f'user{i}@example.com', 'reset_code': '123456', 'user_name': 'Ayşe'})
+    assert len(server.messages) == 3
+    assert b'123456' in server.messages[0] or b'MTIzNDU2' in server.messages[0]
+    assert (server.connections, server.logins) == (1, 1)
+    assert app.extensions['smtp_pool'].stats()['messages_sent'] == 3
@@ -0,0 +1,165 @@
+"""
+Login throttle tests: token bucket refill, the memory and SQL stores, and
+the IP and phone checks in POST /api/auth/phone-pin-login.
+
+Run with: python -m pytest -q test_throttle.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import User, db  # noqa: E402
+from throttle import MemoryBucketStore, SQLBucketStore, parse_limit  # noqa: E402
+
+
+@pytest.fixture(params=['memory', 'sql'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryBucketStore()
+    return SQLBucketStore(f"sqlite:///{tmp_path / 'throttle.db'}")
+
+
+def test_parse_limit():
+    assert parse_limit('5/900') == (5.0, 5 / 900)
+
+
+def test_bucket_refills_up_to_capacity(store):
+    take = lambda now: store.take('phone:x', 2, 1.0, now=now)  # noqa: E731
+    assert take(0) == (True, 0)
+    assert take(0) == (True, 0)
+    assert take(0) == (False, 1)      # empty: one token a second
+    assert take(0.5) == (False, 1)    # half a token; a rejected attempt costs nothing
+    assert take(1.0) == (True, 0)
+    assert take(100) == (True, 0)     # refilled, but never past capacity
+    assert take(100) == (True, 0)
+    assert take(100) == (False, 1)
+    assert store.take('phone:y', 2, 1.0, now=100) == (True, 0)  # buckets are per key
+
+    store.reset('phone:x')
+    assert take(100) == (True, 0)
+
+
+def test_refund_gives_back_one_token(store):
+    assert store.take('ip:a', 2, 1 / 60, now=0) == (True, 0)
+    assert store.take('ip:a', 2, 1 / 60, now=0) == (True, 0)
+    store.refund('ip:a', 2, 1 / 60, now=0)
+    assert store.take('ip:a', 2, 1 / 60, now=0) == (True, 0)
+    assert store.take('ip:a', 2, 1 / 60, now=0)[0] is False
+    for _ in range(5):
+        store.refund('ip:a', 2, 1 / 60, now=0)  # never past capacity
+    assert [store.take('ip:a', 2, 1 / 60, now=0)[0] for _ in range(3)] == [True, True, False]
+    store.refund('ip:new', 2, 1 / 60, now=0)  # no bucket yet: nothing to give back
+    assert store.take('ip:new', 2, 1 / 60, now=0) == (True, 0)
+
+
+def test_stores_agree():
+    memory = MemoryBucketStore()
+    sql = SQLBucketStore('sqlite://')
+    steps = [(key, now) for now in (0, 0, 0, 10, 10, 20, 95, 95, 95, 95) for key in ('ip:a', 'ip:b')]
+    for key, now in steps:
+        assert memory.take(key, 3, 3 / 60, now=now) == sql.take(key, 3, 3 / 60, now=now), (key, now)
+
+
+def test_sql_store_retries_when_another_worker_creates_the_bucket(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'throttle.db'}"
+    store, other_worker = SQLBucketStore(url), SQLBucketStore(url)
+    take_once = store._take_once
+    collisions = []
+
+    def racing(*args):
+        # Our first attempt saw no row; the other worker's insert committed before ours
+        if not collisions:
+            collisions.append(args[1])
+            raise IntegrityError('INSERT INTO throttle_buckets', {}, Exception('UNIQUE constraint failed'))
+        return take_once(*args)
+
+    assert other_worker.take('phone:x', 2, 0.0, now=0) == (True, 0)
+    monkeypatch.setattr(store, '_take_once', racing)
+    assert store.take('phone:x', 2, 0.0, now=0) == (True, 0)  # retried against the other worker's row
+    assert collisions == ['phone:x']
+    assert store.take('phone:x', 2, 0.0, now=0)[0] is False  # both attempts were counted
+
+    monkeypatch.setattr(store, '_take_once', lambda *args: (_ for _ in ()).throw(
+        IntegrityError('INSERT INTO throttle_buckets', {}, Exception('UNIQUE constraint failed'))))
+    with pytest.raises(IntegrityError):
+        store.take('phone:y', 3, 0.0, now=0)  # only one retry
+
+
+PHONE = '+905320000000'
+
+
+def make_login_app(make_app, **limits):
+    app = make_app(['ayse'], **limits)
+    with app.app_context():
+        db.session.get(User, app.config['USER_IDS'][0]).set_password('1234')
+        db.session.commit()
+    return app
+
+
+def login(client, pin='1234', phone=PHONE):
+    return client.post('/api/auth/phone-pin-login', json={'phone': phone, 'pin': pin})
+
+
+def test_ip_is_checked_before_the_request_and_phone_after_validation(make_app):
+    app = make_login_app(make_app, LOGIN_THROTTLE_IP='4/600', LOGIN_THROTTLE_PHONE='1/600')
+    client = app.test_client()
+
+    assert client.post('/api/auth/phone-pin-login', json={}).status_code == 400
+    assert login(client, pin='12').status_code == 400    # invalid PIN: the phone's bucket is untouched
+    assert login(client, pin='0000').status_code == 401  # takes the phone's only token
+
+    response = login(client)
+    assert response.status_code == 429                   # phone empty, the right PIN isn't tried
+    assert response.get_json()['retry_after'] == 600     # the phone's refill, not the IP's (150)
+
+    response = client.post('/api/auth/phone-pin-login', json={})
+    assert response.status_code == 429                   # IP empty: rejected before the body is read
+    assert response.headers['Retry-After'] == '150'
+
+
+def test_successful_login_resets_the_phone_bucket(make_app):
+    app = make_login_app(make_app, LOGIN_THROTTLE_PHONE='2/600')
+    client = app.test_client()
+
+    assert login(client, pin='0000').status_code == 401
+    assert login(client).status_code == 200
+    assert login(client, pin='0000').status_code == 401
+    assert login(client, pin='0000').status_code == 401  # a fresh bucket of 2
+    assert login(client).status_code == 429
+
+
+def test_only_failures_use_the_ip_budget(make_app):
+    # A table of phones behind one restaurant NAT
+    app = make_login_app(make_app, LOGIN_THROTTLE_IP='3/600')
+    client = app.test_client()
+    for _ in range(10):
+        assert login(client).status_code == 200
+    response = client.post('/api/auth/phone-pin-login', json={
+        'phone': '05321111111', 'pin': '1234', 'is_signup': True, 'first_name': 'Mehmet'})
+    assert response.status_code == 201
+
+    assert [login(client, pin='0000').status_code for _ in range(3)] == [401, 401, 401]
+    assert login(client).status_code == 429  # three failures: the IP is out
+
+
+def password_login(client, password='1234', email='ayse@example.com'):
+    return client.post('/api/auth/login', json={'email': email, 'password': password})
+
+
+def test_password_login_is_limited_per_email(make_app):
+    app = make_login_app(make_app, LOGIN_THROTTLE_EMAIL='2/600')
+    client = app.test_client()
+    assert password_login(client, 'x').status_code == 401
+    assert password_login(client).status_code == 200     # resets the email's bucket
+    assert password_login(client, 'x').status_code == 401
+    assert password_login(client, 'x', email='AYSE@example.com ').status_code == 404  # same bucket
+
+    response = password_login(client)
+    assert response.status_code == 429                   # the right password isn't tried
+    assert response.headers['Retry-After'] == '300'
+    assert password_login(client, email='mehmet@example.com').status_code == 404  # other accounts aren't
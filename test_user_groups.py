@@ -0,0 +1,88 @@
+"""
+/api/user/groups tests: a constant number of queries per page, member
+counts and bounded previews, no menu columns, keyset pagination.
+
+Run with: python -m pytest -q test_user_groups.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import Group, db, group_members  # noqa: E402
+from conftest import client_for  # noqa: E402
+
+
+def with_groups(make_app, groups, members, closed=0):
+    """`groups` active and `closed` closed groups, each with all `members` users"""
+    app = make_app([f'Üye{i}' for i in range(members)], USER_GROUPS_MEMBER_PREVIEW=3)
+    with app.app_context():
+        for i in range(groups + closed):
+            group = Group(name=f'Grup {i}', code=f'{i:06d}', menu_data={'categories': {}}, is_active=i < groups)
+            db.session.add(group)
+            db.session.flush()
+            db.session.execute(group_members.insert(), [
+                {'group_id': group.id, 'user_id': user_id} for user_id in app.config['USER_IDS']])
+        db.session.commit()
+    return app
+
+
+@pytest.fixture
+def app(make_app):
+    return with_groups(make_app, groups=7, members=8, closed=2)
+
+
+def get(app, query=''):
+    return client_for(app).get(f'/api/user/groups{query}')
+
+
+def capture_sql(app):
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_counts_previews_and_no_menus(app):
+    get(app)  # warm the principal cache
+    statements = capture_sql(app)
+    body = get(app).get_json()
+
+    assert len(statements) == 2
+    assert not any('menu' in s for s in statements)
+    assert [g['name'] for g in body] == [f'Grup {i}' for i in reversed(range(7))]
+    assert {g['members_count'] for g in body} == {8}
+    assert [m['first_name'] for m in body[0]['members']] == ['Üye0', 'Üye1', 'Üye2']
+    assert body[0]['status'] == 'active'
+
+
+def test_query_count_does_not_grow_with_groups_or_members(make_app):
+    small, large = with_groups(make_app, groups=2, members=2), with_groups(make_app, groups=30, members=20)
+    counts = []
+    for app in (small, large):
+        get(app)
+        statements = capture_sql(app)
+        get(app)
+        counts.append(len(statements))
+    assert counts == [2, 2]
+
+
+def test_keyset_pagination(app):
+    pages = []
+    query = '?limit=3'
+    while query is not None:
+        response = get(app, query)
+        pages.append([g['name'] for g in response.get_json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor:
+            assert response.headers['Link'] == f'</api/user/groups?limit=3&cursor={cursor}>; rel="next"'
+        query = f'?limit=3&cursor={cursor}' if cursor else None
+
+    assert pages == [['Grup 6', 'Grup 5', 'Grup 4'], ['Grup 3', 'Grup 2', 'Grup 1'], ['Grup 0']]
+    assert get(app, '?cursor=abc').status_code == 400
+    assert len(get(app, '?limit=1000').get_json()) == 7
@@ -0,0 +1,194 @@
+"""
+Twilio Verify gateway tests (offline): timeouts, bulkhead and circuit
+breaker, driven by FakeVerifyBackend instead of Twilio.
+
+Run with: python -m pytest -q test_verify_gateway.py
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import deliver_sms_verification  # noqa: E402
+from outbox import PermanentDeliveryError  # noqa: E402
+from verify_gateway import (CircuitBreaker, FakeVerifyBackend, ProviderUnavailable,  # noqa: E402
+                            VerifyGateway, build_gateway, get_gateway)
+
+PHONE = '+905323133277'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ClientError(Exception):
+    """Looks like a TwilioRestException with a 4xx status"""
+
+    def __init__(self, status):
+        super().__init__(f'HTTP {status}')
+        self.status = status
+        self.msg = 'Invalid parameter'
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(TWILIO_TIMEOUT=0.2, TWILIO_MAX_CONCURRENT=2,
+                    TWILIO_BREAKER_MIN_CALLS=4, TWILIO_BREAKER_COOLDOWN=30)
+
+
+def use_backend(app, backend):
+    app.extensions['twilio_gateway'] = build_gateway(app.config, backend)
+    return app.extensions['twilio_gateway']
+
+
+def test_breaker_opens_fails_fast_and_recovers_after_a_probe():
+    clock = Clock()
+    backend = FakeVerifyBackend(fail_times=4)
+    gateway = VerifyGateway(backend, breaker=CircuitBreaker(threshold=0.5, min_calls=4, cooldown=30, clock=clock))
+
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            gateway.check_verification(PHONE, '123456')
+    assert gateway.breaker.state == 'open'
+
+    with pytest.raises(ProviderUnavailable) as excinfo:
+        gateway.check_verification(PHONE, '123456')
+    assert excinfo.value.retry_after == 30
+    assert backend.calls == 4  # rejected without touching the provider
+
+    clock.now += 31
+    assert gateway.check_verification(PHONE, '123456')['status'] == 'approved'  # the probe
+    assert gateway.breaker.state == 'closed'
+    stats = gateway.stats()
+    assert (stats['failed'], stats['succeeded'], stats['rejected_open'], stats['breaker_opened']) == (4, 1, 1, 1)
+    assert set(stats['latency_ms']) == {'p50', 'p95', 'max'}
+
+
+def test_failed_probe_reopens_the_circuit():
+    clock = Clock()
+    gateway = VerifyGateway(FakeVerifyBackend(fail_times=5),
+                            breaker=CircuitBreaker(min_calls=4, cooldown=30, clock=clock))
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            gateway.start_verification(PHONE)
+    clock.now += 31
+    with pytest.raises(ConnectionError):
+        gateway.start_verification(PHONE)
+    assert gateway.breaker.state == 'open'
+    assert gateway.breaker.opened == 2
+
+
+def test_client_errors_do_not_trip_the_breaker():
+    gateway = VerifyGateway(FakeVerifyBackend(fail_times=10, error=lambda _: ClientError(404)),
+                            breaker=CircuitBreaker(min_calls=4))
+    for _ in range(10):
+        with pytest.raises(ClientError):
+            gateway.check_verification(PHONE, '000000')
+    assert gateway.breaker.state == 'closed'
+    assert gateway.stats()['client_errors'] == 10
+
+
+def test_slow_provider_times_out():
+    gateway = VerifyGateway(FakeVerifyBackend(delay=1.0), timeout=0.1)
+    started = time.monotonic()
+    with pytest.raises(ProviderUnavailable):
+        gateway.start_verification(PHONE)
+    assert time.monotonic() - started < 0.5
+    assert gateway.stats()['timeouts'] == 1
+
+
+def test_bulkhead_rejects_instead_of_queueing():
+    backend = FakeVerifyBackend(delay=0.5)
+    gateway = VerifyGateway(backend, timeout=0.05, max_concurrent=2)
+    for _ in range(2):
+        with pytest.raises(ProviderUnavailable):
+            gateway.start_verification(PHONE)  # timed out, but the call still holds its thread
+
+    started = time.monotonic()
+    with pytest.raises(ProviderUnavailable, match='in flight'):
+        gateway.start_verification(PHONE)
+    assert time.monotonic() - started < 0.05
+    assert gateway.stats()['rejected_busy'] == 1
+
+    time.sleep(0.6)  # the hung calls finish and give their slots back
+    backend.delay = 0
+    assert gateway.start_verification(PHONE)['status'] == 'pending'
+
+
+def test_verify_otp_through_the_gateway(app):
+    client = app.test_client()
+    response = client.post('/api/auth/verify-otp', json={'phone': '0532 313 32 77', 'code': '123456'})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['is_new_user'] is True
+    response = client.post('/api/auth/verify-otp', json={'phone': PHONE, 'code': '999999'})
+    assert response.status_code == 401
+
+
+def test_fake_backend_is_test_only(make_app):
+    # OUTBOX_PROVIDER=fake outside TESTING must not approve 123456 for any phone
+    app = make_app(TESTING=False)
+    with app.app_context():
+        assert get_gateway(app, client_factory=lambda: None) is None
+    response = app.test_client().post('/api/auth/verify-otp', json={'phone': PHONE, 'code': '123456'})
+    assert response.status_code == 503
+
+
+def test_failing_provider_answers_503_and_stops_promising_sms(app):
+    backend = FakeVerifyBackend(fail_times=100)
+    use_backend(app, backend)
+    client = app.test_client()
+    for _ in range(4):
+        assert client.post('/api/auth/verify-otp', json={'phone': PHONE, 'code': '123456'}).status_code == 500
+
+    response = client.post('/api/auth/verify-otp', json={'phone': PHONE, 'code': '123456'})
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) > 0
+    assert backend.calls == 4
+
+    response = client.post('/api/auth/request-otp', json={'phone': PHONE})
+    assert response.status_code == 503
+
+
+def test_slow_provider_does_not_hold_the_request(app):
+    use_backend(app, FakeVerifyBackend(delay=2.0))
+    client = app.test_client()
+    started = time.monotonic()
+    response = client.post('/api/auth/verify-otp', json={'phone': PHONE, 'code': '123456'})
+    assert response.status_code == 503
+    assert time.monotonic() - started < 1.0
+
+    # Two calls are hung; others are turned away at once, other endpoints are unaffected
+    threading.Thread(target=client.post, args=('/api/auth/verify-otp',),
+                     kwargs={'json': {'phone': PHONE, 'code': '1'}}).start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    response = client.post('/api/auth/verify-otp', json={'phone': PHONE, 'code': '123456'})
+    assert response.status_code == 503
+    assert response.get_json()['reason'] == 'too many calls in flight'
+    assert client.get('/health').status_code == 200
+    assert time.monotonic() - started < 0.2
+
+
+def test_outbox_delivery_classifies_errors(app):
+    with app.app_context():
+        use_backend(app, FakeVerifyBackend(fail_times=1, error=lambda _: ClientError(400)))
+        with pytest.raises(PermanentDeliveryError):
+            deliver_sms_verification('sms_verification', {'phone': PHONE})
+
+        use_backend(app, FakeVerifyBackend(delay=1.0))
+        with pytest.raises(ProviderUnavailable):  # retried by the dispatcher
+            deliver_sms_verification('sms_verification', {'phone': PHONE})
+
+        backend = FakeVerifyBackend()
+        use_backend(app, backend)
+        assert deliver_sms_verification('sms_verification', {'phone': PHONE})['status'] == 'pending'
+        assert backend.started == [PHONE]
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Outbox worker: delivers queued SMS verifications and emails
+
+Request handlers only write to the outbox_messages table (backend/outbox.py);
+this process claims due messages and sends them through Twilio/SMTP on a
+bounded thread pool, retrying failures with exponential backoff. It also
+runs the expired-OTP sweeper (backend/otp_sweeper.py).
+
+Run it next to the web service (Procfile `worker:`, render.yaml
+`hesap-paylas-worker`) with
+OUTBOX_DISPATCH=worker on the web side, so gunicorn workers don't also start
+their inline dispatcher. Several workers may run at once: each message is
+claimed by exactly one of them.
+
+Usage:
+    python worker.py [--concurrency N] [--once]
+"""
+
+import argparse
+import signal
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'backend'))
+
+from app import app  # noqa: E402
+from logging_config import get_logger, shutdown_logging  # noqa: E402
+import otp_sweeper  # noqa: E402
+import outbox  # noqa: E402
+
+log = get_logger('worker')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, help='deliveries in flight (default OUTBOX_CONCURRENCY)')
+    parser.add_argument('--once', action='store_true', help='deliver what is due now, then exit')
+    args = parser.parse_args()
+
+    if args.concurrency:
+        app.config['OUTBOX_CONCURRENCY'] = args.concurrency
+    outbox.ensure_table(app)
+    dispatcher = outbox.get_dispatcher(app)
+    sweeper = otp_sweeper.get_sweeper(app)
+
+    def finish(what):
+        log.info('%s: %s, %s expired OTP codes swept', what, dispatcher.stats, sweeper.deleted)
+        pool = app.extensions.get('smtp_pool')
+        if pool is not None:
+            log.info('SMTP: %s', pool.stats())
+            pool.close()
+        gateway = app.extensions.get('twilio_gateway')
+        if gateway is not None:
+            log.info('Twilio: %s', gateway.stats())
+        shutdown_logging()
+
+    if args.once:
+        while dispatcher.run_once(wait=True):
+            pass
+        sweeper.run_once()
+        finish('Outbox drained')
+        return
+
+    def stop(signum, frame):
+        log.info('Signal %s received, finishing in-flight deliveries', signum)
+        dispatcher.stop()
+        sweeper.stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    log.info('Outbox worker started (concurrency=%s, provider=%s)',
+             dispatcher.concurrency, app.config['OUTBOX_PROVIDER'])
+    sweeper.start_background()
+    dispatcher.run_forever()
+    finish('Outbox worker stopped')
+
+
+if __name__ == '__main__':
+    main()
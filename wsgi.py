@@ -1,6 +1,11 @@
 """
 WSGI entry point for Flask - Render Production
 Version: 1fc57da-enhanced (2026-05-09 02:30 UTC)
+
+`application` is built by backend.app.create_app() from Config.from_env().
+It is safe to preload in a gunicorn master (--preload): DB pools and the
+Twilio client are created lazily and reset in each forked worker
+(see backend.app.reinit_after_fork).
 """
 import os
 import sys
@@ -70,7 +75,7 @@ try:
     
     # Import Flask app - this is where errors usually happen
     print("[WSGI] Importing Flask app from backend.app...", flush=True)
-    from backend.app import app
+    from backend.app import app, reinit_after_fork
     print("[WSGI] ✓ Flask app imported successfully!", flush=True)
     
     print("[WSGI] ===== WSGI INITIALIZATION COMPLETE =====", flush=True)
@@ -86,6 +91,13 @@ except Exception as e:
 # Gunicorn entry point
 application = app
 
+if __name__ == '__main__':
+    # `python wsgi.py` serves with gunicorn + gunicorn.conf.py instead of
+    # exiting after import (the Flask dev server is never used in production)
+    from gunicorn.app.wsgiapp import run
+    sys.argv = ['gunicorn', '--config', str(project_root / 'gunicorn.conf.py'), 'wsgi:application']
+    run()
+
 
 
 